@@ -29,19 +29,39 @@ import datetime
 import random
 import traceback
 import threading
+import contextlib
+import functools
+from collections import deque
 from xarm import version
 from xarm.wrapper import XArmAPI
+from xarm.tools.waypoints import WaypointLibrary
+from aris.scheduler import OrderScheduler, ICECREAM, GREETING, QUEUED, MAKING, SERVED, FAILED
+from aris.order_server import OrderServer
+from aris.vision_state import PerceptionHub, perception_property
+from aris.clock import RealClock
+from aris.recipe import RecipeRunner
+from aris.safety import SafetyMonitor
+from aris.vision_pipeline import VisionPipeline, DrawList, NULL_DRAW
+from aris.preview import PreviewServer
+from aris.compositor import MaskCompositor
+from aris.distance import DistanceEngine, record_frame
+from aris.zones import Zone, ZoneEngine, ENTERED, STABLE, LEFT
+from aris.inference import select_backend
+from aris.inference_scheduler import InferenceScheduler, InferenceTask
+from aris.motion_gate import MotionGate
+from aris.tracker import Tracker
+from aris.calibration import CameraCalibration, load_intrinsics
+from aris.dryrun import predict_throughput
+from aris.pipeline import PipelineExecutor, CAPSULE_WAIT, JIG
+from aris import recipes
+from xarm.tools.profiler import Profiler, profiled
 
 from threading import Thread, Event
-import socket
-import json
 import os
 
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import time
-from scipy.spatial.distance import cdist
 import logging
 
 
@@ -52,18 +72,61 @@ FRAME_WIDTH = 640            # 웹캠 프레임 너비
 FRAME_HEIGHT = 480           # 웹캠 프레임 높이
 CONFIDENCE_THRESHOLD = 0.87  # YOLO 모델의 신뢰도 임계값
 DEFAULT_MODEL_PATH = '/home/beakhongha/YOLO_ARIS/train23/weights/best.pt'   # YOLO 모델의 경로
+INFERENCE_BACKEND = 'pt'    # 추론 백엔드 ('pt', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8', 'auto'), 내보낸 모델은 best.pt 와 같은 폴더
+INFERENCE_IMGSZ = (FRAME_HEIGHT, FRAME_WIDTH)   # 추론 입력 크기 (높이, 너비), 내보낼 때와 같아야 함 (python -m aris.inference export)
+INFERENCE_SCHEDULE = True   # True 이면 ROI 크롭 / 다중 주기 추론 ('pt' 백엔드만), False 이면 매 프레임 전체 프레임 추론
+SAFETY_INFERENCE_RATE = 10  # 사람/로봇 인식 (전체 프레임) 추론 주기 (회/s)
+SAFETY_INFERENCE_IMGSZ = (256, 320)     # 사람/로봇 인식 입력 크기 (높이, 너비), 전체 프레임을 절반 해상도로
+ZONE_IDLE_RATE = 2          # 레시피가 기다리지 않을 때 캡슐/컵 ROI 크롭 추론 주기 (회/s), 씰 ROI 는 기다릴 때만 추론
+MOTION_GATE_THRESHOLD = 10  # 작업 영역의 블록 평균 밝기 변화가 이 값 이하이면 추론 대신 이전 결과 재사용, None 이면 사용 안 함
+SAFETY_REFRESH = 0.5        # 변화가 없어도 사람/로봇 인식을 다시 추론하는 최대 간격 (s)
+ZONE_REFRESH = 1.0          # 변화가 없어도 ROI 크롭을 다시 추론하는 최대 간격 (s)
+VISION_HEADLESS = False     # True 이면 OpenCV 창 없이 인식/판단만 실행 (운영 모드, 그리기 비용 없음)
+PREVIEW_HOST = '127.0.0.1'  # 미리보기 HTTP 서버 주소 (인증 없는 카메라 영상, 다른 PC 에서 보려면 '0.0.0.0')
+PREVIEW_PORT = 8081         # 미리보기 HTTP 서버 포트 (/stream.mjpg, /snapshot.jpg), None 이면 사용 안 함
+PREVIEW_FPS = 2             # 미리보기 최대 프레임 수 (회/s)
 
 CAPSULE_CHECK_ROI = [(460, 190, 90, 90), (370, 190, 90, 90), (280, 190, 90, 90)]  # A_ZONE, B_ZONE, C_ZONE 순서
 SEAL_CHECK_ROI = (475, 360, 110, 110)   # Seal check ROI 구역
 CUP_TRASH_ROI = (100, 20, 520, 210)     # storagy 위의 컵 쓰레기 인식 ROI 구역
+CAMERA_CALIBRATION_PATH = '/home/beakhongha/RobotArm/camera_calibration/calibration_data.npz'  # 카메라 내부 파라미터/왜곡 계수, 없으면 왜곡 보정 없이 호모그래피만
 
 ROBOT_STOP_DISTANCE = 50            # 로봇이 일시정지하는 사람과 로봇 사이의 거리
+DISTANCE_METHOD = 'kdtree'          # 최단 거리 계산 방법 ('kdtree', 'transform': 로봇 마스크 distanceTransform, 'brute')
+DISTANCE_MAX_POINTS = 2000          # 최단 거리 계산에 쓰는 로봇/사람 외곽선 최대 점 수 (프레임당 비용 상한)
+DISTANCE_RECORD_DIR = None          # 설정하면 사람과 로봇이 함께 인식된 프레임을 .npz 로 저장 (python -m aris.distance 벤치마크용)
+DISTANCE_RECORD_LIMIT = 300         # 최대 저장 프레임 수
+ROBOT_RESUME_DISTANCE = 80          # 로봇이 다시 움직이는 거리 (정지 거리와의 차이로 정지/재개 반복 방지)
+ROBOT_RESUME_FRAMES = 5             # 재개에 필요한 연속된 안전 프레임 수
+ROBOT_RESUME_HOLD = 1.0             # 정지 후 재개까지의 최소 시간 (s)
 CAPSULE_DETECTION_AREA_RATIO = 0.8  # 캡슐을 객체 인식하는 면적 비율
+ZONE_EXIT_RATIO = 0.6               # 이미 인식된 캡슐을 ROI 안에 있다고 보는 면적 비율 (히스테리시스)
+ZONE_MISS_FRAMES = 2                # ROI 를 벗어났다고 판단하기 전까지 허용하는 연속 미인식 프레임 수
 
 CAPSULE_DETECTION_TIME = 2  # 캡슐 인식 시간
 CUP_DETECTION_TIME = 1      # 컵 인식 시간
 
-DISTANCE_BETWEEN_POINTS = 10    # 중심좌표가 일정 거리 이하로 변동 시 중심좌표의 변동이 없다고 판단
+TRACK_IOU_THRESHOLD = 0.3       # 컵/컵홀더 박스를 같은 트랙으로 연결하는 최소 IoU
+TRACK_MAX_DISTANCE = 40         # IoU 로 연결되지 않은 박스를 예측 중심 거리로 연결하는 최대 거리 (px)
+TRACK_MAX_AGE = 1.0             # 인식되지 않은 트랙을 유지하는 시간 (s), 이 안에 다시 인식되면 인식 시간이 이어짐
+TRACK_MIN_HITS = 2              # 좌표를 전송하는 트랙의 최소 인식 프레임 수 (한 프레임 오인식 제외)
+TRACK_STILL_DISTANCE = 10       # 중심좌표가 이 거리 (px) 안에서만 움직이면 정지로 판단
+
+ORDER_SERVER_HOST = '127.0.0.1'     # 키오스크 주문 서버 주소
+ORDER_SERVER_PORT = 20002
+STATUS_PUBLISH_RATE = 5             # 로봇 상태 스냅샷의 최대 푸시 횟수 (회/s), 그 사이의 변경은 합쳐서 전송
+ORDER_MAKE_TIME_ESTIMATE = 145      # 제조 시간 통계가 없을 때 ETA 에 쓰는 주문 한 건의 제조 시간 (s, dry-run 기준)
+
+WAYPOINT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aris_waypoints.json')  # 고정 포즈 IK 캐시 파일
+JOINT_POSITION_NAMES = ('position_home', 'position_topping_B', 'position_icecream_no_topping')  # 관절 각도로 정의된 포즈
+
+ORDER_BATCH_SIZE = 3        # 대기 주문을 한 번에 연속 제조하는 최대 개수 (1 이면 한 건씩)
+BATCH_PREDICT_ORDERS = [{'topping1': 1, 'topping2': 0, 'topping3': 0},
+                        {'topping1': 0, 'topping2': 1, 'topping3': 0}] * ORDER_BATCH_SIZE   # 시작 시 예상 처리량을 dry-run 할 주문 목록
+
+PIPELINE_OVERLAP = True     # 다음 주문의 캡슐 인식 대기를 앞 주문의 씰 확인이 끝나면 바로 시작 (False 이면 주문마다 순서대로)
+
+PROFILE_TRACE_DIR = None    # 주문별 Chrome trace 저장 폴더 (None 이면 저장 안 함), chrome://tracing 에서 확인
 
 logging.getLogger("ultralytics").setLevel(logging.WARNING)  # 로깅 수준을 WARNING으로 설정하여 정보 메시지 비활성화
 
@@ -71,31 +134,48 @@ logging.getLogger("ultralytics").setLevel(logging.WARNING)  # 로깅 수준을 W
 
 class YOLOMain:
     def __init__(self, robot_main, model_path=DEFAULT_MODEL_PATH, webcam_index=WEBCAM_INDEX, 
-                 frame_width=FRAME_WIDTH, frame_height=FRAME_HEIGHT, conf=CONFIDENCE_THRESHOLD):
+                 frame_width=FRAME_WIDTH, frame_height=FRAME_HEIGHT, conf=CONFIDENCE_THRESHOLD,
+                 headless=VISION_HEADLESS, preview_port=PREVIEW_PORT, preview_host=PREVIEW_HOST,
+                 backend=INFERENCE_BACKEND):
         """
         YOLOMain 클래스 초기화 메서드
         모델을 로드하고 웹캠을 초기화하며, 카메라와 로봇 좌표계 간의 호모그래피 변환 행렬을 계산
         """
-        # 모델 로드, 웹캠 초기화
-        self.model = YOLO(model_path)
+        # 모델 로드 (선택한 추론 백엔드), 웹캠 초기화
+        self.backend = select_backend(backend, model_path, conf=conf, imgsz=INFERENCE_IMGSZ)
+        self.names = self.backend.names
         self.webcam = cv2.VideoCapture(webcam_index)
         self.webcam.set(cv2.CAP_PROP_FRAME_WIDTH, frame_width)
         self.webcam.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_height)
+        self.webcam.set(cv2.CAP_PROP_BUFFERSIZE, 1)     # 드라이버 버퍼에 오래된 프레임이 쌓이지 않도록 설정
         self.conf = conf
+        self.pipeline = None
+        self.compositor = MaskCompositor(alpha=0.3)     # 프레임의 모든 마스크를 한 번에 오버레이
+        self.distance_engine = DistanceEngine(DISTANCE_METHOD, max_points=DISTANCE_MAX_POINTS)
+        self.distance_record_count = 0
+        self.last_nearest = None
+        self.min_distance = 300
+        self.zones = self.init_zones()                  # 모든 ROI 판정을 프레임당 한 번에 계산
+        robot_main.zone_engine = self.zones
+
+        # 작업별 영역 / 주기 추론 (레시피가 기다리는 ROI 만 매 프레임 추론)
+        self.scheduler = self.init_inference_scheduler(robot_main.safety.clock)
+        robot_main.inference_scheduler = self.scheduler
+
+        # 헤드리스 모드, 미리보기는 접속한 클라이언트가 있을 때만 그림
+        self.headless = headless
+        self.preview = PreviewServer(self.preview_snapshot, host=preview_host, port=preview_port,
+                                     fps=PREVIEW_FPS) if preview_port else None
 
         self.robot = robot_main
 
         if not self.webcam.isOpened():
             raise Exception("웹캠을 열 수 없습니다. 프로그램을 종료합니다.")
         
-        # 컵, 컵홀더 좌표 초기화
-        self.cup_trash_x, self.cup_trash_y = None, None
-        self.cup_trash_x_pixel, self.cup_trash_y_pixel = None, None
-        self.last_cup_trash_center = None
-
-        self.cup_holder_x, self.cup_holder_y = None, None
-        self.cup_holder_x_pixel, self.cup_holder_y_pixel = None, None
-        self.last_cup_holder_center = None
+        # 컵, 컵홀더 트래커 (프레임 간 같은 객체에 같은 ID 유지) 및 라벨별 선택한 트랙 ID
+        self.cup_tracker = Tracker(TRACK_IOU_THRESHOLD, TRACK_MAX_DISTANCE, TRACK_MAX_AGE, TRACK_MIN_HITS,
+                                   TRACK_STILL_DISTANCE)
+        self.selected_tracks = {}
 
         # ROI 상태 초기화
         self.init_roi_state()
@@ -103,8 +183,9 @@ class YOLOMain:
         # 객체 인식 바운딩 박스 및 마스크 색상 설정
         self.colors = self.init_colors()
 
-        # 호모그래피 변환 행렬 계산         
-        self.homography_matrix = self.compute_homography_matrix()
+        # 카메라 보정 (왜곡 보정 + 호모그래피 룩업 맵, 시작할 때 한 번 계산)
+        self.calibration = self.compute_homography_matrix()
+        self.homography_matrix = self.calibration.homography
     
 
     def init_roi_state(self):
@@ -113,13 +194,67 @@ class YOLOMain:
         """
         # 캡슐, 씰 제거 여부 확인 변수 초기화
         self.robot.A_ZONE, self.robot.B_ZONE, self.robot.C_ZONE, self.robot.NOT_SEAL = False, False, False, False
-        self.robot.A_ZONE_start_time, self.robot.B_ZONE_start_time, self.robot.C_ZONE_start_time = None, None, None
+        self.zones.reset()
+        self.cup_tracker.reset()
+        self.selected_tracks = {}
 
         # 컵, 컵홀더 탐지 변수 초기화
         self.robot.cup_trash_detected, self.robot.cup_holder_detected = False, False
         self.robot.cup_trash_detect_start_time, self.robot.cup_holder_detect_start_time = None, None
 
 
+    def init_zones(self):
+        """
+        캡슐 A/B/C 존, 씰 확인, 컵/컵홀더 ROI 구역을 생성하는 메서드
+        캡슐/씰 구역은 stable 이벤트에서 인식 허브의 플래그를 켜고, 컵/컵홀더 구역은 중심 좌표 판정에만 사용
+        """
+        zones = [Zone(name, roi, ('capsule',), ratio=CAPSULE_DETECTION_AREA_RATIO, exit_ratio=ZONE_EXIT_RATIO,
+                      dwell=CAPSULE_DETECTION_TIME, miss_frames=ZONE_MISS_FRAMES)
+                 for name, roi in zip(('A_ZONE', 'B_ZONE', 'C_ZONE'), CAPSULE_CHECK_ROI)]
+        zones.append(Zone('NOT_SEAL', SEAL_CHECK_ROI, ('capsule_not_label',), ratio=CAPSULE_DETECTION_AREA_RATIO))
+        x1, y1, x2, y2 = CUP_TRASH_ROI
+        zones.append(Zone('cup_trash', (x1, y1, x2 - x1, y2 - y1), ('cup',), mode='center'))
+        zones.append(Zone('cup_holder', (x1, y1, x2 - x1, y2 - y1), ('cup_holder',), mode='center'))
+        return ZoneEngine(zones)
+
+
+    def init_inference_scheduler(self, clock):
+        """
+        추론 작업을 생성하는 메서드
+        safety 는 전체 프레임을 낮은 해상도로 자체 주기에, capsule / seal / cup 은 ROI 크롭을 원래 배율로
+        로봇이 vision_demand() 로 기다리는 동안 매 프레임, 그 외에는 ZONE_IDLE_RATE 로 실행
+        작업 영역에 변화가 없으면 (MotionGate) refresh 초까지 이전 결과를 재사용
+        내보낸 모델 (INFERENCE_BACKEND 가 'pt' 가 아닌 경우) 은 입력 크기가 INFERENCE_IMGSZ 로 고정이므로
+        작업별 크기로 실행할 수 없어 전체 프레임 추론 하나로 실행
+        """
+        gate = MotionGate(MOTION_GATE_THRESHOLD) if MOTION_GATE_THRESHOLD is not None else None
+        schedule = INFERENCE_SCHEDULE
+        if schedule and getattr(self.backend, 'fixed_size', False):
+            print('inference backend {} has a fixed input size {}, ROI/multi-rate scheduling disabled'.format(
+                self.backend.name, tuple(self.backend.imgsz)))
+            schedule = False
+        if not schedule:
+            self.safety_task, self.zone_tasks, self.cup_task = 'frame', {'frame'}, 'frame'
+            return InferenceScheduler(self.backend, [InferenceTask('frame', imgsz=INFERENCE_IMGSZ, refresh=SAFETY_REFRESH)],
+                                      clock=clock, gate=gate)
+        capsule_x1 = min(x for x, y, w, h in CAPSULE_CHECK_ROI)
+        capsule_y1 = min(y for x, y, w, h in CAPSULE_CHECK_ROI)
+        capsule_x2 = max(x + w for x, y, w, h in CAPSULE_CHECK_ROI)
+        capsule_y2 = max(y + h for x, y, w, h in CAPSULE_CHECK_ROI)
+        cup_x1, cup_y1, cup_x2, cup_y2 = CUP_TRASH_ROI
+        tasks = [
+            InferenceTask('safety', labels=('robot', 'human', 'hand'), rate=SAFETY_INFERENCE_RATE,
+                          demand_rate=SAFETY_INFERENCE_RATE, imgsz=SAFETY_INFERENCE_IMGSZ, refresh=SAFETY_REFRESH),
+            InferenceTask('capsule', roi=(capsule_x1, capsule_y1, capsule_x2 - capsule_x1, capsule_y2 - capsule_y1),
+                          labels=('capsule',), rate=ZONE_IDLE_RATE, refresh=ZONE_REFRESH),
+            InferenceTask('seal', roi=SEAL_CHECK_ROI, labels=('capsule_not_label',), rate=0, refresh=ZONE_REFRESH),
+            InferenceTask('cup', roi=(cup_x1, cup_y1, cup_x2 - cup_x1, cup_y2 - cup_y1),
+                          labels=('cup', 'cup_holder'), rate=ZONE_IDLE_RATE, refresh=ZONE_REFRESH),
+        ]
+        self.safety_task, self.zone_tasks, self.cup_task = 'safety', {'capsule', 'seal', 'cup'}, 'cup'
+        return InferenceScheduler(self.backend, tasks, clock=clock, gate=gate)
+
+
     def init_colors(self):
         """
         객체 인식 색상을 초기화하는 메서드
@@ -139,7 +274,10 @@ class YOLOMain:
     def compute_homography_matrix(self):
         """
         호모그래피 변환 행렬을 계산하는 메서드
-        카메라 좌표와 로봇 좌표를 기반으로 호모그래피 행렬을 계산
+        카메라 좌표와 로봇 좌표를 기반으로 호모그래피 행렬을 계산하고, 보정점의 재투영 오차를 출력
+        CAMERA_CALIBRATION_PATH 가 있으면 왜곡 보정한 좌표로 계산하고 전체 픽셀의 룩업 맵을 미리 만듦
+
+        :return: CameraCalibration
         """
         # 카메라 좌표, 로봇 좌표
         camera_points = np.array([
@@ -150,64 +288,39 @@ class YOLOMain:
             [116.3, -424.9], [17.4, -456.5], [-73.2, -484.2], [140.1, -518.5], [45.6, -548.1], [-47.5, -580.8]
         ], dtype=np.float32)
 
-        # 변환 행렬 계산
-        homography_matrix, _ = cv2.findHomography(camera_points, robot_points)
-        print("호모그래피 변환 행렬 homography_matrix:\n", homography_matrix)
+        # 변환 행렬 및 룩업 맵 계산
+        mtx, dist = load_intrinsics(CAMERA_CALIBRATION_PATH)
+        calibration = CameraCalibration(camera_points, robot_points, mtx, dist, size=(FRAME_WIDTH, FRAME_HEIGHT))
+        print("호모그래피 변환 행렬 homography_matrix:\n", calibration.homography)
+        report = calibration.reprojection_error()
+        print('reprojection error: rms {:.2f}mm, max {:.2f}mm, undistort={}'.format(
+            report['rms'], report['max'], mtx is not None))
 
-        return homography_matrix
+        return calibration
     
 
     def transform_to_robot_coordinates(self, image_points):
         """
         이미지 좌표를 로봇 좌표계로 변환하는 메서드
-        주어진 이미지 좌표를 로봇 좌표계로 변환
-        """
-        camera_coords = np.array([[image_points]], dtype=np.float32)
-        robot_coords = cv2.perspectiveTransform(camera_coords, self.homography_matrix)
+        주어진 이미지 좌표 (x, y) 하나 또는 N x 2 를 로봇 좌표계로 변환, 여러 점은 한 번에 변환
 
-        return [round(float(coord), 1) for coord in robot_coords[0][0]]
+        :return: 점 하나이면 [x_mm, y_mm], 여러 점이면 N x 2 배열
+        """
+        robot_coords = np.round(self.calibration.transform(image_points), 1)
+        if np.ndim(image_points) == 1:
+            return [float(coord) for coord in robot_coords[0]]
+        return robot_coords
 
 
     def predict_on_image(self, img):
         """
         입력된 이미지에 대해 예측을 수행하는 메서드
-        YOLO 모델을 사용해 바운딩 박스, 마스크, 클래스, 신뢰도 점수를 반환
+        선택한 추론 백엔드 (pt / ONNX / OpenVINO) 로 바운딩 박스, 마스크, 클래스, 신뢰도 점수를 반환
         """
-        result = self.model(img, conf=self.conf)[0]
-
-        cls = result.boxes.cls.cpu().numpy() if result.boxes else []
-        probs = result.boxes.conf.cpu().numpy() if result.boxes else []
-        boxes = result.boxes.xyxy.cpu().numpy() if result.boxes else []
-        masks = result.masks.data.cpu().numpy() if result.masks is not None else []
-        
         # 예측 결과 반환(박스, 마스크, 클래스, 신뢰도 점수)
-        return boxes, masks, cls, probs
+        return self.backend.predict(img)
 
 
-    def overlay(self, image, mask, color, alpha=0.5):
-        """
-        이미지 위에 세그멘테이션 마스크를 오버레이하는 메서드
-        주어진 색상과 투명도를 사용하여 마스크를 원본 이미지에 결합
-        """
-        # 마스크 크기를 조정하고 색상으로 칠함
-        mask = cv2.resize(mask, (image.shape[1], image.shape[0]))
-        colored_mask = np.zeros_like(image, dtype=np.uint8)
-        for c in range(3):
-            colored_mask[:, :, c] = mask * color[c]
-        
-        # 오버레이 이미지를 생성하고 반환
-        try:
-            mask_indices = mask > 0
-            overlay_image = image.copy()
-            overlay_image[mask_indices] = cv2.addWeighted(image[mask_indices], 1 - alpha, colored_mask[mask_indices], alpha, 0)
-            return overlay_image
-        
-        # 오류 발생 시 원본 이미지를 반환
-        except Exception as e:
-            print(f"오버레이 처리 중 오류 발생: {e}")
-            return image  
-        
-
     def find_contours(self, mask):
         """
         마스크에서 외곽선을 찾는 메서드
@@ -216,25 +329,38 @@ class YOLOMain:
         return contours
     
 
-    def pause_robot(self, image_with_masks, robot_contours, human_contours):
+    def pause_robot(self, draw, robot_contours, human_contours, robot_masks=None, fresh=True):
         """
         로봇과 인간 간의 최단 거리를 계산하고 로봇을 일시정지하게 하는 메서드
+        fresh 가 False 이면 (이번 프레임에 사람/로봇 추론 없음) 마지막 최단 거리만 다시 표시
         """
-        # 사람과 로봇 사이의 최단 거리 계산
-        if robot_contours and human_contours:
-            robot_points = np.vstack(robot_contours).squeeze()
-            human_points = np.vstack(human_contours).squeeze()
-            dists = cdist(robot_points, human_points)
-            min_dist_idx = np.unravel_index(np.argmin(dists), dists.shape)
-            robot_point = robot_points[min_dist_idx[0]]
-            human_point = human_points[min_dist_idx[1]]
-            self.min_distance = dists[min_dist_idx]
+        if not fresh:
+            if self.last_nearest is not None:
+                draw.line(self.last_nearest[1], self.last_nearest[2], (255, 255, 255), 2)
+            return
+
+        # 사람과 로봇 사이의 최단 거리 계산 (distanceTransform 방법은 로봇 마스크 사용)
+        robot_mask = None
+        if robot_masks:
+            robot_mask = robot_masks[0] if len(robot_masks) == 1 else np.max(robot_masks, axis=0)
+        nearest = None
+        if (robot_contours or robot_mask is not None) and human_contours:
+            nearest = self.distance_engine.compute(robot_contours, human_contours, robot_mask=robot_mask)
+            if DISTANCE_RECORD_DIR and self.distance_record_count < DISTANCE_RECORD_LIMIT:
+                os.makedirs(DISTANCE_RECORD_DIR, exist_ok=True)
+                record_frame(os.path.join(DISTANCE_RECORD_DIR, 'frame_{:05d}.npz'.format(self.distance_record_count)),
+                             robot_contours, human_contours, robot_mask)
+                self.distance_record_count += 1
+
+        self.last_nearest = nearest
+        if nearest is not None:
+            self.min_distance, robot_point, human_point = nearest
             min_distance_bool = True
 
             # 사람과 로봇 사이의 최단 거리 표시
-            cv2.line(image_with_masks, tuple(robot_point), tuple(human_point), (255, 255, 255), 2)
+            draw.line(robot_point, human_point, (255, 255, 255), 2)
             mid_point = ((robot_point[0] + human_point[0]) // 2, (robot_point[1] + human_point[1]) // 2)
-            cv2.putText(image_with_masks, f'{self.min_distance:.2f}', mid_point, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+            draw.putText(f'{self.min_distance:.2f}', mid_point, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
 
         # 사람 또는 로봇의 외곽선 없을 때 최단 거리 비활성화
         else:
@@ -242,282 +368,268 @@ class YOLOMain:
             min_distance_bool = False
 
         # 거리 조건 체크 및 로봇 일시정지 제어
-        if self.min_distance <= ROBOT_STOP_DISTANCE and min_distance_bool and self.robot.pressing == False:
-            self.robot.robot_state = 'robot stop'
-            self.robot._arm.set_state(3)
-        elif self.min_distance > ROBOT_STOP_DISTANCE or not min_distance_bool:
-            self.robot.robot_state = 'robot move'
-            self.robot._arm.set_state(0)
+        # 명령은 SafetyMonitor 의 전용 스레드/연결로 보내므로 이 프레임의 처리는 기다리지 않음
+        self.robot.safety.update(self.min_distance if min_distance_bool else None, self.capture_time)
 
 
-    def capsule_detect_check(self, x1, y1, x2, y2, roi, zone_name, zone_flag, start_time):
+    def zone_events(self, events):
         """
-        ROI 영역에서 객체가 일정 시간 이상 감지되었는지 확인하는 메서드
+        ROI 구역 이벤트로 캡슐/씰 인식 상태를 갱신하는 메서드
+        캡슐 구역은 CAPSULE_DETECTION_TIME 이상 머물면, 씰 구역은 들어오는 즉시 stable
+        플래그는 로봇이 동작을 마치고 초기화할 때까지 유지
         """
-        # ROI와 바운딩 박스의 교차 영역 계산
-        rx, ry, rw, rh = roi
-        intersection_x1 = max(x1, rx)
-        intersection_y1 = max(y1, ry)
-        intersection_x2 = min(x2, rx + rw)
-        intersection_y2 = min(y2, ry + rh)
-        intersection_area = max(0, intersection_x2 - intersection_x1) * max(0, intersection_y2 - intersection_y1)
-        box_area = (x2 - x1) * (y2 - y1)
-
-        # 교차 영역이 바운딩 박스 면적의 일정 비율 이상인지 여부
-        if intersection_area >= CAPSULE_DETECTION_AREA_RATIO * box_area:
-            is_condition_met = True
-        else:
-            is_condition_met = False
-
-        # ROI 내에서 capsule 객체 일정 시간 이상 인식 확인
-        if is_condition_met:
-            current_time = time.time()
-            if not zone_flag:
-                if start_time is None:
-                    start_time = current_time
-                    print(f'{zone_name} start time set')
-                elif current_time - start_time >= CAPSULE_DETECTION_TIME:
-                    zone_flag = True
-                else:
-                    print(f'Waiting for {CAPSULE_DETECTION_TIME} seconds: {current_time - start_time:.2f} seconds elapsed')
-            else:
-                start_time = current_time
-        else:
-            start_time = None
-
-        # ROI 상태 및 인식 시작 시간 반환
-        return zone_flag, start_time
-    
-
-    def seal_remove_check(self, x1, y1, x2, y2, roi, zone_flag):
-        """
-        ROI 영역에서 객체가 감지되었는지 확인하는 메서드
-        """
-        # 씰 제거 여부 확인 ROI와 바운딩 박스의 교차 영역 계산
-        rx, ry, rw, rh = roi
-        intersection_x1 = max(x1, rx)
-        intersection_y1 = max(y1, ry)
-        intersection_x2 = min(x2, rx + rw)
-        intersection_y2 = min(y2, ry + rh)
-        intersection_area = max(0, intersection_x2 - intersection_x1) * max(0, intersection_y2 - intersection_y1)
-        box_area = (x2 - x1) * (y2 - y1)
-        
-        # 교차 영역이 바운딩 박스 면적의 일정 비율 이상인지 여부
-        if intersection_area >= CAPSULE_DETECTION_AREA_RATIO * box_area:
-            zone_flag = True
+        for event in events:
+            zone = event['zone']
+            if zone not in ('A_ZONE', 'B_ZONE', 'C_ZONE', 'NOT_SEAL'):
+                continue
+            if event['event'] == STABLE:
+                self.robot.perception.publish(**{zone: True})
+                print('{} detected ({:.2f}s)'.format(zone, event['elapsed']))
+            elif event['event'] == ENTERED and zone != 'NOT_SEAL':
+                print('{} capsule entered, waiting for {} seconds'.format(zone, CAPSULE_DETECTION_TIME))
+            elif event['event'] == LEFT and zone != 'NOT_SEAL':
+                print('{} capsule left after {:.2f} seconds'.format(zone, event['elapsed']))
 
-        # ROI 상태 반환
-        return zone_flag
-    
 
-    def make_object_list(self, x1, y1, x2, y2, image_with_masks, object_list, object_list_pixel):
+    def track_object(self, draw, label, start_time, set_object_coordinates, now):
         '''
-        ROI 영역에서 객체(컵, 컵 홀더)가 감지되었는지 확인하고 리스트에 중심 좌표를 저장하는 메서드
+        ARIS에서 가장 가까이 있는 객체(컵, 컵 홀더) 트랙의 좌표값을 전송하고, 일정 시간 이상 정지해 있는지 확인하는 메서드
+        선택한 트랙은 사라질 때까지 유지하므로 인식이 한두 프레임 빠지거나 다른 객체가 잠깐 더 가까이 보여도 인식 시간이 이어짐
+
+        :param start_time: 로봇이 확인을 요청한 시각 (None 이면 지금), 로봇이 None 으로 초기화하면 인식 시간을 다시 측정
+        :return: (인식 여부, start_time)
         '''
-        # center 좌표(pixel)
-        center_x_pixel = (x2 - x1) / 2 + x1
-        center_y_pixel = (y2 - y1) / 2 + y1
-
-        # ROI 영역 내에 있는지 확인
-        if CUP_TRASH_ROI[0] <= center_x_pixel <= CUP_TRASH_ROI[2] and CUP_TRASH_ROI[1] <= center_y_pixel <= CUP_TRASH_ROI[3]:
-            # 이미지 좌표로 실세계 좌표 계산
-            image_points = [center_x_pixel, center_y_pixel]
-            world_points = self.transform_to_robot_coordinates(image_points)
-            center_x_mm, center_y_mm = world_points
-            
-            # 리스트에 좌표값 추가
-            object_list_pixel.append((center_x_pixel, center_y_pixel))
-            object_list.append((center_x_mm, center_y_mm))
-            
-            # 중심좌표 화면에 출력
-            cv2.putText(image_with_masks, f'Center: ({int(center_x_mm)}, {int(center_y_mm)})', (int(center_x_pixel), int(center_y_pixel - 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            cv2.circle(image_with_masks, (int(center_x_pixel), int(center_y_pixel)), 5, (255, 0, 0), -1)
+        tracks = self.cup_tracker.active(label)
+        if not tracks:
+            self.selected_tracks.pop(label, None)
+            return False, None
+
+        # 중심좌표의 로봇 좌표 (mm), 모든 트랙을 한 번에 변환
+        robot_centers = self.transform_to_robot_coordinates([track.center for track in tracks])
+        centers = {track.track_id: robot_centers[index] for index, track in enumerate(tracks)}
+        for track in tracks:
+            x_mm, y_mm = map(float, centers[track.track_id])
+            x_pixel, y_pixel = map(int, track.center)
+            draw.putText(f'#{track.track_id} ({int(x_mm)}, {int(y_mm)})', (x_pixel, y_pixel - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+            draw.circle((x_pixel, y_pixel), 5, (255, 0, 0), -1)
+
+        # 선택한 트랙이 없어졌을 때만 가장 큰 y 좌표(mm)를 가진 트랙을 새로 선택
+        track = next((track for track in tracks if track.track_id == self.selected_tracks.get(label, None)), None)
+        if track is None:
+            track = max(tracks, key=lambda track: centers[track.track_id][1])
+            self.selected_tracks[label] = track.track_id
+            print(f'{label} track #{track.track_id} selected')
+        x_mm, y_mm = map(float, centers[track.track_id])
+
+        # 좌표 정보를 로봇에 전송
+        set_object_coordinates(x_mm, y_mm)
 
-        # 중심 좌표 저장된 리스트 반환
-        return object_list, object_list_pixel
+        # 선택한 트랙을 다른 색으로 화면에 출력
+        x_pixel, y_pixel = map(int, track.center)
+        draw.putText(f'#{track.track_id} ({int(x_mm)}, {int(y_mm)})', (x_pixel, y_pixel - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+        draw.circle((x_pixel, y_pixel), 5, (0, 0, 255), -1)
 
+        # 요청 시각과 트랙이 정지하기 시작한 시각 중 나중 시각부터 일정 시간 이상 정지해 있는지 확인
+        if start_time is None:
+            start_time = now
+        return now - max(start_time, track.still_since) >= CUP_DETECTION_TIME, start_time
 
-    def object_detect_order(self, image_with_masks, zone_flag, start_time, set_object_coordinates, last_object_center,
-                               object_x, object_y, object_max_y, object_list,
-                               object_x_pixel, object_y_pixel, object_max_y_pixel, object_list_pixel):
-        '''
-        ARIS에서 가장 가까이 있는 객체(컵, 컵 홀더)의 좌표값을 받아오고, 일정 시간 이상 좌표값의 변동이 없는지 확인하는 메서드
-        '''
-        # 가장 큰 y 좌표를 가진 객체를 찾음
-        for x, y in object_list_pixel:
-            if y > object_max_y_pixel:
-                object_max_y_pixel = y
-                object_x_pixel = x
-                object_y_pixel = y
-
-        for x, y in object_list:
-            if y > object_max_y:
-                object_max_y = y
-                object_x = x
-                object_y = y
 
-        # 좌표 정보를 로봇에 전송
-        set_object_coordinates(object_x, object_y)
-
-        # 중심좌표 중에 ARIS와 가장 가까운 값 다른 색으로 화면에 출력
-        cv2.putText(image_with_masks, f'Center: ({int(object_x)}, {int(object_y)})', (int(object_x_pixel), int(object_y_pixel - 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-        cv2.circle(image_with_masks, (int(object_x_pixel), int(object_y_pixel)), 5, (0, 0, 255), -1)
-
-        # 일정 시간 이상 중심좌표의 변동 없이 감지되는지 확인
-        if last_object_center:
-            if self.distance_between_points((object_x, object_y), last_object_center) < DISTANCE_BETWEEN_POINTS:
-                current_time = time.time()
-                if start_time is None:
-                    start_time = current_time
-                    print('object detect start time set')
-                elif current_time - start_time >= CUP_DETECTION_TIME:
-                    zone_flag = True
-                else:
-                    print(f"object detected for {current_time - start_time:.2f} seconds")
-            else:
-                start_time = None
-                zone_flag = False
-        # 중심좌표 갱신
-        last_object_center = (object_x, object_y)
-
-        # ROI 상태, 인식 시작 시간, 갱신한 중심좌표 반환
-        return zone_flag, start_time, last_object_center
-
-
-    def distance_between_points(self, p1, p2):
+    def run_yolo(self, render=True):
         """
-        객체의 현재 위치와 과거 위치의 차이를 비교하기 위한 메서드
+        YOLO 모델을 실행하는 메서드
+        캡처 / 인식(예측 + 판단) / 화면 표시를 각각의 스레드에서 실행하고, 종료될 때까지 블로킹
+
+        :param render: False 이면 화면 표시 스레드 없이 인식과 판단만 실행
         """
-        return np.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+        render = render and not self.headless
+        self.pipeline = VisionPipeline(self.webcam.read, self.scheduler.infer, self.process_detections,
+                                       render=self.render_frame if render else None, clock=self.robot.safety.clock,
+                                       infer_time=True)
+        self.robot.vision_pipeline = self.pipeline
+        if self.preview is not None:
+            self.preview.start()
+        self.pipeline.run()
+        if self.preview is not None:
+            self.preview.stop()
+
+        # 프레임당 CPU 시간 (헤드리스 모드에서 줄어드는 CPU 비교용)
+        metrics = self.pipeline.metrics()
+        print('vision cpu per frame: infer {:.1f}ms (decide {:.1f}ms), render {:.1f}ms, headless={}'.format(
+            metrics['infer']['cpu']['avg'] * 1000, metrics['infer']['decide_cpu']['avg'] * 1000,
+            metrics['render']['cpu']['avg'] * 1000, not render))
+        stats = self.scheduler.stats()
+        print('inference per frame: {:.1f}ms (gate {:.2f}ms), saved {:.1f}s, {}'.format(
+            stats['avg_ms'], stats['gate_ms'], stats['saved_ms'] / 1000, ', '.join(
+                '{} {} runs {:.1f}ms reused {:.0%}'.format(name, task['runs'], task['avg_ms'], task['hit_rate'])
+                for name, task in stats['tasks'].items())))
+
+        # 자원 해제
+        self.webcam.release()  # 웹캠 장치 해제
+        cv2.destroyAllWindows()  # 모든 OpenCV 창 닫기
 
 
-    def run_yolo(self):
+    def process_detections(self, frame, detections):
         """
-        YOLO 모델을 실행하는 메서드
-        실시간으로 웹캠 영상을 처리 및 예측 결과를 화면에 출력하고, 여러 기능을 실행
+        한 프레임의 예측 결과로 ROI 상태, 컵/컵홀더 좌표, 로봇 일시정지를 갱신하는 메서드 (인식 스레드)
+        그릴 내용은 DrawList 에 기록만 하고 실제 그리기는 render_frame 에서 실행
+
+        :return: DrawList
         """
-        # 카메라 작동
-        while True:
-            # 웹캠에서 프레임 읽기
-            ret, frame = self.webcam.read()
+        boxes, masks, cls, probs = detections
 
-            # 프레임을 읽지 못한 경우 오류 메시지 출력, 프로그램 종료
-            if not ret: 
-                print("카메라에서 프레임을 읽을 수 없습니다. 프로그램을 종료합니다.")
-                break
+        # 사람/로봇 인식 결과의 촬영 시각, 안전 정지 응답 시간 측정 기준
+        # 사람/로봇 추론이 이번 프레임에 실행되지 않았으면 (다중 주기) 거리 계산과 안전 정지 판단을 건너뜀
+        self.capture_time = detections.timestamps.get(self.safety_task, frame.capture_time)
+        safety_fresh = self.safety_task in detections.fresh
 
-            # 현재 프레임 예측
-            boxes, masks, cls, probs = self.predict_on_image(frame)
+        # 이 프레임의 인식 결과는 같은 프레임 번호로 기록
+        self.robot.perception.new_frame()
 
-            # 원본 이미지에 마스크 오버레이 및 디텍션 박스 표시
-            image_with_masks = np.copy(frame)
+        # 마스크 오버레이 및 디텍션 박스 등 그릴 내용, 화면 표시와 미리보기가 모두 없으면 기록하지 않음
+        drawing = self.pipeline.render is not None or (self.preview is not None and self.preview.active)
+        draw = DrawList() if drawing else NULL_DRAW
 
-            # 사람과 로봇의 segmentation 마스크 외곽선을 저장하는 리스트 (프레임 마다 초기화)
-            robot_contours = []
-            human_contours = []
+        # 사람과 로봇의 segmentation 마스크 외곽선을 저장하는 리스트 (프레임 마다 초기화)
+        robot_contours = []
+        human_contours = []
+        robot_masks = []
 
-            # ROI 영역 내 객체(컵, 컵홀더) 좌표를 저장하는 리스트 (프레임 마다 초기화)
-            self.cup_trash_list = []
-            self.cup_trash_list_pixel = []
-            self.cup_holder_list = []
-            self.cup_holder_list_pixel = []
+        # 캡슐을 인식하는 ROI를 흰색 바운딩 박스로 그리고 선을 얇게 설정
+        for (x, y, w, h) in CAPSULE_CHECK_ROI:
+            draw.rectangle((x, y), (x + w, y + h), (255, 255, 255), 1)
 
-            # 객체(컵, 컵홀더) y좌표 비교용 변수 (프레임 마다 초기화)
-            self.cup_trash_max_y = -float('inf')
-            self.cup_trash_max_y_pixel = -float('inf')
-            self.cup_holder_max_y = -float('inf')
-            self.cup_holder_max_y_pixel = -float('inf')
+        # 씰 제거 여부 확인 ROI를 흰색 바운딩 박스로 그리고 선을 얇게 설정
+        draw.rectangle((SEAL_CHECK_ROI[0], SEAL_CHECK_ROI[1]), 
+                       (SEAL_CHECK_ROI[0] + SEAL_CHECK_ROI[2], SEAL_CHECK_ROI[1] + SEAL_CHECK_ROI[3]), 
+                       (255, 255, 255), 1)
+        
+        # 'hand' 객체를 'human' 객체로 변경
+        labels = ['human' if self.names[int(class_id)] == 'hand' else self.names[int(class_id)] for class_id in cls]
+
+        # 모든 객체와 모든 ROI 구역의 교차 판정 및 체류 시간 갱신 (프레임당 한 번, 구역 추론이 실행된 프레임만)
+        if detections.fresh & self.zone_tasks:
+            zones = self.zones.update(boxes, labels, frame.capture_time)
+            self.zone_events(zones.events)
+        else:
+            zones = self.zones.peek(boxes, labels)
 
-            # 캡슐을 인식하는 ROI를 흰색 바운딩 박스로 그리고 선을 얇게 설정
-            for (x, y, w, h) in CAPSULE_CHECK_ROI:
-                cv2.rectangle(image_with_masks, (x, y), (x + w, y + h), (255, 255, 255), 1)
+        # 각 객체에 대해 박스, 마스크 생성
+        for index, (box, mask, label, prob) in enumerate(zip(boxes, masks, labels, probs)):
 
-            # 씰 제거 여부 확인 ROI를 흰색 바운딩 박스로 그리고 선을 얇게 설정
-            cv2.rectangle(image_with_masks, (SEAL_CHECK_ROI[0], SEAL_CHECK_ROI[1]), 
-                          (SEAL_CHECK_ROI[0] + SEAL_CHECK_ROI[2], SEAL_CHECK_ROI[1] + SEAL_CHECK_ROI[3]), 
-                          (255, 255, 255), 1)
+            # 클래스에 해당하는 색상 가져오기
+            color = self.colors.get(label, (255, 255, 255))  
             
-            # 각 객체에 대해 박스, 마스크 생성
-            for box, mask, class_id, prob in zip(boxes, masks, cls, probs):
-                label = self.model.names[int(class_id)]
+            if mask is not None and len(mask) > 0:
+                # 마스크 오버레이
+                draw.mask(mask, color)
+
+                # 라벨별 외곽선 저장
+                if not safety_fresh:
+                    pass
+                elif label == 'robot':
+                    robot_masks.append(mask)
+                    if self.distance_engine.method != 'transform':
+                        robot_contours.extend(self.find_contours(mask))
+                elif label == 'human':
+                    human_contours.extend(self.find_contours(mask))
+
+            # 디텍션 박스 및 라벨 표시
+            x1, y1, x2, y2 = map(int, box)
+            draw.rectangle((x1, y1), (x2, y2), color, 2)                     
+            draw.putText(f'{label} {prob:.2f}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        # Storagy 위의 'cup', 'cup_holder' 객체를 트랙에 연결 (컵 구역 추론이 실행된 프레임만)
+        cup_time = detections.timestamps.get(self.cup_task, frame.capture_time)
+        if self.cup_task in detections.fresh:
+            indices = [index for index in range(len(labels))
+                       if zones.contains('cup_trash', index) or zones.contains('cup_holder', index)]
+            self.cup_tracker.update(np.asarray(boxes)[indices], [labels[index] for index in indices], cup_time)
+
+        # 가장 가까운 컵 쓰레기 / 컵 홀더 트랙의 좌표를 전송하고 정지 여부 확인
+        self.robot.cup_trash_detected, self.robot.cup_trash_detect_start_time = self.track_object(
+            draw, 'cup', self.robot.cup_trash_detect_start_time, self.robot.set_cup_trash_coordinates, cup_time)
+        self.robot.cup_holder_detected, self.robot.cup_holder_detect_start_time = self.track_object(
+            draw, 'cup_holder', self.robot.cup_holder_detect_start_time, self.robot.set_cup_holder_coordinates, cup_time)
+
+        # 로봇 일시정지 기능
+        self.pause_robot(draw, robot_contours, human_contours, robot_masks, fresh=safety_fresh)
+
+        # 화면 왼쪽 위에 최단 거리 및 로봇 상태 및 ROI 상태 표시
+        draw.putText(f'Distance: {self.min_distance:.2f}, state: {self.robot.robot_state}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        draw.putText(f'A_ZONE: {self.robot.A_ZONE}, B_ZONE: {self.robot.B_ZONE}, C_ZONE: {self.robot.C_ZONE}, NOT_SEAL: {self.robot.NOT_SEAL}', (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        draw.putText(f'cup_trash_detected: {self.robot.cup_trash_detected}', (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        draw.putText(f'cup_holder_detected: {self.robot.cup_holder_detected}', (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+        return draw
+
+
+    def compose_frame(self, result):
+        """
+        마스크 오버레이와 기록된 그리기를 적용한 프레임을 만드는 메서드
+        """
+        masks = result.payload.masks
+        image_with_masks = self.compositor.composite(result.frame.image, [mask for mask, _ in masks],
+                                                     [color for _, color in masks])
+        result.payload.draw(image_with_masks)
 
-                # 'hand' 객체를 'human' 객체로 변경
-                if label == 'hand':
-                    label = 'human'
+        # 단계별 FPS 및 촬영 -> 판단 지연 시간 표시
+        fps = self.pipeline.fps()
+        cv2.putText(image_with_masks, 'capture {:.1f}fps, infer {:.1f}fps, render {:.1f}fps, latency {:.0f}ms'.format(
+            fps['capture'], fps['infer'], fps['render'], result.latency * 1000),
+            (10, FRAME_HEIGHT - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        return image_with_masks
 
-                # 클래스에 해당하는 색상 가져오기
-                color = self.colors.get(label, (255, 255, 255))  
-                
-                if mask is not None and len(mask) > 0:
-                    # 마스크 오버레이
-                    image_with_masks = self.overlay(image_with_masks, mask, color, alpha=0.3)
-
-                    # 라벨별 외곽선 저장
-                    contours = self.find_contours(mask)
-                    if label == 'robot':
-                        robot_contours.extend(contours)
-                    elif label == 'human':
-                        human_contours.extend(contours)
-
-                # 디텍션 박스 및 라벨 표시
-                x1, y1, x2, y2 = map(int, box)
-                cv2.rectangle(image_with_masks, (x1, y1), (x2, y2), color, 2)                     
-                cv2.putText(image_with_masks, f'{label} {prob:.2f}', (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-                # A_ZONE, B_ZONE, C_ZONE ROI 내 일정 시간 이상 'capsule' 객체 인식 확인
-                if label == 'capsule':
-                    self.robot.A_ZONE, self.robot.A_ZONE_start_time = self.capsule_detect_check(x1, y1, x2, y2, CAPSULE_CHECK_ROI[0], 'A_ZONE', self.robot.A_ZONE, self.robot.A_ZONE_start_time)
-                    self.robot.B_ZONE, self.robot.B_ZONE_start_time = self.capsule_detect_check(x1, y1, x2, y2, CAPSULE_CHECK_ROI[1], 'B_ZONE', self.robot.B_ZONE, self.robot.B_ZONE_start_time)
-                    self.robot.C_ZONE, self.robot.C_ZONE_start_time = self.capsule_detect_check(x1, y1, x2, y2, CAPSULE_CHECK_ROI[2], 'C_ZONE', self.robot.C_ZONE, self.robot.C_ZONE_start_time)
-
-                # 씰 확인 ROI 내 'capsule_not_label' 객체 인식 확인
-                if label == 'capsule_not_label':
-                    self.robot.NOT_SEAL = self.seal_remove_check(x1, y1, x2, y2, SEAL_CHECK_ROI, self.robot.NOT_SEAL)
-
-                # Storagy 위의 'cup' 객체를 인식하고 좌표를 저장하는 리스트 생성
-                if label == 'cup':
-                    self.cup_trash_list, self.cup_trash_list_pixel = self.make_object_list(x1, y1, x2, y2, image_with_masks, self.cup_trash_list, self.cup_trash_list_pixel)
-
-                # Storagy 위의 'cup_holder' 객체를 인식하고 좌표를 저장하는 리스트 생성
-                if label == 'cup_holder':
-                    self.cup_holder_list, self.cup_holder_list_pixel = self.make_object_list(x1, y1, x2, y2, image_with_masks, self.cup_holder_list, self.cup_holder_list_pixel)
-
-            # Storagy 위에 'cup' 객체가 있을 때 쓰레기 좌표를 저장하고 우선순위 지정
-            if self.cup_trash_list:
-                self.robot.cup_trash_detected, self.robot.cup_trash_detect_start_time, self.last_cup_trash_center = self.object_detect_order(image_with_masks, self.robot.cup_trash_detected, self.robot.cup_trash_detect_start_time, self.robot.set_cup_trash_coordinates, self.last_cup_trash_center,
-                                                                                                                                            self.cup_trash_x, self.cup_trash_y, self.cup_trash_max_y, self.cup_trash_list,
-                                                                                                                                            self.cup_trash_x_pixel, self.cup_trash_y_pixel, self.cup_trash_max_y_pixel, self.cup_trash_list_pixel)
-            # Storagy 위에 'cup_holder' 객체가 있을 때 컵 홀더 좌표를 저장하고 우선순위 지정
-            if self.cup_holder_list:
-                self.robot.cup_holder_detected, self.robot.cup_holder_detect_start_time, self.last_cup_holder_center = self.object_detect_order(image_with_masks, self.robot.cup_holder_detected, self.robot.cup_holder_detect_start_time, self.robot.set_cup_holder_coordinates, self.last_cup_holder_center,
-                                                                                                                                            self.cup_holder_x, self.cup_holder_y, self.cup_holder_max_y, self.cup_holder_list,
-                                                                                                                                            self.cup_holder_x_pixel, self.cup_holder_y_pixel, self.cup_holder_max_y_pixel, self.cup_holder_list_pixel)
-            # 로봇 일시정지 기능
-            self.pause_robot(image_with_masks, robot_contours, human_contours)
-
-            # 화면 왼쪽 위에 최단 거리 및 로봇 상태 및 ROI 상태 표시
-            cv2.putText(image_with_masks, f'Distance: {self.min_distance:.2f}, state: {self.robot.robot_state}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(image_with_masks, f'A_ZONE: {self.robot.A_ZONE}, B_ZONE: {self.robot.B_ZONE}, C_ZONE: {self.robot.C_ZONE}, NOT_SEAL: {self.robot.NOT_SEAL}', (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            cv2.putText(image_with_masks, f'cup_trash_detected: {self.robot.cup_trash_detected}', (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            cv2.putText(image_with_masks, f'cup_holder_detected: {self.robot.cup_holder_detected}', (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-            # 디텍션 박스와 마스크가 적용된 프레임 표시
-            cv2.imshow("Webcam with Segmentation Masks and Detection Boxes", image_with_masks)
-
-            # 종료 키를 누르면 종료
-            if cv2.waitKey(1) & 0xFF == ESC_KEY:
-                break
 
-        # 자원 해제
-        self.webcam.release()  # 웹캠 장치 해제
-        cv2.destroyAllWindows()  # 모든 OpenCV 창 닫기
+    def render_frame(self, result):
+        """
+        디텍션 박스와 마스크가 적용된 프레임을 화면에 표시하는 메서드 (표시 스레드)
+
+        :return: 종료 키를 누르면 False
+        """
+        cv2.imshow("Webcam with Segmentation Masks and Detection Boxes", self.compose_frame(result))
+
+        # 종료 키를 누르면 종료
+        return cv2.waitKey(1) & 0xFF != ESC_KEY
+
+
+    def preview_snapshot(self):
+        """
+        미리보기 서버용 최신 인식 결과 프레임 (JPEG), 아직 인식한 프레임이 없으면 None
+        """
+        result = self.pipeline.last_result if self.pipeline is not None else None
+        if result is None:
+            return None
+        ok, jpeg = cv2.imencode('.jpg', self.compose_frame(result), [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return jpeg.tobytes() if ok else None
 
 
 
 class RobotMain(object):
     """Robot Main Class"""
 
+    # 비전 인식 결과 (YOLO 스레드가 쓰고 로봇 스레드가 읽음, PerceptionHub 에 저장)
+    A_ZONE = perception_property('A_ZONE')
+    B_ZONE = perception_property('B_ZONE')
+    C_ZONE = perception_property('C_ZONE')
+    NOT_SEAL = perception_property('NOT_SEAL')
+    cup_trash_detected = perception_property('cup_trash_detected')
+    cup_trash_x = perception_property('cup_trash_x')
+    cup_trash_y = perception_property('cup_trash_y')
+    cup_holder_detected = perception_property('cup_holder_detected')
+    cup_holder_x = perception_property('cup_holder_x')
+    cup_holder_y = perception_property('cup_holder_y')
+
     def __init__(self, robot, **kwargs):
+        # 시계 (dry-run 에서는 VirtualClock 을 주입하여 sleep/대기를 가상 시간으로 처리)
+        self.clock = kwargs.get('clock', None) or RealClock()
+        self.perception = PerceptionHub(clock=self.clock)
+
+        # 구간별 시간 측정 (모션, 대기 sleep, 비전 대기, SDK 모션 명령)
+        self.profiler = Profiler(clock=self.clock.time)
+        # 주입된 시계는 여러 RobotMain 이 공유할 수 있으므로 (dry-run 비교 실행) 시계를 고치지 않고 감싼 함수를 따로 보관
+        self._sleep = self.profiler.wrap(self.clock.sleep, 'sleep', 'sleep')
+        self.trace_dir = kwargs.get('trace_dir', PROFILE_TRACE_DIR)
         self.alive = True
         self._arm = robot
         self._tcp_speed = 100
@@ -526,15 +638,41 @@ class RobotMain(object):
         self._angle_acc = 500
         self._vars = {}
         self._funcs = {}
+        # 키오스크 주문 서버 (로봇 상태 콜백이 바로 상태를 푸시하므로 로봇 초기화 전에 생성)
+        self.order_server = OrderServer(self.handle_message, host=ORDER_SERVER_HOST, port=ORDER_SERVER_PORT,
+                                        status_rate=STATUS_PUBLISH_RATE)
+        self._arm.set_profiler(self.profiler)
         self._robot_init()
 
         # 로봇 상태, 아이스크림 프레스 작동 여부
         self.state = 'stopped'
         self.pressing = False
 
-        # 주문 정보, 성별 정보 리스트
-        self.order_list = []
-        self.gritting_list = []
+        # 비전 안전 정지 (프레스 중에는 새로 정지하지 않음), 전용 제어 연결로 움직임 명령과 별도로 전송
+        self.robot_state = 'robot move'
+        self.vision_pipeline = None     # YOLOMain.run_yolo 가 설정, 상태 응답에 단계별 FPS/지연 시간 포함
+        self.zone_engine = None         # YOLOMain 이 설정, 동작 후 캡슐/씰 ROI 체류 시간 초기화
+        self.inference_scheduler = None # YOLOMain 이 설정, 인식 대기 중인 ROI 를 매 프레임 추론하도록 요청
+        self.safety = SafetyMonitor(self._arm, stop_distance=ROBOT_STOP_DISTANCE, resume_distance=ROBOT_RESUME_DISTANCE,
+                                    resume_frames=ROBOT_RESUME_FRAMES, min_hold=ROBOT_RESUME_HOLD,
+                                    inhibit=lambda: self.pressing, on_change=self._safety_changed_callback,
+                                    clock=self.clock.time, profiler=self.profiler)
+        if self._arm.connect_safety() != 0:
+            print('safety connection failed, safety stop uses the main connection')
+        self.safety.start()
+
+        # 주문 스케줄러 (아이스크림 주문, 인사 요청)
+        self.scheduler = OrderScheduler(clock=self.clock)
+        self.batch_size = kwargs.get('batch_size', ORDER_BATCH_SIZE)
+        self.batch_history = deque(maxlen=100)     # (배치 크기, 시작 시각, 종료 시각)
+        self.predicted_throughput = kwargs.get('predicted_throughput', None)   # aris.dryrun.predict_throughput 결과
+
+        # 팔을 쓰지 않는 대기 스테이지 (캡슐 인식 대기) 를 앞 주문의 팔 동작과 겹쳐서 실행
+        self.order_pipeline = PipelineExecutor(self.perception, self.clock)
+        self.pipeline_overlap = kwargs.get('pipeline', PIPELINE_OVERLAP)
+
+        # 주문 상태 변경 시 클라이언트에 푸시
+        self.scheduler.register_listener(self._order_changed_callback)
 
         self.position_home = [179.2, -42.1, 7.4, 186.7, 41.5, -1.6] #angle
         self.position_jig_A_grab = [-257.3, -138.3, 198, 68.3, 86.1, -47.0] #linear
@@ -555,15 +693,52 @@ class RobotMain(object):
         self.position_jig_C_serve = [-63.1, -138.2, 199.5, -45.5, 88.1, -112.1] #Linear
         self.position_capsule_grab = [234.2, 129.8, 464.5, -153.7, 87.3, -68.7] #Linear
 
+        # 데이터 기반 레시피 실행기
+        self.recipe_runner = RecipeRunner(self._arm, self.clock, profiler=self.profiler, sleep=self._sleep)
+
+        # 고정 포즈 사전 검증 (IK 캐시)
+        self.waypoints = WaypointLibrary(self._arm, cache_path=kwargs.get('waypoint_cache_path', WAYPOINT_CACHE_PATH))
+        self.init_waypoints()
+
+    def init_waypoints(self):
+        '''
+        position_* 고정 포즈를 시작 시 한 번 검증하고 관절 해를 캐시에 저장
+        (컨트롤러 SN, TCP 오프셋, 월드 오프셋이 같으면 캐시를 재사용)
+        '''
+        for name, pose in vars(self).items():
+            if name.startswith('position_') and isinstance(pose, list):
+                kind = WaypointLibrary.JOINT if name in JOINT_POSITION_NAMES else WaypointLibrary.LINEAR
+                self.waypoints.add(name, pose, kind=kind)
+        for recipe in recipes.RECIPES.values():
+            for name, pose, kind in recipe.poses():
+                self.waypoints.add(name, pose, kind=kind)
+        code, unreachable = self.waypoints.validate()
+        if self.waypoints.last_validate_time is not None:
+            self.pprint('waypoints validated in {:.3f}s'.format(self.waypoints.last_validate_time))
+        if code != 0:
+            self.pprint('waypoint validate failed, code={}'.format(code))
+        elif unreachable:
+            self.pprint('unreachable waypoints: {}'.format(unreachable))
+        return code, unreachable
+
+    def run_recipe(self, recipe, **context):
+        """
+        현재 속도 설정으로 레시피 실행, 실패 시 _check_code 와 같이 alive 를 False 로 바꿈
+
+        :param context: choose 조건에 사용할 값 (order, toping 등)
+        :return: code
+        """
+        speeds = {'tcp_speed': self._tcp_speed, 'tcp_acc': self._tcp_acc,
+                  'angle_speed': self._angle_speed, 'angle_acc': self._angle_acc}
+        return self.recipe_runner.run(recipe, context, target=self, speeds=speeds, check=self._check_code)
+
     def set_cup_trash_coordinates(self, x_mm, y_mm):
         # 컵 쓰레기 좌표 값을 업데이트
-        self.cup_trash_x = x_mm
-        self.cup_trash_y = y_mm
+        self.perception.publish(cup_trash_x=x_mm, cup_trash_y=y_mm)
 
     def set_cup_holder_coordinates(self, x_mm, y_mm):
         # 컵 홀더 좌표 값을 업데이트
-        self.cup_holder_x = x_mm
-        self.cup_holder_y = y_mm
+        self.perception.publish(cup_holder_x=x_mm, cup_holder_y=y_mm)
 
         # Robot init
     def _robot_init(self):
@@ -572,7 +747,7 @@ class RobotMain(object):
         self._arm.motion_enable(True)
         self._arm.set_mode(0)
         self._arm.set_state(0)
-        time.sleep(1)
+        self._sleep(1)
         self._arm.register_error_warn_changed_callback(self._error_warn_changed_callback)
         self._arm.register_state_changed_callback(self._state_changed_callback)
         if hasattr(self._arm, 'register_count_changed_callback'):
@@ -580,6 +755,8 @@ class RobotMain(object):
 
     # Register error/warn changed callback
     def _error_warn_changed_callback(self, data):
+        if data:
+            self.update_status(error_code=data['error_code'], warn_code=data['warn_code'])
         if data and data['error_code'] != 0:
             self.alive = False
             self.pprint('err={}, quit'.format(data['error_code']))
@@ -587,6 +764,8 @@ class RobotMain(object):
 
     # Register state changed callback
     def _state_changed_callback(self, data):
+        if data:
+            self.update_status(arm_state=data['state'])
         if data and data['state'] == 4:
             self.alive = False
             self.pprint('state=4, quit')
@@ -637,7 +816,7 @@ class RobotMain(object):
                 cnt = 0
                 while self._arm.state == 5 and cnt < 5:
                     cnt += 1
-                    time.sleep(0.1)
+                    self._sleep(0.1)
             return self._arm.state < 4
         else:
             return False
@@ -651,80 +830,98 @@ class RobotMain(object):
         return reverse_position
 
     def socket_connect(self):
+        """
+        주문 서버 실행 (소켓 스레드에서 호출, 종료 시까지 블로킹)
+        """
+        self.connected = True
+        self.state = 'ready'
+        self.order_server.serve_forever()
 
-        # self.HOST = '192.168.1.167'
-        self.HOST = '127.0.0.1'
-        self.PORT = 20002
-        self.BUFSIZE = 1024
-        self.ADDR = (self.HOST, self.PORT)
+    def handle_message(self, msg, client_id):
+        """
+        클라이언트 메시지 처리, 주문을 스케줄러에 넣고 주문 ID로 ACK
 
-        # self.serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        try:
-            self.clientSocket.shutdown(1)
-            self.clientSocket.close()
-        except:
-            pass
+        :param msg: {"topping1": 0, "topping2": 0, "topping3": 0, "gender": "", "age": 0, "seq": (선택)}
+                    또는 {"type": "status"}
+        """
+        print(msg)
+        if msg.get('type') == 'status':
+            return {'type': 'status', 'seq': msg.get('seq'), 'mode': getattr(self, 'MODE', 'ready'),
+                    'metrics': self.scheduler.metrics(), 'profile': self.profiler.stats(),
+                    'batch': self.batch_report(), 'safety': self.safety.stats(),
+                    'status': self.order_server.status(),
+                    'vision': self.vision_pipeline.metrics() if self.vision_pipeline is not None else None,
+                    'inference': self.inference_scheduler.stats() if self.inference_scheduler is not None else None}
+        order_ids = []
+        if msg.get("topping1", 0) != 0 or msg.get("topping2", 0) != 0 or msg.get("topping3", 0) != 0:
+            order = self.scheduler.submit(ICECREAM, {"topping1" : msg["topping1"], 
+                                                     "topping2" : msg["topping2"], 
+                                                     "topping3" : msg["topping3"]})
+            order_ids.append(order.order_id)
+        if msg.get("gender", "") != "":
+            order = self.scheduler.submit(GREETING, [msg["gender"], int(msg.get("age", 0))])
+            order_ids.append(order.order_id)
+        return {'type': 'ack', 'seq': msg.get('seq'), 'order_id': order_ids[0] if order_ids else None,
+                'order_ids': order_ids}
+
+    def _order_changed_callback(self, order):
+        self.publish('order', order_id=order.order_id, kind=order.kind, state=order.state, reason=order.reason)
+        counts = self.scheduler.counts
+        status = {'queue': counts[QUEUED], 'making': counts[MAKING],
+                  'queue_eta': time.time() + self._make_time_estimate() * (counts[QUEUED] + counts[MAKING])}
+        if order.state == MAKING:
+            status.update(order_id=order.order_id, kind=order.kind, stage='start', eta=self._order_eta(order))
+        elif order.state in (SERVED, FAILED) and counts[MAKING] == 0:
+            status.update(order_id=None, kind=None, stage='idle', eta=None)
+        self.update_status(**status)
+
+    def _safety_changed_callback(self, paused, event):
+        self.robot_state = 'robot stop' if paused else 'robot move'
+        self.update_status(paused=paused)
+        self.publish('safety', paused=paused, distance=event['distance'], latency=round(event['latency'], 4))
+
+    def publish(self, event, **data):
+        """
+        접속한 모든 클라이언트에 상태 이벤트 전송
+        """
+        self.order_server.publish(event, **data)
+        if event == 'progress' and data.get('order_id', None) is not None:
+            order = self.scheduler.get_order(data['order_id'])
+            self.update_status(order_id=order.order_id, stage=data['step'], eta=self._order_eta(order))
 
-        self.serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # self
-        self.serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # self.serverSocket.allow_reuse_address = True
-        while True:
-            try:
-                self.serverSocket.bind(self.ADDR)
-                print("bind")
-
-                while True:
-                    self.serverSocket.listen(1)
-                    print(f'[LISTENING] Server is listening on robot_server')
-                    time.sleep(1)
-                    try:
-                        while True:
-                            try:
-                                self.clientSocket, addr_info = self.serverSocket.accept()
-                                print("socket accepted")
-                                break
-                            except:
-                                time.sleep(1)
-                                print('except')
-                                # break
-
-                        break
-
-                    except socket.timeout:
-                        print("socket timeout")
-
-                    except:
-                        pass
-                break
-            except:
-                pass
-        # self.clientSocket.settimeout(10.0)
-        print("accept")
-        print("--client info--")
-        # print(self.clientSocket)
+    def update_status(self, **fields):
+        """
+        키오스크/모니터링 화면에 푸시할 로봇 상태 갱신 (블로킹 없음, 전송은 STATUS_PUBLISH_RATE 로 합쳐짐)
 
-        self.connected = True
-        self.state = 'ready'
+        필드: mode, stage, order_id, kind, eta/queue_eta (완료 예상 시각, epoch s), queue, making,
+              arm_state, error_code, warn_code, paused
+        """
+        self.order_server.publish_status(**fields)
 
-        # ------------------- receive msg start -----------
-        while self.connected:
-            try:
-                self.recv_msg = json.loads(self.clientSocket.recv(1024).decode())
-                print(self.recv_msg)
-                if self.recv_msg["topping1"] != 0 or self.recv_msg["topping2"] != 0 or self.recv_msg["topping3"] != 0:
-                    self.order_list.append({"topping1" : self.recv_msg["topping1"], 
-                                            "topping2" : self.recv_msg["topping2"], 
-                                            "topping3" : self.recv_msg["topping3"]})
-                if self.recv_msg["gender"] != "":
-                    self.gritting_list.append([self.recv_msg["gender"], int(self.recv_msg["age"])])
-            except Exception as e:
-                print(e)
-                continue
+    def vision_demand(self, *names):
+        """
+        with 블록 동안 해당 ROI 추론 작업('capsule', 'seal', 'cup')을 매 프레임 실행하도록 요청
+        YOLO 가 실행되지 않았으면 (dry-run 등) 아무것도 하지 않음
+        """
+        if self.inference_scheduler is None:
+            return contextlib.nullcontext()
+        return self.inference_scheduler.demand(*names)
+
+    def _make_time_estimate(self):
+        make_time = self.scheduler.metrics()['make_time']
+        return make_time['avg'] if make_time['count'] > 0 else ORDER_MAKE_TIME_ESTIMATE
+
+    def _order_eta(self, order):
+        """
+        :return: 제조 중인 주문의 완료 예상 시각 (epoch s)
+        """
+        elapsed = self.clock.time() - order.start_time if order.start_time is not None else 0
+        return time.time() + max(0.0, self._make_time_estimate() - elapsed)
 
 
     # =================================  motion  =======================================
 
+    @profiled(cat='motion')
     def motion_home(self):
 
         print('motion_home start')
@@ -751,6 +948,7 @@ class RobotMain(object):
 
         print('motion_home finish')
 
+    @profiled(cat='motion')
     def motion_grab_capsule(self):
 
         print('motion_grab_capsule start')
@@ -772,7 +970,7 @@ class RobotMain(object):
         code = self._arm.stop_lite6_gripper()
         if not self._check_code(code, 'stop_lite6_gripper'):
             return
-        time.sleep(0.5)
+        self._sleep(0.5)
 
         if self.A_ZONE:
             pass
@@ -784,7 +982,7 @@ class RobotMain(object):
         code = self._arm.open_lite6_gripper()
         if not self._check_code(code, 'open_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
 
         if self.A_ZONE:
             code = self._arm.set_servo_angle(angle=[179.5, 33.5, 32.7, 113.0, 93.1, -2.3], speed=self._angle_speed,
@@ -812,7 +1010,7 @@ class RobotMain(object):
         code = self._arm.close_lite6_gripper()
         if not self._check_code(code, 'close_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
 
         if self.C_ZONE:
             code = self._arm.set_position(z=150, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
@@ -840,6 +1038,7 @@ class RobotMain(object):
         
         print('motion_grab_capsule finish')
 
+    @profiled(cat='motion')
     def motion_check_sealing(self):
 
         print('motion_check_sealing start')
@@ -853,6 +1052,7 @@ class RobotMain(object):
         
         print('motion_check_sealing finish')
 
+    @profiled(cat='motion')
     def motion_place_fail_capsule(self):
 
         print('motion_place_fail_capsule start')
@@ -887,11 +1087,11 @@ class RobotMain(object):
         code = self._arm.open_lite6_gripper()
         if not self._check_code(code, 'open_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
         code = self._arm.stop_lite6_gripper()
         if not self._check_code(code, 'stop_lite6_gripper'):
             return
-        time.sleep(0.5)
+        self._sleep(0.5)
 
         code = self._arm.set_position(z=100, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                       wait=False)
@@ -899,6 +1099,7 @@ class RobotMain(object):
         
         print('motion_place_fail_capsule finish')
 
+    @profiled(cat='motion')
     def motion_place_capsule(self):
 
         print('motion_place_capsule start')
@@ -937,15 +1138,16 @@ class RobotMain(object):
         code = self._arm.open_lite6_gripper()
         if not self._check_code(code, 'open_lite6_gripper'):
             return
-        time.sleep(2)
+        self._sleep(2)
         code = self._arm.stop_lite6_gripper()
         if not self._check_code(code, 'stop_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
 
         print('motion_place_capsule finish')
         
 
+    @profiled(cat='motion')
     def motion_grab_cup(self):
 
         print('motion_grab_cup start')
@@ -957,7 +1159,7 @@ class RobotMain(object):
         code = self._arm.open_lite6_gripper()
         if not self._check_code(code, 'open_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
 
         code = self._arm.set_servo_angle(angle=[-2.8, -2.5, 45.3, 119.8, -79.2, -18.8], speed=self._angle_speed,
                                          mvacc=self._angle_acc, wait=True, radius=30.0)
@@ -974,7 +1176,7 @@ class RobotMain(object):
         code = self._arm.close_lite6_gripper()
         if not self._check_code(code, 'close_lite6_gripper'):
             return
-        time.sleep(2)
+        self._sleep(2)
 
         code = self._arm.set_position(z=120, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                       wait=True)
@@ -990,220 +1192,62 @@ class RobotMain(object):
         code = self._arm.set_cgpio_analog(1, 5)
         if not self._check_code(code, 'set_cgpio_analog'):
             return
-        time.sleep(0.5)
+        self._sleep(0.5)
 
         print('motion_grab_cup finish')
         
 
+    @profiled(cat='motion')
     def motion_topping(self, order):
 
         self.toppingAmount = 5
 
         print('motion_topping start')
 
-        if self.Toping:
-            code = self._arm.set_servo_angle(angle=[36.6, -36.7, 21.1, 85.6, 59.4, 44.5], speed=self._angle_speed,
-                                                mvacc=self._angle_acc, wait=False, radius=0.0)
-            if not self._check_code(code, 'set_servo_angle'): return
-
-            # ========== 컵 잡는 위치 위로 변경하는 모션 ==========
-            code = self._arm.set_servo_angle(angle=[47.7, -44.2, 10.6, 107.1, 72.6, 50.6], speed=self._angle_speed,
-                                                mvacc=self._angle_acc, wait=True, radius=0.0)
-            if not self._check_code(code, 'set_servo_angle'): return
-
-            code = self._arm.open_lite6_gripper()
-            if not self._check_code(code, 'open_lite6_gripper'):
-                return
-            time.sleep(1.5)
-            code = self._arm.close_lite6_gripper()
-            if not self._check_code(code, 'close_lite6_gripper'):
-                return
-            time.sleep(1)
-            # ===============================================
-
-            if order["topping3"] > 0:
-                code = self._arm.set_position(*self.position_topping_C, speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, radius=0.0, wait=True)
-                if not self._check_code(code, 'set_position'): return
-
-                # 토핑 추출
-                # code = self._arm.set_cgpio_digital(2, 1, delay_sec=0)
-                # if not self._check_code(code, 'set_cgpio_digital'):
-                #     return
-                
-                code = self._arm.set_position(z=30, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
-                                                wait=True)
-                if not self._check_code(code, 'set_position'): return
-                
-                code = self._arm.set_pause_time(self.toppingAmount - 3)
-                if not self._check_code(code, 'set_pause_time'):
-                    return
-                
-                self.pressing = True
-                code = self._arm.set_cgpio_digital(3, 1, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-
-                code = self._arm.set_pause_time(2)
-                if not self._check_code(code, 'set_pause_time'):
-                    return
-                
-                code = self._arm.set_cgpio_digital(2, 0, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-
-                code = self._arm.set_position(z=-30, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc,
-                                                relative=True, wait=False)
-                if not self._check_code(code, 'set_position'): return
-
-            elif order["topping2"] > 0:
-                code = self._arm.set_servo_angle(angle=[55.8, -48.2, 14.8, 86.1, 60.2, 58.7], speed=self._angle_speed,
-                                                    mvacc=self._angle_acc, wait=False, radius=20.0)
-                if not self._check_code(code, 'set_servo_angle'): return
-                
-                code = self._arm.set_servo_angle(angle=self.position_topping_B, speed=self._angle_speed,
-                                                    mvacc=self._angle_acc, wait=True, radius=0.0)
-                if not self._check_code(code, 'set_servo_angle'): return
-
-                # 토핑 추출
-                # code = self._arm.set_cgpio_digital(1, 1, delay_sec=0)
-                # if not self._check_code(code, 'set_cgpio_digital'):
-                #     return
-                
-                code = self._arm.set_position(z=30, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
-                                                wait=True)
-                if not self._check_code(code, 'set_position'): return
-                
-                code = self._arm.set_pause_time(self.toppingAmount - 4)
-                if not self._check_code(code, 'set_pause_time'):
-                    return
-                
-                self.pressing = True
-                code = self._arm.set_cgpio_digital(3, 1, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-
-                code = self._arm.set_pause_time(3)
-                if not self._check_code(code, 'set_pause_time'):
-                    return
-                
-                code = self._arm.set_cgpio_digital(1, 0, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-
-                code = self._arm.set_position(z=-30, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc,
-                                                relative=True, wait=False)
-                if not self._check_code(code, 'set_position'): return
-                
-                code = self._arm.set_servo_angle(angle=[87.5, -48.2, 13.5, 125.1, 44.5, 46.2], speed=self._angle_speed,
-                                                    mvacc=self._angle_acc, wait=False, radius=10.0)
-                if not self._check_code(code, 'set_servo_angle'): return
-
-                code = self._arm.set_position(*[43.6, 137.9, 350.1, -92.8, 87.5, 5.3], speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, radius=10.0, wait=False)
-                if not self._check_code(code, 'set_position'): return
-
-            elif order["topping1"] > 0:
-                code = self._arm.set_position(*self.position_topping_A, speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, radius=0.0, wait=True)
-                if not self._check_code(code, 'set_position'): return
-
-                # 토핑 추출
-                # code = self._arm.set_cgpio_digital(0, 1, delay_sec=0)
-                # if not self._check_code(code, 'set_cgpio_digital'):
-                #     return
-
-                code = self._arm.set_position(z=10, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
-                                                wait=True)
-                if not self._check_code(code, 'set_position'): return
-                
-                code = self._arm.set_pause_time(self.toppingAmount - 1)
-                if not self._check_code(code, 'set_servo_angle'): return
-
-                code = self._arm.set_pause_time(0)
-                if not self._check_code(code, 'set_pause_time'):
-                    return
-                
-                self.pressing = True
-                code = self._arm.set_cgpio_digital(3, 1, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-                
-                code = self._arm.set_cgpio_digital(0, 0, delay_sec=0)
-                if not self._check_code(code, 'set_cgpio_digital'):
-                    return
-                
-                code = self._arm.set_position(z=-10, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
-                                                wait=True)
-                if not self._check_code(code, 'set_position'): return
-
-                code = self._arm.set_servo_angle(angle=[130.0, -33.1, 12.5, 194.3, 51.0, 0.0], speed=self._angle_speed,
-                                                    mvacc=self._angle_acc, wait=True, radius=0.0)
-                if not self._check_code(code, 'set_servo_angle'): return
-                
-                code = self._arm.set_position(*[-38.2, 132.2, 333.9, -112.9, 86.3, -6.6], speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, radius=10.0, wait=False)
-                if not self._check_code(code, 'set_position'): return
-                
-                code = self._arm.set_position(*[43.6, 137.9, 350.1, -92.8, 87.5, 5.3], speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, radius=10.0, wait=False)
-                if not self._check_code(code, 'set_position'): return
-            
-            # code = self._arm.set_position(*self.position_icecream_with_topping, speed=self._tcp_speed,
-            #                                 mvacc=self._tcp_acc, radius=0.0, wait=True)
-            # if not self._check_code(code, 'set_position'): return
-
-            code = self._arm.set_position(*[217.2, 138.5, 377.1, 30.2, 84.3, 104,5], speed=self._tcp_speed,
-                                                mvacc=self._tcp_acc, wait=True)
-            if not self._check_code(code, 'set_position'): return
-            
-        else:
-            self.pressing = True
-            code = self._arm.set_cgpio_digital(3, 1, delay_sec=0)
-            if not self._check_code(code, 'set_cgpio_digital'):
-                return
-            code = self._arm.set_servo_angle(angle=self.position_icecream_no_topping, speed=self._angle_speed,
-                                                mvacc=self._angle_acc, wait=True, radius=0.0)
-            if not self._check_code(code, 'set_servo_angle'): return
-        time.sleep(0.5)
+        # 토핑 종류별 동작은 aris/recipes.py 의 TOPPING 레시피
+        code = self.run_recipe(recipes.TOPPING, order=order, toping=self.Toping)
+        if code != 0:
+            return
 
         print('motion_topping finish')
 
+    @profiled(cat='motion')
     def motion_make_icecream(self):
 
         print('motion_make_icecream start')
 
         if self.Toping:
-            time.sleep(4)
+            self._sleep(4)
         else:
-            time.sleep(7)
+            self._sleep(7)
 
-        time.sleep(3)
+        self._sleep(3)
         code = self._arm.set_position(z=-20, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                       wait=True)
         if not self._check_code(code, 'set_position'): return
 
-        time.sleep(3)
+        self._sleep(3)
         code = self._arm.set_position(z=-10, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                       wait=True)
         if not self._check_code(code, 'set_position'): return
         
         if not self._check_code(code, 'set_pause_time'):
             return
-        time.sleep(0.5)
+        self._sleep(0.5)
         code = self._arm.set_position(z=-30, radius=0, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                       wait=True)
         if not self._check_code(code, 'set_position'): return
         
-        time.sleep(2)
+        self._sleep(2)
         self.pressing = False
         code = self._arm.set_cgpio_digital(3, 0, delay_sec=0)
         if not self._check_code(code, 'set_cgpio_digital'):
             return
-        time.sleep(0.5)
+        self._sleep(0.5)
 
         print('motion_make_icecream finish')
 
+    @profiled(cat='motion')
     def motion_serve(self):
 
         print('motion_serve start')
@@ -1231,7 +1275,7 @@ class RobotMain(object):
             code = self._arm.open_lite6_gripper()
             if not self._check_code(code, 'open_lite6_gripper'):
                 return
-            time.sleep(1)
+            self._sleep(1)
             code = self._arm.set_position(*[-256.2, -126.6, 210.1, -179.2, 77.2, 66.9], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
             if not self._check_code(code, 'set_position'): return
@@ -1239,7 +1283,7 @@ class RobotMain(object):
             code = self._arm.stop_lite6_gripper()
             if not self._check_code(code, 'stop_lite6_gripper'):
                 return
-            time.sleep(0.5)
+            self._sleep(0.5)
             code = self._arm.set_position(*[-242.8, -96.3, 210.5, -179.2, 77.2, 66.9], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
             if not self._check_code(code, 'set_position'): return
@@ -1261,7 +1305,7 @@ class RobotMain(object):
             code = self._arm.open_lite6_gripper()
             if not self._check_code(code, 'open_lite6_gripper'):
                 return
-            time.sleep(1)
+            self._sleep(1)
             code = self._arm.set_position(*[-165.0, -122.7, 200, -178.7, 80.7, 92.5], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
             if not self._check_code(code, 'set_position'): return
@@ -1269,7 +1313,7 @@ class RobotMain(object):
             code = self._arm.stop_lite6_gripper()
             if not self._check_code(code, 'stop_lite6_gripper'):
                 return
-            time.sleep(0.5)
+            self._sleep(0.5)
             code = self._arm.set_position(*[-165.9, -81.9, 200, -178.7, 80.7, 92.5], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
             if not self._check_code(code, 'set_position'): return
@@ -1294,7 +1338,7 @@ class RobotMain(object):
             code = self._arm.open_lite6_gripper()
             if not self._check_code(code, 'open_lite6_gripper'):
                 return
-            time.sleep(1)
+            self._sleep(1)
 
             code = self._arm.set_position(*[-75, -132.8, 208, -176.8, 76.1, 123.0], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
@@ -1303,7 +1347,7 @@ class RobotMain(object):
             code = self._arm.stop_lite6_gripper()
             if not self._check_code(code, 'stop_lite6_gripper'):
                 return
-            time.sleep(0.5)
+            self._sleep(0.5)
 
             code = self._arm.set_position(*[-92.0, -107.5, 208, -176.8, 76.1, 123.0], speed=self._tcp_speed,
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
@@ -1313,7 +1357,7 @@ class RobotMain(object):
                                           mvacc=self._tcp_acc, radius=0.0, wait=True)
             if not self._check_code(code, 'set_position'): return
             
-        time.sleep(0.5)
+        self._sleep(0.5)
         code = self._arm.set_servo_angle(angle=[169.6, -8.7, 13.8, 85.8, 93.7, 19.0], speed=self._angle_speed,
                                          mvacc=self._angle_acc, wait=True, radius=10.0)
         if not self._check_code(code, 'set_servo_angle'): return
@@ -1323,6 +1367,7 @@ class RobotMain(object):
 
         print('motion_serve finish')
 
+    @profiled(cat='motion')
     def motion_serve_storagy(self):
 
         print('motion_serve_storagy start')
@@ -1354,7 +1399,7 @@ class RobotMain(object):
                                           wait=True)
         if not self._check_code(code, 'set_position'): return
 
-        time.sleep(0.5)
+        self._sleep(0.5)
 
         code = self._arm.set_position(roll=10, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                             wait=True)
@@ -1366,7 +1411,7 @@ class RobotMain(object):
         if not self._check_code(code, 'open_lite6_gripper'):
             return
         
-        time.sleep(1.5)
+        self._sleep(1.5)
 
         code = self._arm.stop_lite6_gripper()
         if not self._check_code(code, 'close_lite6_gripper'):
@@ -1386,107 +1431,27 @@ class RobotMain(object):
 
         print('motion_serve_storagy finish')
 
+    @profiled(cat='motion')
     def motion_trash_capsule(self):
 
         print('motion_trash_capsule start')
 
-        self._angle_speed = 150
-        self._angle_acc = 300
-
-        code = self._arm.set_servo_angle(angle=[51.2, -8.7, 13.8, 95.0, 86.0, 17.0], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=50.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.set_servo_angle(angle=[-16.2, -19.3, 42.7, 82.0, 89.1, 55.0], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=True, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.open_lite6_gripper()
-        if not self._check_code(code, 'open_lite6_gripper'):
+        # 동작은 aris/recipes.py 의 TRASH_CAPSULE 레시피 (경유점 자동 블렌딩)
+        code = self.run_recipe(recipes.TRASH_CAPSULE)
+        if code != 0:
             return
-        
-        code = self._arm.set_servo_angle(angle=[-19.9, -19.1, 48.7, 87.2, 98.7, 60.0], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=True, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.set_position(*[222.8, 0.9, 470.0, -153.7, 87.3, -68.7], speed=self._tcp_speed,
-                                      mvacc=self._tcp_acc, radius=0.0, wait=True)
-        if not self._check_code(code, 'set_position'): return
-        
-        code = self._arm.set_position(*self.position_capsule_grab, speed=self._tcp_speed,
-                                      mvacc=self._tcp_acc, radius=0.0, wait=True)
-        if not self._check_code(code, 'set_position'): return
-        
-        code = self._arm.close_lite6_gripper()
-        if not self._check_code(code, 'close_lite6_gripper'):
-            return
-        time.sleep(1)
 
-        code = self._arm.set_position(z=30, radius=-1, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
-                                      wait=True)
-        if not self._check_code(code, 'set_position'): return
-        
+        # 이후 동작이 쓰는 속도 설정은 기존 동작이 끝났을 때와 같이 남김
         self._tcp_speed = 100
         self._tcp_acc = 1000
-
-        code = self._arm.set_position(*[221.9, -5.5, 500.4, -153.7, 87.3, -68.7], speed=self._tcp_speed,
-                                      mvacc=self._tcp_acc, radius=0.0, wait=True)
-        if not self._check_code(code, 'set_position'): return
-        
-        self._angle_speed = 60
-        self._angle_acc = 100
-
-        code = self._arm.set_servo_angle(angle=[-10.7, -2.4, 53.5, 50.4, 78.1, 63.0], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=10.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-
-        self._angle_speed = 160
-        self._angle_acc = 1000
-
-        code = self._arm.set_servo_angle(angle=[18.0, 11.2, 40.4, 90.4, 58.7, -148.8], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=True, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.open_lite6_gripper()
-        if not self._check_code(code, 'open_lite6_gripper'):
-            return
-        # time.sleep(2)
-
-        code = self._arm.set_servo_angle(angle=[25.2, 15.2, 42.7, 83.2, 35.0, -139.8], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-
-        code = self._arm.set_servo_angle(angle=[18.0, 11.2, 40.4, 90.4, 58.7, -148.8], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.set_servo_angle(angle=[25.2, 15.2, 42.7, 83.2, 35.0, -139.8], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=True, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        
-        code = self._arm.stop_lite6_gripper()
-        if not self._check_code(code, 'stop_lite6_gripper'):
-            return
         self._angle_speed = 120
         self._angle_acc = 1000
 
-        code = self._arm.set_servo_angle(angle=[28.3, -9.0, 12.6, 85.9, 78.5, 20.0], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=30.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-
-        code = self._arm.set_servo_angle(angle=[149.3, -9.4, 10.9, 114.7, 69.1, 26.1], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=False, radius=50.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-
-        code = self._arm.set_servo_angle(angle=[179.2, -42.1, 7.4, 186.7, 41.5, -1.6], speed=self._angle_speed,
-                                         mvacc=self._angle_acc, wait=True, radius=0.0)
-        if not self._check_code(code, 'set_servo_angle'): return
-        time.sleep(0.5)
-
         print('motion_trash_capsule finish')
         
 
     # ============================= trash mode =============================
+    @profiled(cat='motion')
     def storagy_trash_mode(self):
 
         print('storagy_trash_mode start')
@@ -1500,7 +1465,7 @@ class RobotMain(object):
         code = self._arm.open_lite6_gripper()
         if not self._check_code(code, 'close_lite6_gripper'):
             return
-        time.sleep(1)
+        self._sleep(1)
         code = self._arm.stop_lite6_gripper()
         if not self._check_code(code, 'close_lite6_gripper'):
             return
@@ -1512,14 +1477,11 @@ class RobotMain(object):
         # 컵 쓰레기를 다 버릴 때 까지 무한루프
         while True:
             # 일정시간 동안 컵 탐지
-            count = 0
-            while True:
-                if self.cup_trash_detected or count >= 5:  
-                    print('cup detect finish')
-                    break
-                time.sleep(0.2)
-                print("컵 쓰레기 탐지중...")
-                count += 0.2
+            print("컵 쓰레기 탐지중...")
+            with self.profiler.span('cup_trash_wait', 'vision'), self.vision_demand('cup'):
+                result = self.perception.wait_for(lambda state: state.cup_trash_detected, timeout=5)
+            if result is not None:
+                print('cup detect finish, frame={}'.format(result.stamp('cup_trash_detected')[1]))
 
             # 컵 감지 시 쓰레기 버리는 모션 시작
             if self.cup_trash_detected:
@@ -1535,7 +1497,7 @@ class RobotMain(object):
                                                 mvacc=self._tcp_acc, radius=0.0, wait=False)
                 if not self._check_code(code, 'set_position'): return
 
-                time.sleep(0.5)
+                self._sleep(0.5)
 
                 code = self._arm.set_position(*[cup_x_mm, cup_y_mm+130, 264.5, 180, 77.9, 90], speed=self._tcp_speed,
                                                 mvacc=self._tcp_acc, radius=0.0, wait=True)
@@ -1545,7 +1507,7 @@ class RobotMain(object):
                 if not self._check_code(code, 'close_lite6_gripper'):
                     return
                 
-                time.sleep(2)
+                self._sleep(2)
 
                 code = self._arm.set_position(y=30, z=90, radius=-1, speed=self._tcp_speed, mvacc=self._tcp_acc, relative=True,
                                                     wait=True)
@@ -1571,7 +1533,7 @@ class RobotMain(object):
                 if not self._check_code(code, 'open_lite6_gripper'):
                     return
                 
-                time.sleep(1)
+                self._sleep(1)
 
                 code = self._arm.set_servo_angle(angle=[18.7, -16.6, 7.6, 100.6, 88.8, 29.2], speed=self._angle_speed,
                                                             mvacc=self._angle_acc, wait=False, radius=0.0)
@@ -1589,7 +1551,7 @@ class RobotMain(object):
                 if not self._check_code(code, 'stop_lite6_gripper'):
                     return
                 
-                time.sleep(0.2)
+                self._sleep(0.2)
 
             # self.cup_trash_detected가 False가 되면 무한루프 break
             if not self.cup_trash_detected:
@@ -1599,11 +1561,9 @@ class RobotMain(object):
 
     # ============================= gritting =============================
 
+    @profiled(cat='motion')
     def motion_greet(self):
-        try:
-            self.clientSocket.send('greet_start'.encode('utf-8'))
-        except:
-            print('socket error')
+        self.publish('greet_start')
 
         self._angle_speed = 100
         self._angle_acc = 350
@@ -1636,21 +1596,14 @@ class RobotMain(object):
                                          mvacc=self._angle_acc, wait=True, radius=0.0)
         if not self._check_code(code, 'set_servo_angle'):
             return
-        try:
-            self.clientSocket.send('motion_greet finish'.encode('utf-8'))
-        except:
-            print('socket error')
+        self.publish('progress', motion='greet', step='wave_finish')
         code = self._arm.set_servo_angle(angle=[178.9, -0.7, 179.9, 181.5, -1.9, -92.6], speed=self._angle_speed,
                                          mvacc=self._angle_acc, wait=True, radius=0.0)
         if not self._check_code(code, 'set_servo_angle'):
             return
-        while True:
-            try:
-                self.clientSocket.send('motion_greet_finish'.encode('utf-8'))
-                break
-            except:
-                print('socket error')
+        self.publish('motion_greet_finish')
 
+    @profiled(cat='motion')
     def gritting(self, gender) -> None: 
         self._angle_speed = 100
         self._angle_acc = 100
@@ -1691,88 +1644,227 @@ class RobotMain(object):
             self.motion_greet()
 
 
+    def save_order_trace(self, job, order_start, trace_mark):
+        """
+        주문 한 건의 구간 기록을 'order' 구간으로 묶고, trace_dir 이 있으면 Chrome trace 로 저장
+        """
+        self.profiler.add('order', order_start, self.clock.time(), 'order', order_id=job.order_id,
+                          kind=job.kind, state=job.state)
+        if self.trace_dir:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            path = os.path.join(self.trace_dir, 'order_{}.json'.format(job.order_id))
+            self.profiler.save_chrome_trace(path, self.profiler.events(since=trace_mark))
+
     # ============================= main =============================
     def run_robot(self):
 
         self.Toping = True
 
         while self.is_alive:
-            if self.order_list != []:
-                self.MODE = 'icecreaming'
-                raw_order = self.order_list.pop(0)
-                order = raw_order
+            # 주문이 들어올 때까지 대기 (주기적으로 로봇 상태 확인)
+            self.MODE = 'ready'
+            self.update_status(mode=self.MODE)
+            job = self.scheduler.get(timeout=0.5)
+            if job is None:
+                if self.scheduler.closed:
+                    break
+                continue
 
-            elif self.gritting_list != []:
+            if job.kind == ICECREAM:
+                self.MODE = 'icecreaming'
+                self.update_status(mode=self.MODE)
+                # 대기 중인 주문을 토핑별로 모아서 연속 제조 (주문 사이의 홈 복귀, 쓰레기 확인 생략)
+                batch = [job] + self.scheduler.take_batch(job, self.batch_size, group=self._topping_group)
+                batch_start = self.clock.time()
+                if self.pipeline_overlap:
+                    # 배치 주문의 캡슐 인식 대기를 미리 예약, 첫 주문은 바로 시작하고 다음 주문은 지그가 비면 시작
+                    for order in batch:
+                        self._schedule_capsule_wait(order)
+                for index, job in enumerate(batch):
+                    order_start = self.clock.time()
+                    trace_mark = self.profiler.mark()
+                    self.scheduler.begin(job)
+                    if not self.make_icecream(job, first=index == 0, last=index == len(batch) - 1):
+                        # 제조 중에 멈춘 주문 (완료/실패/재대기로 끝나지 않은 경우) 과 배치의 남은 주문을 다시 대기열로
+                        self.order_pipeline.cancel(*[order.order_id for order in batch])
+                        if job.state == MAKING:
+                            self.scheduler.requeue(job, 'robot stopped')
+                        for rest in batch[index + 1:]:
+                            self.scheduler.requeue(rest, 'robot stopped')
+                        return
+                    self.save_order_trace(job, order_start, trace_mark)
+                self.batch_history.append((len(batch), batch_start, self.clock.time()))
+
+            elif job.kind == GREETING:
                 self.MODE = 'gritting'
-                data = self.gritting_list.pop(0)
-                gender = data[0]
-                age = data[1]
-            else:
-                self.MODE = 'ready'
-
-            # --------------Joint Motion : icecream start--------------------
-            if self.MODE == 'icecreaming':
-                print('icecream start')
-                time.sleep(4)
+                self.update_status(mode=self.MODE)
+                gender = job.payload[0]
+                age = job.payload[1]
+
+                order_start = self.clock.time()
+                trace_mark = self.profiler.mark()
+                self.gritting(gender)
+                if not self.is_alive:
+                    # 인사 모션 중 에러로 중단, 지난 인사는 다시 하지 않으므로 실패 처리
+                    self.scheduler.fail(job, 'robot stopped')
+                    return
+                self.scheduler.complete(job)
+                self.save_order_trace(job, order_start, trace_mark)
+
+    def make_icecream(self, job, first=True, last=True):
+        """
+        아이스크림 주문 한 건 제조
+
+        :param first: 배치의 첫 주문이면 True, 시작 대기/홈 복귀/Storagy 쓰레기 확인은 첫 주문에서만 실행
+        :param last: 배치의 마지막 주문이면 True, 홈 복귀/그리퍼 정지는 마지막 주문에서만 실행
+                     (motion_trash_capsule 이 홈 자세에서 끝나고 프레스는 motion_make_icecream 에서 올라감)
+        :return: 로봇이 멈춰서 중단되면 False
+        """
+        order = job.payload
+
+        # --------------Joint Motion : icecream start--------------------
+        print('icecream start')
+        if first:
+            self._sleep(4)
+            self.motion_home()
+
+            self.storagy_trash_mode()
+
+        # 캡슐 인식 대기 (파이프라인이면 배치 시작 또는 앞 주문의 씰 확인 후에 이미 시작되어 있음)
+        self._schedule_capsule_wait(job)
+        with self.profiler.span('capsule_wait', 'vision'):
+            while True:
+                result = self.order_pipeline.join(job.order_id, timeout=5)
+                if result is not None:
+                    break
+                if not self.is_alive:
+                    # 제조 시작 전에 멈춤, 주문을 다시 대기열로
+                    self.order_pipeline.cancel(job.order_id)
+                    self.scheduler.requeue(job, 'robot stopped')
+                    return False
+                print('캡슐 인식 대기중...')
+        self.order_pipeline.finish(job.order_id)
+        # 캡슐 인식 후 2초 대기, 앞 주문의 동작 중에 이미 인식되었으면 남은 시간만
+        detected = max(result.stamp(zone)[0] or self.clock.time() for zone in ('A_ZONE', 'B_ZONE', 'C_ZONE')
+                       if getattr(result, zone))
+        self._sleep(max(0.0, 2 - (self.clock.time() - detected)))
+
+        self.publish('progress', order_id=job.order_id, step='seal_check')
+        self.motion_grab_capsule()
+        self.motion_check_sealing()
+
+        # 일정 시간 동안 씰 제거 여부 인식
+        with self.profiler.span('seal_check', 'vision'), self.vision_demand('seal'):
+            result = self.perception.wait_for(lambda state: state.NOT_SEAL, timeout=3)
+        print('seal check complete, frame={}'.format(result.stamp('NOT_SEAL')[1] if result else None))
+
+        # 씰 제거 확인 시 아이스크림 제조
+        if self.NOT_SEAL:
+            if self.pipeline_overlap:
+                # 캡슐이 지그를 떠남, 다음 주문의 캡슐 인식 대기를 지금 시작 (이 주문의 제조/서빙/폐기와 겹침)
+                self._release_jig(job)
+            self.publish('progress', order_id=job.order_id, step='making')
+            self.motion_place_capsule()
+            self.motion_grab_cup()
+            self.motion_topping(order)
+            self.motion_make_icecream()
+            self.publish('progress', order_id=job.order_id, step='serving')
+            self.motion_serve_storagy()
+            self.motion_trash_capsule()
+            if last:
                 self.motion_home()
+            if not self.is_alive:
+                # 모션 중 에러로 남은 동작이 생략됨, 완료 처리하지 않고 주문을 다시 대기열로
+                self.scheduler.requeue(job, 'robot stopped')
+                return False
+            self.scheduler.complete(job)
+            print('icecream finish')
+
+        # 씰 제거 확인 안될 시 캡슐 return
+        else:
+            self.motion_place_fail_capsule()
+            self.motion_home()
+            if not self.is_alive:
+                # 씰 확인 전후의 모션 중 에러로 멈춤 (씰 인식 실패가 아님)
+                self.scheduler.requeue(job, 'robot stopped')
+                return False
+            self.scheduler.requeue(job, 'seal not removed')
+            print('please take off the seal')
+
+        if last:
+            code = self._arm.stop_lite6_gripper()
+            if not self._check_code(code, 'stop_lite6_gripper'):
+                if job.state == MAKING:
+                    self.scheduler.fail(job, 'stop_lite6_gripper')
+                return False
+
+        # -------------- 동작 종류 후 변수 초기화 --------------
+        self._release_jig(job)
+        self.NOT_SEAL = False
+        if self.zone_engine is not None:
+            self.zone_engine.reset('NOT_SEAL')
+        self.cup_trash_detected, self.cup_holder_detected = False, False
+        self.cup_trash_detect_start_time, self.cup_holder_detect_start_time = None, None
+        if last:
+            self._sleep(1)
+        return self.is_alive
 
-                self.storagy_trash_mode()
-
-                # 캡슐 인식 대기
-                while not (self.A_ZONE or self.B_ZONE or self.C_ZONE):
-                    time.sleep(0.2)
-                    print('캡슐 인식 대기중...')
-                time.sleep(2)
-
-                self.motion_grab_capsule()
-                self.motion_check_sealing()
-
-                # 일정 시간 동안 씰 제거 여부 인식
-                count = 0
-                while True:
-                    if self.NOT_SEAL or count >= 3:      
-                        print('seal check complete')
-                        break
-                    time.sleep(0.2)
-                    count += 0.2
-
-                # 씰 제거 확인 시 아이스크림 제조
-                if self.NOT_SEAL:
-                    self.motion_place_capsule()
-                    self.motion_grab_cup()
-                    self.motion_topping(order)
-                    self.motion_make_icecream()
-                    self.motion_serve_storagy()
-                    self.motion_trash_capsule()
-                    self.motion_home()
-                    print('icecream finish')
-
-                # 씰 제거 확인 안될 시 캡슐 return
-                else:
-                    self.motion_place_fail_capsule()
-                    self.motion_home()
-                    self.order_list.insert(0, raw_order)
-                    print('please take off the seal')
+    def _schedule_capsule_wait(self, job):
+        self.order_pipeline.schedule(job.order_id, CAPSULE_WAIT, self._capsule_detected,
+                                     on_start=functools.partial(self._start_capsule_wait, job))
 
-                code = self._arm.stop_lite6_gripper()
-                if not self._check_code(code, 'stop_lite6_gripper'):
-                    return
-                
-                # -------------- 동작 종류 후 변수 초기화 --------------
-                self.A_ZONE, self.B_ZONE, self.C_ZONE, self.NOT_SEAL = False, False, False, False
-                self.A_ZONE_start_time, self.B_ZONE_start_time, self.C_ZONE_start_time = None, None, None
-                self.cup_trash_detected, self.cup_holder_detected = False, False
-                self.cup_trash_detect_start_time, self.cup_holder_detect_start_time = None, None
-                time.sleep(1)
-            
-            elif self.MODE == 'gritting':
-                self.gritting(gender)
+    @staticmethod
+    def _capsule_detected(state):
+        return state.A_ZONE or state.B_ZONE or state.C_ZONE
+
+    def _start_capsule_wait(self, job):
+        # 키오스크에 캡슐 투입 안내, 인식이 끝날 때까지 캡슐 ROI 를 매 프레임 추론
+        self.publish('progress', order_id=job.order_id, step='capsule_wait')
+        demand = contextlib.ExitStack()
+        demand.enter_context(self.vision_demand('capsule'))
+        return demand.close
 
+    def _release_jig(self, job):
+        """
+        지그의 캡슐 인식 상태를 초기화하고 지그 반납, 예약된 다음 주문의 캡슐 인식 대기가 시작됨
+        """
+        if not self.order_pipeline.holds(job.order_id, JIG):
+            return
+        self.A_ZONE, self.B_ZONE, self.C_ZONE = False, False, False
+        if self.zone_engine is not None:
+            # 캡슐이 계속 ROI 안에 있으면 체류 시간을 처음부터 다시 측정
+            self.zone_engine.reset('A_ZONE', 'B_ZONE', 'C_ZONE')
+        self.order_pipeline.release(job.order_id, JIG)
+
+    @staticmethod
+    def _topping_group(order):
+        return tuple(order.payload.get(key, 0) for key in ('topping1', 'topping2', 'topping3'))
+
+    def batch_report(self):
+        """
+        배치 크기별 실측 처리량 (주문/시간), 한 건씩 제조할 때 대비 배치 제조의 처리량 증가율 (실측/예상)
+
+        예상 값은 시작 시 dry-run 한 결과 (predicted_throughput), 없으면 None
+        """
+        report = {}
+        for label, sizes in (('single', lambda size: size == 1), ('batched', lambda size: size > 1)):
+            records = [(size, end - start) for size, start, end in self.batch_history if sizes(size)]
+            orders = sum(size for size, _ in records)
+            duration = sum(duration for _, duration in records)
+            report[label] = {'batches': len(records), 'orders': orders,
+                             'orders_per_hour': orders * 3600.0 / duration if duration > 0 else 0}
+        single, batched = report['single']['orders_per_hour'], report['batched']['orders_per_hour']
+        report['measured_gain'] = batched / single if single > 0 and batched > 0 else None
+        report['predicted'] = self.predicted_throughput
+        report['predicted_gain'] = self.predicted_throughput['gain'] if self.predicted_throughput else None
+        return report
 
 if __name__ == '__main__':
     RobotMain.pprint('xArm-Python-SDK Version:{}'.format(version.__version__))
     arm = XArmAPI('192.168.1.167', baud_checkset=False)
-    robot_main = RobotMain(arm)
+    # 한 건씩 제조할 때 대비 배치 제조의 예상 처리량 (batch_report 에서 실측 값과 비교)
+    predicted = predict_throughput(RobotMain, BATCH_PREDICT_ORDERS, ORDER_BATCH_SIZE) if ORDER_BATCH_SIZE > 1 else None
+    robot_main = RobotMain(arm, predicted_throughput=predicted)
     yolo_main = YOLOMain(robot_main)
 
     robot_thread = threading.Thread(target=robot_main.run_robot)
@@ -0,0 +1,3 @@
+"""
+ARIS 아이스크림 로봇 애플리케이션 모듈
+"""
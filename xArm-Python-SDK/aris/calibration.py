@@ -0,0 +1,181 @@
+"""
+카메라 픽셀 -> 로봇 좌표 (mm) 변환
+
+기존 방식은 객체 중심마다 1 x 1 x 2 배열을 만들어 cv2.perspectiveTransform 을 따로 호출하고,
+왜곡 보정 (Coordinate_camera_to_world.py) 은 calibration_data.npz 를 읽어 점마다 cv2.undistortPoints 를 호출함
+CameraCalibration 은 내부 파라미터 / 왜곡 계수 / 호모그래피를 시작할 때 한 번만 계산하고
+- 프레임의 모든 점을 한 번의 numpy 연산으로 변환 (transform, N x 2)
+- 왜곡 계수가 있으면 640 x 480 전체 픽셀의 (왜곡 보정 + 호모그래피) 결과를 룩업 맵으로 미리 계산하고,
+  변환은 맵의 쌍선형 보간 (이미지 밖의 점은 직접 계산)
+호모그래피는 왜곡 보정한 보정점으로 계산하므로 왜곡 계수가 없을 때는 기존 compute_homography_matrix 와 같은 결과
+
+reprojection_error() 는 보정점 (카메라 픽셀, 로봇 mm) 을 변환해 로봇 좌표 오차 (mm) 를 보고
+
+벤치마크: python -m aris.calibration [--calibration calibration_data.npz] [--points 1 10 100]
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+
+def load_intrinsics(path):
+    """
+    :param path: camera_calibration 의 calibration_data.npz ('mtx', 'dist')
+    :return: (mtx, dist), 파일이 없으면 (None, None)
+    """
+    if not path or not os.path.exists(path):
+        if path:
+            print('calibration file not found, skip undistortion: {}'.format(path))
+        return None, None
+    data = np.load(path)
+    return np.asarray(data['mtx'], dtype=np.float64), np.asarray(data['dist'], dtype=np.float64)
+
+
+def apply_homography(homography, points):
+    """
+    :param points: N x 2
+    :return: N x 2
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    projected = points @ homography[:, :2].T + homography[:, 2]
+    return projected[:, :2] / projected[:, 2:]
+
+
+class CameraCalibration(object):
+    """
+    :param camera_points: 보정점의 카메라 픽셀 좌표 (N x 2)
+    :param robot_points: 보정점의 로봇 좌표 (N x 2, mm)
+    :param mtx: 카메라 내부 파라미터 (3 x 3), None 이면 왜곡 보정 안 함
+    :param dist: 왜곡 계수
+    :param size: 룩업 맵 크기 (너비, 높이), None 이면 맵 없이 매번 계산
+    """
+    def __init__(self, camera_points, robot_points, mtx=None, dist=None, size=(640, 480)):
+        import cv2
+        self.camera_points = np.asarray(camera_points, dtype=np.float64).reshape(-1, 2)
+        self.robot_points = np.asarray(robot_points, dtype=np.float64).reshape(-1, 2)
+        self.mtx = mtx
+        self.dist = dist
+        self.homography, _ = cv2.findHomography(self.undistort(self.camera_points).astype(np.float32),
+                                                self.robot_points.astype(np.float32))
+        self.size = size
+        self.map = None
+        if size is not None and mtx is not None:
+            self.map = self.build_map(size)
+
+    def undistort(self, points):
+        """
+        :return: 왜곡 보정한 픽셀 좌표 (N x 2), 왜곡 계수가 없으면 그대로
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.mtx is None or not len(points):
+            return points
+        import cv2
+        return cv2.undistortPoints(points.reshape(-1, 1, 2), self.mtx, self.dist, P=self.mtx).reshape(-1, 2)
+
+    def direct(self, points):
+        """
+        룩업 맵 없이 왜곡 보정 + 호모그래피 계산
+
+        :return: N x 2 로봇 좌표 (mm)
+        """
+        return apply_homography(self.homography, self.undistort(points))
+
+    def build_map(self, size):
+        """
+        :return: 높이 x 너비 x 2 (float32) 픽셀별 로봇 좌표
+        """
+        width, height = size
+        xs, ys = np.meshgrid(np.arange(width, dtype=np.float64), np.arange(height, dtype=np.float64))
+        return self.direct(np.stack([xs.ravel(), ys.ravel()], axis=1)).reshape(height, width, 2).astype(np.float32)
+
+    def transform(self, points):
+        """
+        프레임의 모든 점을 한 번에 변환
+
+        :param points: N x 2 픽셀 좌표
+        :return: N x 2 로봇 좌표 (mm)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.map is None:
+            return self.direct(points)
+        height, width = self.map.shape[:2]
+        x, y = points[:, 0], points[:, 1]
+        inside = (x >= 0) & (y >= 0) & (x <= width - 1) & (y <= height - 1)
+        result = np.empty_like(points)
+
+        # 쌍선형 보간
+        x0 = np.minimum(np.floor(x[inside]).astype(np.intp), width - 2)
+        y0 = np.minimum(np.floor(y[inside]).astype(np.intp), height - 2)
+        fx = (x[inside] - x0)[:, None]
+        fy = (y[inside] - y0)[:, None]
+        top = self.map[y0, x0] * (1 - fx) + self.map[y0, x0 + 1] * fx
+        bottom = self.map[y0 + 1, x0] * (1 - fx) + self.map[y0 + 1, x0 + 1] * fx
+        result[inside] = top * (1 - fy) + bottom * fy
+        if not inside.all():
+            result[~inside] = self.direct(points[~inside])
+        return result
+
+    def reprojection_error(self):
+        """
+        :return: {'errors': 보정점별 로봇 좌표 오차 (mm), 'rms', 'max', 'map_max': 룩업 맵 보간과 직접 계산의 최대 차이 (mm)}
+        """
+        errors = np.linalg.norm(self.transform(self.camera_points) - self.robot_points, axis=1)
+        map_max = 0.0
+        if self.map is not None:
+            map_max = float(np.abs(self.transform(self.camera_points) - self.direct(self.camera_points)).max())
+        return {'errors': errors, 'rms': float(np.sqrt(np.mean(errors ** 2))), 'max': float(errors.max()),
+                'map_max': map_max}
+
+
+def benchmark(calibration, point_counts=(1, 10, 100), repeat=200, seed=0):
+    """
+    :return: [(점 수, 점마다 perspectiveTransform ms, 한 번에 직접 계산 ms, 룩업 맵 ms)], 프레임당 시간
+    """
+    import cv2
+    rng = np.random.RandomState(seed)
+    width, height = calibration.size or (640, 480)
+    results = []
+    for count in point_counts:
+        points = rng.uniform(0, 1, (count, 2)) * (width - 1, height - 1)
+        timings = []
+        for run in (
+            lambda: [cv2.perspectiveTransform(np.array([[point]], dtype=np.float32), calibration.homography)
+                     for point in points],
+            lambda: calibration.direct(points),
+            lambda: calibration.transform(points),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            timings.append(1000 * (time.perf_counter() - start) / repeat)
+        results.append((count,) + tuple(timings))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='camera to robot transform benchmark')
+    parser.add_argument('--calibration', default=None, help='calibration_data.npz (mtx, dist), 없으면 호모그래피만')
+    parser.add_argument('--points', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    # 240822_Aris_Storagy_Socket.py 의 보정점
+    camera_points = [[247.0, 121.0], [306.0, 107.0], [358.0, 94.0], [238.0, 79.0], [290.0, 66.0], [342.0, 52.0]]
+    robot_points = [[116.3, -424.9], [17.4, -456.5], [-73.2, -484.2], [140.1, -518.5], [45.6, -548.1], [-47.5, -580.8]]
+    mtx, dist = load_intrinsics(args.calibration)
+    start = time.perf_counter()
+    calibration = CameraCalibration(camera_points, robot_points, mtx, dist)
+    print('calibration: {:.1f}ms (lookup map: {})'.format(1000 * (time.perf_counter() - start),
+                                                         calibration.map is not None))
+    report = calibration.reprojection_error()
+    print('reprojection error: rms {:.2f}mm, max {:.2f}mm, map {:.3f}mm'.format(
+        report['rms'], report['max'], report['map_max']))
+    print('{:>8} {:>12} {:>12} {:>12}'.format('points', 'loop(ms)', 'batch(ms)', 'map(ms)'))
+    for count, loop, batch, lookup in benchmark(calibration, args.points, args.repeat):
+        print('{:>8} {:>12.3f} {:>12.3f} {:>12.3f}'.format(count, loop, batch, lookup))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+주입 가능한 시계 (실제 시간 / 가상 시간)
+
+RobotMain 의 모든 sleep 과 비전 대기는 clock 을 통해 이루어지므로, VirtualClock 을 넣으면
+실제로 기다리지 않고 가상 시간만 진행하여 주문 한 건을 수 밀리초 안에 실행할 수 있음 (dry-run)
+"""
+import time
+import heapq
+import itertools
+
+
+class RealClock(object):
+    """
+    실제 시간 시계 (time.monotonic / time.sleep)
+    """
+    virtual = False
+
+    def time(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sleep_until(self, t):
+        self.sleep(t - self.time())
+
+    def wait(self, cond, timeout=None):
+        """
+        threading.Condition 대기 (cond 의 lock 을 잡은 상태에서 호출)
+        """
+        return cond.wait(timeout)
+
+
+class VirtualClock(object):
+    """
+    가상 시간 시계, sleep 은 시간만 진행시키고 예약된 이벤트(call_later)를 시간 순서대로 실행
+    Note: 로봇 스레드 하나에서만 사용하는 것을 전제로 함
+    """
+    virtual = True
+
+    def __init__(self, start=0.0):
+        self._now = float(start)
+        self._events = []
+        self._seq = itertools.count()
+
+    def time(self):
+        return self._now
+
+    def call_at(self, t, callback, *args):
+        """
+        가상 시각 t 에 callback(*args) 실행 예약
+        """
+        heapq.heappush(self._events, (max(t, self._now), next(self._seq), callback, args))
+
+    def call_later(self, delay, callback, *args):
+        self.call_at(self._now + delay, callback, *args)
+
+    def advance_to(self, t):
+        """
+        t 까지 시간을 진행하며 그 사이에 예약된 이벤트 실행
+        """
+        while self._events and self._events[0][0] <= t:
+            event_time, _, callback, args = heapq.heappop(self._events)
+            self._now = max(self._now, event_time)
+            callback(*args)
+        self._now = max(self._now, t)
+
+    def sleep(self, seconds):
+        self.advance_to(self._now + max(seconds, 0))
+
+    def sleep_until(self, t):
+        self.advance_to(t)
+
+    def wait(self, cond, timeout=None):
+        """
+        Condition 대기를 가상 시간으로 대체, 다음 이벤트까지 (또는 timeout 까지) 시간을 진행
+
+        :return: 이벤트가 실행되었으면 True, timeout 이면 False
+        """
+        deadline = None if timeout is None else self._now + timeout
+        if self._events and (deadline is None or self._events[0][0] <= deadline):
+            self.advance_to(self._events[0][0])
+            return True
+        if deadline is None:
+            raise RuntimeError('virtual clock: waiting forever without any scheduled event')
+        self.advance_to(deadline)
+        return False
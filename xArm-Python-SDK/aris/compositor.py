@@ -0,0 +1,158 @@
+"""
+세그멘테이션 마스크 한 번에 합성 (마스크별 overlay 반복 대체)
+
+기존 방식은 마스크마다 전체 프레임 크기의 리사이즈/색상 이미지 생성/이미지 복사/블렌딩을 반복함
+MaskCompositor 는 모든 마스크로 라벨 맵(픽셀마다 가장 위 마스크 번호)을 마스크 해상도에서 한 번 만들고,
+캐시된 인덱스로 프레임 크기로 확대 (nearest) 한 뒤 마스크가 있는 픽셀만 한 번 블렌딩함
+블렌딩은 uint16 룩업 테이블 (픽셀 * (1 - alpha)) + 팔레트 (색상 * alpha) 의 합을 한 번 반올림해 계산 (오차 최대 1)
+출력 버퍼는 스레드별로 재사용
+
+겹친 영역은 위(나중) 마스크의 색만 적용됨 (기존 방식은 겹친 횟수만큼 반복 블렌딩)
+
+벤치마크: python -m aris.compositor [--masks 5 10 20] [--repeat 50]
+"""
+import time
+import argparse
+import threading
+
+import numpy as np
+
+
+class MaskCompositor(object):
+    """
+    :param alpha: 마스크 색의 비율 (0 ~ 1)
+    :param threshold: 마스크 값이 이보다 크면 객체 픽셀
+    """
+    def __init__(self, alpha=0.3, threshold=0.5):
+        self.alpha = alpha
+        self.threshold = threshold
+        self._local = threading.local()
+        self._index_cache = {}
+        self._lut = None
+
+    def _output(self, image):
+        out = getattr(self._local, 'out', None)
+        if out is None or out.shape != image.shape or out.dtype != image.dtype:
+            out = self._local.out = np.empty_like(image)
+        return out
+
+    def _scale_index(self, src_shape, dst_shape):
+        key = (src_shape, dst_shape)
+        index = self._index_cache.get(key, None)
+        if index is None:
+            rows = (np.arange(dst_shape[0]) * src_shape[0] // dst_shape[0])[:, None]
+            cols = (np.arange(dst_shape[1]) * src_shape[1] // dst_shape[1])[None, :]
+            index = self._index_cache.setdefault(key, (rows, cols))
+        return index
+
+    def label_map(self, masks, shape):
+        """
+        :param masks: N x h x w 마스크 배열
+        :param shape: 출력 (H, W)
+        :return: H x W 라벨 맵, 0 은 배경, i 는 i-1 번째 마스크 (겹치면 뒤의 마스크)
+        """
+        n = masks.shape[0]
+        labels = np.zeros(masks.shape[1:], dtype=np.uint8 if n < 255 else np.uint16)
+        for index, mask in enumerate(masks):
+            labels[mask > self.threshold] = index + 1
+        if labels.shape != tuple(shape):
+            rows, cols = self._scale_index(labels.shape, tuple(shape))
+            labels = labels[rows, cols]
+        return labels
+
+    def composite(self, image, masks, colors):
+        """
+        :param image: H x W x 3 uint8 프레임 (변경하지 않음)
+        :param masks: N x h x w 마스크 (result.masks.data), 또는 h x w 마스크 목록
+        :param colors: 마스크별 BGR 색상 목록
+        :return: 합성된 이미지 (스레드별로 재사용되는 버퍼, 다음 호출 전까지 유효)
+        """
+        out = self._output(image)
+        np.copyto(out, image)
+        if len(masks) == 0:
+            return out
+        masks = np.asarray(masks)
+        labels = self.label_map(masks, image.shape[:2])
+        weight = int(round(self.alpha * 256))
+        if self._lut is None or self._lut[0] != weight:
+            self._lut = (weight, (np.arange(256) * (256 - weight)).astype(np.uint16))
+        # 두 항을 따로 버림하면 오차가 2 까지 생기므로 256 배 값으로 더한 뒤 한 번만 반올림
+        palette = np.zeros((len(masks) + 1, 3), dtype=np.uint16)
+        palette[1:] = np.asarray(colors, dtype=np.uint16).reshape(-1, 3) * weight + 128
+        selected = labels > 0
+        labels = labels[selected]
+        out[selected] = (self._lut[1][image[selected]] + palette[labels]) >> 8
+        return out
+
+
+def overlay_loop(image, masks, colors, alpha=0.3):
+    """
+    기존 YOLOMain.overlay 를 마스크마다 반복하는 방식 (벤치마크 비교용)
+    """
+    import cv2
+    for mask, color in zip(masks, colors):
+        mask = cv2.resize(mask, (image.shape[1], image.shape[0]))
+        colored_mask = np.zeros_like(image, dtype=np.uint8)
+        for c in range(3):
+            colored_mask[:, :, c] = mask * color[c]
+        mask_indices = mask > 0
+        overlay_image = image.copy()
+        overlay_image[mask_indices] = cv2.addWeighted(image[mask_indices], 1 - alpha, colored_mask[mask_indices], alpha, 0)
+        image = overlay_image
+    return image
+
+
+def _random_masks(count, shape, rng):
+    masks = np.zeros((count,) + shape, dtype=np.float32)
+    for mask in masks:
+        h, w = rng.integers(shape[0] // 8, shape[0] // 3), rng.integers(shape[1] // 8, shape[1] // 3)
+        y, x = rng.integers(0, shape[0] - h), rng.integers(0, shape[1] - w)
+        mask[y:y + h, x:x + w] = 1
+    return masks
+
+
+def benchmark(counts=(5, 10, 20), repeat=50, frame_shape=(480, 640), mask_shape=(480, 640)):
+    """
+    :return: [(마스크 수, 기존 방식 ms, 합성기 ms)], cv2 가 없으면 기존 방식은 None
+    """
+    try:
+        import cv2  # noqa: F401
+        has_cv2 = True
+    except ImportError:
+        has_cv2 = False
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, frame_shape + (3,), dtype=np.uint8)
+    compositor = MaskCompositor()
+    results = []
+    for count in counts:
+        masks = _random_masks(count, mask_shape, rng)
+        colors = [tuple(int(v) for v in rng.integers(0, 256, 3)) for _ in range(count)]
+        timings = []
+        for func in ((lambda: overlay_loop(image, masks, colors)) if has_cv2 else None,
+                     lambda: compositor.composite(image, masks, colors)):
+            if func is None:
+                timings.append(None)
+                continue
+            func()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            timings.append((time.perf_counter() - start) / repeat * 1000)
+        results.append((count, timings[0], timings[1]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='mask compositing benchmark')
+    parser.add_argument('--masks', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+    print('{:>6} {:>12} {:>12} {:>8}'.format('masks', 'overlay(ms)', 'single(ms)', 'speedup'))
+    for count, loop_ms, single_ms in benchmark(args.masks, args.repeat):
+        print('{:>6} {:>12} {:>12.2f} {:>8}'.format(
+            count, 'n/a' if loop_ms is None else '{:.2f}'.format(loop_ms), single_ms,
+            'n/a' if loop_ms is None else '{:.1f}x'.format(loop_ms / single_ms)))
+
+
+if __name__ == '__main__':
+    main()
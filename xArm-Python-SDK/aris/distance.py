@@ -0,0 +1,237 @@
+"""
+사람 - 로봇 최단 거리 계산 (cdist 전체 거리 행렬 대체)
+
+cdist(robot_points, human_points) 는 N x M 행렬을 만들어 사람이 가까이 올수록(외곽선이 클수록) 시간/메모리가 급증함
+DistanceEngine 의 방법
+- 'kdtree'    : 로봇 외곽선 점의 cKDTree 에 사람 외곽선 점을 질의, O((N + M) log N), cdist 와 같은 결과 (scipy 필요)
+- 'transform' : 로봇 마스크의 distanceTransform 에서 사람 외곽선 점의 값을 읽음, 점 개수와 무관하게 O(H x W) (cv2 필요)
+                로봇 마스크의 모든 경계 픽셀 기준이므로 CHAIN_APPROX_NONE 외곽선의 cdist 와 같고,
+                꼭짓점만 남은 CHAIN_APPROX_SIMPLE 외곽선의 cdist 보다 같거나 작음 (더 안전한 쪽)
+- 'brute'     : 블록 단위 numpy 전체 비교, 메모리는 block_size x N 으로 제한 (의존 패키지 없음)
+max_points 를 지정하면 외곽선 점을 일정 간격으로 줄여 프레임당 비용 상한을 둠 (거리 오차는 점 간격의 절반 이내)
+
+벤치마크: python -m aris.distance [--frames 녹화 폴더] [--repeat 20]
+녹화 파일은 record_frame() 으로 저장한 .npz (robot_points, human_points, robot_mask)
+"""
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def stack_points(contours):
+    """
+    cv2.findContours 외곽선 목록 -> K x 2 (x, y) 점 배열
+    """
+    if contours is None or len(contours) == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    if isinstance(contours, np.ndarray) and contours.ndim == 2:
+        return contours
+    return np.vstack([np.asarray(contour).reshape(-1, 2) for contour in contours])
+
+
+def decimate(points, max_points):
+    """
+    점이 max_points 보다 많으면 일정 간격으로 골라 max_points 개 이하로 줄임
+    """
+    if max_points is None or len(points) <= max_points:
+        return points
+    step = -(-len(points) // max_points)
+    return points[::step]
+
+
+class DistanceEngine(object):
+    """
+    :param method: 'kdtree', 'transform', 'brute', 'auto' (scipy 가 있으면 kdtree, 없으면 brute)
+    :param max_points: 로봇/사람 각각의 최대 외곽선 점 수, None 이면 줄이지 않음 (transform 은 사람 점만 줄임)
+    :param block_size: brute 방법에서 한 번에 비교하는 사람 점 수
+    """
+    def __init__(self, method='auto', max_points=None, block_size=256):
+        if method == 'auto':
+            method = 'kdtree' if cKDTree is not None else 'brute'
+        if method == 'kdtree' and cKDTree is None:
+            raise ImportError('kdtree method requires scipy')
+        if method not in ('kdtree', 'transform', 'brute'):
+            raise ValueError('unknown distance method: {}'.format(method))
+        self.method = method
+        self.max_points = max_points
+        self.block_size = block_size
+        self.last_time = 0
+
+    def compute(self, robot_contours, human_contours, robot_mask=None):
+        """
+        :param robot_contours: 로봇 외곽선 목록 또는 K x 2 점 배열
+        :param human_contours: 사람 외곽선 목록 또는 K x 2 점 배열
+        :param robot_mask: 로봇 마스크 (H x W), transform 방법에 필요, 외곽선과 같은 좌표계
+        :return: (최단 거리, 로봇 점 (x, y), 사람 점 (x, y)), 둘 중 하나라도 없으면 None
+        """
+        start = time.perf_counter()
+        human_points = decimate(stack_points(human_contours), self.max_points)
+        if self.method == 'transform' and robot_mask is not None:
+            result = self._transform(robot_mask, human_points)
+        else:
+            robot_points = decimate(stack_points(robot_contours), self.max_points)
+            if len(robot_points) == 0 or len(human_points) == 0:
+                result = None
+            elif self.method == 'kdtree':
+                result = self._kdtree(robot_points, human_points)
+            else:
+                result = self._brute(robot_points, human_points)
+        self.last_time = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def _result(distance, robot_point, human_point):
+        return float(distance), (int(robot_point[0]), int(robot_point[1])), (int(human_point[0]), int(human_point[1]))
+
+    def _kdtree(self, robot_points, human_points):
+        distances, indexes = cKDTree(robot_points).query(human_points, k=1)
+        human_index = int(np.argmin(distances))
+        return self._result(distances[human_index], robot_points[indexes[human_index]], human_points[human_index])
+
+    def _brute(self, robot_points, human_points):
+        robot = robot_points.astype(np.float64)
+        robot_norm = (robot ** 2).sum(axis=1)
+        best = (np.inf, None, None)
+        for start in range(0, len(human_points), self.block_size):
+            block = human_points[start:start + self.block_size].astype(np.float64)
+            # |h - r|^2 = |h|^2 + |r|^2 - 2 h.r, 블록 하나의 block_size x N 행렬만 만듦
+            squared = (block ** 2).sum(axis=1)[:, None] + robot_norm[None, :] - 2 * block.dot(robot.T)
+            index = np.unravel_index(np.argmin(squared), squared.shape)
+            if squared[index] < best[0]:
+                best = (squared[index], index[1], start + index[0])
+        robot_point, human_point = robot_points[best[1]], human_points[best[2]]
+        return self._result(np.hypot(*(robot_point.astype(np.float64) - human_point)), robot_point, human_point)
+
+    def _transform(self, robot_mask, human_points):
+        import cv2
+        robot = np.asarray(robot_mask) > 0.5
+        if len(human_points) == 0 or not robot.any():
+            return None
+        # 로봇 픽셀을 0 으로 두면 각 픽셀 값은 가장 가까운 로봇 픽셀까지의 거리, label 은 그 픽셀의 번호 (행 우선 순서)
+        source = np.where(robot, 0, 255).astype(np.uint8)
+        distance, labels = cv2.distanceTransformWithLabels(source, cv2.DIST_L2, cv2.DIST_MASK_5,
+                                                           labelType=cv2.DIST_LABEL_PIXEL)
+        height, width = source.shape
+        xs = np.clip(human_points[:, 0], 0, width - 1)
+        ys = np.clip(human_points[:, 1], 0, height - 1)
+        human_index = int(np.argmin(distance[ys, xs]))
+        x, y = xs[human_index], ys[human_index]
+        robot_pixels = np.flatnonzero(robot.ravel())
+        witness = robot_pixels[labels[y, x] - 1]
+        robot_point = (witness % width, witness // width)
+        # 마스크 근사 거리 대신 찾은 두 점 사이의 정확한 거리
+        return self._result(np.hypot(robot_point[0] - x, robot_point[1] - y), robot_point, (x, y))
+
+
+# ============================= 녹화 / 벤치마크 =============================
+
+def record_frame(path, robot_contours, human_contours, robot_mask=None):
+    """
+    벤치마크용 프레임 저장 (.npz)
+    """
+    data = {'robot_points': stack_points(robot_contours), 'human_points': stack_points(human_contours)}
+    if robot_mask is not None:
+        data['robot_mask'] = (np.asarray(robot_mask) > 0.5).astype(np.uint8)
+    np.savez_compressed(path, **data)
+
+
+def _synthetic_frames(count, sizes, shape=(480, 640)):
+    """
+    녹화가 없을 때 쓰는 가상 프레임: 가까이 있는 두 개의 타원 실루엣 (외곽선 점 수 = size)
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for size in sizes:
+        for _ in range(count):
+            angles = np.linspace(0, 2 * np.pi, size, endpoint=False)
+            robot_center = np.array([220, 240]) + rng.integers(-20, 20, 2)
+            human_center = np.array([420, 240]) + rng.integers(-20, 20, 2)
+            robot = np.stack([robot_center[0] + 90 * np.cos(angles), robot_center[1] + 180 * np.sin(angles)], axis=1)
+            human = np.stack([human_center[0] + 100 * np.cos(angles), human_center[1] + 200 * np.sin(angles)], axis=1)
+            robot, human = robot.astype(np.int32), human.astype(np.int32)
+            yy, xx = np.mgrid[:shape[0], :shape[1]]
+            mask = (((xx - robot_center[0]) / 90.0) ** 2 + ((yy - robot_center[1]) / 180.0) ** 2) <= 1
+            frames.append(('synthetic-{}'.format(size), robot, human, mask.astype(np.uint8)))
+    return frames
+
+
+def _load_frames(directory):
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.npz'))):
+        data = np.load(path)
+        mask = data['robot_mask'] if 'robot_mask' in data.files else None
+        frames.append((os.path.basename(path), data['robot_points'], data['human_points'], mask))
+    return frames
+
+
+def _dense_reference(robot_points, human_points):
+    """
+    기존 방식 (전체 거리 행렬)
+    """
+    diff = robot_points[:, None, :].astype(np.float64) - human_points[None, :, :]
+    dists = np.sqrt((diff ** 2).sum(axis=2))
+    index = np.unravel_index(np.argmin(dists), dists.shape)
+    return float(dists[index])
+
+
+def benchmark(frames, repeat=20, max_points=2000):
+    """
+    :return: {방법: {'avg_ms', 'max_ms', 'max_error'}}, max_error 는 기존 방식과의 최대 거리 차이 (px)
+    """
+    engines = {'brute': DistanceEngine('brute'), 'brute/decimated': DistanceEngine('brute', max_points=max_points)}
+    if cKDTree is not None:
+        engines['kdtree'] = DistanceEngine('kdtree')
+        engines['kdtree/decimated'] = DistanceEngine('kdtree', max_points=max_points)
+    try:
+        import cv2  # noqa: F401
+        engines['transform'] = DistanceEngine('transform')
+    except ImportError:
+        pass
+    report = {'dense': {'times': [], 'errors': [0.0]}}
+    report.update({name: {'times': [], 'errors': []} for name in engines})
+    for _, robot_points, human_points, mask in frames:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            reference = _dense_reference(robot_points, human_points)
+        report['dense']['times'].append((time.perf_counter() - start) / repeat)
+        for name, engine in engines.items():
+            if engine.method == 'transform' and mask is None:
+                continue
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = engine.compute(robot_points, human_points, robot_mask=mask)
+            report[name]['times'].append((time.perf_counter() - start) / repeat)
+            report[name]['errors'].append(abs(result[0] - reference))
+    return {name: {'avg_ms': 1000 * sum(item['times']) / len(item['times']),
+                   'max_ms': 1000 * max(item['times']), 'max_error': max(item['errors'])}
+            for name, item in report.items() if item['times']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='human-robot distance benchmark')
+    parser.add_argument('--frames', default=None, help='record_frame() 로 저장한 .npz 폴더, 없으면 가상 프레임')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 5000], help='가상 프레임의 외곽선 점 수')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-points', type=int, default=2000)
+    args = parser.parse_args(argv)
+    if args.frames:
+        groups = [(args.frames, _load_frames(args.frames))]
+    else:
+        groups = [('synthetic, {} points per silhouette'.format(size), _synthetic_frames(3, [size])) for size in args.sizes]
+    for title, frames in groups:
+        print('{} ({} frames)'.format(title, len(frames)))
+        print('{:>18} {:>10} {:>10} {:>10}'.format('method', 'avg(ms)', 'max(ms)', 'error(px)'))
+        for name, stat in benchmark(frames, args.repeat, args.max_points).items():
+            print('{:>18} {:>10.2f} {:>10.2f} {:>10.2f}'.format(name, stat['avg_ms'], stat['max_ms'], stat['max_error']))
+
+
+if __name__ == '__main__':
+    main()
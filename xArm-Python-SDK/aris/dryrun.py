@@ -0,0 +1,362 @@
+"""
+ARIS 레시피 dry-run (가짜 로봇팔 + 가상 시계)
+
+RobotMain 을 FakeArm 과 VirtualClock 으로 실행하여, 실제 로봇 없이 주문 처리 흐름과 사이클 타임을 확인
+- 모션은 MotionEstimator 로 추정한 시간만큼 가상 시간을 진행 (wait=True 이면 모션 종료까지 대기)
+- sleep 과 비전 대기는 가상 시간으로 처리되며, 캡슐 투입/씰 제거 인식은 예약된 이벤트로 흉내냄
+- 주문 한 건이 수 밀리초 안에 끝나므로 CI 에서 사이클 타임과 동작 순서의 회귀 테스트에 사용 가능
+
+주의: 스크립트를 import 하므로 스크립트의 의존 패키지(ultralytics, cv2, scipy)는 설치되어 있어야 함
+      (YOLOMain 은 생성하지 않으므로 카메라와 모델은 필요 없음)
+
+사용법:
+    python -m aris.dryrun --orders 3
+    python -m aris.dryrun --orders 2 --seal-fail 1 --timeline
+    python -m aris.dryrun --orders 6 --topping 1,0,0/0,1,0 --batch 3 --compare
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+import functools
+import importlib.util
+
+from xarm.tools.motion_estimator import MotionEstimator
+from .clock import VirtualClock
+from .scheduler import ICECREAM, SERVED, FAILED, QUEUED, MAKING
+
+
+DEFAULT_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   '240822_Aris_Storagy_Socket.py')
+
+
+class FakeArm(object):
+    """
+    RobotMain 이 사용하는 XArmAPI 인터페이스의 가짜 구현, 모든 명령은 성공(0)을 반환
+
+    모션 명령은 컨트롤러처럼 순서대로 큐에 쌓이며, 각 모션은 이전 모션이 끝난 뒤 시작됨
+    이전 모션이 끝나기 전에 들어온 모션은 이전 모션과 함께 추정하여 radius 블렌딩을 반영
+    Note: 관절 모션 후에는 직교 좌표가 갱신되지 않으므로 (FK 없음) 이어지는 직선 모션의 시간은 근사값
+    """
+    def __init__(self, clock, estimator=None):
+        self.clock = clock
+        self.estimator = estimator or MotionEstimator(None, is_radian=False)
+        self.motion_end = clock.time()
+        self._previous = None    # (이전 모션 시작 자세, 이전 모션), 블렌딩 추정용
+        self.log = []       # (시작, 종료, 명령, 인자)
+        self.profiler = None
+        self._faults = []   # (명령, 컨트롤러 에러 코드, 인자)
+
+        self.connected = True
+        self.error_code = 0
+        self.warn_code = 0
+        self.sn = 'dry-run'
+        self.default_is_radian = False
+        self.position_offset = [0, 0, 0, 0, 0, 0]
+        self.world_offset = [0, 0, 0, 0, 0, 0]
+
+    @property
+    def state(self):
+        # 1: 모션 중, 2: 대기
+        return 1 if self.clock.time() < self.motion_end else 2
+
+    def inject_error(self, name, error_code, **args):
+        """
+        name 명령이 args 와 같은 인자로 호출되면 1 을 반환하고 컨트롤러 에러 상태(error_code)로 바뀜 (에러 처리 확인용)
+        ex: arm.inject_error('set_cgpio_digital', 22, ionum=3, value=1)
+        """
+        self._faults.append((name, error_code, args))
+
+    def _fault(self, name, args):
+        for fault_name, error_code, fault_args in self._faults:
+            if fault_name == name and all(args.get(k, None) == v for k, v in fault_args.items()):
+                self.error_code = error_code
+                return 1
+        return 0
+
+    def _record(self, name, start, end, args):
+        self.log.append((start, end, name, args))
+
+    def _instant(self, name, **args):
+        if self._fault(name, args):
+            return 1
+        now = self.clock.time()
+        self._record(name, now, now, args)
+        return 0
+
+    def _move(self, name, kind, params, wait):
+        if self._fault(name, params):
+            return 1
+        start = max(self.clock.time(), self.motion_end)
+        pose = (list(self.estimator.position), list(self.estimator.angles))
+        if self._previous is not None and self.clock.time() < self.motion_end:
+            # 큐에서 이전 모션 뒤에 이어짐, 이전 모션부터 다시 추정해 블렌딩으로 줄어든 시간만 사용
+            (self.estimator.position, self.estimator.angles), previous = self._previous
+            duration = self.estimator.estimate_sequence([previous, (kind, params)], update=True)[1][1]
+        else:
+            duration, _ = self.estimator.estimate_sequence([(kind, params)], update=True)
+        self._previous = (pose, (kind, params))
+        self.motion_end = start + duration
+        self._record(name, start, self.motion_end, params)
+        if wait:
+            called = self.clock.time()
+            self.clock.sleep_until(self.motion_end)
+            if self.profiler is not None:
+                self.profiler.add(name, called, self.motion_end, 'sdk', wait=True)
+        return 0
+
+    # ----------------------------- 모션 -----------------------------
+
+    def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None, speed=None,
+                     mvacc=None, mvtime=None, relative=False, is_radian=None, wait=False, timeout=None, **kwargs):
+        params = dict(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, radius=radius, speed=speed, mvacc=mvacc,
+                      relative=relative, is_radian=is_radian)
+        return self._move('set_position', 'position', params, wait)
+
+    def set_tool_position(self, x=0, y=0, z=0, roll=0, pitch=0, yaw=0, speed=None, mvacc=None, mvtime=None,
+                          is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
+        params = dict(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, speed=speed, mvacc=mvacc,
+                      is_radian=is_radian, radius=radius)
+        return self._move('set_tool_position', 'tool_position', params, wait)
+
+    def set_servo_angle(self, servo_id=None, angle=None, speed=None, mvacc=None, mvtime=None, relative=False,
+                        is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
+        params = dict(servo_id=servo_id, angle=angle, speed=speed, mvacc=mvacc, relative=relative,
+                      is_radian=is_radian, radius=radius)
+        return self._move('set_servo_angle', 'servo_angle', params, wait)
+
+    def set_pause_time(self, sltime, wait=False):
+        start = max(self.clock.time(), self.motion_end)
+        self.motion_end = start + sltime
+        self._previous = None
+        self._record('set_pause_time', start, self.motion_end, {'sltime': sltime})
+        if wait:
+            self.clock.sleep_until(self.motion_end)
+        return 0
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+        return 0
+
+    def get_inverse_kinematics(self, pose, input_is_radian=None, return_is_radian=None):
+        return 0, [0.0] * 7
+
+    def is_joint_limit(self, joint, is_radian=None):
+        return 0, False
+
+    # ----------------------------- IO / 그리퍼 -----------------------------
+
+    def set_cgpio_analog(self, ionum, value):
+        return self._instant('set_cgpio_analog', ionum=ionum, value=value)
+
+    def set_cgpio_digital(self, ionum, value, delay_sec=None, sync=True):
+        return self._instant('set_cgpio_digital', ionum=ionum, value=value)
+
+    def open_lite6_gripper(self, sync=True):
+        return self._instant('open_lite6_gripper')
+
+    def close_lite6_gripper(self, sync=True):
+        return self._instant('close_lite6_gripper')
+
+    def stop_lite6_gripper(self, sync=True):
+        return self._instant('stop_lite6_gripper')
+
+    # ----------------------------- 상태 -----------------------------
+
+    def clean_warn(self):
+        return 0
+
+    def clean_error(self):
+        return 0
+
+    def motion_enable(self, enable=True, servo_id=None):
+        return 0
+
+    def set_mode(self, mode=0):
+        return 0
+
+    def set_state(self, state=0):
+        return 0
+
+    def connect_safety(self):
+        return 0
+
+    def safety_set_state(self, state):
+        return self.set_state(state)
+
+    def get_state(self):
+        return 0, self.state
+
+    def get_err_warn_code(self, show=False, lang='en'):
+        return 0, [self.error_code, self.warn_code]
+
+    def register_error_warn_changed_callback(self, callback=None):
+        return True
+
+    def release_error_warn_changed_callback(self, callback=None):
+        return True
+
+    def register_state_changed_callback(self, callback=None):
+        return True
+
+    def release_state_changed_callback(self, callback=None):
+        return True
+
+
+def load_robot_main(script_path=DEFAULT_SCRIPT_PATH):
+    """
+    ARIS 스크립트를 모듈로 불러와 RobotMain 클래스를 반환 (__main__ 블록은 실행되지 않음)
+    """
+    spec = importlib.util.spec_from_file_location('aris_script', script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.RobotMain
+
+
+class DryRun(object):
+    """
+    주문 목록을 가상 시간으로 실행하고 타임라인과 주문별 사이클 타임을 기록
+
+    :param capsule_delay: 캡슐 인식 대기 시작 후 캡슐이 인식되기까지의 시간 (s)
+    :param seal_delay: 씰 확인 시작 후 씰 제거가 인식되기까지의 시간 (s)
+    :param seal_fail: 씰 제거 인식에 실패할 횟수 (앞의 주문부터, 실패한 주문은 재투입됨)
+    :param cup_holder: Storagy 컵 홀더 좌표 (mm)
+    :param batch_size: RobotMain 의 최대 배치 크기
+    :param pipeline: RobotMain 의 파이프라인 실행 여부 (다음 주문의 캡슐 인식 대기를 겹침), None 이면 스크립트 설정
+    """
+    def __init__(self, robot_main_class=None, capsule_delay=2.0, seal_delay=0.5, seal_fail=0,
+                 cup_holder=(-150.0, -250.0), batch_size=1, pipeline=None):
+        self.clock = VirtualClock()
+        self.arm = FakeArm(self.clock)
+        robot_main_class = robot_main_class or load_robot_main()
+        options = {} if pipeline is None else {'pipeline': pipeline}
+        self.robot = robot_main_class(self.arm, clock=self.clock, waypoint_cache_path=None, trace_dir=None,
+                                      batch_size=batch_size, **options)
+        self.capsule_delay = capsule_delay
+        self.seal_delay = seal_delay
+        self.seal_fail = seal_fail
+        self.events = []    # (시각, 이벤트, 데이터)
+
+        self.robot.perception.publish(cup_holder_detected=True, cup_holder_x=cup_holder[0],
+                                      cup_holder_y=cup_holder[1])
+        # 실제 서버 대신 이벤트를 기록하고 비전 인식을 예약
+        self.robot.publish = self._publish
+        self.robot.scheduler.register_listener(self._order_changed)
+
+    def _publish(self, event, **data):
+        self.events.append((self.clock.time(), event, data))
+        perception = self.robot.perception
+        step = data.get('step', None)
+        if step == 'capsule_wait':
+            self.clock.call_later(self.capsule_delay, functools.partial(perception.publish, A_ZONE=True))
+        elif step == 'seal_check':
+            if self.seal_fail > 0:
+                self.seal_fail -= 1
+            else:
+                self.clock.call_later(self.seal_delay, functools.partial(perception.publish, NOT_SEAL=True))
+
+    def _order_changed(self, order):
+        scheduler = self.robot.scheduler
+        if order.state in (SERVED, FAILED) and scheduler.counts[QUEUED] == 0 and scheduler.counts[MAKING] == 0:
+            # 모든 주문이 끝나면 run_robot 종료
+            scheduler.close()
+
+    def run(self, orders):
+        """
+        :param orders: 주문 내용 목록, ex: [{'topping1': 1, 'topping2': 0, 'topping3': 0}]
+        :return: 완료/실패한 Order 목록
+        """
+        submitted = [self.robot.scheduler.submit(ICECREAM, dict(order)) for order in orders]
+        self.robot.run_robot()
+        return submitted
+
+    def close(self):
+        self.robot.safety.stop()
+
+    @property
+    def orders_per_hour(self):
+        served = self.robot.scheduler.counts[SERVED]
+        return served * 3600.0 / self.clock.time() if self.clock.time() > 0 else 0
+
+    def timeline_text(self):
+        lines = []
+        for start, end, name, args in self.arm.log:
+            lines.append('{:9.3f} ~ {:9.3f}  {}'.format(start, end, name))
+        for t, event, data in self.events:
+            lines.append('{:9.3f}              [{}] {}'.format(t, event, data))
+        return '\n'.join(sorted(lines, key=lambda line: float(line.split()[0])))
+
+
+def predict_throughput(robot_main_class, orders, batch_size, quiet=True, **kwargs):
+    """
+    같은 주문 목록을 한 건씩 / batch_size 배치로 dry-run 하여 예상 처리량 비교
+
+    :param robot_main_class: RobotMain 클래스 (load_robot_main)
+    :param quiet: True 이면 dry-run 중 RobotMain 의 출력을 숨김
+    :param kwargs: DryRun 의 capsule_delay, seal_delay, seal_fail, cup_holder
+    :return: {'single': 주문/시간, 'batched': 주문/시간, 'gain': batched / single}
+    """
+    result = {}
+    for label, size in (('single', 1), ('batched', batch_size)):
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            dry_run = DryRun(robot_main_class, batch_size=size, **kwargs)
+            dry_run.run(orders)
+            dry_run.close()
+        result[label] = dry_run.orders_per_hour
+    result['gain'] = result['batched'] / result['single'] if result['single'] > 0 else None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ARIS recipe dry run with a fake arm and a virtual clock')
+    parser.add_argument('--orders', type=int, default=1)
+    parser.add_argument('--topping', default='1,0,0',
+                        help='topping1,topping2,topping3 of the orders, several combinations separated by / are used in turn')
+    parser.add_argument('--capsule-delay', type=float, default=2.0)
+    parser.add_argument('--seal-delay', type=float, default=0.5)
+    parser.add_argument('--seal-fail', type=int, default=0, help='number of seal checks that fail')
+    parser.add_argument('--script', default=DEFAULT_SCRIPT_PATH)
+    parser.add_argument('--timeline', action='store_true', help='print every arm command and event')
+    parser.add_argument('--trace', default=None, help='save the spans as a chrome trace json file')
+    parser.add_argument('--batch', type=int, default=1, help='max number of orders made in one batch')
+    parser.add_argument('--compare', action='store_true', help='also run one order at a time and compare throughput')
+    args = parser.parse_args(argv)
+
+    combinations = []
+    for text in args.topping.split('/'):
+        toppings = [int(v) for v in text.split(',')]
+        combinations.append({'topping{}'.format(i + 1): toppings[i] if i < len(toppings) else 0 for i in range(3)})
+    orders = [combinations[i % len(combinations)] for i in range(args.orders)]
+
+    robot_main_class = load_robot_main(args.script)
+    dry_run = DryRun(robot_main_class, capsule_delay=args.capsule_delay, seal_delay=args.seal_delay,
+                     seal_fail=args.seal_fail, batch_size=args.batch)
+    start = time.perf_counter()
+    submitted = dry_run.run(orders)
+    elapsed = time.perf_counter() - start
+
+    if args.timeline:
+        print(dry_run.timeline_text())
+    for job in submitted:
+        cycle = job.finish_time - job.start_time if job.finish_time is not None else None
+        print('order {}: state={}, attempts={}, cycle={}'.format(
+            job.order_id, job.state, job.attempts, 'n/a' if cycle is None else '{:.2f}s'.format(cycle)))
+    print('{:>24} {:>6} {:>8} {:>8}'.format('span', 'count', 'p50', 'p95'))
+    for name, stat in sorted(dry_run.robot.profiler.stats().items(), key=lambda item: -item[1]['p50']):
+        print('{:>24} {:>6} {:>7.2f}s {:>7.2f}s'.format(name, stat['count'], stat['p50'], stat['p95']))
+    if args.trace:
+        dry_run.robot.profiler.save_chrome_trace(args.trace)
+    print('virtual time: {:.2f}s, motions: {}, wall time: {:.1f}ms'.format(
+        dry_run.clock.time(), len(dry_run.arm.log), elapsed * 1000))
+    if args.compare:
+        predicted = predict_throughput(robot_main_class, orders, args.batch, capsule_delay=args.capsule_delay,
+                                       seal_delay=args.seal_delay, seal_fail=args.seal_fail)
+        print('predicted throughput: one at a time {:.1f} orders/h, batch of {} {:.1f} orders/h, gain {:.1%}'.format(
+            predicted['single'], args.batch, predicted['batched'], (predicted['gain'] or 1) - 1))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
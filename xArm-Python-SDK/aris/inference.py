@@ -0,0 +1,342 @@
+"""
+YOLO 세그멘테이션 추론 백엔드 (CPU 키오스크용)
+
+학습된 best.pt (YOLO_code/Traning_YOLO.py) 를 ONNX / OpenVINO 로 내보내고, 실행 시 백엔드를 선택함
+모든 백엔드는 YOLOMain.predict_on_image 와 같은 (boxes, masks, cls, probs) 를 반환
+
+    백엔드          파일 (best.pt 와 같은 폴더)       런타임
+    'pt'            best.pt                          PyTorch eager
+    'onnx'          best.onnx                        ONNX Runtime
+    'onnx-int8'     best_int8.onnx                   ONNX Runtime, 캡처 프레임으로 정적 INT8 양자화
+    'openvino'      best_openvino_model/             OpenVINO
+    'openvino-int8' best_int8_openvino_model/        OpenVINO, 캡처 프레임으로 INT8 양자화 (NNCF)
+
+- 내보내기 입력 크기는 카메라 프레임과 같은 480 x 640 (패딩 없음), 마스크도 프레임 좌표로 나옴
+- 로드/전처리/후처리(NMS, 마스크 복원)는 모두 ultralytics 가 담당하므로 백엔드 간 차이는 모델 실행뿐
+
+내보내기:   python -m aris.inference export --weights best.pt --formats onnx openvino --int8 --calib Image4
+벤치마크:   python -m aris.inference bench --weights best.pt --frames Image4 --backends pt onnx openvino openvino-int8
+            'pt' 결과를 기준으로 FPS, 박스 recall/precision/IoU, 마스크 IoU 차이를 출력
+캘리브레이션/벤치마크 프레임은 YOLO_code/Image_capture.py 로 캡처한 640 x 480 이미지 폴더
+"""
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+
+BACKENDS = {
+    'pt': '{stem}.pt',
+    'onnx': '{stem}.onnx',
+    'onnx-int8': '{stem}_int8.onnx',
+    'openvino': '{stem}_openvino_model',
+    'openvino-int8': '{stem}_int8_openvino_model',
+}
+DEFAULT_IMGSZ = (480, 640)     # (높이, 너비), 카메라 프레임 크기
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+def backend_path(weights, backend):
+    """
+    :param weights: best.pt 경로
+    :return: 백엔드에 해당하는 내보낸 모델 경로
+    """
+    if backend not in BACKENDS:
+        raise ValueError('unknown inference backend: {}'.format(backend))
+    stem = os.path.splitext(weights)[0]
+    return BACKENDS[backend].format(stem=stem)
+
+
+def list_images(directory, limit=None):
+    paths = sorted(path for pattern in IMAGE_PATTERNS for path in glob.glob(os.path.join(directory, pattern)))
+    return paths[:limit] if limit else paths
+
+
+class YOLOBackend(object):
+    """
+    ultralytics YOLO 로 .pt / .onnx / OpenVINO 모델을 실행하는 백엔드
+
+    :param path: 모델 경로 (.pt, .onnx, *_openvino_model 폴더)
+    :param conf: 신뢰도 임계값
+    :param imgsz: 입력 크기 (높이, 너비), 내보낸 모델은 내보낼 때와 같아야 함
+    :ivar fixed_size: 내보낸 모델 (ONNX / OpenVINO) 이면 True, imgsz 외의 입력 크기로 실행할 수 없음
+    """
+    def __init__(self, path, conf=0.25, imgsz=DEFAULT_IMGSZ, name=None):
+        from ultralytics import YOLO
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.conf = conf
+        self.imgsz = list(imgsz)
+        self.fixed_size = not path.endswith('.pt')
+        self.model = YOLO(path, task='segment')
+        self.last_time = 0
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, img, imgsz=None):
+        """
+        :param imgsz: 이번 호출의 입력 크기 (높이, 너비), None 이면 self.imgsz (.pt 모델만 호출마다 바꿀 수 있음)
+        :return: (boxes N x 4 xyxy, masks N x H x W (프레임 좌표), cls N, probs N), 인식이 없으면 빈 리스트
+        """
+        start = time.perf_counter()
+        imgsz = self.imgsz if imgsz is None else list(imgsz)
+        result = self.model(img, conf=self.conf, imgsz=imgsz, verbose=False)[0]
+        cls = result.boxes.cls.cpu().numpy() if result.boxes else []
+        probs = result.boxes.conf.cpu().numpy() if result.boxes else []
+        boxes = result.boxes.xyxy.cpu().numpy() if result.boxes else []
+        masks = result.masks.data.cpu().numpy() if result.masks is not None else []
+        if len(masks) and masks.shape[1:] != img.shape[:2]:
+            # 입력 크기가 프레임과 다르면 (패딩 포함 640 x 640 등) 패딩을 제거하고 프레임 크기로 복원
+            from ultralytics.utils.ops import scale_image
+            masks = scale_image(masks.transpose(1, 2, 0), img.shape[:2]).transpose(2, 0, 1)
+        self.last_time = time.perf_counter() - start
+        return boxes, masks, cls, probs
+
+
+def select_backend(backend, weights, conf=0.25, imgsz=DEFAULT_IMGSZ, fallback=True):
+    """
+    :param backend: BACKENDS 의 이름, 또는 'auto' (openvino-int8 > openvino > onnx > pt 중 파일이 있는 첫 번째)
+    :param weights: best.pt 경로, 내보낸 모델은 같은 폴더에서 찾음
+    :param fallback: 내보낸 모델이 없으면 'pt' 사용, False 이면 FileNotFoundError
+    :return: YOLOBackend
+    """
+    if backend == 'auto':
+        candidates = ['openvino-int8', 'openvino', 'onnx', 'pt']
+        backend = next((name for name in candidates if os.path.exists(backend_path(weights, name))), 'pt')
+    path = backend_path(weights, backend)
+    if not os.path.exists(path):
+        if not fallback or backend == 'pt':
+            raise FileNotFoundError('inference model not found: {}'.format(path))
+        print('inference backend {} not found ({}), using pt'.format(backend, path))
+        backend, path = 'pt', weights
+    print('inference backend: {} ({})'.format(backend, path))
+    return YOLOBackend(path, conf=conf, imgsz=imgsz, name=backend)
+
+
+# ============================= 내보내기 =============================
+
+def _calibration_yaml(calib_dir, names, directory):
+    """
+    캡처 프레임 폴더를 ultralytics 데이터셋 yaml 로 감쌈 (INT8 캘리브레이션은 이미지만 사용)
+    """
+    path = os.path.join(directory, 'calibration.yaml')
+    with open(path, 'w') as f:
+        f.write('path: {}\ntrain: .\nval: .\nnames:\n'.format(os.path.abspath(calib_dir)))
+        for index in sorted(names):
+            f.write('  {}: {}\n'.format(index, names[index]))
+    return path
+
+
+def _letterbox(image, imgsz):
+    """
+    ultralytics 와 같은 방식 (비율 유지, 114 회색 패딩), -> 1 x 3 x H x W float32 RGB (0 ~ 1)
+    """
+    import cv2
+    height, width = imgsz
+    scale = min(height / image.shape[0], width / image.shape[1])
+    resized = cv2.resize(image, (int(round(image.shape[1] * scale)), int(round(image.shape[0] * scale))))
+    canvas = np.full((height, width, 3), 114, dtype=np.uint8)
+    top, left = (height - resized.shape[0]) // 2, (width - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return np.ascontiguousarray(canvas[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def quantize_onnx(onnx_path, output_path, calib_dir, imgsz=DEFAULT_IMGSZ, limit=300):
+    """
+    ONNX Runtime 정적 INT8 양자화 (QDQ, 가중치 채널별), 캡처 프레임으로 활성값 범위 캘리브레이션
+    ultralytics 메타데이터 (클래스 이름, 입력 크기, task) 는 원본 모델에서 복사
+    """
+    import cv2
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    paths = list_images(calib_dir, limit)
+    if not paths:
+        raise FileNotFoundError('no calibration images in {}'.format(calib_dir))
+    input_name = onnx.load(onnx_path, load_external_data=False).graph.input[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {input_name: _letterbox(image, imgsz)}
+            return None
+
+    quantize_static(onnx_path, output_path, FrameReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    source, quantized = onnx.load(onnx_path), onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, output_path)
+    print('quantized {} with {} frames -> {}'.format(onnx_path, len(paths), output_path))
+    return output_path
+
+
+def export(weights, formats=('onnx', 'openvino'), imgsz=DEFAULT_IMGSZ, int8=False, calib_dir=None, calib_limit=300):
+    """
+    best.pt 를 내보냄, 결과 경로는 backend_path() 규칙을 따름
+
+    :param formats: 'onnx', 'openvino'
+    :param int8: True 이면 각 형식의 INT8 모델도 생성 (calib_dir 필요)
+    :param calib_dir: 캘리브레이션용 캡처 프레임 폴더
+    :return: {백엔드 이름: 경로}
+    """
+    from ultralytics import YOLO
+    if int8 and not calib_dir:
+        raise ValueError('int8 export requires calibration frames (calib_dir)')
+    exported = {}
+    for fmt in formats:
+        if fmt not in ('onnx', 'openvino'):
+            raise ValueError('unknown export format: {}'.format(fmt))
+        path = YOLO(weights).export(format=fmt, imgsz=list(imgsz), dynamic=False, simplify=fmt == 'onnx')
+        exported[fmt] = str(path)
+        if not int8:
+            continue
+        if fmt == 'onnx':
+            exported['onnx-int8'] = quantize_onnx(str(path), backend_path(weights, 'onnx-int8'), calib_dir, imgsz, calib_limit)
+        else:
+            model = YOLO(weights)
+            directory = tempfile.mkdtemp(prefix='aris_calib_')
+            try:
+                data = _calibration_yaml(calib_dir, model.names, directory)
+                exported['openvino-int8'] = str(model.export(format='openvino', imgsz=list(imgsz), int8=True, data=data))
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+    for name, path in exported.items():
+        print('exported {}: {}'.format(name, path))
+    return exported
+
+
+# ============================= 벤치마크 =============================
+
+def _box_iou(a, b):
+    """
+    :return: len(a) x len(b) IoU
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def compare(reference, candidate, iou_threshold=0.5):
+    """
+    같은 프레임의 두 예측 결과를 클래스별 IoU 탐욕 매칭으로 비교
+
+    :return: {'matched', 'reference', 'candidate', 'box_iou': [...], 'mask_iou': [...]}
+    """
+    ref_boxes, ref_masks, ref_cls, _ = reference
+    boxes, masks, cls, _ = candidate
+    stat = {'matched': 0, 'reference': len(ref_boxes), 'candidate': len(boxes), 'box_iou': [], 'mask_iou': []}
+    if not len(ref_boxes) or not len(boxes):
+        return stat
+    iou = _box_iou(np.asarray(ref_boxes, dtype=np.float64), np.asarray(boxes, dtype=np.float64))
+    iou[np.asarray(ref_cls)[:, None] != np.asarray(cls)[None, :]] = 0
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        stat['matched'] += 1
+        stat['box_iou'].append(float(iou[i, j]))
+        if len(ref_masks) and len(masks):
+            a, b = ref_masks[i] > 0.5, masks[j] > 0.5
+            union = np.logical_or(a, b).sum()
+            stat['mask_iou'].append(float(np.logical_and(a, b).sum() / union) if union else 1.0)
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return stat
+
+
+def benchmark(weights, frames_dir, backends=('pt', 'onnx', 'openvino'), conf=0.25, imgsz=DEFAULT_IMGSZ,
+              limit=200, warmup=5):
+    """
+    :return: {백엔드: {'fps', 'avg_ms', 'p95_ms', 'recall', 'precision', 'box_iou', 'mask_iou'}}, 'pt' 결과 기준
+    """
+    import cv2
+    images = [image for image in (cv2.imread(path) for path in list_images(frames_dir, limit)) if image is not None]
+    if not images:
+        raise FileNotFoundError('no benchmark images in {}'.format(frames_dir))
+    backends = ['pt'] + [name for name in backends if name != 'pt']
+    reference = None
+    report = {}
+    for name in backends:
+        path = weights if name == 'pt' else backend_path(weights, name)
+        if not os.path.exists(path):
+            print('skip {}: {} not found'.format(name, path))
+            continue
+        backend = YOLOBackend(path, conf=conf, imgsz=imgsz, name=name)
+        for image in images[:warmup]:
+            backend.predict(image)
+        outputs, times = [], []
+        for image in images:
+            outputs.append(backend.predict(image))
+            times.append(backend.last_time)
+        if reference is None:
+            reference = outputs
+        stats = [compare(ref, out) for ref, out in zip(reference, outputs)]
+        matched = sum(stat['matched'] for stat in stats)
+        box_iou = [value for stat in stats for value in stat['box_iou']]
+        mask_iou = [value for stat in stats for value in stat['mask_iou']]
+        times = sorted(times)
+        report[name] = {
+            'fps': len(times) / sum(times),
+            'avg_ms': 1000 * sum(times) / len(times),
+            'p95_ms': 1000 * times[min(len(times) - 1, int(len(times) * 0.95))],
+            'recall': matched / max(1, sum(stat['reference'] for stat in stats)),
+            'precision': matched / max(1, sum(stat['candidate'] for stat in stats)),
+            'box_iou': float(np.mean(box_iou)) if box_iou else 0.0,
+            'mask_iou': float(np.mean(mask_iou)) if mask_iou else 0.0,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='YOLO inference backend export / benchmark')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    export_parser = commands.add_parser('export', help='best.pt -> ONNX / OpenVINO (+ INT8)')
+    export_parser.add_argument('--weights', required=True)
+    export_parser.add_argument('--formats', nargs='+', default=['onnx', 'openvino'], choices=['onnx', 'openvino'])
+    export_parser.add_argument('--imgsz', type=int, nargs=2, default=list(DEFAULT_IMGSZ), metavar=('H', 'W'))
+    export_parser.add_argument('--int8', action='store_true', help='캡처 프레임으로 INT8 양자화 모델도 생성')
+    export_parser.add_argument('--calib', default=None, help='캘리브레이션용 캡처 프레임 폴더')
+    export_parser.add_argument('--calib-limit', type=int, default=300)
+
+    bench_parser = commands.add_parser('bench', help='백엔드별 FPS 와 pt 대비 박스/마스크 정확도')
+    bench_parser.add_argument('--weights', required=True)
+    bench_parser.add_argument('--frames', required=True, help='640 x 480 캡처 프레임 폴더')
+    bench_parser.add_argument('--backends', nargs='+', default=['pt', 'onnx', 'openvino'], choices=sorted(BACKENDS))
+    bench_parser.add_argument('--imgsz', type=int, nargs=2, default=list(DEFAULT_IMGSZ), metavar=('H', 'W'))
+    bench_parser.add_argument('--conf', type=float, default=0.25)
+    bench_parser.add_argument('--limit', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        export(args.weights, args.formats, tuple(args.imgsz), args.int8, args.calib, args.calib_limit)
+        return
+    report = benchmark(args.weights, args.frames, args.backends, args.conf, tuple(args.imgsz), args.limit)
+    print('{:>14} {:>8} {:>9} {:>9} {:>8} {:>9} {:>8} {:>9}'.format(
+        'backend', 'fps', 'avg(ms)', 'p95(ms)', 'recall', 'precision', 'box_iou', 'mask_iou'))
+    for name, stat in report.items():
+        print('{:>14} {:>8.1f} {:>9.1f} {:>9.1f} {:>8.3f} {:>9.3f} {:>8.3f} {:>9.3f}'.format(
+            name, stat['fps'], stat['avg_ms'], stat['p95_ms'], stat['recall'], stat['precision'],
+            stat['box_iou'], stat['mask_iou']))
+
+
+if __name__ == '__main__':
+    main()
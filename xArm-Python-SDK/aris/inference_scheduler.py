@@ -0,0 +1,262 @@
+"""
+ROI 크롭 / 다중 주기 추론 스케줄러
+
+매 프레임 640 x 480 전체를 세그멘테이션하는 대신, 작업(InferenceTask)별로 영역, 입력 크기, 주기를 따로 둠
+- 안전 작업: 전체 프레임을 낮은 해상도로 자체 주기(rate)에 실행 (사람 / 로봇)
+- 구역 작업: 캡슐 / 씰 / 컵 ROI 크롭만 원래 배율로 실행, 레시피가 그 구역을 기다리는 동안 (demand) 매 프레임,
+  기다리지 않을 때는 idle 주기 (0 이면 실행 안 함)
+한 프레임의 결과는 각 작업의 최신 결과를 프레임 좌표로 합친 Detections, 작업이 이번 프레임에 실행되지 않았으면
+이전 실행 결과를 그대로 쓰고 (작업이 계속 스케줄된 동안만) 작업별 촬영 시각과 fresh 여부를 함께 전달
+
+    with scheduler.demand('capsule'):       # 로봇 스레드, 캡슐 인식 대기 동안 캡슐 크롭을 매 프레임 실행
+        perception.wait_for(...)
+
+내보낸 ONNX / OpenVINO 모델은 입력 크기가 고정이므로, 작업별 imgsz 로 각각 내보내 backend 를 지정해야 함
+(.pt 모델은 하나로 모든 작업 실행 가능), 입력 크기가 맞지 않는 작업이 있으면 생성할 때 ValueError
+
+gate (aris.motion_gate.MotionGate) 를 지정하면, 실행할 차례인 작업의 영역이 마지막 추론 이후 바뀌지 않았을 때
+추론 대신 이전 결과를 이번 프레임의 결과로 다시 씀 (fresh, 촬영 시각은 이번 프레임)
+변화가 없어도 작업의 refresh 초가 지나면 추론, refresh 가 None 인 작업은 항상 추론
+"""
+import time
+import threading
+import contextlib
+
+import numpy as np
+
+
+STRIDE = 32
+
+
+def _round_up(value, base=STRIDE):
+    return int(-(-value // base) * base)
+
+
+class InferenceTask(object):
+    """
+    :param name: 작업 이름, ex: 'safety', 'capsule'
+    :param roi: (x, y, w, h) 크롭 영역, None 이면 전체 프레임
+    :param labels: 결과에 남길 라벨, None 이면 전체
+    :param rate: demand 가 없을 때의 실행 주기 (회/s), None 이면 매 프레임, 0 이면 실행 안 함
+    :param demand_rate: demand 중의 실행 주기 (회/s), None 이면 매 프레임
+    :param imgsz: 입력 크기 (높이, 너비), None 이면 크롭 크기를 32 배수로 올림 (원래 배율)
+    :param margin: ROI 바깥으로 더 잘라내는 픽셀 (경계에 걸친 객체 인식용)
+    :param backend: 이 작업 전용 백엔드, None 이면 스케줄러 기본 백엔드
+    :param refresh: 장면 변화가 없을 때 추론을 건너뛸 수 있는 최대 시간 (s), None 이면 건너뛰지 않음
+    """
+    def __init__(self, name, roi=None, labels=None, rate=None, demand_rate=None, imgsz=None, margin=16, backend=None,
+                 refresh=None):
+        self.name = name
+        self.roi = None if roi is None else tuple(int(v) for v in roi)
+        self.labels = None if labels is None else set(labels)
+        self.rate = rate
+        self.demand_rate = demand_rate
+        self.imgsz = imgsz
+        self.margin = margin
+        self.backend = backend
+        self.refresh = refresh
+
+    def crop(self, shape):
+        """
+        :return: 프레임 shape 에서의 크롭 범위 (x1, y1, x2, y2)
+        """
+        height, width = shape[:2]
+        if self.roi is None:
+            return 0, 0, width, height
+        x, y, w, h = self.roi
+        return (max(0, x - self.margin), max(0, y - self.margin),
+                min(width, x + w + self.margin), min(height, y + h + self.margin))
+
+    def input_size(self, shape):
+        if self.imgsz is not None:
+            return tuple(self.imgsz)
+        x1, y1, x2, y2 = self.crop(shape)
+        return _round_up(y2 - y1), _round_up(x2 - x1)
+
+
+class Detections(tuple):
+    """
+    (boxes, masks, cls, probs) 튜플 (predict_on_image 와 같은 형태) + 작업 정보
+    """
+    def __new__(cls, boxes, masks, classes, probs, sources, timestamps, fresh):
+        self = super(Detections, cls).__new__(cls, (boxes, masks, classes, probs))
+        self.sources = sources          # 객체별 작업 이름
+        self.timestamps = timestamps    # {작업 이름: 결과를 만든 프레임의 촬영 시각}
+        self.fresh = fresh              # 이번 프레임의 결과인 작업 이름 set (추론, 또는 변화가 없어 이전 결과 재사용)
+        return self
+
+
+class InferenceScheduler(object):
+    """
+    :param backend: 기본 추론 백엔드 (aris.inference.YOLOBackend), predict(img, imgsz) 지원
+    :param tasks: InferenceTask 목록
+    :param clock: 현재 시각 함수 (s), 촬영 시각과 같은 기준
+    :param gate: aris.motion_gate.MotionGate, None 이면 장면 변화와 관계없이 추론
+    """
+    def __init__(self, backend, tasks, clock=None, window=200, gate=None):
+        self.backend = backend
+        self.tasks = list(tasks)
+        self.clock = clock or time.monotonic
+        self.gate = gate
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._demand = {}
+        self._last_run = {}         # 작업 이름: 마지막 실행 시각 (추론 또는 재사용)
+        self._last_infer = {}       # 작업 이름: 마지막 실제 추론 시각
+        self._results = {}          # 작업 이름: (boxes, masks, cls, probs, 촬영 시각)
+        self._times = {task.name: [] for task in self.tasks}
+        self._runs = {task.name: 0 for task in self.tasks}
+        self._reused = {task.name: 0 for task in self.tasks}
+        self._frames = 0
+        self._infer_total = 0.0
+
+        for task in self.tasks:
+            backend = task.backend or self.backend
+            if getattr(backend, 'fixed_size', False) and \
+                    (task.imgsz is None or list(task.imgsz) != list(backend.imgsz)):
+                raise ValueError('task {} needs input size {}, but backend {} is fixed at {} '
+                                 '(export a model for this size and set task.backend)'.format(
+                                     task.name, task.imgsz or 'of its crop', backend.name, tuple(backend.imgsz)))
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    # ----------------------------- demand -----------------------------
+
+    def set_demand(self, name, on):
+        with self._lock:
+            count = self._demand.get(name, 0) + (1 if on else -1)
+            self._demand[name] = max(0, count)
+
+    @contextlib.contextmanager
+    def demand(self, *names):
+        """
+        with 블록 동안 해당 작업을 demand_rate 로 실행 (다른 스레드에서 호출 가능, 중첩 가능)
+        """
+        for name in names:
+            self.set_demand(name, True)
+        try:
+            yield
+        finally:
+            for name in names:
+                self.set_demand(name, False)
+
+    def demanded(self, name):
+        return self._demand.get(name, 0) > 0
+
+    # ----------------------------- 실행 -----------------------------
+
+    def _due(self, task, now):
+        """
+        :return: (이번 프레임에 실행할지, 작업이 스케줄된 상태인지)
+        """
+        rate = task.demand_rate if self.demanded(task.name) else task.rate
+        if rate == 0:
+            return False, False
+        last = self._last_run.get(task.name, None)
+        return rate is None or last is None or now - last >= 1.0 / rate, True
+
+    def _run(self, task, image):
+        x1, y1, x2, y2 = task.crop(image.shape)
+        backend = task.backend or self.backend
+        crop = image if (x1, y1, x2, y2) == (0, 0, image.shape[1], image.shape[0]) else image[y1:y2, x1:x2]
+        boxes, masks, cls, probs = backend.predict(crop, imgsz=task.input_size(image.shape))
+        if not len(boxes):
+            return np.empty((0, 4), dtype=np.float32), [], np.empty(0), np.empty(0)
+        boxes, cls, probs = np.asarray(boxes, dtype=np.float32), np.asarray(cls), np.asarray(probs)
+        keep = np.ones(len(boxes), dtype=bool)
+        if task.labels is not None:
+            keep = np.array([backend.names[int(c)] in task.labels for c in cls], dtype=bool)
+        boxes, cls, probs = boxes[keep], cls[keep], probs[keep]
+        masks = [mask for mask, k in zip(masks, keep) if k] if len(masks) else []
+        if crop is not image:
+            # 크롭 좌표 -> 프레임 좌표
+            boxes = boxes + np.array([x1, y1, x1, y1], dtype=np.float32)
+            placed = []
+            for mask in masks:
+                canvas = np.zeros(image.shape[:2], dtype=np.float32)
+                canvas[y1:y2, x1:x2] = mask
+                placed.append(canvas)
+            masks = placed
+        return boxes, masks, cls, probs
+
+    def infer(self, image, capture_time=None):
+        """
+        VisionPipeline 의 infer (infer_time=True), 이번 프레임에 실행할 작업만 실행하고 결과를 합침
+
+        :return: Detections
+        """
+        now = self.clock() if capture_time is None else capture_time
+        start = time.perf_counter()
+        fresh = set()
+        for task in self.tasks:
+            due, scheduled = self._due(task, now)
+            if not scheduled:
+                self._results.pop(task.name, None)
+                self._last_infer.pop(task.name, None)
+                if self.gate is not None:
+                    self.gate.forget(task.name)
+                continue
+            if not due:
+                continue
+            self._last_run[task.name] = now
+            fresh.add(task.name)
+            signature = None
+            if self.gate is not None and task.refresh is not None:
+                changed, signature = self.gate.check(task.name, image, task.crop(image.shape))
+                previous = self._results.get(task.name, None)
+                if not changed and previous is not None and now - self._last_infer[task.name] < task.refresh:
+                    # 영역에 변화 없음, 이전 추론 결과를 이번 프레임의 결과로 사용
+                    self._results[task.name] = previous[:4] + (now,)
+                    self._reused[task.name] += 1
+                    continue
+            task_start = time.perf_counter()
+            self._results[task.name] = self._run(task, image) + (now,)
+            elapsed = time.perf_counter() - task_start
+            if signature is not None:
+                self.gate.set_reference(task.name, signature)
+            self._last_infer[task.name] = now
+            self._runs[task.name] += 1
+            self._times[task.name] = (self._times[task.name] + [elapsed])[-self.window:]
+        self._frames += 1
+        self._infer_total += time.perf_counter() - start
+
+        boxes, masks, cls, probs, sources, timestamps = [], [], [], [], [], {}
+        for task in self.tasks:
+            result = self._results.get(task.name, None)
+            if result is None:
+                continue
+            task_boxes, task_masks, task_cls, task_probs, timestamp = result
+            timestamps[task.name] = timestamp
+            boxes.append(task_boxes)
+            cls.append(task_cls)
+            probs.append(task_probs)
+            masks.extend(task_masks)
+            sources.extend([task.name] * len(task_boxes))
+        if boxes:
+            boxes, cls, probs = np.concatenate(boxes), np.concatenate(cls), np.concatenate(probs)
+        else:
+            boxes, cls, probs = np.empty((0, 4), dtype=np.float32), np.empty(0), np.empty(0)
+        masks = np.stack(masks) if masks else []
+        return Detections(boxes, masks, cls, probs, sources, timestamps, fresh)
+
+    def stats(self):
+        """
+        :return: {'frames', 'avg_ms': 프레임당 평균 추론 시간 (변화 감지 포함), 'gate_ms': 변화 감지 한 번의 시간,
+                  'saved_ms': 결과 재사용으로 아낀 추론 시간 합계 (작업별 평균 추론 시간 x 재사용 횟수),
+                  'tasks': {이름: {'runs', 'reused', 'hit_rate', 'avg_ms', 'saved_ms', 'demanded'}}}
+                  hit_rate 는 실행할 차례에 추론 대신 재사용한 비율
+        """
+        tasks = {}
+        for task in self.tasks:
+            times = list(self._times[task.name])
+            avg = sum(times) / len(times) if times else 0.0
+            runs, reused = self._runs[task.name], self._reused[task.name]
+            tasks[task.name] = {'runs': runs, 'reused': reused, 'hit_rate': reused / max(1, runs + reused),
+                                'avg_ms': 1000 * avg, 'saved_ms': 1000 * avg * reused,
+                                'demanded': self.demanded(task.name)}
+        return {'frames': self._frames, 'avg_ms': 1000 * self._infer_total / max(1, self._frames),
+                'gate_ms': 1000 * self.gate.cost() if self.gate is not None else 0.0,
+                'saved_ms': sum(task['saved_ms'] for task in tasks.values()), 'tasks': tasks}
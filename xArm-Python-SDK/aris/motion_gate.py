@@ -0,0 +1,114 @@
+"""
+장면 변화 감지 (추론 건너뛰기용)
+
+작업 영역이 마지막으로 추론한 프레임과 비교해 바뀌지 않았으면 이전 추론 결과를 다시 씀
+비교는 영역을 step 간격으로 줄인 밝기 영상의 block x block 블록 평균 차이 (카메라 노이즈는 블록 평균으로 상쇄)
+가장 많이 바뀐 블록의 차이가 threshold (0 ~ 255) 를 넘으면 변화 있음, 작은 물체(손 등)가 들어와도 감지됨
+
+기준 영상은 매 프레임이 아니라 마지막으로 실제 추론한 프레임이므로, 천천히 바뀌는 변화도 누적되어 감지됨
+변화가 없어도 InferenceTask.refresh 초마다 한 번은 추론 (조명 변화가 작은 경우 등 대비)
+
+임계값 조정: python -m aris.motion_gate --frames 캡처 폴더 [--thresholds 4 8 12 16]
+"""
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+
+
+class MotionGate(object):
+    """
+    :param threshold: 변화로 판단하는 블록 평균 밝기 차이 (0 ~ 255)
+    :param step: 영역을 줄이는 간격 (px)
+    :param block: 줄인 영상의 블록 크기 (px)
+    """
+    def __init__(self, threshold=10.0, step=4, block=8):
+        self.threshold = threshold
+        self.step = step
+        self.block = block
+        self._references = {}
+        self._times = []
+
+    def signature(self, image, crop=None):
+        """
+        :param crop: (x1, y1, x2, y2), None 이면 전체 프레임
+        :return: 블록 평균 밝기 배열
+        """
+        if crop is not None:
+            x1, y1, x2, y2 = crop
+            image = image[y1:y2, x1:x2]
+        small = np.ascontiguousarray(image[::self.step, ::self.step])
+        channels = small.shape[2] if small.ndim == 3 else 1
+        block_h, block_w = min(self.block, small.shape[0]), min(self.block, small.shape[1])
+        height, width = small.shape[0] // block_h * block_h, small.shape[1] // block_w * block_w
+        # 채널은 블록의 열 방향에 합쳐서 한 번에 더함 (밝기 = 채널 평균)
+        blocks = small[:height, :width].reshape(height // block_h, block_h, width // block_w, block_w * channels)
+        return blocks.sum(axis=(1, 3), dtype=np.uint32).astype(np.float32) / (block_h * block_w * channels)
+
+    def check(self, key, image, crop=None):
+        """
+        :return: (변화 있음, signature), 기준 영상이 없으면 변화 있음
+        """
+        start = time.perf_counter()
+        signature = self.signature(image, crop)
+        reference = self._references.get(key, None)
+        changed = reference is None or reference.shape != signature.shape or \
+            float(np.abs(signature - reference).max()) > self.threshold
+        self._times = (self._times + [time.perf_counter() - start])[-200:]
+        return changed, signature
+
+    def set_reference(self, key, signature):
+        self._references[key] = signature
+
+    def forget(self, key):
+        self._references.pop(key, None)
+
+    def cost(self):
+        """
+        :return: check 한 번의 평균 시간 (s)
+        """
+        times = list(self._times)
+        return sum(times) / len(times) if times else 0.0
+
+
+def replay(paths, thresholds, step=4, block=8):
+    """
+    캡처 프레임을 순서대로 보고 임계값별로 추론이 필요한 프레임 비율을 계산
+
+    :return: [(임계값, 추론 비율)]
+    """
+    import cv2
+    results = []
+    for threshold in thresholds:
+        gate = MotionGate(threshold, step, block)
+        runs = total = 0
+        for path in paths:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            changed, signature = gate.check('frame', image)
+            if changed:
+                gate.set_reference('frame', signature)
+                runs += 1
+            total += 1
+        results.append((threshold, runs / max(1, total)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='motion gate threshold replay')
+    parser.add_argument('--frames', required=True, help='시간 순서대로 캡처한 프레임 폴더')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[4, 8, 12, 16])
+    parser.add_argument('--step', type=int, default=4)
+    parser.add_argument('--block', type=int, default=8)
+    args = parser.parse_args(argv)
+    paths = sorted(glob.glob(os.path.join(args.frames, '*.jpg')) + glob.glob(os.path.join(args.frames, '*.png')))
+    print('{:>10} {:>10}'.format('threshold', 'infer(%)'))
+    for threshold, ratio in replay(paths, args.thresholds, args.step, args.block):
+        print('{:>10.1f} {:>10.1f}'.format(threshold, ratio * 100))
+
+
+if __name__ == '__main__':
+    main()
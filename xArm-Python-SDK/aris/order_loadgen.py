@@ -0,0 +1,111 @@
+"""
+주문 서버 부하 테스트 (초당 주문 수, ACK 지연 시간 측정)
+
+사용법:
+    # 로봇 없이 서버를 함께 띄워서 테스트
+    python -m aris.order_loadgen --local --clients 4 --orders 500
+    # 실행 중인 로봇 서버에 테스트 (주문이 실제로 들어가므로 주의)
+    python -m aris.order_loadgen --host 127.0.0.1 --port 20002 --clients 1 --orders 10
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+
+def _percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def _run_client(host, port, orders, window, latencies, legacy):
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}
+    acked = 0
+
+    async def recv():
+        nonlocal acked
+        while acked < orders:
+            line = await reader.readline()
+            if not line:
+                break
+            msg = json.loads(line.decode('utf-8'))
+            if msg.get('type') != 'ack':
+                continue
+            start = sent.pop(msg.get('seq'), None)
+            if start is not None:
+                latencies.append(time.perf_counter() - start)
+                acked += 1
+                inflight.release()
+
+    inflight = asyncio.Semaphore(window)
+    recv_task = asyncio.ensure_future(recv())
+    for seq in range(orders):
+        await inflight.acquire()
+        msg = {'seq': seq, 'topping1': 1, 'topping2': 0, 'topping3': 0, 'gender': '', 'age': 0}
+        data = json.dumps(msg)
+        sent[seq] = time.perf_counter()
+        # legacy: 기존 키오스크처럼 줄바꿈 없이 전송
+        writer.write(data.encode('utf-8') if legacy else (data + '\n').encode('utf-8'))
+        await writer.drain()
+    await recv_task
+    writer.close()
+    return acked
+
+
+async def run_loadgen(host, port, clients, orders, window, legacy=False):
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*[_run_client(host, port, orders, window, latencies, legacy)
+                                     for _ in range(clients)])
+    elapsed = time.perf_counter() - start
+    total = sum(results)
+    return {
+        'orders': total,
+        'elapsed': elapsed,
+        'orders_per_sec': total / elapsed if elapsed > 0 else 0,
+        'ack_p50_ms': _percentile(latencies, 0.5) * 1000,
+        'ack_p95_ms': _percentile(latencies, 0.95) * 1000,
+        'ack_p99_ms': _percentile(latencies, 0.99) * 1000,
+        'ack_max_ms': max(latencies) * 1000 if latencies else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ARIS order server load generator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=20002)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=500, help='orders per client')
+    parser.add_argument('--window', type=int, default=8, help='max unacked orders per client')
+    parser.add_argument('--legacy', action='store_true', help='send without newline like the old kiosk')
+    parser.add_argument('--local', action='store_true', help='start a local server with a dummy scheduler')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.local:
+        from .order_server import OrderServer
+        from .scheduler import OrderScheduler, ICECREAM
+
+        scheduler = OrderScheduler()
+
+        def handler(msg, client_id):
+            order = scheduler.submit(ICECREAM, msg)
+            return {'type': 'ack', 'seq': msg.get('seq'), 'order_id': order.order_id}
+
+        server = OrderServer(handler, host=args.host, port=args.port)
+        server.start()
+
+    result = asyncio.run(run_loadgen(args.host, args.port, args.clients, args.orders, args.window, args.legacy))
+    for key, value in result.items():
+        print('{:>16}: {:.3f}'.format(key, value) if isinstance(value, float) else '{:>16}: {}'.format(key, value))
+    if server is not None:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import json
+import time
+import codecs
+import asyncio
+import itertools
+import threading
+
+
+# 송신 큐에 들어가는 상태 스냅샷 자리표시, 실제 전송 시 클라이언트의 최신 상태로 바뀜
+_STATUS = object()
+_MISSING = object()
+
+
+class _Client(object):
+    """
+    접속한 클라이언트 한 개의 상태 (송신 큐, 통계)
+    """
+    def __init__(self, client_id, addr, writer, max_pending):
+        self.client_id = client_id
+        self.addr = addr
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.status = None          # 아직 보내지 않은 최신 상태 스냅샷
+        self.connected_time = time.time()
+        self.recv_count = 0
+        self.send_count = 0
+        self.drop_count = 0
+
+
+class OrderServer(object):
+    """
+    키오스크/스태프 태블릿/모니터링용 asyncio 주문 서버
+
+    - 프레이밍: 줄바꿈으로 구분된 JSON (NDJSON), 기존 키오스크처럼 줄바꿈 없이 이어 보내거나
+      TCP 세그먼트가 나뉘어 들어와도 JSON 단위로 잘라서 처리
+    - 여러 클라이언트 동시 접속, 메시지마다 handler(msg, client_id)의 결과를 응답 (주문 ID ACK 등)
+    - 상태 이벤트(publish)는 모든 클라이언트에 푸시, 클라이언트별 송신 큐가 가득 차면 가장 오래된 이벤트를 버림
+    - 로봇 상태(publish_status)는 변경을 합쳐서 최대 status_rate 회/s 로 전체 스냅샷을 푸시,
+      느린 클라이언트의 송신 큐에는 보내지 않은 스냅샷이 하나만 남고 전송 시점의 최신 값으로 보냄
+    - 응답은 송신 큐에 자리가 날 때까지 해당 클라이언트의 수신을 멈춤 (TCP 백프레셔)
+    - idle_timeout 동안 수신이 없거나 송신이 write_timeout 이상 막히면 연결 종료
+    """
+    def __init__(self, handler, host='127.0.0.1', port=20002, idle_timeout=600, write_timeout=5,
+                 max_pending=64, max_message_size=65536, status_rate=5.0):
+        """
+        :param handler: handler(msg, client_id) -> 응답 dict 또는 None, 이벤트 루프 스레드에서 호출되므로 빨리 반환해야 함
+        :param idle_timeout: 수신이 없을 때 연결을 끊는 시간 (s), None이면 끊지 않음
+        :param write_timeout: 송신(drain)이 막혔을 때 연결을 끊는 시간 (s)
+        :param max_pending: 클라이언트별 송신 큐 크기
+        :param max_message_size: 메시지 하나의 최대 크기 (byte)
+        :param status_rate: 상태 스냅샷의 최대 전송 횟수 (회/s)
+        """
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.write_timeout = write_timeout
+        self.max_pending = max_pending
+        self.max_message_size = max_message_size
+        self.status_rate = status_rate
+
+        self._status = {}
+        self._status_lock = threading.Lock()
+        self._status_scheduled = False
+        self._status_msg = None
+        self._status_revision = 0
+        self._status_last = None
+        self._ids = itertools.count(1)
+        self._clients = {}
+        self._tasks = set()         # 클라이언트별 수신/송신 태스크 (종료 시 취소)
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def clients(self):
+        return [{'client_id': c.client_id, 'addr': c.addr, 'recv': c.recv_count, 'send': c.send_count,
+                 'drop': c.drop_count} for c in list(self._clients.values())]
+
+    # ----------------------------- 실행/종료 -----------------------------
+
+    def serve_forever(self):
+        """
+        현재 스레드에서 서버 실행 (stop() 호출 시 반환)
+        """
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port, reuse_address=True))
+            print('[LISTENING] order server on {}:{}'.format(self.host, self.port))
+            self._ready.set()
+            self._loop.run_forever()
+        finally:
+            self._ready.set()
+            self._loop.run_until_complete(self._shutdown())
+            self._loop.close()
+
+    def start(self, timeout=5):
+        """
+        백그라운드 스레드에서 서버 실행
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    async def _shutdown(self):
+        """
+        접속을 먼저 닫고 클라이언트 태스크를 모두 취소/대기한 뒤 서버 종료를 기다림
+        (Python 3.12 부터 wait_closed 는 열린 접속이 있으면 반환되지 않음)
+        """
+        if self._server is not None:
+            self._server.close()
+        for client in list(self._clients.values()):
+            client.writer.close()
+        tasks = [task for task in self._tasks if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def _track(self, task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # ----------------------------- 송신 -----------------------------
+
+    def publish(self, event, **data):
+        """
+        모든 클라이언트에 상태 이벤트 푸시, 어느 스레드에서나 호출 가능
+
+        :param event: 이벤트 이름 (greet_start, motion_greet_finish, order 등)
+        """
+        msg = dict(data, type='event', event=event, time=time.time())
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._broadcast, msg)
+
+    def publish_status(self, **fields):
+        """
+        로봇 상태 필드 갱신, 어느 스레드에서나 호출 가능하며 블로킹 없음 (로봇/SDK 콜백 스레드용)
+        바뀐 필드는 기존 상태에 합쳐지고, 합쳐진 전체 상태가 'status' 이벤트로 전송됨
+
+        ex: publish_status(stage='making', order_id=3, queue=2)
+        """
+        with self._status_lock:
+            if all(self._status.get(key, _MISSING) == value for key, value in fields.items()):
+                # 바뀐 값이 없으면 전송하지 않음
+                return
+            self._status.update(fields)
+            if self._status_scheduled:
+                # 이미 예약된 전송에 합쳐짐
+                return
+            self._status_scheduled = True
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._schedule_status)
+        else:
+            with self._status_lock:
+                self._status_scheduled = False
+
+    def status(self):
+        with self._status_lock:
+            return dict(self._status)
+
+    def _schedule_status(self):
+        now = self._loop.time()
+        delay = 0 if self._status_last is None else self._status_last + 1.0 / self.status_rate - now
+        if delay > 0:
+            self._loop.call_later(delay, self._flush_status)
+        else:
+            self._flush_status()
+
+    def _flush_status(self):
+        with self._status_lock:
+            self._status_scheduled = False
+            self._status_revision += 1
+            self._status_msg = dict(self._status, type='event', event='status', revision=self._status_revision,
+                                    time=time.time())
+        self._status_last = self._loop.time()
+        for client in list(self._clients.values()):
+            self._push_status(client)
+
+    def _push_status(self, client):
+        pending = client.status is not None
+        client.status = self._status_msg
+        if not pending:
+            self._push(client.client_id, _STATUS)
+
+    def send_to(self, client_id, msg):
+        """
+        특정 클라이언트에 메시지 전송, 어느 스레드에서나 호출 가능
+        """
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._push, client_id, msg)
+
+    def _push(self, client_id, msg):
+        client = self._clients.get(client_id, None)
+        if client is None:
+            return
+        if client.queue.full():
+            # 느린 클라이언트: 오래된 이벤트부터 버림
+            if client.queue.get_nowait() is _STATUS:
+                client.status = None
+            client.drop_count += 1
+        client.queue.put_nowait(msg)
+
+    def _broadcast(self, msg):
+        for client_id in list(self._clients.keys()):
+            self._push(client_id, msg)
+
+    async def _writer_task(self, client):
+        writer = client.writer
+        try:
+            while True:
+                msg = await client.queue.get()
+                if msg is None:
+                    break
+                if msg is _STATUS:
+                    msg, client.status = client.status, None
+                    if msg is None:
+                        continue
+                writer.write((json.dumps(msg, ensure_ascii=False) + '\n').encode('utf-8'))
+                await asyncio.wait_for(writer.drain(), self.write_timeout)
+                client.send_count += 1
+        except asyncio.TimeoutError:
+            print('client {} write timeout, close'.format(client.addr))
+            writer.close()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    # ----------------------------- 수신 -----------------------------
+
+    def _dispatch(self, client, msg):
+        client.recv_count += 1
+        if not isinstance(msg, dict):
+            return {'type': 'error', 'reason': 'message must be a json object'}
+        try:
+            return self.handler(msg, client.client_id)
+        except Exception as e:
+            print('order handler error: {}'.format(e))
+            return {'type': 'error', 'reason': str(e), 'seq': msg.get('seq', None)}
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(next(self._ids), writer.get_extra_info('peername'), writer, self.max_pending)
+        self._clients[client.client_id] = client
+        self._track(asyncio.current_task())
+        writer_task = self._track(asyncio.ensure_future(self._writer_task(client)))
+        if self._status_msg is not None:
+            # 새 클라이언트는 접속하자마자 현재 상태를 받음
+            self._push_status(client)
+        print('client connected: {} (id={})'.format(client.addr, client.client_id))
+
+        text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        json_decoder = json.JSONDecoder()
+        buf = ''
+        try:
+            while not writer_task.done():
+                try:
+                    data = await asyncio.wait_for(reader.read(4096), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    print('client {} idle timeout, close'.format(client.addr))
+                    break
+                if not data:
+                    break
+                buf += text_decoder.decode(data)
+                while True:
+                    buf = buf.lstrip()
+                    if not buf:
+                        break
+                    try:
+                        msg, end = json_decoder.raw_decode(buf)
+                    except ValueError:
+                        newline = buf.find('\n')
+                        if newline >= 0:
+                            # 깨진 메시지는 줄 단위로 버림
+                            buf = buf[newline + 1:]
+                            await client.queue.put({'type': 'error', 'reason': 'invalid json'})
+                            continue
+                        if len(buf) > self.max_message_size:
+                            await client.queue.put({'type': 'error', 'reason': 'message too large'})
+                            buf = ''
+                        # 아직 다 받지 못한 메시지
+                        break
+                    buf = buf[end:]
+                    reply = self._dispatch(client, msg)
+                    if reply is not None:
+                        # 송신 큐가 비워질 때까지 수신을 멈춤
+                        await client.queue.put(reply)
+        except (ConnectionError, asyncio.CancelledError):
+            # 서버 종료 시 취소됨, 태스크는 정상 종료로 끝냄 (start_server 콜백이 예외를 로그로 남기지 않도록)
+            pass
+        finally:
+            self._clients.pop(client.client_id, None)
+            # 남은 응답을 보낸 뒤 종료
+            try:
+                await asyncio.wait_for(client.queue.put(None), self.write_timeout)
+                await asyncio.wait_for(writer_task, self.write_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                writer_task.cancel()
+            writer.close()
+            print('client disconnected: {} (id={})'.format(client.addr, client.client_id))
@@ -0,0 +1,395 @@
+"""
+자원 기반 레시피 파이프라인 (스테이지별 자원 모델, 실행기, 타임라인 시뮬레이션)
+
+각 스테이지는 실행 중에만 쓰는 자원(uses)과 여러 스테이지에 걸쳐 점유하는 자원(acquire ~ release)을 가짐
+서로 자원이 겹치지 않는 스테이지는 다른 주문의 스테이지와 동시에 실행할 수 있음
+(예: 이전 주문의 제조/서빙/캡슐 폐기 중에 다음 주문의 캡슐 인식 대기, Storagy 배달 중에 다음 주문 제조)
+
+주의: 프레스 동작 중에는 로봇팔이 컵을 들고 있으므로 (motion_make_icecream) 프레스 시간에 팔을 쓰는 작업은
+겹칠 수 없음, 겹칠 수 있는 것은 비전/고객 대기와 Storagy 이동 같은 팔 이외의 자원을 쓰는 스테이지
+
+- PipelineExecutor: run_robot 이 사용하는 실행기, 다음 주문의 캡슐 인식 대기를 지그가 비는 즉시 시작
+- simulate(): 스테이지 시간으로 직렬/파이프라인 타임라인 비교 (시간은 dry-run 으로 측정, measure_stages)
+
+사용법:
+    python -m aris.pipeline --orders 6 --batch 3
+"""
+import io
+import sys
+import argparse
+import contextlib
+
+
+# 자원 이름
+ARM = 'arm'             # 로봇팔
+PRESS = 'press'         # 아이스크림 프레스 (캡슐 장착 ~ 캡슐 폐기)
+JIG = 'jig'             # 캡슐 지그 (A/B/C 존)
+TRAY = 'tray'           # Storagy 컵 홀더
+VISION = 'vision'       # 카메라 판정 (ROI 대기)
+
+
+class Stage(object):
+    """
+    레시피의 한 단계
+
+    :param name: 스테이지 이름
+    :param duration: 예상 소요 시간 (s), 시뮬레이션에 사용
+    :param uses: 스테이지 실행 중에만 사용하는 자원
+    :param acquire: 이 스테이지 시작 시 점유하여 release 스테이지가 끝날 때까지 유지하는 자원
+    :param release: 이 스테이지가 끝날 때 반납하는 자원
+    """
+    def __init__(self, name, duration, uses=(), acquire=(), release=()):
+        self.name = name
+        self.duration = duration
+        self.uses = tuple(uses)
+        self.acquire = tuple(acquire)
+        self.release = tuple(release)
+
+    def __repr__(self):
+        return 'Stage({}, {}s, uses={}, acquire={}, release={})'.format(self.name, self.duration, self.uses,
+                                                                         self.acquire, self.release)
+
+
+class Recipe(object):
+    def __init__(self, name, stages):
+        self.name = name
+        self.stages = list(stages)
+
+    @property
+    def serial_time(self):
+        return sum(stage.duration for stage in self.stages)
+
+
+# 다음 주문과 겹칠 수 있는 고객 캡슐 투입 인식 대기, 씰 확인이 끝나 캡슐이 지그를 떠날 때 지그를 반납
+CAPSULE_WAIT = Stage('capsule_wait', None, uses=[VISION], acquire=[JIG])
+
+# ARIS 아이스크림 레시피의 스테이지 -> (시간을 합산할 dry-run 구간 이름, 구간 밖에 있는 스크립트의 고정 sleep (s))
+STAGE_SPANS = {
+    'home': (('motion_home', ), 4.0),                               # 시작 대기 4s + 홈 이동
+    'cup_trash': (('storagy_trash_mode', ), 0.0),                   # Storagy 위 컵 쓰레기 확인
+    'capsule_wait': (('capsule_wait', ), 2.0),                      # 고객 캡슐 투입 인식 + 인식 후 2s
+    'grab_capsule': (('motion_grab_capsule', ), 0.0),
+    'seal_check': (('motion_check_sealing', 'seal_check'), 0.0),
+    'place_capsule': (('motion_place_capsule', ), 0.0),
+    'grab_cup': (('motion_grab_cup', ), 0.0),
+    'topping': (('motion_topping', ), 0.0),
+    'make_icecream': (('motion_make_icecream', ), 0.0),             # 팔이 컵을 들고 프레스 아래에서 대기
+    'serve': (('motion_serve_storagy', ), 0.0),
+    'trash_capsule': (('motion_trash_capsule', ), 0.0),
+    'return_home': (('motion_home', ), 1.0),                        # 홈 이동 + 마지막 1s
+}
+STORAGY_DELIVERY_TIME = 40.0    # Storagy 배달 후 복귀 시간 (s), 스크립트 밖의 동작이라 측정하지 않은 가정 값
+
+
+def measure_stages(stats, delivery=STORAGY_DELIVERY_TIME):
+    """
+    dry-run 의 구간 통계로 스테이지 시간 계산
+
+    :param stats: Profiler.stats() (RobotMain.profiler), 구간별 p50 사용
+    :param delivery: Storagy 배달 시간 (s), dry-run 의 Storagy 는 항상 자리에 있으므로 0 이면 dry-run 과 같은 조건
+    :return: {스테이지 이름: 시간 (s)}
+    """
+    durations = {}
+    for name, (spans, fixed) in STAGE_SPANS.items():
+        durations[name] = fixed + sum(stats[span]['p50'] for span in spans if span in stats)
+    durations['delivery'] = delivery
+    return durations
+
+
+def aris_icecream(durations):
+    """
+    ARIS 아이스크림 레시피 자원 모델
+
+    :param durations: {스테이지 이름: 시간 (s)}, measure_stages 결과
+    """
+    return Recipe('icecream', [
+        Stage('home', durations['home'], uses=[ARM]),
+        Stage('cup_trash', durations['cup_trash'], uses=[VISION, TRAY]),
+        Stage('capsule_wait', durations['capsule_wait'], uses=CAPSULE_WAIT.uses, acquire=CAPSULE_WAIT.acquire),
+        Stage('grab_capsule', durations['grab_capsule'], uses=[ARM]),
+        Stage('seal_check', durations['seal_check'], uses=[ARM, VISION], release=[JIG]),
+        Stage('place_capsule', durations['place_capsule'], uses=[ARM], acquire=[PRESS]),
+        Stage('grab_cup', durations['grab_cup'], uses=[ARM]),
+        Stage('topping', durations['topping'], uses=[ARM]),
+        Stage('make_icecream', durations['make_icecream'], uses=[ARM]),
+        Stage('serve', durations['serve'], uses=[ARM], acquire=[TRAY]),
+        Stage('trash_capsule', durations['trash_capsule'], uses=[ARM], release=[PRESS]),
+        Stage('return_home', durations['return_home'], uses=[ARM]),
+        Stage('delivery', durations['delivery'], release=[TRAY]),   # 팔과 무관
+    ])
+
+
+# ============================= 실행기 =============================
+
+class _Running(object):
+    def __init__(self, stage, predicate, start, stop):
+        self.stage = stage
+        self.predicate = predicate
+        self.start = start
+        self.stop = stop
+
+
+class PipelineExecutor(object):
+    """
+    주문 파이프라인 실행기 (로봇 스레드 하나에서 사용)
+
+    팔을 쓰는 스테이지는 로봇 스레드가 순서대로 실행하고, 팔을 쓰지 않는 대기 스테이지 (고객 캡슐 투입 같은
+    비전 대기) 는 점유할 자원이 비는 즉시 시작해 두어 앞 주문의 팔 동작과 겹쳐서 진행
+    - schedule(): 주문의 대기 스테이지 예약, 자원이 비어 있으면 바로 시작 (예약 순서대로 자원 배정)
+    - release(): 점유한 자원 반납, 그 자원을 기다리던 다음 주문의 대기 스테이지 시작
+    - join(): 로봇 스레드가 그 스테이지에 도달하면 호출, 이미 조건을 만족했으면 바로 반환
+    대기 조건은 PerceptionHub 의 predicate 이므로 시작해 둔 스테이지는 별도 스레드 없이 허브의 인식 결과로 진행되고,
+    VirtualClock dry-run 에서도 같은 코드로 실행됨
+    """
+    def __init__(self, hub, clock):
+        """
+        :param hub: aris.vision_state.PerceptionHub
+        :param clock: aris.clock 의 시계
+        """
+        self.hub = hub
+        self.clock = clock
+        self._holders = {}      # 자원 -> 점유한 key
+        self._pending = []      # 자원을 기다리는 (key, stage, predicate, on_start)
+        self._running = {}      # key -> _Running
+
+    def schedule(self, key, stage, predicate, on_start=None):
+        """
+        대기 스테이지 예약, 같은 key 가 이미 예약/시작되었으면 무시
+
+        :param key: 주문 ID 등
+        :param stage: Stage, acquire 자원이 모두 비어야 시작
+        :param predicate: 스테이지가 끝나는 조건 predicate(PerceptionState)
+        :param on_start: 시작할 때 호출, 반환값이 있으면 finish/cancel 때 호출 (ex: 키오스크 안내 + 추론 요청)
+        """
+        if key in self._running or any(item[0] == key for item in self._pending):
+            return
+        self._pending.append((key, stage, predicate, on_start))
+        self._dispatch()
+
+    def _dispatch(self):
+        blocked = set()
+        for item in list(self._pending):
+            key, stage, predicate, on_start = item
+            resources = set(stage.acquire)
+            if resources & blocked or any(self._holders.get(r, key) != key for r in resources):
+                # 앞 예약이 기다리는 자원은 뒤 예약이 먼저 가져가지 않음
+                blocked |= resources
+                continue
+            self._pending.remove(item)
+            for resource in resources:
+                self._holders[resource] = key
+            stop = on_start() if on_start is not None else None
+            self._running[key] = _Running(stage, predicate, self.clock.time(), stop)
+
+    def started(self, key):
+        """
+        :return: 스테이지 시작 시각, 아직 시작하지 않았으면 None
+        """
+        running = self._running.get(key, None)
+        return running.start if running is not None else None
+
+    def holds(self, key, resource):
+        return self._holders.get(resource, None) == key
+
+    def join(self, key, timeout=None):
+        """
+        시작한 대기 스테이지의 조건을 기다림
+
+        :return: 조건을 만족한 PerceptionState, timeout 이면 None
+        """
+        running = self._running.get(key, None)
+        if running is None:
+            raise RuntimeError('stage of {} is not started, the resources are held by {}'.format(
+                key, {r: k for r, k in self._holders.items() if k != key}))
+        return self.hub.wait_for(running.predicate, timeout=timeout)
+
+    def finish(self, key):
+        """
+        대기 스테이지 종료 (점유한 자원은 release 할 때까지 유지)
+        """
+        running = self._running.pop(key, None)
+        if running is not None and running.stop is not None:
+            running.stop()
+
+    def release(self, key, *resources):
+        """
+        key 가 점유한 자원 반납, 인자가 없으면 전부
+        """
+        for resource, holder in list(self._holders.items()):
+            if holder == key and (not resources or resource in resources):
+                del self._holders[resource]
+        self._dispatch()
+
+    def cancel(self, *keys):
+        """
+        예약/실행 중인 스테이지를 취소하고 점유한 자원 반납 (주문 재대기/실패 시)
+        """
+        # 예약부터 모두 지워서 앞 주문이 반납한 자원으로 취소할 주문의 스테이지가 시작되지 않도록 함
+        self._pending = [item for item in self._pending if item[0] not in keys]
+        for key in keys:
+            self.finish(key)
+            self.release(key)
+
+
+# ============================= 시뮬레이션 =============================
+
+class _Timeline(object):
+    """
+    자원별 사용 구간 목록, 빈 구간에 끼워 넣기 지원
+    """
+    def __init__(self):
+        self._busy = {}
+
+    def free_at(self, resource, start, duration):
+        """
+        start 이후 duration 동안 비어있는 가장 이른 시작 시각
+        """
+        for s, e in self._busy.get(resource, []):
+            if e <= start or s >= start + duration:
+                continue
+            start = e
+        return start
+
+    def reserve(self, resource, start, end):
+        busy = self._busy.setdefault(resource, [])
+        busy.append((start, end))
+        busy.sort()
+
+
+class Schedule(object):
+    def __init__(self, recipe, entries, serial):
+        self.recipe = recipe
+        self.entries = entries      # (주문 번호, 스테이지 이름, 시작, 종료)
+        self.serial = serial
+
+    @property
+    def makespan(self):
+        return max(e[3] for e in self.entries) if self.entries else 0
+
+    @property
+    def order_count(self):
+        return len(set(e[0] for e in self.entries))
+
+    @property
+    def orders_per_hour(self):
+        return self.order_count * 3600.0 / self.makespan if self.makespan > 0 else 0
+
+    def utilization(self):
+        used = {}
+        for _, name, start, end in self.entries:
+            stage = next(s for s in self.recipe.stages if s.name == name)
+            for resource in stage.uses:
+                used[resource] = used.get(resource, 0) + end - start
+        return {k: v / self.makespan for k, v in used.items()} if self.makespan > 0 else {}
+
+    def to_text(self, width=100):
+        """
+        주문별 간트 차트 문자열
+        """
+        scale = width / self.makespan if self.makespan > 0 else 1
+        lines = []
+        for index in range(self.order_count):
+            row = [' '] * (width + 1)
+            for order, name, start, end in self.entries:
+                if order != index:
+                    continue
+                for i in range(int(start * scale), max(int(end * scale), int(start * scale) + 1)):
+                    row[min(i, width)] = name[0]
+            lines.append('order {:>2} |{}|'.format(index, ''.join(row)))
+        return '\n'.join(lines)
+
+
+def simulate(recipe, count, serial=False):
+    """
+    주문 count 개를 처리하는 타임라인 시뮬레이션
+
+    :param serial: True 이면 기존 run_robot 처럼 자원을 쓰는 스테이지를 모두 직렬로 실행
+                   (자원을 쓰지 않는 Storagy 배달만 다음 주문과 겹침)
+    :return: Schedule
+    """
+    timeline = _Timeline()
+    entries = []
+    stage_start = [0.0] * len(recipe.stages)    # 스테이지별 이전 주문 시작 시각 (주문 순서 유지)
+    last_end = 0.0
+    for order in range(count):
+        t = last_end if serial else 0.0
+        held = {}
+        for index, stage in enumerate(recipe.stages):
+            start = max(t, stage_start[index])
+            resources = stage.uses + stage.acquire
+            if serial and stage.uses:
+                resources += ('serial',)
+            # 모든 자원이 동시에 비는 시각을 찾을 때까지 반복
+            while True:
+                candidate = start
+                for resource in resources:
+                    candidate = max(candidate, timeline.free_at(resource, candidate, stage.duration))
+                if candidate == start:
+                    break
+                start = candidate
+            end = start + stage.duration
+            for resource in resources:
+                if resource in stage.acquire:
+                    held[resource] = start
+                else:
+                    timeline.reserve(resource, start, end)
+            for resource in stage.release:
+                timeline.reserve(resource, held.pop(resource, start), end)
+            entries.append((order, stage.name, start, end))
+            stage_start[index] = start
+            t = end
+            if stage.uses:
+                last_end = end
+        # release 없이 끝난 점유 자원은 주문 종료 시 반납
+        for resource, start in held.items():
+            timeline.reserve(resource, start, t)
+    return Schedule(recipe, entries, serial)
+
+
+def compare(recipe, count):
+    """
+    :return: (직렬 Schedule, 파이프라인 Schedule)
+    """
+    return simulate(recipe, count, serial=True), simulate(recipe, count, serial=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ARIS recipe pipeline: dry-run before/after and timeline model')
+    parser.add_argument('--orders', type=int, default=6)
+    parser.add_argument('--batch', type=int, default=3, help='max number of orders made in one batch')
+    parser.add_argument('--capsule-delay', type=float, default=2.0,
+                        help='time the customer takes to put the capsule after the kiosk asks for it (s)')
+    parser.add_argument('--delivery', type=float, default=STORAGY_DELIVERY_TIME,
+                        help='Storagy delivery round trip of the model (s), the dry run has no delivery')
+    parser.add_argument('--chart', action='store_true', help='print the gantt chart of the model')
+    args = parser.parse_args(argv)
+
+    # 스크립트를 불러오므로 스크립트의 의존 패키지가 필요 (aris.dryrun 참고)
+    from .dryrun import DryRun, load_robot_main
+    robot_main_class = load_robot_main()
+    orders = [{'topping1': 1, 'topping2': 0, 'topping3': 0}] * args.orders
+    runs = {}
+    for label, overlap in (('serial', False), ('pipelined', True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            dry_run = DryRun(robot_main_class, capsule_delay=args.capsule_delay, batch_size=args.batch,
+                             pipeline=overlap)
+            dry_run.run(orders)
+            dry_run.close()
+        runs[label] = dry_run
+        print('dry-run {:>10}: virtual time={:.1f}s, orders/hour={:.1f}'.format(
+            label, dry_run.clock.time(), dry_run.orders_per_hour))
+    serial, pipelined = runs['serial'].orders_per_hour, runs['pipelined'].orders_per_hour
+    print('dry-run gain: {:.1%}'.format(pipelined / serial - 1 if serial > 0 else 0))
+
+    # 실행기가 아직 겹치지 않는 스테이지까지 겹쳤을 때의 상한 (스테이지 시간은 직렬 dry-run 에서 측정)
+    recipe = aris_icecream(measure_stages(runs['serial'].robot.profiler.stats(), delivery=args.delivery))
+    for label, schedule in zip(('serial', 'pipelined'), compare(recipe, args.orders)):
+        print('  model {:>10}: makespan={:.1f}s, orders/hour={:.1f}, arm utilization={:.0%}'.format(
+            label, schedule.makespan, schedule.orders_per_hour, schedule.utilization().get(ARM, 0)))
+        if args.chart:
+            print(schedule.to_text())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
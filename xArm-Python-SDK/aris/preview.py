@@ -0,0 +1,134 @@
+"""
+헤드리스 모드용 저속 미리보기 HTTP 서버
+
+    http://<host>:<port>/stream.mjpg    MJPEG 스트림 (브라우저에서 바로 재생)
+    http://<host>:<port>/snapshot.jpg   현재 프레임 한 장
+
+접속한 클라이언트가 있을 때만 snapshot() 으로 프레임을 만들므로, 아무도 보지 않으면 그리기/인코딩 비용이 없음
+여러 클라이언트가 접속해도 같은 프레임은 한 번만 만들고 (fps 주기로 캐시) 모두에게 보냄
+"""
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+BOUNDARY = 'frame'
+
+
+class PreviewServer(object):
+    """
+    :param snapshot: snapshot() -> JPEG bytes 또는 None (아직 프레임 없음)
+    :param host: 접속 주소, 기본은 로컬만 (인증 없는 카메라 영상이므로 외부 공개는 명시적으로 '0.0.0.0' 지정)
+    :param fps: 스트림의 최대 프레임 수 (회/s)
+    """
+    def __init__(self, snapshot, host='127.0.0.1', port=8081, fps=2.0):
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self.fps = fps
+
+        self._lock = threading.Lock()
+        self._jpeg = None
+        self._jpeg_time = 0
+        self._clients = 0
+        self._clients_lock = threading.Lock()
+        self._request_time = None
+        self._encode_times = []
+        self._server = None
+        self._thread = None
+
+    @property
+    def active(self):
+        """
+        미리보기를 보고 있거나 최근 5초 안에 스냅샷 요청이 있으면 True (이때만 그릴 내용을 기록하면 됨)
+        """
+        return self._clients > 0 or (self._request_time is not None and time.monotonic() - self._request_time < 5)
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/snapshot'):
+                    server._serve_snapshot(self)
+                elif self.path.startswith('/stream'):
+                    server._serve_stream(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='preview', daemon=True)
+        self._thread.start()
+        print('[LISTENING] preview on http://{}:{}/stream.mjpg'.format(self.host, self.port))
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def latest(self):
+        """
+        :return: 최근 1/fps 초 안에 만든 프레임이 있으면 그 프레임, 없으면 새로 만든 JPEG bytes
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._jpeg is None or now - self._jpeg_time >= 1.0 / self.fps:
+                start = time.thread_time()
+                jpeg = self.snapshot()
+                if jpeg is not None:
+                    self._encode_times = (self._encode_times + [time.thread_time() - start])[-100:]
+                    self._jpeg, self._jpeg_time = jpeg, now
+            return self._jpeg
+
+    def stats(self):
+        """
+        :return: {'clients', 'cpu_per_frame'}, cpu_per_frame 는 미리보기 한 장을 그리고 인코딩하는 CPU 시간 (s)
+        """
+        times = list(self._encode_times)
+        return {'clients': self._clients, 'cpu_per_frame': sum(times) / len(times) if times else 0}
+
+    def _add_client(self, count):
+        with self._clients_lock:
+            self._clients += count
+            self._request_time = time.monotonic()
+
+    def _serve_snapshot(self, handler):
+        self._add_client(1)
+        try:
+            jpeg = self.latest()
+        finally:
+            self._add_client(-1)
+        if jpeg is None:
+            handler.send_error(503, 'no frame yet')
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'image/jpeg')
+        handler.send_header('Content-Length', str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+    def _serve_stream(self, handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'multipart/x-mixed-replace; boundary={}'.format(BOUNDARY))
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+        self._add_client(1)
+        try:
+            while self._server is not None:
+                start = time.monotonic()
+                jpeg = self.latest()
+                if jpeg is not None:
+                    handler.wfile.write('--{}\r\nContent-Type: image/jpeg\r\nContent-Length: {}\r\n\r\n'.format(
+                        BOUNDARY, len(jpeg)).encode('ascii'))
+                    handler.wfile.write(jpeg)
+                    handler.wfile.write(b'\r\n')
+                time.sleep(max(0.0, 1.0 / self.fps - (time.monotonic() - start)))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._add_client(-1)
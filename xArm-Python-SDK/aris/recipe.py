@@ -0,0 +1,312 @@
+"""
+데이터 기반 레시피 형식과 실행기
+
+레시피는 동작(step) dict 의 목록이며, JSON 으로 저장/불러오기 가능
+    {'op': 'joint', 'pose': [...] 또는 'position_home', 'radius': 0, 'wait': True}   관절 이동 (set_servo_angle)
+    {'op': 'line', 'pose': [...] 또는 'position_topping_A', 'radius': 10}            직선 이동 (set_position)
+    {'op': 'line', 'pose': {'z': 30}, 'relative': True}                              상대 직선 이동
+    {'op': 'pause', 'seconds': 2}                       컨트롤러 대기 (set_pause_time, 모션 큐에 들어감)
+    {'op': 'sleep', 'seconds': 1}                       PC 대기 (동기화 지점)
+    {'op': 'gripper', 'action': 'open'}                 open / close / stop
+    {'op': 'digital', 'ionum': 3, 'value': 1}           컨트롤 박스 디지털 출력
+    {'op': 'analog', 'ionum': 0, 'value': 5}            컨트롤 박스 아날로그 출력
+    {'op': 'set', 'name': 'pressing', 'value': True}    대상 객체(RobotMain)의 속성 변경
+    {'op': 'choose', 'cases': [['order.topping3', [...]], ...], 'default': [...]}
+                                                        context 값이 참인 첫 번째 case 의 동작 실행
+
+실행기 (RecipeRunner) 의 최적화
+- 이동의 radius 를 생략하면, 바로 다음 동작이 같은 종류의 이동이고 wait 가 아닐 때 자동으로 블렌딩 (blend_radius)
+- 연속된 IO 동작은 한 번에 실행하고, 한 번의 실행 안에서 이미 같은 값을 쓴 출력은 다시 쓰지 않음
+- 절대 좌표 포즈는 WaypointLibrary 에 등록하여 시작 시 한 번에 IK 검증 (poses())
+- 레시피 전체와 label 이 있는 동작은 profiler 구간으로 기록
+"""
+import json
+import copy
+
+from xarm.tools.motion_estimator import MotionEstimator
+
+
+MOVE_OPS = ('joint', 'line')
+IO_OPS = ('gripper', 'digital', 'analog', 'set')
+
+
+# ============================= 동작 생성 함수 =============================
+
+def joint(pose, radius=None, wait=False, speed=None, acc=None, label=None):
+    return _step('joint', pose=pose, radius=radius, wait=wait, speed=speed, acc=acc, label=label)
+
+
+def line(pose, radius=None, wait=False, speed=None, acc=None, label=None):
+    return _step('line', pose=pose, radius=radius, wait=wait, speed=speed, acc=acc, label=label)
+
+
+def line_relative(radius=None, wait=False, speed=None, acc=None, label=None, **offset):
+    """
+    ex: line_relative(z=30, radius=0, wait=True)
+    """
+    return _step('line', pose=offset, relative=True, radius=radius, wait=wait, speed=speed, acc=acc, label=label)
+
+
+def pause(seconds):
+    return _step('pause', seconds=seconds)
+
+
+def sleep(seconds, label=None):
+    return _step('sleep', seconds=seconds, label=label)
+
+
+def gripper(action):
+    assert action in ('open', 'close', 'stop')
+    return _step('gripper', action=action)
+
+
+def digital(ionum, value):
+    return _step('digital', ionum=ionum, value=value)
+
+
+def analog(ionum, value):
+    return _step('analog', ionum=ionum, value=value)
+
+
+def set_attr(name, value):
+    return _step('set', name=name, value=value)
+
+
+def choose(cases, default=None):
+    """
+    :param cases: [(context 경로, 동작 목록), ...], ex: [('order.topping3', [...]), ('order.topping2', [...])]
+    :param default: 참인 case 가 없을 때 실행할 동작 목록
+    """
+    return _step('choose', cases=[[key, list(steps)] for key, steps in cases], default=list(default or []))
+
+
+def _step(op, **kwargs):
+    step = {'op': op}
+    step.update({k: v for k, v in kwargs.items() if v is not None})
+    return step
+
+
+class Recipe(object):
+    def __init__(self, name, steps):
+        self.name = name
+        self.steps = list(steps)
+
+    def to_dict(self):
+        return {'name': self.name, 'steps': copy.deepcopy(self.steps)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['steps'])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def poses(self):
+        """
+        모든 분기의 절대 좌표 포즈 목록 (WaypointLibrary 사전 검증용)
+
+        :return: [(이름, 포즈, 'joint' 또는 'linear'), ...], 이름은 '레시피:동작 위치'
+        """
+        result = []
+
+        def walk(steps, path):
+            for index, step in enumerate(steps):
+                where = '{}.{}'.format(path, index) if path else str(index)
+                if step['op'] in MOVE_OPS and not step.get('relative', False) and isinstance(step['pose'], list):
+                    kind = 'joint' if step['op'] == 'joint' else 'linear'
+                    result.append(('{}:{}'.format(self.name, where), step['pose'], kind))
+                elif step['op'] == 'choose':
+                    for case_index, (_, case_steps) in enumerate(step['cases']):
+                        walk(case_steps, '{}.{}'.format(where, case_index))
+                    walk(step.get('default', []), '{}.default'.format(where))
+
+        walk(self.steps, '')
+        return result
+
+    def __repr__(self):
+        return 'Recipe({}, {} steps)'.format(self.name, len(self.steps))
+
+
+def _lookup(context, path):
+    value = context
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key, None)
+        else:
+            value = getattr(value, key, None)
+        if value is None:
+            return None
+    return value
+
+
+# ============================= 실행기 =============================
+
+class RecipeRunner(object):
+    """
+    레시피 실행기
+
+    :param arm: XArmAPI
+    :param clock: aris.clock 의 시계 (sleep 동작에 사용)
+    :param profiler: xarm.tools.profiler.Profiler, None 이면 구간 기록 안 함
+    :param blend_radius: radius 를 생략한 연속 이동의 블렌딩 반경 (mm)
+    :param sleep: sleep 동작에 사용할 함수, None 이면 clock.sleep (ex: 구간 기록으로 감싼 sleep)
+    """
+    def __init__(self, arm, clock, profiler=None, blend_radius=10.0, sleep=None):
+        self._arm = arm
+        self.clock = clock
+        self._sleep = sleep or clock.sleep
+        self.profiler = profiler
+        self.blend_radius = blend_radius
+
+    def compile(self, recipe, context=None, target=None):
+        """
+        분기를 풀고 포즈 이름과 자동 블렌딩을 적용한 실행 동작 목록
+
+        :param context: choose 의 조건을 찾을 dict (ex: {'order': order, 'toping': True})
+        :param target: 포즈 이름과 set 동작의 대상 객체
+        """
+        context = context or {}
+        flat = []
+
+        def expand(steps):
+            for step in steps:
+                if step['op'] == 'choose':
+                    for key, case_steps in step['cases']:
+                        if _lookup(context, key):
+                            expand(case_steps)
+                            break
+                    else:
+                        expand(step.get('default', []))
+                else:
+                    flat.append(dict(step))
+
+        expand(recipe.steps)
+        for index, step in enumerate(flat):
+            if step['op'] not in MOVE_OPS:
+                continue
+            if isinstance(step['pose'], str):
+                step['pose'] = list(getattr(target, step['pose']))
+            if step.get('radius', None) is None:
+                following = flat[index + 1] if index + 1 < len(flat) else None
+                blend = not step.get('wait', False) and following is not None and following['op'] == step['op']
+                step['radius'] = self.blend_radius if blend else 0
+        return flat
+
+    def estimate(self, recipe, context=None, target=None, speeds=None, estimator=None):
+        """
+        MotionEstimator 로 추정한 레시피 실행 시간 (s)
+        """
+        speeds = speeds or {}
+        estimator = estimator or MotionEstimator(None, is_radian=False)
+        moves = []
+        for step in self.compile(recipe, context, target):
+            op = step['op']
+            if op in MOVE_OPS:
+                params = {'radius': step['radius'], 'wait': step.get('wait', False)}
+                if op == 'joint':
+                    params.update(angle=step['pose'], speed=step.get('speed', speeds.get('angle_speed')),
+                                  mvacc=step.get('acc', speeds.get('angle_acc')))
+                    moves.append(('servo_angle', params))
+                else:
+                    if step.get('relative', False):
+                        params.update(step['pose'], relative=True)
+                    else:
+                        params.update(zip(('x', 'y', 'z', 'roll', 'pitch', 'yaw'), step['pose']))
+                    params.update(speed=step.get('speed', speeds.get('tcp_speed')),
+                                  mvacc=step.get('acc', speeds.get('tcp_acc')))
+                    moves.append(('position', params))
+            elif op in ('pause', 'sleep'):
+                moves.append(('sleep', step['seconds']))
+        return estimator.estimate_sequence(moves)[0]
+
+    def run(self, recipe, context=None, target=None, speeds=None, check=None):
+        """
+        레시피 실행
+
+        :param speeds: {'tcp_speed', 'tcp_acc', 'angle_speed', 'angle_acc'}, 동작에 speed/acc 가 없을 때 사용
+        :param check: check(code, label) -> bool, False 이면 실행 중단 (RobotMain._check_code)
+        :return: code, 0 이면 성공
+        """
+        speeds = speeds or {}
+        check = check or (lambda code, label: code == 0)
+        steps = self.compile(recipe, context, target)
+        if self.profiler is None:
+            return self._run(steps, target, speeds, check)
+        with self.profiler.span(recipe.name, 'recipe'):
+            return self._run(steps, target, speeds, check)
+
+    def _run(self, steps, target, speeds, check):
+        written = {}
+        index = 0
+        while index < len(steps):
+            if steps[index]['op'] in IO_OPS:
+                # 연속된 IO 동작은 모아서 실행
+                end = index
+                while end < len(steps) and steps[end]['op'] in IO_OPS:
+                    end += 1
+                code, label = self._run_io(steps[index:end], target, written)
+                index = end
+            else:
+                step = steps[index]
+                if step.get('label', None) and self.profiler is not None:
+                    with self.profiler.span(step['label'], 'step'):
+                        code, label = self._run_step(step, speeds)
+                else:
+                    code, label = self._run_step(step, speeds)
+                index += 1
+            if not check(code, label):
+                return code if code != 0 else -1
+        return 0
+
+    def _run_step(self, step, speeds):
+        op = step['op']
+        if op == 'joint':
+            code = self._arm.set_servo_angle(angle=step['pose'], speed=step.get('speed', speeds.get('angle_speed')),
+                                             mvacc=step.get('acc', speeds.get('angle_acc')),
+                                             wait=step.get('wait', False), radius=step['radius'])
+            return code, 'set_servo_angle'
+        if op == 'line':
+            speed, acc = step.get('speed', speeds.get('tcp_speed')), step.get('acc', speeds.get('tcp_acc'))
+            if step.get('relative', False):
+                code = self._arm.set_position(radius=step['radius'], speed=speed, mvacc=acc, relative=True,
+                                              wait=step.get('wait', False), **step['pose'])
+            else:
+                code = self._arm.set_position(*step['pose'], speed=speed, mvacc=acc, radius=step['radius'],
+                                              wait=step.get('wait', False))
+            return code, 'set_position'
+        if op == 'pause':
+            return self._arm.set_pause_time(step['seconds']), 'set_pause_time'
+        if op == 'sleep':
+            self._sleep(step['seconds'])
+            return 0, 'sleep'
+        raise ValueError('unknown recipe op: {}'.format(op))
+
+    def _run_io(self, steps, target, written):
+        for step in steps:
+            op = step['op']
+            if op == 'set':
+                setattr(target, step['name'], step['value'])
+                continue
+            if op == 'gripper':
+                code = getattr(self._arm, '{}_lite6_gripper'.format(step['action']))()
+                label = '{}_lite6_gripper'.format(step['action'])
+            else:
+                key = (op, step['ionum'])
+                if written.get(key, None) == step['value']:
+                    continue
+                if op == 'digital':
+                    code = self._arm.set_cgpio_digital(step['ionum'], step['value'], delay_sec=0)
+                else:
+                    code = self._arm.set_cgpio_analog(step['ionum'], step['value'])
+                label = 'set_cgpio_{}'.format(op)
+                if code == 0:
+                    written[key] = step['value']
+            if code != 0:
+                return code, label
+        return 0, 'io'
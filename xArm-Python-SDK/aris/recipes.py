@@ -0,0 +1,104 @@
+"""
+ARIS 레시피 데이터 (aris.recipe 형식)
+
+포즈 이름(문자열)은 RobotMain 의 position_* 속성, 리스트는 절대 좌표/관절 각도
+"""
+from .recipe import Recipe, joint, line, line_relative, pause, sleep, gripper, digital, set_attr, choose
+
+
+# 토핑 추출 시간은 toppingAmount = 5 기준
+TOPPING = Recipe('topping', [
+    choose([
+        ('toping', [
+            joint([36.6, -36.7, 21.1, 85.6, 59.4, 44.5], radius=0),
+            # 컵 잡는 위치 위로 변경
+            joint([47.7, -44.2, 10.6, 107.1, 72.6, 50.6], radius=0, wait=True),
+            gripper('open'),
+            sleep(1.5),
+            gripper('close'),
+            sleep(1),
+
+            choose([
+                ('order.topping3', [
+                    line('position_topping_C', radius=0, wait=True, label='topping_C'),
+                    line_relative(z=30, radius=0, wait=True),
+                    pause(2),
+                    set_attr('pressing', True),
+                    digital(3, 1),
+                    pause(2),
+                    digital(2, 0),
+                    line_relative(z=-30, radius=0),
+                ]),
+                ('order.topping2', [
+                    joint([55.8, -48.2, 14.8, 86.1, 60.2, 58.7], radius=20),
+                    joint('position_topping_B', radius=0, wait=True, label='topping_B'),
+                    line_relative(z=30, radius=0, wait=True),
+                    pause(1),
+                    set_attr('pressing', True),
+                    digital(3, 1),
+                    pause(3),
+                    digital(1, 0),
+                    line_relative(z=-30, radius=0),
+                    joint([87.5, -48.2, 13.5, 125.1, 44.5, 46.2], radius=10),
+                    line([43.6, 137.9, 350.1, -92.8, 87.5, 5.3], radius=10),
+                ]),
+                ('order.topping1', [
+                    line('position_topping_A', radius=0, wait=True, label='topping_A'),
+                    line_relative(z=10, radius=0, wait=True),
+                    pause(4),
+                    set_attr('pressing', True),
+                    digital(3, 1),
+                    digital(0, 0),
+                    line_relative(z=-10, radius=0, wait=True),
+                    joint([130.0, -33.1, 12.5, 194.3, 51.0, 0.0], radius=0, wait=True),
+                    line([-38.2, 132.2, 333.9, -112.9, 86.3, -6.6], radius=10),
+                    line([43.6, 137.9, 350.1, -92.8, 87.5, 5.3], radius=10),
+                ]),
+            ]),
+
+            # 기존 스크립트의 [..., 104,5] 를 그대로 유지 (yaw=104, radius=5)
+            line([217.2, 138.5, 377.1, 30.2, 84.3, 104], radius=5, wait=True),
+        ]),
+    ], default=[
+        # 토핑 없음: 바로 프레스
+        set_attr('pressing', True),
+        digital(3, 1),
+        joint('position_icecream_no_topping', radius=0, wait=True),
+    ]),
+    sleep(0.5),
+])
+
+
+
+# 캡슐 폐기, radius 를 생략한 이동은 RecipeRunner 가 자동으로 블렌딩
+CAPSULE_SHAKE = [25.2, 15.2, 42.7, 83.2, 35.0, -139.8]
+CAPSULE_DROP = [18.0, 11.2, 40.4, 90.4, 58.7, -148.8]
+TRASH_CAPSULE = Recipe('trash_capsule', [
+    joint([51.2, -8.7, 13.8, 95.0, 86.0, 17.0], radius=50, speed=150, acc=300),
+    joint([-16.2, -19.3, 42.7, 82.0, 89.1, 55.0], radius=0, wait=True, speed=150, acc=300),
+    gripper('open'),
+    joint([-19.9, -19.1, 48.7, 87.2, 98.7, 60.0], radius=0, wait=True, speed=150, acc=300),
+    # 캡슐 잡는 위치 앞의 경유점은 멈추지 않고 통과 (자동 블렌딩)
+    line([222.8, 0.9, 470.0, -153.7, 87.3, -68.7]),
+    line('position_capsule_grab', radius=0, wait=True, label='capsule_grab'),
+    gripper('close'),
+    sleep(1),
+    line_relative(z=30, radius=-1, wait=True),
+    line([221.9, -5.5, 500.4, -153.7, 87.3, -68.7], radius=0, wait=True, speed=100, acc=1000),
+    # 다음 관절 이동과 자동 블렌딩
+    joint([-10.7, -2.4, 53.5, 50.4, 78.1, 63.0], speed=60, acc=100),
+    joint(CAPSULE_DROP, radius=0, wait=True, speed=160, acc=1000),
+    gripper('open'),
+    # 캡슐 털기: 블렌딩 없이 왕복
+    joint(CAPSULE_SHAKE, radius=0, speed=160, acc=1000),
+    joint(CAPSULE_DROP, radius=0, speed=160, acc=1000),
+    joint(CAPSULE_SHAKE, radius=0, wait=True, speed=160, acc=1000),
+    gripper('stop'),
+    joint([28.3, -9.0, 12.6, 85.9, 78.5, 20.0], radius=30, speed=120, acc=1000),
+    joint([149.3, -9.4, 10.9, 114.7, 69.1, 26.1], radius=50, speed=120, acc=1000),
+    joint([179.2, -42.1, 7.4, 186.7, 41.5, -1.6], radius=0, wait=True, speed=120, acc=1000),
+    sleep(0.5),
+])
+
+
+RECIPES = {recipe.name: recipe for recipe in [TOPPING, TRASH_CAPSULE]}
@@ -0,0 +1,171 @@
+"""
+비전 -> 로봇 안전 정지 경로
+
+YOLO 스레드는 프레임마다 update(거리, 촬영 시각) 만 호출하고 바로 돌아가며,
+실제 set_state 는 전용 스레드가 전용 제어 연결(XArmAPI.connect_safety)로 보내므로
+움직임 명령이 잡고 있는 UxbusCmd.lock 을 기다리지 않음
+
+- 정지는 거리가 stop_distance 이하가 된 첫 프레임에 바로 요청, 재개는 resume_distance 를 넘는 프레임이
+  resume_frames 번 연속되고 정지 후 min_hold 초가 지나야 요청 (히스테리시스 + 디바운스)
+- 보내지 않은 요청은 최신 요청 하나만 유지하므로, 정지 요청은 대기 중인 재개 요청을 덮어씀
+- 모든 정지/재개 이벤트의 촬영 -> 상태 변경 응답 시간을 기록 (events(), stats())
+"""
+import time
+import threading
+from collections import deque
+
+
+STATE_MOVE = 0
+STATE_PAUSE = 3
+
+
+class SafetyMonitor(object):
+    """
+    :param arm: XArmAPI, safety_set_state 가 없으면 set_state 사용
+    :param stop_distance: 이 거리 이하이면 정지 (px)
+    :param resume_distance: 이 거리를 넘어야 재개 (px), stop_distance 보다 크게 설정
+    :param resume_frames: 재개에 필요한 연속된 안전 프레임 수
+    :param min_hold: 정지 후 재개까지의 최소 시간 (s)
+    :param inhibit: inhibit() 가 참이면 새로 정지하지 않음 (ex: 아이스크림 프레스 중)
+    :param on_change: on_change(paused, event), 상태 변경 후 전용 스레드에서 호출
+    :param clock: 현재 시각 함수 (s), 촬영 시각과 같은 기준이어야 함, 기본은 time.monotonic
+    :param profiler: xarm.tools.profiler.Profiler, 촬영 -> 상태 변경 구간을 'safety' 로 기록
+    """
+    def __init__(self, arm, stop_distance=50, resume_distance=80, resume_frames=5, min_hold=1.0,
+                 inhibit=None, on_change=None, clock=None, profiler=None, history_size=200):
+        assert resume_distance >= stop_distance
+        self._arm = arm
+        self._set_state = getattr(arm, 'safety_set_state', None) or arm.set_state
+        self.stop_distance = stop_distance
+        self.resume_distance = resume_distance
+        self.resume_frames = resume_frames
+        self.min_hold = min_hold
+        self.inhibit = inhibit
+        self.on_change = on_change
+        self.clock = clock or time.monotonic
+        self.profiler = profiler
+
+        self._cond = threading.Condition()
+        self._desired = STATE_MOVE      # 비전이 원하는 상태
+        self._applied = STATE_MOVE      # 마지막으로 성공한 상태
+        self._pending = None            # (상태, 촬영 시각, 요청 시각, 거리)
+        self._sending = False
+        self._clear_count = 0
+        self._stop_since = None
+        self._events = deque(maxlen=history_size)
+        self._alive = False
+        self._thread = None
+
+    @property
+    def paused(self):
+        return self._applied == STATE_PAUSE
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._alive = True
+        self._thread = threading.Thread(target=self._run, name='safety', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._alive = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(1)
+            self._thread = None
+
+    def update(self, distance, capture_time=None):
+        """
+        프레임마다 비전 스레드에서 호출, 명령을 기다리지 않고 바로 돌아감
+
+        :param distance: 사람과 로봇 사이의 최단 거리, 둘 중 하나라도 인식되지 않으면 None
+        :param capture_time: 프레임 촬영 시각 (clock 기준), None 이면 현재 시각
+        :return: 정지가 요청된 상태이면 True
+        """
+        now = self.clock()
+        capture_time = now if capture_time is None else capture_time
+        near = distance is not None and distance <= self.stop_distance
+        far = distance is None or distance > self.resume_distance
+        with self._cond:
+            if self._desired == STATE_MOVE:
+                if near and not (self.inhibit is not None and self.inhibit()):
+                    self._desired = STATE_PAUSE
+                    self._stop_since = now
+                    self._clear_count = 0
+                    self._request(STATE_PAUSE, capture_time, now, distance)
+            else:
+                self._clear_count = self._clear_count + 1 if far else 0
+                if self._clear_count >= self.resume_frames and now - self._stop_since >= self.min_hold:
+                    self._desired = STATE_MOVE
+                    self._request(STATE_MOVE, capture_time, now, distance)
+            if self._desired != self._applied and self._pending is None and not self._sending:
+                # 명령이 실패하면 다음 프레임에서 다시 요청
+                self._request(self._desired, capture_time, now, distance)
+            return self._desired == STATE_PAUSE
+
+    def _request(self, state, capture_time, request_time, distance):
+        self._pending = (state, capture_time, request_time, distance)
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._alive and self._pending is None:
+                    self._cond.wait()
+                if not self._alive:
+                    return
+                state, capture_time, request_time, distance = self._pending
+                self._pending = None
+                if state == self._applied:
+                    continue
+                self._sending = True
+            try:
+                send_time = self.clock()
+                code = self._set_state(state)
+                ack_time = self.clock()
+            except Exception as e:
+                code, ack_time = -1, self.clock()
+                print('safety set_state({}) error: {}'.format(state, e))
+            with self._cond:
+                self._sending = False
+                if code == 0:
+                    self._applied = state
+            event = {
+                'paused': state == STATE_PAUSE,
+                'code': code,
+                'distance': None if distance is None else float(distance),
+                'capture_time': capture_time,
+                'latency': ack_time - capture_time,     # 촬영 -> 상태 변경 완료
+                'vision': request_time - capture_time,  # 촬영 -> 요청 (인식 처리 시간)
+                'queue': send_time - request_time,      # 요청 -> 전송 시작
+                'command': ack_time - send_time,        # 전송 -> 응답
+            }
+            self._events.append(event)
+            print('[SAFETY] {} code={}, distance={}, latency={:.1f}ms (vision={:.1f}ms, queue={:.1f}ms, command={:.1f}ms)'.format(
+                'PAUSE' if event['paused'] else 'RESUME', code, event['distance'], event['latency'] * 1000,
+                event['vision'] * 1000, event['queue'] * 1000, event['command'] * 1000))
+            if self.profiler is not None:
+                self.profiler.add('safety_pause' if event['paused'] else 'safety_resume', capture_time, ack_time, 'safety', code=code)
+            if code == 0 and self.on_change is not None:
+                self.on_change(event['paused'], event)
+
+    def events(self):
+        return list(self._events)
+
+    def stats(self):
+        """
+        :return: {'pause': {'count', 'p50', 'p95', 'max'}, 'resume': {...}}, 촬영 -> 상태 변경 시간 (s)
+        """
+        result = {}
+        for key, paused in (('pause', True), ('resume', False)):
+            values = sorted(event['latency'] for event in self._events if event['paused'] == paused and event['code'] == 0)
+            if not values:
+                continue
+            result[key] = {
+                'count': len(values),
+                'p50': values[min(len(values) - 1, int(len(values) * 0.5))],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+            }
+        return result
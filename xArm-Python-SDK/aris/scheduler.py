@@ -0,0 +1,268 @@
+import time
+import queue
+import itertools
+import threading
+from collections import deque, OrderedDict
+
+
+# 주문 상태
+QUEUED = 'queued'
+MAKING = 'making'
+SERVED = 'served'
+FAILED = 'failed'
+
+# 주문 종류와 우선순위 (숫자가 작을수록 먼저 처리)
+ICECREAM = 'icecream'
+GREETING = 'greeting'
+DEFAULT_PRIORITY = {ICECREAM: 0, GREETING: 1}
+
+
+class Order(object):
+    """
+    주문 한 건의 정보 (ID, 종류, 내용, 상태, 시간 기록)
+    """
+    def __init__(self, order_id, kind, payload, priority, seq):
+        self.order_id = order_id
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.seq = seq              # 큐 내 순서, 재투입 시에도 유지하여 맨 앞으로 들어감
+        self.state = QUEUED
+        self.attempts = 0
+        self.reason = None
+        self.created_time = time.time()
+        self.queued_time = time.monotonic()     # 마지막으로 큐에 들어간 시각
+        self.start_time = None
+        self.finish_time = None
+
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'kind': self.kind,
+            'payload': self.payload,
+            'state': self.state,
+            'attempts': self.attempts,
+            'reason': self.reason,
+            'created_time': self.created_time,
+        }
+
+    def __repr__(self):
+        return 'Order(id={}, kind={}, state={}, payload={})'.format(self.order_id, self.kind, self.state,
+                                                                   self.payload)
+
+
+class OrderScheduler(object):
+    """
+    우선순위 큐 기반 주문 스케줄러
+
+    로봇 스레드는 get()에서 주문이 들어올 때까지 블로킹되며 (CPU 사용 없음), 주문이 들어오면 바로 깨어남
+    씰 제거 실패 등으로 재투입된 주문은 원래 순서(seq)를 유지하므로 같은 우선순위의 다른 주문보다 먼저 처리됨
+    완료/실패한 주문은 최근 max_finished 건만 보관 (오래 켜 두는 키오스크에서 메모리가 계속 늘지 않도록)
+    """
+    def __init__(self, priorities=None, history_size=200, clock=None, max_finished=1024):
+        """
+        :param clock: 시간 측정에 사용할 시계 (aris.clock), None 이면 time.monotonic
+        :param max_finished: get_order() 로 조회할 수 있도록 보관할 완료/실패 주문 수, 오래된 것부터 삭제
+        """
+        self._time = clock.time if clock is not None else time.monotonic
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._priorities = dict(DEFAULT_PRIORITY, **(priorities or {}))
+        self._orders = {}                   # 대기/제조 중인 주문
+        self._finished = OrderedDict()      # 완료/실패한 주문 (최근 max_finished 건)
+        self.max_finished = max(1, int(max_finished))
+        self._latencies = deque(maxlen=history_size)     # 큐 대기 시간 (s)
+        self._make_times = deque(maxlen=history_size)    # 제조 시간 (s)
+        self._listeners = []
+        self._closed = False
+        self.counts = {QUEUED: 0, MAKING: 0, SERVED: 0, FAILED: 0}
+
+    def register_listener(self, callback):
+        """
+        주문 상태 변경 시 callback(order) 호출
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def release_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _set_state(self, order, state):
+        with self._lock:
+            self.counts[order.state] -= 1
+            order.state = state
+            self.counts[state] += 1
+        self._notify(order)
+
+    def _notify(self, order):
+        for callback in self._listeners:
+            try:
+                callback(order)
+            except Exception as e:
+                print('order listener error: {}'.format(e))
+
+    def submit(self, kind, payload=None, priority=None):
+        """
+        주문 추가
+
+        :param kind: ICECREAM 또는 GREETING
+        :param payload: 주문 내용 (토핑 정보, 성별/나이 등)
+        :param priority: 우선순위, None이면 종류별 기본값
+        :return: Order, 스케줄러가 닫혔으면 None
+        """
+        if self._closed:
+            return None
+        priority = self._priorities.get(kind, 0) if priority is None else priority
+        with self._lock:
+            order = Order(next(self._ids), kind, payload, priority, next(self._seq))
+            order.queued_time = self._time()
+            self._orders[order.order_id] = order
+            self.counts[QUEUED] += 1
+        self._queue.put((order.priority, order.seq, order))
+        self._notify(order)
+        return order
+
+    def get(self, timeout=None):
+        """
+        다음 주문을 꺼내 MAKING 상태로 변경, 주문이 없으면 블로킹
+
+        :param timeout: 최대 대기 시간 (s), None이면 무한 대기
+        :return: Order, 타임아웃 또는 스케줄러가 닫혔으면 None
+        """
+        try:
+            _, _, order = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if order is None:
+            # close() 가 넣은 종료 신호, 다른 대기 스레드를 위해 다시 넣음
+            self._queue.put((-1, next(self._seq), None))
+            return None
+        order.attempts += 1
+        order.start_time = self._time()
+        self._latencies.append(order.start_time - order.queued_time)
+        self._set_state(order, MAKING)
+        return order
+
+    def take_batch(self, first, max_size, group=None):
+        """
+        first 와 함께 연속으로 만들 같은 종류의 대기 주문을 큐에서 꺼내 MAKING 상태로 변경
+
+        group(order) 가 first 와 같은 주문을 먼저 고르고, 고른 주문은 그룹별로 모아서 반환
+        (그룹 안에서는 원래 순서 유지), 고르지 않은 주문은 다시 큐에 넣음
+
+        :param first: get() 으로 꺼낸 주문
+        :param max_size: first 를 포함한 최대 배치 크기
+        :param group: 주문의 그룹 키 함수 (ex: 토핑 조합), None 이면 순서대로
+        :return: first 를 제외한 Order 목록
+        """
+        if max_size <= 1:
+            return []
+        drained = []
+        while True:
+            try:
+                drained.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        drained.sort(key=lambda item: item[:2])
+        group = group or (lambda order: 0)
+        groups = [group(first)]
+        for _, _, order in drained:
+            if order is not None and order.kind == first.kind and group(order) not in groups:
+                groups.append(group(order))
+        candidates = [item for item in drained if item[2] is not None and item[2].kind == first.kind]
+        candidates.sort(key=lambda item: groups.index(group(item[2])))
+        selected = candidates[:max_size - 1]
+        for item in drained:
+            if item not in selected:
+                self._queue.put(item)
+        batch = []
+        for _, _, order in selected:
+            order.attempts += 1
+            order.start_time = self._time()
+            self._latencies.append(order.start_time - order.queued_time)
+            self._set_state(order, MAKING)
+            batch.append(order)
+        return batch
+
+    def begin(self, order):
+        """
+        배치로 꺼낸 주문의 실제 제조 시작 시각 기록 (제조 시간 통계용)
+        """
+        order.start_time = self._time()
+
+    def complete(self, order):
+        order.finish_time = self._time()
+        self._make_times.append(order.finish_time - order.start_time)
+        self._set_state(order, SERVED)
+        self._store_finished(order)
+
+    def fail(self, order, reason=None):
+        order.finish_time = self._time()
+        order.reason = reason
+        self._set_state(order, FAILED)
+        self._store_finished(order)
+
+    def _store_finished(self, order):
+        with self._lock:
+            self._orders.pop(order.order_id, None)
+            self._finished[order.order_id] = order
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+
+    def requeue(self, order, reason=None):
+        """
+        주문을 다시 큐에 넣음 (원래 순서 유지, 같은 우선순위 중 맨 앞)
+        """
+        order.reason = reason
+        order.queued_time = self._time()
+        self._set_state(order, QUEUED)
+        self._queue.put((order.priority, order.seq, order))
+
+    def get_order(self, order_id):
+        """
+        :return: 대기/제조 중이거나 최근에 끝난 주문, 없으면 None
+        """
+        with self._lock:
+            order = self._orders.get(order_id, None)
+            return order if order is not None else self._finished.get(order_id, None)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def pending_count(self):
+        return self.counts[QUEUED]
+
+    def close(self):
+        """
+        대기 중인 get()을 모두 깨우고 새 주문을 받지 않음
+        """
+        self._closed = True
+        self._queue.put((-1, next(self._seq), None))
+
+    @staticmethod
+    def _summary(values):
+        if not values:
+            return {'count': 0, 'avg': 0, 'p95': 0, 'max': 0}
+        values = sorted(values)
+        return {
+            'count': len(values),
+            'avg': sum(values) / len(values),
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1],
+        }
+
+    def metrics(self):
+        """
+        :return: 상태별 주문 수, 큐 대기 시간, 제조 시간 통계
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            'counts': counts,
+            'queue_latency': self._summary(list(self._latencies)),
+            'make_time': self._summary(list(self._make_times)),
+        }
@@ -0,0 +1,242 @@
+"""
+경량 다중 객체 트래커 (IoU / 중심 거리 연결)
+
+프레임마다 인식된 박스를 기존 트랙에 연결해 같은 객체에 같은 ID 를 유지함
+- 연결 순서: 같은 라벨끼리 IoU 가 큰 쌍부터, 남은 박스는 예측 중심(속도 반영)과의 거리가 가까운 쌍부터
+- 연결되지 않은 트랙은 max_age 초 동안 유지 (인식 깜빡임으로 트랙/타이머가 끊기지 않음)
+- 트랙마다 속도 (px/s), 나이, 연속 인식 수, 정지 시작 시각 (중심이 still_distance 안에 머문 시각) 을 관리
+
+model.track(persist=True) (YOLO_code/YOLO_segmentation_tracking.py) 와 달리 추론 백엔드 / ROI 크롭 / 재사용 결과와
+관계없이 최종 박스만으로 동작
+
+시뮬레이션: python -m aris.tracker [--miss 0.1 0.2 0.3] [--dwell 1.0]
+"""
+import argparse
+import itertools
+
+import numpy as np
+
+
+class Track(object):
+    """
+    :ivar track_id: 트랙 번호 (1 부터 증가)
+    :ivar box: 마지막으로 연결된 박스 (x1, y1, x2, y2)
+    :ivar velocity: 중심 속도 (px/s), 지수 평균
+    :ivar hits: 연결된 프레임 수
+    :ivar misses: 마지막 연결 이후 연결되지 않은 프레임 수
+    :ivar still_since: 중심이 still_distance 안에 머물기 시작한 시각
+    """
+    def __init__(self, track_id, label, box, timestamp):
+        self.track_id = track_id
+        self.label = label
+        self.box = np.asarray(box, dtype=np.float64)
+        self.velocity = np.zeros(2)
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        self.misses = 0
+        self.anchor = self.center
+        self.still_since = timestamp
+
+    @property
+    def center(self):
+        return np.array([(self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2])
+
+    def age(self, now):
+        return now - self.first_seen
+
+    def still_time(self, now):
+        return now - self.still_since
+
+    def predict(self, now):
+        """
+        :return: now 시각의 예상 중심
+        """
+        return self.center + self.velocity * (now - self.last_seen)
+
+    def __repr__(self):
+        return 'Track(#{} {}, center=({:.0f}, {:.0f}), hits={}, misses={})'.format(
+            self.track_id, self.label, self.center[0], self.center[1], self.hits, self.misses)
+
+
+def box_iou(a, b):
+    """
+    :return: len(a) x len(b) IoU
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _greedy(score, valid, descending=True):
+    """
+    점수가 좋은 쌍부터 행/열이 겹치지 않게 선택
+
+    :param valid: 연결 가능한 쌍
+    :return: [(행, 열)]
+    """
+    pairs = []
+    if not valid.any():
+        return pairs
+    rows, cols = np.nonzero(valid)
+    order = np.argsort(-score[rows, cols] if descending else score[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    for row, col in zip(rows[order], cols[order]):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((int(row), int(col)))
+    return pairs
+
+
+class Tracker(object):
+    """
+    :param iou_threshold: IoU 로 연결하는 최소 IoU
+    :param max_distance: 중심 거리로 연결하는 최대 거리 (px, 예측 중심 기준)
+    :param max_age: 연결되지 않은 트랙을 유지하는 시간 (s)
+    :param min_hits: 확정 트랙이 되는 최소 연결 수 (한 프레임 오인식 제외)
+    :param still_distance: 정지로 보는 중심 이동 범위 (px)
+    :param smoothing: 속도 지수 평균 계수 (0 ~ 1, 클수록 최근 값 비중)
+    """
+    def __init__(self, iou_threshold=0.3, max_distance=40, max_age=1.0, min_hits=2, still_distance=8, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.still_distance = still_distance
+        self.smoothing = smoothing
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, labels, timestamp):
+        """
+        :param boxes: N x 4 (x1, y1, x2, y2)
+        :param labels: 박스별 라벨
+        :param timestamp: 프레임 촬영 시각 (s)
+        :return: 박스별 트랙 목록 (입력 순서)
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        labels = list(labels)
+        assigned = [None] * len(boxes)
+        tracks = self.tracks
+        if tracks and len(boxes):
+            same = np.array([[track.label == label for label in labels] for track in tracks], dtype=bool)
+            iou = box_iou(np.array([track.box for track in tracks]), boxes)
+            pairs = _greedy(iou, same & (iou >= self.iou_threshold))
+            matched_tracks = {row for row, _ in pairs}
+            matched_boxes = {col for _, col in pairs}
+
+            # IoU 로 연결되지 않은 트랙/박스는 예측 중심과의 거리로 연결 (빠르게 움직였거나 박스 크기가 바뀐 경우)
+            predicted = np.array([track.predict(timestamp) for track in tracks])
+            centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            distance = np.linalg.norm(predicted[:, None, :] - centers[None, :, :], axis=2)
+            free = np.ones_like(same)
+            free[list(matched_tracks), :] = False
+            free[:, list(matched_boxes)] = False
+            pairs += _greedy(distance, same & free & (distance <= self.max_distance), descending=False)
+            for row, col in pairs:
+                self._match(tracks[row], boxes[col], timestamp)
+                assigned[col] = tracks[row]
+
+        for track in tracks:
+            if track.last_seen != timestamp:
+                track.misses += 1
+        for index, box in enumerate(boxes):
+            if assigned[index] is None:
+                track = Track(next(self._ids), labels[index], box, timestamp)
+                self.tracks.append(track)
+                assigned[index] = track
+        self.tracks = [track for track in self.tracks if timestamp - track.last_seen <= self.max_age]
+        return assigned
+
+    def _match(self, track, box, timestamp):
+        previous = track.center
+        dt = timestamp - track.last_seen
+        track.box = box
+        track.hits += 1
+        track.misses = 0
+        if dt > 0:
+            track.velocity = (1 - self.smoothing) * track.velocity + self.smoothing * (track.center - previous) / dt
+        track.last_seen = timestamp
+        if np.linalg.norm(track.center - track.anchor) > self.still_distance:
+            track.anchor = track.center
+            track.still_since = timestamp
+
+    def active(self, label=None):
+        """
+        :return: 확정된 트랙 (min_hits 이상), label 을 지정하면 해당 라벨만
+        """
+        return [track for track in self.tracks
+                if track.hits >= self.min_hits and (label is None or track.label == label)]
+
+    def get(self, track_id):
+        return next((track for track in self.tracks if track.track_id == track_id), None)
+
+    def reset(self):
+        self.tracks = []
+
+
+def simulate(miss, dwell=1.0, fps=15, duration=10.0, jitter=2.0, seed=0):
+    """
+    y 가 비슷한 컵 두 개가 정지해 있고 각각 miss 확률로 인식이 빠질 때, dwell 초 정지 확인까지 걸린 시간 비교
+    - 기존 방식: 매 프레임 y 가 가장 큰 객체를 고르고, 이전 프레임 선택과 중심이 10 px 이상 다르면 타이머 재시작
+    - 트래커: 선택한 트랙 ID 를 유지하고, 트랙의 정지 시작 시각으로 판단
+
+    :return: (기존 방식 시간, 트래커 시간), 확인하지 못하면 None
+    """
+    rng = np.random.RandomState(seed)
+    cups = np.array([[200, 100, 240, 150], [300, 98, 340, 148]], dtype=np.float64)
+    tracker = Tracker()
+    last_center, start, legacy = None, None, None
+    selected, tracked = None, None
+    for frame in range(int(duration * fps)):
+        now = frame / fps
+        seen = rng.rand(len(cups)) >= miss
+        boxes = cups[seen] + rng.uniform(-jitter, jitter, (int(seen.sum()), 4))
+        tracker.update(boxes, ['cup'] * len(boxes), now)
+
+        if legacy is None and len(boxes):
+            center = (boxes[:, :2] + boxes[:, 2:])[np.argmax(boxes[:, 3])] / 2
+            if last_center is not None and np.linalg.norm(center - last_center) < 10:
+                start = now if start is None else start
+                if now - start >= dwell:
+                    legacy = now
+            else:
+                start = None
+            last_center = center
+
+        tracks = tracker.active('cup')
+        if tracked is None and tracks:
+            track = tracker.get(selected)
+            if track is None:
+                track = max(tracks, key=lambda t: t.box[3])
+                selected = track.track_id
+            if track.still_time(now) >= dwell:
+                tracked = now
+    return legacy, tracked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='tracker persistence simulation')
+    parser.add_argument('--miss', type=float, nargs='+', default=[0.0, 0.1, 0.2, 0.3])
+    parser.add_argument('--dwell', type=float, default=1.0)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args(argv)
+    print('{:>6} {:>12} {:>12}'.format('miss', 'legacy(s)', 'tracker(s)'))
+    for miss in args.miss:
+        results = [simulate(miss, args.dwell, seed=seed) for seed in range(args.runs)]
+        legacy = [r[0] for r in results if r[0] is not None]
+        tracked = [r[1] for r in results if r[1] is not None]
+        print('{:>6.2f} {:>12} {:>12}'.format(
+            miss, '{:.2f} ({}/{})'.format(np.mean(legacy), len(legacy), args.runs) if legacy else '-',
+            '{:.2f} ({}/{})'.format(np.mean(tracked), len(tracked), args.runs) if tracked else '-'))
+
+
+if __name__ == '__main__':
+    main()
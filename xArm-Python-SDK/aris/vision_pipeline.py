@@ -0,0 +1,307 @@
+"""
+캡처 / 인식 / 화면 표시 3단계 비전 파이프라인
+
+    캡처 스레드 --(최신 프레임 1장)--> 인식 스레드 (추론 + 판단) --(최신 결과 1개)--> 표시 스레드 (선택)
+
+- 단계 사이의 큐는 크기 1 (LatestSlot), 다음 단계가 아직 꺼내지 않은 항목은 새 항목이 들어오면 버림
+  -> 인식은 항상 가장 최근에 촬영된 프레임으로 하고, 화면 표시가 느려도 인식/판단은 기다리지 않음
+- 판단(decide)은 추론 직후 인식 스레드에서 실행하고, 마스크 오버레이 등 그리기는 표시 스레드에서 실행
+- 단계별 FPS, 버린 항목 수, 처리 시간, 프레임당 CPU 시간, 촬영 -> 판단 완료 지연 시간을 metrics() 로 제공
+- 헤드리스 모드: render=None 이고 판단 단계에서 NULL_DRAW 를 쓰면 그리기 비용이 전혀 없음
+"""
+import time
+import threading
+import traceback
+from collections import deque
+
+
+class LatestSlot(object):
+    """
+    크기 1 의 큐, 꺼내지 않은 항목은 새 항목으로 교체됨 (drop_count 증가)
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.drop_count = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.drop_count += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        :return: 가장 최근 항목, 닫혔거나 타임아웃이면 None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class RateMeter(object):
+    """
+    최근 window 초 동안의 초당 처리 횟수
+    """
+    def __init__(self, clock, window=2.0):
+        self.clock = clock
+        self.window = window
+        self._times = deque()
+
+    def tick(self):
+        now = self.clock()
+        self._times.append(now)
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+    def rate(self):
+        times = list(self._times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+
+class Frame(object):
+    __slots__ = ('frame_id', 'image', 'capture_time')
+
+    def __init__(self, frame_id, image, capture_time):
+        self.frame_id = frame_id
+        self.image = image
+        self.capture_time = capture_time    # read() 가 반환된 시각 (clock 기준)
+
+
+class FrameResult(object):
+    __slots__ = ('frame', 'detections', 'payload', 'decision_time')
+
+    def __init__(self, frame, detections, payload, decision_time):
+        self.frame = frame
+        self.detections = detections        # infer(image) 의 반환값
+        self.payload = payload              # decide(frame, detections) 의 반환값 (표시 단계로 전달)
+        self.decision_time = decision_time  # 판단이 끝난 시각
+
+    @property
+    def latency(self):
+        return self.decision_time - self.frame.capture_time
+
+
+class DrawList(object):
+    """
+    판단 단계에서 그릴 내용을 기록하고 표시 단계에서 한 번에 그림 (판단 단계는 이미지를 복사/수정하지 않음)
+    메서드는 같은 이름의 cv2 함수에서 첫 번째 인자(이미지)를 뺀 형태, ex: draw.putText(text, org, font, scale, color, 2)
+    """
+    def __init__(self):
+        self.masks = []     # (마스크, 색상), 오버레이는 도형보다 먼저 그림
+        self.ops = []
+
+    def mask(self, mask, color):
+        self.masks.append((mask, color))
+
+    def line(self, *args):
+        self.ops.append(('line', args))
+
+    def rectangle(self, *args):
+        self.ops.append(('rectangle', args))
+
+    def circle(self, *args):
+        self.ops.append(('circle', args))
+
+    def putText(self, *args):
+        self.ops.append(('putText', args))
+
+    def draw(self, image):
+        import cv2
+        for name, args in self.ops:
+            getattr(cv2, name)(image, *args)
+        return image
+
+
+class _NullDrawList(DrawList):
+    """
+    아무것도 기록하지 않는 DrawList (헤드리스 모드)
+    """
+    def _ignore(self, *args):
+        pass
+
+    mask = line = rectangle = circle = putText = _ignore
+
+
+NULL_DRAW = _NullDrawList()
+
+
+def _summary(values):
+    values = sorted(values)
+    if not values:
+        return {'count': 0, 'avg': 0, 'p50': 0, 'p95': 0, 'max': 0}
+    return {
+        'count': len(values),
+        'avg': sum(values) / len(values),
+        'p50': values[min(len(values) - 1, int(len(values) * 0.5))],
+        'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+        'max': values[-1],
+    }
+
+
+class VisionPipeline(object):
+    """
+    :param read: read() -> (ok, image), ex: cv2.VideoCapture.read, ok 가 False 이면 파이프라인 종료
+    :param infer: infer(image) -> detections, ex: YOLOMain.predict_on_image
+    :param infer_time: True 이면 infer(image, capture_time) 으로 호출 (ex: InferenceScheduler.infer)
+    :param decide: decide(frame, detections) -> payload, 인식 결과로 로봇 상태를 갱신 (인식 스레드)
+    :param render: render(result) -> False 이면 파이프라인 종료, None 이면 표시 스레드 없음
+    :param clock: 현재 시각 함수 (s), 기본은 time.monotonic
+    :param window: 처리 시간/지연 시간 통계에 쓰는 최근 프레임 수
+    """
+    def __init__(self, read, infer, decide, render=None, clock=None, window=200, infer_time=False):
+        self.read = read
+        self.infer = infer
+        self.infer_time = infer_time
+        self.decide = decide
+        self.render = render
+        self.clock = clock or time.monotonic
+
+        self._frames = LatestSlot()
+        self._results = LatestSlot()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._frame_count = 0
+        self._rates = {name: RateMeter(self.clock) for name in ('capture', 'infer', 'render')}
+        self._infer_times = deque(maxlen=window)
+        self._decide_times = deque(maxlen=window)
+        self._render_times = deque(maxlen=window)
+        self._infer_cpu = deque(maxlen=window)      # 프레임당 인식 스레드 CPU 시간 (추론 + 판단)
+        self._decide_cpu = deque(maxlen=window)
+        self._render_cpu = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self.last_result = None
+
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stopped.is_set()
+
+    def start(self):
+        self._stopped.clear()
+        targets = [('vision_capture', self._capture_loop), ('vision_infer', self._infer_loop)]
+        if self.render is not None:
+            targets.append(('vision_render', self._render_loop))
+        self._threads = [threading.Thread(target=target, name=name, daemon=True) for name, target in targets]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._frames.close()
+        self._results.close()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def run(self):
+        """
+        파이프라인을 시작하고 종료될 때까지 블로킹
+        """
+        self.start()
+        try:
+            self._stopped.wait()
+        finally:
+            self.stop()
+            self.join(5)
+
+    def _stage(self, name, loop):
+        try:
+            loop()
+        except Exception:
+            print('vision {} stage error:\n{}'.format(name, traceback.format_exc()))
+        finally:
+            self.stop()
+
+    # ----------------------------- 단계 -----------------------------
+
+    def _capture_loop(self):
+        def loop():
+            while not self._stopped.is_set():
+                ok, image = self.read()
+                capture_time = self.clock()
+                if not ok:
+                    print('카메라에서 프레임을 읽을 수 없습니다. 비전 파이프라인을 종료합니다.')
+                    return
+                self._frame_count += 1
+                self._frames.put(Frame(self._frame_count, image, capture_time))
+                self._rates['capture'].tick()
+        self._stage('capture', loop)
+
+    def _infer_loop(self):
+        def loop():
+            while not self._stopped.is_set():
+                frame = self._frames.get()
+                if frame is None:
+                    continue
+                start, cpu_start = self.clock(), time.thread_time()
+                if self.infer_time:
+                    detections = self.infer(frame.image, frame.capture_time)
+                else:
+                    detections = self.infer(frame.image)
+                infer_end, infer_cpu_end = self.clock(), time.thread_time()
+                payload = self.decide(frame, detections)
+                result = FrameResult(frame, detections, payload, self.clock())
+                cpu_end = time.thread_time()
+                self._infer_cpu.append(cpu_end - cpu_start)
+                self._decide_cpu.append(cpu_end - infer_cpu_end)
+                self._infer_times.append(infer_end - start)
+                self._decide_times.append(result.decision_time - infer_end)
+                self._latencies.append(result.latency)
+                self._rates['infer'].tick()
+                self.last_result = result
+                if self.render is not None:
+                    self._results.put(result)
+        self._stage('infer', loop)
+
+    def _render_loop(self):
+        def loop():
+            while not self._stopped.is_set():
+                result = self._results.get()
+                if result is None:
+                    continue
+                start, cpu_start = self.clock(), time.thread_time()
+                keep = self.render(result)
+                self._render_times.append(self.clock() - start)
+                self._render_cpu.append(time.thread_time() - cpu_start)
+                self._rates['render'].tick()
+                if keep is False:
+                    return
+        self._stage('render', loop)
+
+    # ----------------------------- 통계 -----------------------------
+
+    def fps(self):
+        """
+        :return: {'capture', 'infer', 'render'}, 단계별 최근 초당 처리 횟수
+        """
+        return {name: meter.rate() for name, meter in self._rates.items()}
+
+    def metrics(self):
+        """
+        :return: {'capture': {'fps', 'frames'}, 'infer': {'fps', 'dropped', 'time', 'decide_time', 'cpu', 'decide_cpu'},
+                  'render': {'fps', 'dropped', 'time', 'cpu'}, 'latency': 촬영 -> 판단 완료 (s)}
+                  dropped 는 다음 단계가 처리하기 전에 새 항목으로 교체되어 버려진 수
+                  cpu 는 프레임당 해당 스레드의 CPU 시간, 헤드리스 모드에서 줄어드는 CPU 는
+                  표시 모드의 render.cpu + (표시 모드와 헤드리스 모드의 decide_cpu 차이)
+        """
+        return {
+            'capture': {'fps': self._rates['capture'].rate(), 'frames': self._frame_count},
+            'infer': {'fps': self._rates['infer'].rate(), 'dropped': self._frames.drop_count,
+                      'time': _summary(self._infer_times), 'decide_time': _summary(self._decide_times),
+                      'cpu': _summary(self._infer_cpu), 'decide_cpu': _summary(self._decide_cpu)},
+            'render': {'fps': self._rates['render'].rate(), 'dropped': self._results.drop_count,
+                       'time': _summary(self._render_times), 'cpu': _summary(self._render_cpu)},
+            'latency': _summary(self._latencies),
+        }
@@ -0,0 +1,173 @@
+"""
+비전 인식 결과 공유 허브 (YOLO 스레드 -> 로봇 스레드)
+
+YOLOMain 이 프레임마다 인식 결과를 publish 하면, RobotMain 은 wait_for(predicate, timeout) 으로
+조건이 참이 되는 순간 바로 깨어나고 조건을 만족시킨 인식의 시각과 프레임 번호를 함께 받음
+"""
+import time
+import threading
+
+
+# 허브가 관리하는 필드와 기본값
+FIELDS = {
+    'A_ZONE': False,                # A 존 캡슐 인식
+    'B_ZONE': False,                # B 존 캡슐 인식
+    'C_ZONE': False,                # C 존 캡슐 인식
+    'NOT_SEAL': False,              # 씰 제거 확인
+    'cup_trash_detected': False,    # Storagy 위 컵 쓰레기 인식
+    'cup_trash_x': None,            # 컵 쓰레기 로봇 좌표 (mm)
+    'cup_trash_y': None,
+    'cup_holder_detected': False,   # Storagy 컵 홀더 인식
+    'cup_holder_x': None,           # 컵 홀더 로봇 좌표 (mm)
+    'cup_holder_y': None,
+}
+
+
+class PerceptionState(object):
+    """
+    허브 상태의 스냅샷, 필드는 속성으로 접근 (state.A_ZONE)
+    """
+    def __init__(self, values, stamps, frame_id, timestamp):
+        self._values = values
+        self._stamps = stamps
+        self.frame_id = frame_id        # 스냅샷 시점의 최신 프레임 번호
+        self.timestamp = timestamp      # 스냅샷 시점의 최신 갱신 시각
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_values'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def stamp(self, name):
+        """
+        :return: (변경 시각, 프레임 번호), 해당 필드가 마지막으로 바뀐 인식 정보
+        """
+        return self._stamps.get(name, (None, None))
+
+    def to_dict(self):
+        return dict(self._values)
+
+    def __repr__(self):
+        return 'PerceptionState(frame={}, {})'.format(self.frame_id, self._values)
+
+
+class PerceptionHub(object):
+    """
+    스레드 안전한 인식 상태 허브 (Condition 기반)
+    """
+    def __init__(self, fields=None, clock=None):
+        """
+        :param fields: {필드 이름: 기본값}, None 이면 FIELDS
+        :param clock: 대기에 사용할 시계 (aris.clock), None 이면 실제 시간
+        """
+        self._fields = dict(FIELDS if fields is None else fields)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._values = dict(self._fields)
+        self._stamps = {}
+        self._frame_id = 0
+        self._timestamp = 0
+        self._version = 0
+
+    @property
+    def frame_id(self):
+        return self._frame_id
+
+    def new_frame(self, timestamp=None):
+        """
+        새 프레임 시작, 이후 publish 는 이 프레임 번호로 기록됨
+
+        :return: 프레임 번호
+        """
+        with self._cond:
+            self._frame_id += 1
+            if timestamp is None:
+                timestamp = self._clock.time() if self._clock is not None else time.monotonic()
+            self._timestamp = timestamp
+            return self._frame_id
+
+    def publish(self, frame_id=None, **values):
+        """
+        인식 결과 갱신, 값이 바뀐 필드가 있으면 대기 중인 스레드를 깨움
+
+        :param frame_id: 인식한 프레임 번호, None 이면 현재 프레임
+        """
+        for name in values:
+            if name not in self._fields:
+                raise KeyError('unknown perception field: {}'.format(name))
+        with self._cond:
+            frame_id = self._frame_id if frame_id is None else frame_id
+            now = self._clock.time() if self._clock is not None else time.monotonic()
+            changed = False
+            for name, value in values.items():
+                if self._values[name] != value:
+                    self._values[name] = value
+                    self._stamps[name] = (now, frame_id)
+                    changed = True
+            if changed:
+                self._timestamp = now
+                self._version += 1
+                self._cond.notify_all()
+
+    def get(self, name):
+        with self._cond:
+            return self._values[name]
+
+    def reset(self, *names):
+        """
+        필드를 기본값으로 초기화, 인자가 없으면 전체 초기화
+        """
+        names = names or tuple(self._fields.keys())
+        self.publish(**{name: self._fields[name] for name in names})
+
+    def _snapshot(self):
+        return PerceptionState(dict(self._values), dict(self._stamps), self._frame_id, self._timestamp)
+
+    def snapshot(self):
+        with self._cond:
+            return self._snapshot()
+
+    def wait_for(self, predicate, timeout=None):
+        """
+        predicate(state) 가 참이 될 때까지 대기
+
+        :param predicate: PerceptionState 를 받아 bool 을 반환하는 함수
+        :param timeout: 최대 대기 시간 (s), None 이면 무한 대기
+        :return: 조건을 만족한 PerceptionState, 타임아웃이면 None
+        """
+        now = self._clock.time if self._clock is not None else time.monotonic
+        expired = None if timeout is None else now() + timeout
+        with self._cond:
+            while True:
+                state = self._snapshot()
+                if predicate(state):
+                    return state
+                remaining = None if expired is None else expired - now()
+                if remaining is not None and remaining <= 0:
+                    return None
+                if self._clock is not None:
+                    self._clock.wait(self._cond, remaining)
+                else:
+                    self._cond.wait(remaining)
+
+    def wake_all(self):
+        """
+        대기 중인 스레드를 깨워 predicate 를 다시 평가하게 함 (종료 플래그 확인 등)
+        """
+        with self._cond:
+            self._cond.notify_all()
+
+
+def perception_property(name):
+    """
+    self.perception (PerceptionHub) 의 필드를 읽고 쓰는 클래스 속성
+    ex: A_ZONE = perception_property('A_ZONE')
+    """
+    def fget(self):
+        return self.perception.get(name)
+
+    def fset(self, value):
+        self.perception.publish(**{name: value})
+
+    return property(fget, fset)
@@ -0,0 +1,268 @@
+"""
+ROI 구역 판정 및 체류 시간 엔진 (캡슐 A/B/C 존, 씰 확인, 컵/컵홀더 구역)
+
+기존 방식은 인식된 객체마다 구역별 함수를 따로 호출해 교차 영역을 파이썬 스칼라 연산으로 계산하고
+매 프레임 진행 상황을 출력함
+ZoneEngine 은 한 프레임의 모든 박스 (N x 4) 와 모든 구역 (Z x 4) 의 교차 비율을 numpy 연산 한 번으로 계산하고
+구역별 상태를 벡터로 갱신함
+
+- 'overlap' 구역: (박스와 구역의 교차 면적 / 박스 면적) >= ratio 인 박스가 있으면 객체 있음
+- 'center'  구역: 박스 중심이 구역 안 (경계 포함) 에 있으면 객체 있음
+- 히스테리시스: 객체가 있는 구역은 exit_ratio (ratio 이하) 만 넘어도 계속 있음으로 판단
+- 디바운스: 객체가 miss_frames 프레임 연속으로 보이지 않아야 구역을 벗어난 것으로 판단 (인식 깜빡임 무시)
+- 체류 시간: 들어온 뒤 dwell 초가 지나면 stable
+
+이벤트 ('entered', 'stable', 'left') 는 상태가 바뀐 프레임에서 한 번만 발생
+
+벤치마크: python -m aris.zones [--zones 6 24 48] [--objects 10 40]
+"""
+import time
+import argparse
+import threading
+
+import numpy as np
+
+
+ENTERED = 'entered'
+STABLE = 'stable'
+LEFT = 'left'
+
+
+class Zone(object):
+    """
+    :param name: 구역 이름, ex: 'A_ZONE'
+    :param roi: (x, y, w, h) 픽셀
+    :param labels: 이 구역에서 판정할 객체 라벨
+    :param mode: 'overlap' 또는 'center'
+    :param ratio: 들어옴으로 판단하는 교차 비율 (overlap)
+    :param exit_ratio: 이미 들어온 객체를 계속 있음으로 판단하는 교차 비율, None 이면 ratio
+    :param dwell: stable 까지의 체류 시간 (s)
+    :param miss_frames: 벗어남으로 판단하기 전까지 허용하는 연속 미인식 프레임 수
+    """
+    def __init__(self, name, roi, labels, mode='overlap', ratio=0.8, exit_ratio=None, dwell=0, miss_frames=0):
+        if mode not in ('overlap', 'center'):
+            raise ValueError('unknown zone mode: {}'.format(mode))
+        self.name = name
+        self.roi = tuple(roi)
+        self.labels = tuple(labels)
+        self.mode = mode
+        self.ratio = ratio
+        self.exit_ratio = ratio if exit_ratio is None else exit_ratio
+        self.dwell = dwell
+        self.miss_frames = miss_frames
+
+    def __repr__(self):
+        return 'Zone({}, roi={}, labels={}, mode={})'.format(self.name, self.roi, self.labels, self.mode)
+
+
+class ZoneFrame(object):
+    """
+    ZoneEngine.update 의 결과 (한 프레임)
+    """
+    def __init__(self, names, hits, ratios, present, stable, events):
+        self._index = {name: i for i, name in enumerate(names)}
+        self.hits = hits            # N x Z, 박스 i 가 구역 j 의 조건을 만족하면 True
+        self.ratios = ratios        # N x Z, 교차 비율 (center 구역은 0 또는 1)
+        self.present = present      # {구역 이름: 객체 있음 (디바운스 적용)}
+        self.stable = stable        # {구역 이름: 체류 시간 경과}
+        self.events = events        # [{'event', 'zone', 'time', 'elapsed': 들어온 뒤 지난 시간}]
+
+    def members(self, name):
+        """
+        :return: 이 프레임에서 구역 조건을 만족한 박스 번호 배열
+        """
+        return np.flatnonzero(self.hits[:, self._index[name]])
+
+    def contains(self, name, index):
+        return bool(self.hits[index, self._index[name]])
+
+
+class ZoneEngine(object):
+    """
+    :param zones: Zone 목록
+    :param on_event: on_event(event), update 안에서 이벤트마다 호출
+    """
+    def __init__(self, zones, on_event=None):
+        self.zones = list(zones)
+        self.names = [zone.name for zone in self.zones]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError('duplicate zone names')
+        self.on_event = on_event
+
+        rois = np.array([zone.roi for zone in self.zones], dtype=np.float64).reshape(-1, 4)
+        self._rects = np.concatenate([rois[:, :2], rois[:, :2] + rois[:, 2:]], axis=1)     # Z x (x1, y1, x2, y2)
+        self._center = np.array([zone.mode == 'center' for zone in self.zones], dtype=bool)
+        self._enter = np.array([zone.ratio for zone in self.zones], dtype=np.float64)
+        self._exit = np.array([zone.exit_ratio for zone in self.zones], dtype=np.float64)
+        self._dwell = np.array([zone.dwell for zone in self.zones], dtype=np.float64)
+        self._miss_limit = np.array([zone.miss_frames for zone in self.zones], dtype=np.int64)
+
+        # 라벨 번호 x 구역 판정 대상 여부, 마지막 행은 어느 구역에도 없는 라벨
+        self._vocab = {}
+        for zone in self.zones:
+            for label in zone.labels:
+                self._vocab.setdefault(label, len(self._vocab))
+        self._label_zones = np.zeros((len(self._vocab) + 1, len(self.zones)), dtype=bool)
+        for j, zone in enumerate(self.zones):
+            for label in zone.labels:
+                self._label_zones[self._vocab[label], j] = True
+
+        self._lock = threading.Lock()
+        self._present = np.zeros(len(self.zones), dtype=bool)
+        self._stable = np.zeros(len(self.zones), dtype=bool)
+        self._misses = np.zeros(len(self.zones), dtype=np.int64)
+        self._enter_time = np.full(len(self.zones), np.nan)
+
+    def label_ids(self, labels):
+        unknown = len(self._vocab)
+        return np.fromiter((self._vocab.get(label, unknown) for label in labels), dtype=np.int64, count=len(labels))
+
+    def ratios(self, boxes):
+        """
+        :param boxes: N x 4 (x1, y1, x2, y2)
+        :return: N x Z 교차 비율, center 구역은 중심이 안에 있으면 1
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        bx1, by1, bx2, by2 = (boxes[:, i:i + 1] for i in range(4))
+        rx1, ry1, rx2, ry2 = (self._rects[None, :, i] for i in range(4))
+        width = np.clip(np.minimum(bx2, rx2) - np.maximum(bx1, rx1), 0, None)
+        height = np.clip(np.minimum(by2, ry2) - np.maximum(by1, ry1), 0, None)
+        area = np.maximum((bx2 - bx1) * (by2 - by1), 1e-9)
+        overlap = width * height / area
+        if not self._center.any():
+            return overlap
+        cx, cy = (bx1 + bx2) / 2, (by1 + by2) / 2
+        inside = ((rx1 <= cx) & (cx <= rx2) & (ry1 <= cy) & (cy <= ry2)).astype(np.float64)
+        return np.where(self._center[None, :], inside, overlap)
+
+    def update(self, boxes, labels, timestamp=None):
+        """
+        프레임마다 인식 스레드에서 호출
+
+        :param boxes: N x 4 (x1, y1, x2, y2) 박스 배열
+        :param labels: 박스별 라벨 이름 목록
+        :param timestamp: 프레임 촬영 시각 (s), None 이면 time.monotonic()
+        :return: ZoneFrame
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        ratios = self.ratios(boxes)
+        match = self._label_zones[self.label_ids(labels)]
+        with self._lock:
+            threshold = np.where(self._present, self._exit, self._enter)
+            hits = match & (ratios >= threshold[None, :])
+            detected = hits.any(axis=0)
+
+            self._misses = np.where(detected, 0, self._misses + self._present)
+            entered = detected & ~self._present
+            left = self._present & ~detected & (self._misses > self._miss_limit)
+            self._present = (self._present | entered) & ~left
+            self._enter_time = np.where(entered, now, self._enter_time)
+            elapsed = now - self._enter_time
+            self._enter_time[left] = np.nan
+            became_stable = self._present & ~self._stable & (elapsed >= self._dwell)
+            self._stable = (self._stable | became_stable) & self._present
+            self._misses[left] = 0
+
+            events = []
+            for kind, flags in ((ENTERED, entered), (STABLE, became_stable), (LEFT, left)):
+                for j in np.flatnonzero(flags):
+                    events.append({'event': kind, 'zone': self.names[j], 'time': now,
+                                   'elapsed': float(elapsed[j])})
+            present = dict(zip(self.names, self._present.tolist()))
+            stable = dict(zip(self.names, self._stable.tolist()))
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return ZoneFrame(self.names, hits, ratios, present, stable, events)
+
+    def peek(self, boxes, labels):
+        """
+        구역 상태를 바꾸지 않고 박스별 구역 판정만 계산 (이번 프레임에 구역 관련 추론이 없었을 때)
+
+        :return: ZoneFrame, events 는 빈 목록
+        """
+        ratios = self.ratios(boxes)
+        match = self._label_zones[self.label_ids(labels)]
+        with self._lock:
+            threshold = np.where(self._present, self._exit, self._enter)
+            present = dict(zip(self.names, self._present.tolist()))
+            stable = dict(zip(self.names, self._stable.tolist()))
+        return ZoneFrame(self.names, match & (ratios >= threshold[None, :]), ratios, present, stable, [])
+
+    def reset(self, *names):
+        """
+        구역 상태 초기화 (다른 스레드에서 호출 가능), 객체가 계속 있으면 다음 프레임에서 다시 entered 부터 시작
+        인자가 없으면 전체 초기화
+        """
+        index = [self.names.index(name) for name in names] if names else slice(None)
+        with self._lock:
+            self._present[index] = False
+            self._stable[index] = False
+            self._misses[index] = 0
+            self._enter_time[index] = np.nan
+
+    def state(self):
+        """
+        :return: {구역 이름: {'present', 'stable', 'since'}}, since 는 들어온 시각 (update 의 timestamp 기준)
+        """
+        with self._lock:
+            return {name: {'present': bool(self._present[j]), 'stable': bool(self._stable[j]),
+                           'since': None if np.isnan(self._enter_time[j]) else float(self._enter_time[j])}
+                    for j, name in enumerate(self.names)}
+
+
+# ============================= 벤치마크 =============================
+
+def scalar_ratio(box, roi):
+    """
+    기존 방식 (박스 하나, 구역 하나의 교차 비율)
+    """
+    x1, y1, x2, y2 = box
+    rx, ry, rw, rh = roi
+    intersection_area = max(0, min(x2, rx + rw) - max(x1, rx)) * max(0, min(y2, ry + rh) - max(y1, ry))
+    return intersection_area / max((x2 - x1) * (y2 - y1), 1e-9)
+
+
+def benchmark(zone_counts=(6, 24, 48), object_counts=(10, 40), repeat=200, shape=(480, 640)):
+    """
+    :return: [(구역 수, 객체 수, 기존 방식 ms, 엔진 ms)], 프레임당 시간
+    """
+    rng = np.random.default_rng(0)
+    results = []
+    for zone_count in zone_counts:
+        zones = [Zone('zone{}'.format(i), (int(rng.integers(0, shape[1] - 90)), int(rng.integers(0, shape[0] - 90)), 90, 90),
+                      ('capsule',), dwell=2, miss_frames=2) for i in range(zone_count)]
+        for object_count in object_counts:
+            xy = rng.integers(0, [shape[1] - 60, shape[0] - 60], (object_count, 2))
+            boxes = np.concatenate([xy, xy + rng.integers(20, 60, (object_count, 2))], axis=1)
+            labels = ['capsule'] * object_count
+            engine = ZoneEngine(zones)
+            box_list = [tuple(int(v) for v in box) for box in boxes]
+
+            start = time.perf_counter()
+            for frame in range(repeat):
+                hits = [[label in zone.labels and scalar_ratio(box, zone.roi) >= zone.ratio for zone in zones]
+                        for box, label in zip(box_list, labels)]
+            loop_ms = (time.perf_counter() - start) / repeat * 1000
+
+            start = time.perf_counter()
+            for frame in range(repeat):
+                engine.update(boxes, labels, frame / 30.0)
+            engine_ms = (time.perf_counter() - start) / repeat * 1000
+            results.append((zone_count, object_count, loop_ms, engine_ms))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='zone engine benchmark')
+    parser.add_argument('--zones', type=int, nargs='+', default=[6, 24, 48])
+    parser.add_argument('--objects', type=int, nargs='+', default=[10, 40])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+    print('{:>6} {:>8} {:>12} {:>12}'.format('zones', 'objects', 'scalar(ms)', 'engine(ms)'))
+    for zone_count, object_count, loop_ms, engine_ms in benchmark(args.zones, args.objects, args.repeat):
+        print('{:>6} {:>8} {:>12.3f} {:>12.3f}'.format(zone_count, object_count, loop_ms, engine_ms))
+
+
+if __name__ == '__main__':
+    main()
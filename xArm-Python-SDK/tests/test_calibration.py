@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from aris.calibration import CameraCalibration, apply_homography, load_intrinsics
+
+CAMERA = [[100, 100], [540, 100], [540, 380], [100, 380], [320, 240]]
+HOMOGRAPHY = np.array([[0.5, 0.02, 10.0], [-0.01, 0.45, -30.0], [1e-5, 2e-5, 1.0]])
+MTX = np.array([[600.0, 0, 320], [0, 600.0, 240], [0, 0, 1]])
+DIST = np.array([[-0.05, 0.01, 0, 0, 0]])
+
+
+def test_apply_homography_matches_per_point():
+    points = np.random.default_rng(0).uniform(0, 640, (20, 2))
+    expected = []
+    for x, y in points:
+        u, v, w = HOMOGRAPHY @ [x, y, 1]
+        expected.append([u / w, v / w])
+    assert np.allclose(apply_homography(HOMOGRAPHY, points), expected)
+    assert apply_homography(HOMOGRAPHY, [1, 2]).shape == (1, 2)
+
+
+def test_load_intrinsics(tmp_path):
+    assert load_intrinsics(None) == (None, None)
+    assert load_intrinsics(str(tmp_path / 'missing.npz')) == (None, None)
+    path = str(tmp_path / 'calibration_data.npz')
+    np.savez(path, mtx=MTX, dist=DIST)
+    mtx, dist = load_intrinsics(path)
+    assert np.allclose(mtx, MTX) and np.allclose(dist, DIST)
+
+
+def test_homography_without_distortion():
+    pytest.importorskip('cv2')
+    robot = apply_homography(HOMOGRAPHY, CAMERA)
+    calibration = CameraCalibration(CAMERA, robot, size=None)
+    assert calibration.map is None
+    assert np.allclose(calibration.transform([[200, 300], [0, 0]]), apply_homography(HOMOGRAPHY, [[200, 300], [0, 0]]),
+                       atol=1e-3)
+    assert calibration.reprojection_error()['max'] < 1e-3
+
+
+def test_lookup_map_matches_direct_inside_and_outside_image():
+    pytest.importorskip('cv2')
+    robot = apply_homography(HOMOGRAPHY, CAMERA)
+    calibration = CameraCalibration(CAMERA, robot, mtx=MTX, dist=DIST, size=(640, 480))
+    assert calibration.map.shape == (480, 640, 2)
+    points = np.array([[0.5, 0.5], [320.25, 240.75], [639, 479], [-10, 50], [700, 500]])
+    assert np.abs(calibration.transform(points) - calibration.direct(points)).max() < 0.01
+    error = calibration.reprojection_error()
+    assert error['map_max'] < 0.01 and len(error['errors']) == len(CAMERA)
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from aris.clock import RealClock, VirtualClock
+
+
+def test_virtual_sleep_runs_events_in_time_order():
+    clock = VirtualClock(5.0)
+    fired = []
+    clock.call_later(3, lambda: fired.append(('b', clock.time())))
+    clock.call_at(6, lambda: fired.append(('a', clock.time())))
+    clock.call_at(6, lambda: fired.append(('a2', clock.time())))
+    clock.call_at(1, lambda: fired.append(('past', clock.time())))
+    clock.sleep(2)
+    assert fired == [('past', 5.0), ('a', 6.0), ('a2', 6.0)] and clock.time() == 7.0
+    clock.sleep_until(20)
+    assert fired[-1] == ('b', 8.0) and clock.time() == 20.0
+    clock.sleep(-1)
+    assert clock.time() == 20.0
+
+
+def test_event_can_schedule_more_events():
+    clock = VirtualClock()
+    ticks = []
+
+    def tick():
+        ticks.append(clock.time())
+        if len(ticks) < 3:
+            clock.call_later(1, tick)
+
+    clock.call_later(1, tick)
+    clock.sleep(10)
+    assert ticks == [1, 2, 3]
+
+
+def test_virtual_wait_advances_to_next_event_or_timeout():
+    clock = VirtualClock()
+    cond = threading.Condition()
+    clock.call_later(2, lambda: None)
+    with cond:
+        assert clock.wait(cond, timeout=5) is True and clock.time() == 2
+        assert clock.wait(cond, timeout=1) is False and clock.time() == 3
+        with pytest.raises(RuntimeError):
+            clock.wait(cond)
+
+
+def test_real_clock():
+    clock = RealClock()
+    start = clock.time()
+    clock.sleep(0.01)
+    clock.sleep(-1)
+    assert 0.01 <= clock.time() - start < 0.5
+    cond = threading.Condition()
+    with cond:
+        assert clock.wait(cond, 0.01) is False
+    assert not clock.virtual and VirtualClock.virtual
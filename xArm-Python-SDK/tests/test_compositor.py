@@ -0,0 +1,61 @@
+import threading
+
+import numpy as np
+import pytest
+
+from aris.compositor import MaskCompositor, overlay_loop, _random_masks
+
+
+def blend(pixel, color, alpha=0.3):
+    return (1 - alpha) * np.asarray(pixel, dtype=float) + alpha * np.asarray(color, dtype=float)
+
+
+def test_single_mask_blend_within_one_level():
+    image = np.full((4, 6, 3), 200, dtype=np.uint8)
+    mask = np.zeros((4, 6), dtype=np.float32)
+    mask[1:3, 2:5] = 1
+    out = MaskCompositor(alpha=0.3).composite(image, [mask], [(0, 0, 255)])
+    assert np.abs(out[1, 2].astype(int) - blend(200, (0, 0, 255))).max() <= 1
+    assert (out[0] == 200).all() and (out[:, :2] == 200).all()
+    assert (image == 200).all()
+
+
+def test_overlap_takes_top_mask_and_label_map_is_upscaled():
+    compositor = MaskCompositor()
+    masks = np.zeros((2, 2, 2), dtype=np.float32)
+    masks[0, 0, :] = 1
+    masks[1, :, 0] = 1
+    labels = compositor.label_map(masks, (4, 4))
+    assert labels.tolist() == [[2, 2, 1, 1], [2, 2, 1, 1], [2, 2, 0, 0], [2, 2, 0, 0]]
+
+
+def test_no_masks_returns_copy():
+    image = np.random.default_rng(0).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    out = MaskCompositor().composite(image, [], [])
+    assert out is not image and (out == image).all()
+
+
+def test_matches_overlay_loop_without_overlap():
+    cv2 = pytest.importorskip('cv2')
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    masks = np.zeros((2, 24, 32), dtype=np.float32)
+    masks[0, 2:10, 2:10] = 1
+    masks[1, 14:20, 16:30] = 1
+    colors = [(255, 0, 0), (0, 200, 100)]
+    expected = overlay_loop(image, masks, colors)
+    out = MaskCompositor().composite(image, masks, colors)
+    assert np.abs(out.astype(int) - expected.astype(int)).max() <= 2
+
+
+def test_output_buffer_is_per_thread():
+    compositor = MaskCompositor()
+    masks = _random_masks(3, (24, 32), np.random.default_rng(2))
+    image = np.zeros((24, 32, 3), dtype=np.uint8)
+    first = compositor.composite(image, masks, [(255, 255, 255)] * 3)
+    assert compositor.composite(image, masks, [(255, 255, 255)] * 3) is first
+    other = []
+    thread = threading.Thread(target=lambda: other.append(compositor.composite(image, masks, [(9, 9, 9)] * 3)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
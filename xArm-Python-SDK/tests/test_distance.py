@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from aris.distance import DistanceEngine, stack_points, decimate, record_frame, _load_frames, _dense_reference
+
+
+def random_points(rng, count, offset):
+    return (rng.integers(0, 200, (count, 2)) + offset).astype(np.int32)
+
+
+def test_brute_matches_dense_reference_across_blocks():
+    rng = np.random.default_rng(0)
+    engine = DistanceEngine('brute', block_size=7)
+    for _ in range(20):
+        robot, human = random_points(rng, 50, 0), random_points(rng, 40, 150)
+        distance, robot_point, human_point = engine.compute(robot, human)
+        assert distance == pytest.approx(_dense_reference(robot, human))
+        assert distance == pytest.approx(np.hypot(robot_point[0] - human_point[0], robot_point[1] - human_point[1]))
+    assert engine.last_time > 0
+
+
+def test_kdtree_matches_brute():
+    pytest.importorskip('scipy')
+    rng = np.random.default_rng(1)
+    robot, human = random_points(rng, 300, 0), random_points(rng, 300, 100)
+    assert DistanceEngine('kdtree').compute(robot, human)[0] == pytest.approx(DistanceEngine('brute').compute(robot, human)[0])
+
+
+def test_transform_is_not_farther_than_contour_distance():
+    pytest.importorskip('cv2')
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[20:40, 20:40] = 1
+    robot = np.array([[20, 20], [39, 20], [39, 39], [20, 39]], dtype=np.int32)
+    human = np.array([[60, 30], [70, 50]], dtype=np.int32)
+    distance, robot_point, _ = DistanceEngine('transform').compute(robot, human, robot_mask=mask)
+    assert distance == pytest.approx(21) and robot_point[0] == 39
+    assert distance <= _dense_reference(robot, human)
+
+
+def test_missing_side_and_contour_helpers():
+    engine = DistanceEngine('brute')
+    assert engine.compute([], [[0, 0]]) is None
+    contours = [np.array([[[1, 2]], [[3, 4]]]), np.array([[[5, 6]]])]
+    assert stack_points(contours).tolist() == [[1, 2], [3, 4], [5, 6]]
+    points = np.arange(20).reshape(10, 2)
+    assert len(decimate(points, 3)) == 3 and decimate(points, None) is points
+    with pytest.raises(ValueError):
+        DistanceEngine('exact')
+
+
+def test_decimation_error_is_bounded_by_point_spacing():
+    robot = np.stack([np.full(400, 100), np.arange(400)], axis=1).astype(np.int32)
+    steps = np.arange(499, -1, -1)
+    human = np.stack([150 + steps, steps], axis=1).astype(np.int32)
+    exact = DistanceEngine('brute').compute(robot, human)[0]
+    approx = DistanceEngine('brute', max_points=100).compute(robot, human)[0]
+    # 로봇 점 간격 4, 사람 점 간격 5 * sqrt(2)
+    assert exact == 50 and exact < approx <= exact + 4 + 5 * np.sqrt(2)
+
+
+def test_record_and_load_frames(tmp_path):
+    record_frame(str(tmp_path / 'frame.npz'), [np.array([[[1, 2]]])], np.array([[3, 4]]), np.ones((4, 4)))
+    (name, robot, human, mask), = _load_frames(str(tmp_path))
+    assert name == 'frame.npz' and robot.tolist() == [[1, 2]] and human.tolist() == [[3, 4]]
+    assert mask.dtype == np.uint8 and mask.all()
@@ -0,0 +1,51 @@
+import pytest
+
+# the dry run imports the ARIS script, which needs the vision packages
+for name in ('cv2', 'scipy', 'ultralytics'):
+    pytest.importorskip(name)
+
+from aris.dryrun import DryRun, load_robot_main
+from aris.scheduler import GREETING, QUEUED, SERVED, FAILED
+
+ORDER = {'topping1': 1, 'topping2': 0, 'topping3': 0}
+
+
+@pytest.fixture(scope='module')
+def robot_main_class():
+    return load_robot_main()
+
+
+def test_orders_are_served(robot_main_class):
+    dry_run = DryRun(robot_main_class, batch_size=2)
+    orders = dry_run.run([ORDER, ORDER])
+    dry_run.close()
+    assert [order.state for order in orders] == [SERVED, SERVED]
+    assert dry_run.robot.batch_history[0][0] == 2
+
+
+def test_seal_fail_requeues_then_serves(robot_main_class):
+    dry_run = DryRun(robot_main_class, seal_fail=1)
+    order, = dry_run.run([ORDER])
+    dry_run.close()
+    assert order.state == SERVED and order.attempts == 2
+
+
+def test_controller_error_is_not_served(robot_main_class):
+    dry_run = DryRun(robot_main_class)
+    dry_run.arm.inject_error('set_cgpio_digital', 22, ionum=3, value=1)    # press start
+    states = []
+    dry_run.robot.scheduler.register_listener(lambda order: states.append(order.state))
+    order, = dry_run.run([ORDER])
+    dry_run.close()
+    assert SERVED not in states
+    assert order.state == QUEUED and order.reason == 'robot stopped'
+
+
+def test_greeting_error_is_failed(robot_main_class):
+    dry_run = DryRun(robot_main_class)
+    dry_run.arm.inject_error('set_servo_angle', 22)
+    order = dry_run.robot.scheduler.submit(GREETING, ('Female', 20))
+    dry_run.robot.run_robot()
+    dry_run.close()
+    assert order.state == FAILED and order.reason == 'robot stopped'
+
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from xarm.tools.motion_estimator import MotionEstimator, scurve_time
+
+
+def test_scurve_trapezoid_and_triangle():
+    # 0.1s acceleration, 0.9s cruise, 0.1s deceleration
+    assert scurve_time(100, 100, 1000) == pytest.approx((1.1, 0.1))
+    # the peak speed is not reached
+    assert scurve_time(1, 100, 1000) == pytest.approx((2 * math.sqrt(0.001), math.sqrt(0.001)))
+    assert scurve_time(0, 100, 1000) == (0.0, 0.0)
+
+
+def test_jerk_makes_moves_longer_and_continuous():
+    trapezoid, _ = scurve_time(100, 100, 1000)
+    scurve, _ = scurve_time(100, 100, 1000, 1000)
+    assert scurve > trapezoid
+    # monotonic in the distance, also around the profile boundaries
+    times = [scurve_time(d, 100, 1000, 1000)[0] for d in range(1, 200)]
+    assert all(b >= a for a, b in zip(times, times[1:]))
+
+
+def test_estimate_position_from_start_and_relative():
+    estimator = MotionEstimator(tcp_jerk=0)
+    start = [0, 0, 0, 180, 0, 0]
+    absolute = estimator.estimate_position(x=100, y=0, z=0, speed=100, mvacc=1000, start=start)
+    assert absolute == pytest.approx(1.1)
+    estimator.position = [0, 0, 0, math.pi, 0, 0]
+    assert estimator.estimate_position(x=100, relative=True, speed=100, mvacc=1000) == pytest.approx(1.1)
+
+
+def test_servo_angle_uses_largest_joint():
+    estimator = MotionEstimator(joint_jerk=0)
+    one = estimator.estimate_servo_angle(angle=[90, 0, 0, 0, 0, 0], speed=90, mvacc=900)
+    both = estimator.estimate_servo_angle(angle=[90, 45, 0, 0, 0, 0], speed=90, mvacc=900)
+    assert one == pytest.approx(both) == pytest.approx(1.1)
+
+
+def test_sequence_blending_and_sleep():
+    estimator = MotionEstimator(tcp_jerk=0)
+    estimator.position = [0, 0, 0, math.pi, 0, 0]
+    moves = [('position', {'x': 100, 'speed': 100, 'mvacc': 1000, 'radius': 5}),
+             ('position', {'x': 200, 'speed': 100, 'mvacc': 1000}),
+             ('sleep', 0.5)]
+    total, durations = estimator.estimate_sequence(moves)
+    assert durations == pytest.approx([1.1, 1.0, 0.5])
+    assert total == pytest.approx(2.6)
+    stopped = [('position', dict(params, radius=0)) if kind == 'position' else (kind, params) for kind, params in moves]
+    assert estimator.estimate_sequence(stopped)[0] == pytest.approx(2.7)
+    assert estimator.position[0] == 0
+    estimator.estimate_sequence(moves, update=True)
+    assert estimator.position[0] == 200
+    with pytest.raises(ValueError):
+        estimator.estimate_sequence([('circle', {})])
+
+
+def test_fit_calibration():
+    estimator = MotionEstimator(tcp_jerk=0)
+    for estimated in (1.0, 2.0, 4.0):
+        estimator.add_sample(MotionEstimator.TCP, estimated, 1.5 * estimated + 0.2)
+    calibration = estimator.fit()
+    assert calibration['tcp'] == pytest.approx([1.5, 0.2])
+    assert calibration['joint'] == [1.0, 0.0]
+    start = [0, 0, 0, 180, 0, 0]
+    assert estimator.estimate_position(x=100, speed=100, mvacc=1000, start=start) == pytest.approx(1.5 * 1.1 + 0.2)
+    estimator.calibration = {'tcp': [1, 0]}
+    estimator.clear_samples()
+    assert estimator.fit()['tcp'] == [1.0, 0.0]
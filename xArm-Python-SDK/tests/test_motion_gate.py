@@ -0,0 +1,55 @@
+import numpy as np
+
+from aris.motion_gate import MotionGate
+
+
+def frame(value=100, noise=0, seed=0):
+    image = np.full((96, 128, 3), value, dtype=np.int16)
+    if noise:
+        image += np.random.default_rng(seed).integers(-noise, noise + 1, image.shape, dtype=np.int16)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def test_signature_is_block_mean_brightness():
+    gate = MotionGate(step=4, block=8)
+    image = frame(0)
+    image[:32, :32] = 255
+    signature = gate.signature(image)
+    assert signature.shape == (3, 4)
+    assert signature[0, 0] == 255 and signature[0, 1] == 0 and signature[2, 3] == 0
+    assert gate.signature(image, crop=(0, 0, 32, 32)).tolist() == [[255.0]]
+
+
+def test_first_frame_changes_then_noise_is_ignored():
+    gate = MotionGate(threshold=8)
+    changed, signature = gate.check('cam', frame(noise=20))
+    assert changed
+    gate.set_reference('cam', signature)
+    for seed in range(1, 6):
+        assert not gate.check('cam', frame(noise=20, seed=seed))[0]
+    assert gate.cost() > 0
+
+
+def test_small_object_is_detected():
+    gate = MotionGate(threshold=8)
+    gate.set_reference('cam', gate.check('cam', frame())[1])
+    image = frame()
+    image[40:56, 40:56] = 255    # 32 x 32 px 블록 하나의 1/4 크기 물체
+    assert gate.check('cam', image)[0]
+
+
+def test_slow_drift_accumulates_against_last_inference():
+    gate = MotionGate(threshold=8)
+    gate.set_reference('cam', gate.check('cam', frame(100))[1])
+    changed = [gate.check('cam', frame(100 + i * 3))[0] for i in range(1, 5)]
+    assert changed == [False, False, True, True]
+
+
+def test_keys_and_crops_are_independent():
+    gate = MotionGate()
+    gate.set_reference('a', gate.check('a', frame(), crop=(0, 0, 64, 64))[1])
+    assert not gate.check('a', frame(), crop=(0, 0, 64, 64))[0]
+    assert gate.check('a', frame(), crop=(0, 0, 128, 64))[0]
+    assert gate.check('b', frame())[0]
+    gate.forget('a')
+    assert gate.check('a', frame(), crop=(0, 0, 64, 64))[0]
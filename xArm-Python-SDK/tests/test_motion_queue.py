@@ -0,0 +1,112 @@
+import time
+import threading
+
+from xarm.tools.motion_queue import MotionQueue
+from xarm.x3.code import APIState
+
+
+class FakeCore(object):
+    """
+    Controller buffer stand-in: every command goes into the buffer, each report wait runs one command
+    """
+    _max_cmd_num = 512
+
+    def __init__(self, codes=None, running=True):
+        self.connected = True
+        self.cmd_num = 0
+        self._last_report_time = time.monotonic()
+        self.codes = codes or {}    # call index -> return code
+        self.running = running
+        self.calls = []
+        self.buffer = 0
+        self.max_buffer = 0
+        self._lock = threading.Lock()
+
+    def set_position(self, *args, **kwargs):
+        with self._lock:
+            self.calls.append((args, kwargs))
+            self.buffer += 1
+            self.max_buffer = max(self.max_buffer, self.buffer)
+            return self.codes.get(len(self.calls) - 1, 0)
+
+    def wait_cmdnum_changed(self, timeout):
+        time.sleep(0.001)
+        with self._lock:
+            if self.running and self.buffer > 0:
+                self.buffer -= 1
+            self.cmd_num = self.buffer
+            self._last_report_time = time.monotonic()
+
+    def get_cmdnum(self):
+        self.cmd_num = self.buffer
+        self._last_report_time = time.monotonic()
+        return 0, self.cmd_num
+
+    def wait_move(self, timeout=None):
+        return 0
+
+    def _notify_cmdnum_waiters(self):
+        pass
+
+
+def test_fill_is_bounded_and_order_kept():
+    core = FakeCore()
+    mq = MotionQueue(core, target_fill=4)
+    cids = [mq.set_position(x=i, speed=100) for i in range(50)]
+    assert mq.flush(timeout=5) == 0
+    mq.close()
+
+    assert cids == list(range(1, 51))
+    assert [kwargs['x'] for _, kwargs in core.calls] == list(range(50))
+    assert all(kwargs['wait'] is False for _, kwargs in core.calls)
+    assert core.max_buffer <= 4
+    assert mq.sent_count == 50
+
+
+def test_failed_command_clears_the_queue():
+    core = FakeCore(codes={2: 9}, running=False)
+    mq = MotionQueue(core, target_fill=3)
+    cids = [mq.set_position(x=i) for i in range(6)]
+
+    assert mq.flush(timeout=5) == 9
+    assert mq.error == 9
+    assert mq.result(cids[0]) == 0
+    assert mq.result(cids[2]) == 9
+    assert mq.result(cids[5]) == 9
+    assert mq.set_position(x=0) == -1
+
+    mq.reset()
+    core.running = True
+    assert mq.set_position(x=0) > 0
+    assert mq.flush(timeout=5) == 0
+    mq.close()
+
+
+def test_flush_timeout_while_controller_is_full():
+    mq = MotionQueue(FakeCore(running=False), target_fill=2, report_timeout=0.05)
+    for i in range(5):
+        mq.set_position(x=i)
+    assert mq.flush(timeout=0.2) == APIState.WAIT_FINISH_TIMEOUT
+    assert mq.pending_count == 3
+    assert mq.clear() == 3
+    mq.close()
+
+
+def test_enqueue_timeout_when_client_queue_is_full():
+    mq = MotionQueue(FakeCore(running=False), target_fill=1, max_pending=2, report_timeout=0.05)
+    results = [mq.set_position(x=i, queue_timeout=0.1) for i in range(4)]
+    assert results[:3] == [1, 2, 3]
+    assert results[3] == 0
+    assert mq.producer_wait_count > 0
+    mq.close()
+
+
+def test_results_are_bounded_and_popped():
+    mq = MotionQueue(FakeCore(), target_fill=8, max_results=3)
+    cids = [mq.set_position(x=i) for i in range(5)]
+    assert mq.flush(timeout=5) == 0
+    mq.close()
+
+    assert mq.result(cids[0]) is None
+    assert mq.result(cids[4]) == 0
+    assert mq.result(cids[4]) is None
@@ -0,0 +1,99 @@
+import json
+import time
+import socket
+
+import pytest
+
+from aris.order_server import OrderServer
+
+
+class Client(object):
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.file = self.sock.makefile('r', encoding='utf-8')
+
+    def send(self, data):
+        self.sock.sendall(data.encode('utf-8'))
+
+    def recv(self):
+        return json.loads(self.file.readline())
+
+    def recv_until(self, predicate):
+        while True:
+            msg = self.recv()
+            if predicate(msg):
+                return msg
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def handler(msg, client_id):
+    if msg.get('type') == 'boom':
+        raise ValueError('boom')
+    if msg.get('type') == 'ping':
+        return None
+    return {'type': 'ack', 'seq': msg.get('seq'), 'client_id': client_id}
+
+
+@pytest.fixture
+def server():
+    server = OrderServer(handler, port=0, status_rate=20)
+    server.start()
+    server.port = server._server.sockets[0].getsockname()[1]
+    yield server
+    server.stop()
+
+
+def test_concatenated_and_split_messages_are_framed(server):
+    client = Client(server.port)
+    client.send('{"seq": 1}{"seq": 2}\n{"se')
+    time.sleep(0.05)
+    client.send('q": 3}\n')
+    assert [client.recv()['seq'] for _ in range(3)] == [1, 2, 3]
+    client.close()
+
+
+def test_invalid_json_and_handler_errors_are_replied(server):
+    client = Client(server.port)
+    client.send('{broken\n{"type": "ping"}\n{"type": "boom", "seq": 7}\n[1]\n{"seq": 8}\n')
+    assert client.recv() == {'type': 'error', 'reason': 'invalid json'}
+    assert client.recv() == {'type': 'error', 'reason': 'boom', 'seq': 7}
+    assert client.recv()['reason'] == 'message must be a json object'
+    assert client.recv()['seq'] == 8
+    client.close()
+
+
+def test_events_and_coalesced_status_reach_all_clients(server):
+    clients = [Client(server.port) for _ in range(2)]
+    for client in clients:
+        client.send('{"seq": 0}\n')
+        assert client.recv()['type'] == 'ack'
+    assert server.client_count == 2
+
+    server.publish('order', order_id=3)
+    for i in range(10):
+        server.publish_status(stage='making', step=i)
+    for client in clients:
+        assert client.recv_until(lambda msg: msg.get('event') == 'order')['order_id'] == 3
+        status = client.recv_until(lambda msg: msg.get('event') == 'status' and msg['step'] == 9)
+        assert status['stage'] == 'making'
+    assert server.status() == {'stage': 'making', 'step': 9}
+
+    # 새 클라이언트는 접속하자마자 현재 상태를 받음
+    late = Client(server.port)
+    assert late.recv()['step'] == 9
+    for client in clients + [late]:
+        client.close()
+
+
+def test_unchanged_status_is_not_sent(server):
+    client = Client(server.port)
+    server.publish_status(stage='idle')
+    first = client.recv()
+    server.publish_status(stage='idle')
+    server.publish('done')
+    assert client.recv()['event'] == 'done'
+    assert first['revision'] == 1
+    client.close()
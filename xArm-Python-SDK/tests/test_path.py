@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from xarm.tools.path import CartesianPath, time_parameterize, _sliding_min, _moving_average_full
+
+START = [200, 0, 200, 180, 0, 0]
+DT = 0.004
+
+
+def speeds(setpoints, dt=DT):
+    return np.linalg.norm(np.diff(setpoints[:, :3], axis=0), axis=1) / dt
+
+
+def test_line_respects_speed_and_acc_and_ends_on_target():
+    path = CartesianPath(START).line_to([300, 0, 200, 180, 0, 0])
+    setpoints = path.generate(speed=100, acc=1000, dt=DT)
+    assert np.allclose(setpoints[0], START) and np.allclose(setpoints[-1], path.end)
+    v = speeds(setpoints)
+    assert v.max() <= 100 + 1e-6
+    assert np.abs(np.diff(v)).max() / DT <= 1000 * 1.05
+    # 0.1s ramps + 0.9s cruise
+    assert len(setpoints) * DT == pytest.approx(1.1, abs=0.02)
+
+
+def test_jerk_limit_smooths_and_adds_ramp_time():
+    path = CartesianPath(START).line_to([300, 0, 200, 180, 0, 0])
+    plain = path.generate(speed=100, acc=1000, dt=DT)
+    smooth = path.generate(speed=100, acc=1000, jerk=10000, dt=DT)
+    assert len(smooth) > len(plain)
+    assert np.abs(np.diff(speeds(smooth), 2)).max() < np.abs(np.diff(speeds(plain), 2)).max()
+    assert np.allclose(smooth[-1], plain[-1])
+
+
+def test_arc_keeps_radius_and_curvature_speed_limit():
+    path = CartesianPath(START).arc_to([250, 50, 200, 180, 0, 0], [300, 0, 200, 180, 0, 0])
+    points = path.densify()
+    assert np.allclose(np.linalg.norm(points[:, :2] - [250, 0], axis=1), 50)
+    setpoints = path.generate(speed=1000, acc=1000, dt=DT)
+    # v <= sqrt(acc * r)
+    assert speeds(setpoints).max() <= np.sqrt(1000 * 50) * 1.05
+
+
+def test_spline_passes_through_knots_and_orientation_is_unwrapped():
+    knots = [[250, 50, 200, 180, 0, 0], [300, 0, 250, 180, 0, 0]]
+    path = CartesianPath(START).spline(knots)
+    points = path.densify()
+    for knot in knots:
+        assert np.linalg.norm(points[:, :3] - knot[:3], axis=1).min() < 1e-6
+    assert np.allclose(path.end, knots[-1])
+
+    path = CartesianPath(START).line_to([200, 0, 200, -170, 0, 0])
+    assert path.end[3] == pytest.approx(190)
+    assert len(path) == 1
+
+
+def test_out_buffer_is_reused_and_degenerate_path():
+    path = CartesianPath(START).line_to([220, 0, 200, 180, 0, 0])
+    out = np.empty((1000, 6))
+    setpoints = path.generate(speed=100, acc=1000, out=out)
+    assert setpoints.base is out
+    single = time_parameterize(np.array([START, START], dtype=float), 100, 1000)
+    assert single.shape == (1, 6) and np.allclose(single[0], START)
+
+
+def test_window_helpers_match_naive():
+    x = np.random.default_rng(0).random(50)
+    naive = np.array([x[max(0, i - 3):i + 4].min() for i in range(len(x))])
+    assert np.allclose(_sliding_min(x, 7), naive)
+    average = _moving_average_full(np.arange(5, dtype=float), 3)
+    assert len(average) == 7 and average[0] == 0 and average[-1] == 4
@@ -0,0 +1,103 @@
+import io
+import functools
+import contextlib
+
+import pytest
+
+from aris.clock import VirtualClock
+from aris.vision_state import PerceptionHub
+from aris.pipeline import (PipelineExecutor, CAPSULE_WAIT, JIG, ARM, STAGE_SPANS, aris_icecream, measure_stages,
+                           compare)
+
+
+def zone(name):
+    return lambda state: getattr(state, name)
+
+
+def make_executor():
+    clock = VirtualClock()
+    hub = PerceptionHub(clock=clock)
+    return PipelineExecutor(hub, clock), hub, clock
+
+
+def test_stage_waits_for_jig_then_starts_in_schedule_order():
+    executor, hub, clock = make_executor()
+    started = []
+    for key in (1, 2, 3):
+        executor.schedule(key, CAPSULE_WAIT, zone('A_ZONE'), on_start=lambda key=key: started.append(key))
+    assert started == [1] and executor.holds(1, JIG)
+    assert executor.started(2) is None
+    with pytest.raises(RuntimeError):
+        executor.join(2, timeout=0)
+
+    clock.sleep(5)
+    executor.finish(1)
+    assert started == [1]   # finish 는 지그를 반납하지 않음
+    executor.release(1, JIG)
+    assert started == [1, 2] and executor.started(2) == 5.0 and executor.holds(2, JIG)
+
+
+def test_join_returns_when_predicate_is_true():
+    executor, hub, clock = make_executor()
+    executor.schedule(1, CAPSULE_WAIT, zone('A_ZONE'))
+    clock.call_later(3, functools.partial(hub.publish, A_ZONE=True))
+    state = executor.join(1, timeout=10)
+    assert state is not None and state.stamp('A_ZONE')[0] == 3.0 and clock.time() == 3.0
+
+    executor.schedule(2, CAPSULE_WAIT, zone('B_ZONE'))
+    executor.release(1)
+    assert executor.join(2, timeout=1) is None and clock.time() == 4.0
+
+
+def test_finish_calls_stop_once_and_duplicate_schedule_is_ignored():
+    executor, hub, clock = make_executor()
+    calls = []
+    on_start = lambda: calls.append('start') or (lambda: calls.append('stop'))
+    executor.schedule(1, CAPSULE_WAIT, zone('A_ZONE'), on_start=on_start)
+    executor.schedule(1, CAPSULE_WAIT, zone('A_ZONE'), on_start=on_start)
+    executor.finish(1)
+    executor.finish(1)
+    assert calls == ['start', 'stop']
+
+
+def test_cancel_drops_pending_and_running_stages():
+    executor, hub, clock = make_executor()
+    calls = []
+    for key in (1, 2, 3):
+        executor.schedule(key, CAPSULE_WAIT, zone('A_ZONE'),
+                          on_start=lambda key=key: calls.append(key) or (lambda: calls.append(-key)))
+    executor.cancel(1, 2)
+    # 1 이 반납한 지그는 취소된 2 를 건너뛰고 3 이 가져감
+    assert calls == [1, -1, 3]
+    assert executor.holds(3, JIG) and executor.started(2) is None
+
+
+def test_model_overlaps_capsule_wait_with_previous_order():
+    stats = {span: {'p50': 10.0} for spans, _ in STAGE_SPANS.values() for span in spans}
+    durations = measure_stages(stats, delivery=0)
+    assert durations['capsule_wait'] == 12.0 and durations['seal_check'] == 20.0
+    serial, pipelined = compare(aris_icecream(durations), 3)
+    assert serial.order_count == pipelined.order_count == 3
+    assert pipelined.makespan < serial.makespan
+    assert pipelined.utilization()[ARM] > serial.utilization()[ARM]
+    assert len(serial.to_text(40).splitlines()) == 3
+
+
+def test_dry_run_overlap_is_faster():
+    # 스크립트를 불러오므로 비전 패키지가 필요
+    for name in ('cv2', 'scipy', 'ultralytics'):
+        pytest.importorskip(name)
+    from aris.dryrun import DryRun, load_robot_main
+    from aris.scheduler import SERVED
+
+    robot_main_class = load_robot_main()
+    orders = [{'topping1': 1, 'topping2': 0, 'topping3': 0}] * 3
+    times = {}
+    for overlap in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            dry_run = DryRun(robot_main_class, capsule_delay=30, batch_size=3, pipeline=overlap)
+            served = dry_run.run(orders)
+            dry_run.close()
+        assert [order.state for order in served] == [SERVED] * 3
+        times[overlap] = dry_run.clock.time()
+    assert times[True] < times[False] - 60
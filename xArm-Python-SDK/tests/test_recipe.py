@@ -0,0 +1,91 @@
+from aris.clock import VirtualClock
+from aris.recipe import (Recipe, RecipeRunner, joint, line, line_relative, pause, sleep, gripper, digital,
+                         set_attr, choose)
+
+
+class FakeArm(object):
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail
+
+    def _call(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+        return 1 if name == self.fail else 0
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+class Target(object):
+    position_home = [0, 10, 20, 0, 10, 0]
+    pressing = False
+
+
+HOME = [0, 0, 0, 0, 0, 0]
+A = [100, 0, 200, 180, 0, 0]
+B = [150, 0, 200, 180, 0, 0]
+
+
+def test_auto_blend_only_between_same_kind_moves():
+    runner = RecipeRunner(FakeArm(), VirtualClock(), blend_radius=12)
+    recipe = Recipe('r', [joint(HOME), joint('position_home'), line(A), line(B, wait=True), line(A), joint(HOME, radius=5),
+                          joint(HOME), sleep(1), line(A)])
+    steps = runner.compile(recipe, target=Target())
+    assert [step['radius'] for step in steps if step['op'] != 'sleep'] == [12, 0, 12, 0, 0, 5, 0, 0]
+    assert steps[1]['pose'] == Target.position_home
+    # 원본 레시피는 바뀌지 않음
+    assert 'radius' not in recipe.steps[0] and recipe.steps[1]['pose'] == 'position_home'
+
+
+def test_choose_picks_first_true_case_or_default():
+    runner = RecipeRunner(FakeArm(), VirtualClock())
+    recipe = Recipe('r', [choose([('order.topping3', [pause(3)]), ('order.topping2', [pause(2)])], default=[pause(0)])])
+    pick = lambda context: [step['seconds'] for step in runner.compile(recipe, context)]
+    assert pick({'order': {'topping2': 1, 'topping3': 1}}) == [3]
+    assert pick({'order': {'topping2': 1}}) == [2]
+    assert pick({}) == [0]
+    assert [name for name, _, _ in recipe.poses()] == []
+
+
+def test_run_skips_repeated_digital_writes_and_sets_attributes():
+    arm = FakeArm()
+    clock = VirtualClock()
+    slept = []
+    runner = RecipeRunner(arm, clock, sleep=slept.append)
+    target = Target()
+    recipe = Recipe('r', [digital(3, 1), digital(3, 1), set_attr('pressing', True), gripper('open'),
+                          line_relative(z=30), sleep(2), digital(3, 1), digital(3, 0)])
+    assert runner.run(recipe, target=target, speeds={'tcp_speed': 100, 'tcp_acc': 1000}) == 0
+    names = [name for name, _, _ in arm.calls]
+    assert names == ['set_cgpio_digital', 'open_lite6_gripper', 'set_position', 'set_cgpio_digital']
+    assert arm.calls[2][2] == {'radius': 0, 'speed': 100, 'mvacc': 1000, 'relative': True, 'wait': False, 'z': 30}
+    assert arm.calls[3][1] == (3, 0)
+    assert target.pressing is True and slept == [2]
+
+
+def test_run_stops_on_error():
+    arm = FakeArm(fail='set_position')
+    labels = []
+    runner = RecipeRunner(arm, VirtualClock())
+    check = lambda code, label: labels.append(label) or code == 0
+    assert runner.run(Recipe('r', [joint(HOME), line(A), digital(3, 1)]), check=check) == 1
+    assert labels == ['set_servo_angle', 'set_position']
+    assert [name for name, _, _ in arm.calls] == ['set_servo_angle', 'set_position']
+
+
+def test_poses_walk_all_branches_and_json_round_trip(tmp_path):
+    recipe = Recipe('r', [joint(HOME), line_relative(z=10), joint('position_home'),
+                          choose([('a', [line(A)])], default=[line(B)])])
+    assert recipe.poses() == [('r:0', HOME, 'joint'), ('r:3.0.0', A, 'linear'), ('r:3.default.0', B, 'linear')]
+    path = str(tmp_path / 'recipe.json')
+    recipe.save(path)
+    assert Recipe.load(path).to_dict() == recipe.to_dict()
+
+
+def test_estimate_blending_is_faster():
+    runner = RecipeRunner(FakeArm(), VirtualClock())
+    speeds = {'tcp_speed': 100, 'tcp_acc': 1000}
+    blended = Recipe('r', [line(A), line(B), line(A)])
+    stopped = Recipe('r', [line(A, radius=0), line(B, radius=0), line(A, radius=0)])
+    assert runner.estimate(blended, speeds=speeds) < runner.estimate(stopped, speeds=speeds)
+    assert runner.estimate(Recipe('r', [sleep(1.5)])) == 1.5
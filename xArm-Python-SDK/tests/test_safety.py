@@ -0,0 +1,119 @@
+import threading
+
+from aris.safety import SafetyMonitor, STATE_MOVE, STATE_PAUSE
+
+
+class FakeArm(object):
+    def __init__(self, code=0):
+        self.code = code
+        self.states = []
+        self.sent = threading.Event()
+
+    def safety_set_state(self, state):
+        self.states.append(state)
+        self.sent.set()
+        return self.code
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_monitor(**kwargs):
+    clock = Clock()
+    kwargs.setdefault('stop_distance', 50)
+    kwargs.setdefault('resume_distance', 80)
+    kwargs.setdefault('resume_frames', 3)
+    kwargs.setdefault('min_hold', 1.0)
+    return SafetyMonitor(FakeArm(), clock=clock, **kwargs), clock
+
+
+def test_stop_on_first_near_frame():
+    monitor, _ = make_monitor()
+    assert monitor.update(100) is False
+    assert monitor.update(None) is False
+    assert monitor.update(50) is True
+
+
+def test_hysteresis_between_stop_and_resume_distance():
+    monitor, clock = make_monitor()
+    monitor.update(10)
+    clock.now = 5.0
+    # 50 < 거리 <= 80 은 재개로 세지 않음
+    for _ in range(10):
+        assert monitor.update(70) is True
+    assert [monitor.update(90) for _ in range(3)] == [True, True, False]
+
+
+def test_resume_debounce_resets_on_unsafe_frame():
+    monitor, clock = make_monitor()
+    monitor.update(10)
+    clock.now = 5.0
+    assert monitor.update(90) and monitor.update(90)
+    assert monitor.update(70) is True
+    assert [monitor.update(None) for _ in range(3)] == [True, True, False]
+
+
+def test_resume_waits_for_min_hold():
+    monitor, clock = make_monitor()
+    monitor.update(10)
+    clock.now = 0.5
+    for _ in range(5):
+        assert monitor.update(90) is True
+    clock.now = 1.0
+    assert monitor.update(90) is False
+
+
+def test_inhibit_blocks_new_stop_only():
+    inhibited = [True]
+    monitor, clock = make_monitor(inhibit=lambda: inhibited[0])
+    assert monitor.update(10) is False
+    inhibited[0] = False
+    assert monitor.update(10) is True
+    inhibited[0] = True
+    assert monitor.update(10) is True
+
+
+def test_thread_applies_state_and_records_event():
+    monitor, clock = make_monitor()
+    changes = []
+    done = threading.Event()
+    monitor.on_change = lambda paused, event: (changes.append(paused), done.set())
+    monitor.start()
+    try:
+        clock.now = 0.25
+        monitor.update(10, capture_time=0.1)
+        assert done.wait(2)
+    finally:
+        monitor.stop()
+    assert monitor._arm.states == [STATE_PAUSE]
+    assert monitor.paused and changes == [True]
+    event = monitor.events()[0]
+    assert event['code'] == 0 and abs(event['latency'] - 0.15) < 1e-9
+    assert monitor.stats()['pause']['count'] == 1
+
+
+def test_failed_command_is_retried_on_next_frame():
+    monitor, _ = make_monitor()
+    monitor._arm.code = 1
+    monitor.start()
+    try:
+        monitor.update(10)
+        assert monitor._arm.sent.wait(2)
+        for _ in range(200):
+            if not monitor._sending and monitor._pending is None:
+                break
+            threading.Event().wait(0.005)
+        assert not monitor.paused
+        monitor._arm.code = 0
+        monitor._arm.sent.clear()
+        monitor.update(10)
+        assert monitor._arm.sent.wait(2)
+    finally:
+        monitor.stop()
+    assert monitor._arm.states == [STATE_PAUSE, STATE_PAUSE]
+    assert STATE_MOVE not in monitor._arm.states
@@ -0,0 +1,96 @@
+from aris.clock import VirtualClock
+from aris.scheduler import OrderScheduler, ICECREAM, GREETING, QUEUED, MAKING, SERVED, FAILED
+
+
+def test_state_transitions_and_counts():
+    scheduler = OrderScheduler()
+    states = []
+    scheduler.register_listener(lambda order: states.append(order.state))
+
+    order = scheduler.submit(ICECREAM, {'topping1': 1})
+    assert order.state == QUEUED and scheduler.pending_count() == 1
+    assert scheduler.get(timeout=0) is order
+    assert order.state == MAKING and order.attempts == 1
+    scheduler.complete(order)
+
+    assert states == [QUEUED, MAKING, SERVED]
+    assert scheduler.counts == {QUEUED: 0, MAKING: 0, SERVED: 1, FAILED: 0}
+    assert scheduler.metrics()['make_time']['count'] == 1
+
+
+def test_priority_then_submit_order():
+    scheduler = OrderScheduler()
+    greeting = scheduler.submit(GREETING, ('Female', 20))
+    first = scheduler.submit(ICECREAM, {})
+    second = scheduler.submit(ICECREAM, {})
+    assert [scheduler.get(timeout=0) for _ in range(3)] == [first, second, greeting]
+
+
+def test_requeue_keeps_place_ahead_of_later_orders():
+    scheduler = OrderScheduler()
+    first = scheduler.submit(ICECREAM, {})
+    second = scheduler.submit(ICECREAM, {})
+    assert scheduler.get(timeout=0) is first
+    scheduler.requeue(first, 'seal not removed')
+
+    assert first.state == QUEUED and first.reason == 'seal not removed'
+    assert scheduler.get(timeout=0) is first
+    assert first.attempts == 2
+    assert scheduler.get(timeout=0) is second
+
+
+def test_fail_records_reason():
+    scheduler = OrderScheduler()
+    order = scheduler.submit(ICECREAM, {})
+    scheduler.fail(scheduler.get(timeout=0), 'robot stopped')
+    assert order.state == FAILED and order.reason == 'robot stopped'
+    assert scheduler.counts[FAILED] == 1
+
+
+def test_take_batch_groups_by_topping():
+    scheduler = OrderScheduler()
+    orders = [scheduler.submit(ICECREAM, {'topping': topping}) for topping in (1, 2, 1, 2)]
+    greeting = scheduler.submit(GREETING, ('Male', 30))
+    head = scheduler.get(timeout=0)
+
+    batch = scheduler.take_batch(head, 3, group=lambda order: order.payload['topping'])
+
+    assert head is orders[0]
+    assert batch == [orders[2], orders[1]]
+    assert all(order.state == MAKING for order in batch)
+    assert scheduler.get(timeout=0) is orders[3]
+    assert scheduler.get(timeout=0) is greeting
+
+
+def test_finished_orders_are_pruned():
+    scheduler = OrderScheduler(max_finished=2)
+    orders = []
+    for _ in range(4):
+        orders.append(scheduler.submit(ICECREAM, {}))
+        scheduler.complete(scheduler.get(timeout=0))
+    active = scheduler.submit(ICECREAM, {})
+
+    assert scheduler.get_order(orders[0].order_id) is None
+    assert scheduler.get_order(orders[1].order_id) is None
+    assert scheduler.get_order(orders[3].order_id) is orders[3]
+    assert scheduler.get_order(active.order_id) is active
+
+
+def test_close_wakes_get():
+    scheduler = OrderScheduler()
+    scheduler.close()
+    assert scheduler.get(timeout=1) is None
+    assert scheduler.submit(ICECREAM, {}) is None
+
+
+def test_latency_uses_injected_clock():
+    clock = VirtualClock()
+    scheduler = OrderScheduler(clock=clock)
+    order = scheduler.submit(ICECREAM, {})
+    clock.sleep(3)
+    scheduler.get(timeout=0)
+    clock.sleep(10)
+    scheduler.complete(order)
+    metrics = scheduler.metrics()
+    assert metrics['queue_latency']['max'] == 3
+    assert metrics['make_time']['max'] == 10
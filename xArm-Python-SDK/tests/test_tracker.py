@@ -0,0 +1,73 @@
+import numpy as np
+
+from aris.tracker import Tracker, box_iou, simulate
+
+
+def ids(tracks):
+    return [track.track_id for track in tracks]
+
+
+def test_ids_persist_across_frames_and_input_order():
+    tracker = Tracker()
+    first = ids(tracker.update([[0, 0, 40, 40], [100, 0, 140, 40]], ['cup', 'cup'], 0.0))
+    assert first == [1, 2]
+    second = ids(tracker.update([[102, 1, 142, 41], [1, 1, 41, 41]], ['cup', 'cup'], 0.1))
+    assert second == [2, 1]
+
+
+def test_id_survives_missed_frames_within_max_age():
+    tracker = Tracker(max_age=1.0)
+    track_id = ids(tracker.update([[0, 0, 40, 40]], ['cup'], 0.0))[0]
+    tracker.update([], [], 0.3)
+    tracker.update([], [], 0.6)
+    assert tracker.get(track_id).misses == 2
+    assert ids(tracker.update([[2, 0, 42, 40]], ['cup'], 0.9)) == [track_id]
+    assert tracker.get(track_id).misses == 0
+
+    tracker.update([], [], 2.0)
+    assert tracker.get(track_id) is None
+    assert ids(tracker.update([[2, 0, 42, 40]], ['cup'], 2.1)) == [track_id + 1]
+
+
+def test_fast_motion_links_by_predicted_center():
+    tracker = Tracker(max_distance=40)
+    tracker.update([[0, 0, 20, 20]], ['cup'], 0.0)
+    tracker.update([[30, 0, 50, 20]], ['cup'], 0.1)
+    # IoU 0 이지만 예측 중심 (속도 반영) 과 가까움
+    (track,) = tracker.update([[60, 0, 80, 20]], ['cup'], 0.2)
+    assert track.track_id == 1 and track.hits == 3
+    assert track.velocity[0] > 0
+
+
+def test_labels_are_not_mixed():
+    tracker = Tracker()
+    tracker.update([[0, 0, 40, 40]], ['cup'], 0.0)
+    (track,) = tracker.update([[0, 0, 40, 40]], ['capsule'], 0.1)
+    assert track.track_id == 2 and track.label == 'capsule'
+
+
+def test_active_requires_min_hits_and_still_time():
+    tracker = Tracker(min_hits=2, still_distance=8)
+    tracker.update([[0, 0, 40, 40]], ['cup'], 0.0)
+    assert tracker.active('cup') == []
+    tracker.update([[3, 0, 43, 40]], ['cup'], 0.5)
+    (track,) = tracker.active('cup')
+    assert track.still_time(1.0) == 1.0
+    tracker.update([[30, 0, 70, 40]], ['cup'], 1.0)
+    assert track.still_time(1.5) == 0.5
+    assert tracker.active('capsule') == []
+    tracker.reset()
+    assert tracker.tracks == []
+
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float64)
+    assert np.allclose(box_iou(a, b), [[1.0, 1 / 3, 0.0]])
+
+
+def test_tracker_confirms_dwell_with_missed_detections():
+    legacy, tracked = simulate(0.0, dwell=1.0)
+    assert tracked is not None and tracked <= 1.2
+    _, tracked = simulate(0.3, dwell=1.0)
+    assert tracked is not None and tracked <= 1.5
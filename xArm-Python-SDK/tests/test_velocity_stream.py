@@ -0,0 +1,63 @@
+import time
+import threading
+
+import pytest
+
+from xarm.tools.velocity_stream import VelocityStream
+
+
+class FakeArm(object):
+    axis = 6
+
+    def __init__(self, code=0):
+        self.code = code
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def vc_set_cartesian_velocity(self, speeds, is_radian=None, is_tool_coord=False, duration=-1, **kwargs):
+        with self._lock:
+            self.sent.append((list(speeds), duration))
+        return self.code
+
+    def vc_set_joint_velocity(self, speeds, is_radian=None, is_sync=True, duration=-1, **kwargs):
+        return self.vc_set_cartesian_velocity(speeds, duration=duration)
+
+
+def test_latest_target_only_and_zero_on_stop():
+    arm = FakeArm()
+    with VelocityStream(arm, rate=200) as vs:
+        for i in range(100):
+            vs.set_target([i, 0, 0, 0, 0, 0])
+        time.sleep(0.05)
+    speeds = [s[0] for s, _ in arm.sent]
+    assert 99 in speeds and all(v in (99, 0) for v in speeds)
+    assert arm.sent[-1][0] == [0] * 6
+    assert all(duration == vs.watchdog for _, duration in arm.sent)
+    stats = vs.stats()
+    assert stats['send_count'] == len(arm.sent) and stats['error_count'] == 0
+    assert 0 < stats['latency_max'] < 0.5
+
+
+def test_stalled_target_ramps_to_zero_then_stops_sending():
+    vs = VelocityStream(FakeArm(), rate=100, stall_timeout=0.1, ramp_time=0.2)
+    vs.set_target([10, 0, 0, 0, 0, 0])
+    t = vs._target_time
+    assert vs._next_speeds(t + 0.05)[0] == [10, 0, 0, 0, 0, 0]
+    speeds, _, seq = vs._next_speeds(t + 0.2)
+    assert speeds[0] == pytest.approx(5) and seq == 0 and vs.stalled and vs.stall_count == 1
+    vs._send(vs._next_speeds(t + 0.3)[0])
+    assert vs._last_sent == [0] * 6
+    assert vs._next_speeds(t + 0.4)[0] is None
+
+    vs.set_target([3, 0, 0, 0, 0, 0])
+    assert vs._next_speeds(vs._target_time)[0][0] == 3 and not vs.stalled
+
+
+def test_send_errors_are_counted():
+    vs = VelocityStream(FakeArm(code=9), mode=VelocityStream.JOINT)
+    code, _ = vs._send([1] * vs._dof())
+    assert code == 9 and vs.error_count == 1 and vs.last_code == 9
+    vs._arm.vc_set_joint_velocity = None
+    assert vs._send([0] * 6)[0] == -3
+    vs.reset_stats()
+    assert vs.stats()['send_count'] == 0
@@ -0,0 +1,57 @@
+import time
+import threading
+
+import pytest
+
+from aris.clock import VirtualClock
+from aris.vision_state import PerceptionHub, perception_property
+
+
+def test_publish_records_changed_fields_only():
+    clock = VirtualClock(10.0)
+    hub = PerceptionHub(clock=clock)
+    frame_id = hub.new_frame()
+    hub.publish(A_ZONE=True, B_ZONE=False)
+    clock.sleep(1)
+    hub.publish(A_ZONE=True)
+    state = hub.snapshot()
+    assert state.A_ZONE is True and state.stamp('A_ZONE') == (10.0, frame_id)
+    assert state.stamp('B_ZONE') == (None, None)
+    with pytest.raises(KeyError):
+        hub.publish(D_ZONE=True)
+    with pytest.raises(AttributeError):
+        state.D_ZONE
+
+    hub.reset('A_ZONE')
+    assert hub.get('A_ZONE') is False and hub.snapshot().stamp('A_ZONE') == (11.0, frame_id)
+
+
+def test_wait_for_virtual_clock():
+    clock = VirtualClock()
+    hub = PerceptionHub(clock=clock)
+    clock.call_later(2, lambda: hub.publish(NOT_SEAL=True))
+    state = hub.wait_for(lambda s: s.NOT_SEAL, timeout=5)
+    assert state.NOT_SEAL and clock.time() == 2
+    assert hub.wait_for(lambda s: s.C_ZONE, timeout=1) is None and clock.time() == 3
+
+
+def test_wait_for_wakes_on_publish_from_other_thread():
+    hub = PerceptionHub()
+    timer = threading.Timer(0.05, hub.publish, kwargs={'cup_holder_detected': True, 'cup_holder_x': 120})
+    start = time.monotonic()
+    timer.start()
+    state = hub.wait_for(lambda s: s.cup_holder_detected, timeout=2)
+    assert state.cup_holder_x == 120 and time.monotonic() - start < 1
+    assert hub.wait_for(lambda s: s.A_ZONE, timeout=0.01) is None
+
+
+def test_perception_property():
+    class Robot(object):
+        A_ZONE = perception_property('A_ZONE')
+
+        def __init__(self):
+            self.perception = PerceptionHub()
+
+    robot = Robot()
+    robot.A_ZONE = True
+    assert robot.perception.get('A_ZONE') is True and robot.A_ZONE
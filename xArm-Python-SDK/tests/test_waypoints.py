@@ -0,0 +1,109 @@
+import math
+import threading
+
+from xarm.tools.waypoints import WaypointLibrary
+
+
+class FakeCmd(object):
+    """
+    One control connection in radians, same ik as FakeArm.get_inverse_kinematics
+    """
+    def __init__(self):
+        self.count = 0
+        self.threads = set()
+
+    def get_ik(self, pose):
+        self.count += 1
+        self.threads.add(threading.current_thread().name)
+        return [0] + [math.radians(v) if i < 3 else v for i, v in enumerate(pose)] + [0]
+
+    def is_joint_limit(self, joints):
+        return [0, abs(joints[0]) > math.radians(360)]
+
+
+class FakeArm(object):
+    sn = 'XI1234'
+    tcp_offset = [0, 0, 0, 0, 0, 0]
+    world_offset = [0, 0, 0, 0, 0, 0]
+    default_is_radian = False
+    connected = True
+    connected_safety = False
+
+    def __init__(self):
+        self.ik_count = 0
+        self.arm_cmd = FakeCmd()
+        self.arm_cmd_safety = FakeCmd()
+        self._last_angles = [0] * 7
+        self.moves = []
+
+    def get_inverse_kinematics(self, pose, input_is_radian=None, return_is_radian=None):
+        self.ik_count += 1
+        return 0, list(pose) + [0]
+
+    def is_joint_limit(self, joint, is_radian=None):
+        return 0, abs(joint[0]) > 360
+
+    def _check_code(self, code):
+        return code
+
+    def set_servo_angle(self, **kwargs):
+        self.moves.append(kwargs)
+        return 0
+
+
+def make_library(tmp_path, arm=None):
+    library = WaypointLibrary(arm or FakeArm(), cache_path=str(tmp_path / 'waypoints.json'))
+    library.add('home', [0, 10, 20, 0, 10, 0], kind=WaypointLibrary.JOINT)
+    library.add('cup', [100, 0, 200, 180, 0, 0])
+    library.add('far', [1000, 0, 200, 180, 0, 0])
+    return library
+
+
+def test_validate_marks_unreachable_and_moves_to_cached_angles(tmp_path):
+    library = make_library(tmp_path)
+    assert library.validate() == (0, ['far'])
+    assert library.is_reachable('cup') and library.get_angles('far') is None
+    assert library.get_angles('cup') == [100, 0, 200, 180, 0, 0, 0]
+    assert library.move_to('far') == -3
+    assert library.move_to('cup', speed=20, wait=True) == 0
+    assert library._arm.moves[0]['angle'] == library.get_angles('cup')
+    assert library.last_validate_time is not None
+
+
+def test_cache_reuses_unchanged_poses_only(tmp_path):
+    library = make_library(tmp_path)
+    library.validate()
+    arm = FakeArm()
+    library = make_library(tmp_path, arm)
+    library.add('cup', [110, 0, 200, 180, 0, 0])
+    assert library.validate() == (0, ['far'])
+    assert arm.ik_count == 1
+    library.validate(force=True)
+    assert arm.ik_count == 3
+
+
+def test_cache_key_changes_with_tcp_offset(tmp_path):
+    library = make_library(tmp_path)
+    library.validate()
+    arm = FakeArm()
+    arm.tcp_offset = [0, 0, 50, 0, 0, 0]
+    library = make_library(tmp_path, arm)
+    library.validate()
+    assert arm.ik_count == 2
+
+
+def test_uncached_waypoints_are_split_over_both_connections():
+    arm = FakeArm()
+    arm.connected_safety = True
+    library = WaypointLibrary(arm)
+    for i in range(10):
+        library.add('p{}'.format(i), [100 + i, 0, 200, 180, 0, 0])
+    assert library.validate() == (0, [])
+    assert arm.ik_count == 0
+    assert arm.arm_cmd.count == arm.arm_cmd_safety.count == 5
+    assert len(arm.arm_cmd.threads | arm.arm_cmd_safety.threads) == 2
+    # same solutions as the XArmAPI path
+    assert library.get_angles('p3') == [103, 0, 200, 180, 0, 0, 0]
+    library.add('far', [1000, 0, 200, 180, 0, 0])
+    library.add('near', [0, 0, 200, 180, 0, 0])
+    assert library.validate() == (0, ['far'])
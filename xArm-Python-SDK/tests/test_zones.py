@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from aris.zones import Zone, ZoneEngine, ZoneFrame, ENTERED, STABLE, LEFT, scalar_ratio
+
+
+INSIDE = [[10, 10, 30, 30]]
+OUTSIDE = [[200, 200, 220, 220]]
+NONE = np.zeros((0, 4))
+
+
+def kinds(frame):
+    return [(event['event'], event['zone']) for event in frame.events]
+
+
+def make_engine(**kwargs):
+    kwargs.setdefault('dwell', 2)
+    kwargs.setdefault('miss_frames', 1)
+    return ZoneEngine([Zone('A_ZONE', (0, 0, 100, 100), ('capsule',), **kwargs)])
+
+
+def test_entered_stable_left_once_each():
+    engine = make_engine()
+    assert kinds(engine.update(INSIDE, ['capsule'], 0.0)) == [(ENTERED, 'A_ZONE')]
+    assert kinds(engine.update(INSIDE, ['capsule'], 1.0)) == []
+    frame = engine.update(INSIDE, ['capsule'], 2.0)
+    assert kinds(frame) == [(STABLE, 'A_ZONE')] and frame.events[0]['elapsed'] == 2.0
+    assert frame.stable == {'A_ZONE': True}
+    assert kinds(engine.update(INSIDE, ['capsule'], 3.0)) == []
+
+    # miss_frames=1: 한 프레임 미인식은 무시, 두 번째에 left
+    assert kinds(engine.update(NONE, [], 4.0)) == []
+    frame = engine.update(NONE, [], 5.0)
+    assert kinds(frame) == [(LEFT, 'A_ZONE')]
+    assert frame.present == {'A_ZONE': False} and frame.stable == {'A_ZONE': False}
+    assert engine.state()['A_ZONE'] == {'present': False, 'stable': False, 'since': None}
+
+
+def test_flicker_does_not_restart_dwell():
+    engine = make_engine()
+    engine.update(INSIDE, ['capsule'], 0.0)
+    engine.update(NONE, [], 1.0)
+    assert kinds(engine.update(INSIDE, ['capsule'], 2.0)) == [(STABLE, 'A_ZONE')]
+
+
+def test_label_and_exit_ratio_hysteresis():
+    engine = make_engine(ratio=0.8, exit_ratio=0.3, dwell=0, miss_frames=0)
+    half = [[50, 0, 150, 10]]     # 구역 안 비율 0.5
+    assert kinds(engine.update(INSIDE, ['cup'], 0.0)) == []
+    assert kinds(engine.update(half, ['capsule'], 0.0)) == []
+    assert kinds(engine.update(INSIDE, ['capsule'], 0.0)) == [(ENTERED, 'A_ZONE'), (STABLE, 'A_ZONE')]
+    assert kinds(engine.update(half, ['capsule'], 1.0)) == []
+    assert kinds(engine.update(OUTSIDE, ['capsule'], 2.0)) == [(LEFT, 'A_ZONE')]
+
+
+def test_center_mode_and_members():
+    engine = ZoneEngine([Zone('CUP', (0, 0, 100, 100), ('cup',), mode='center'),
+                         Zone('SEAL', (100, 0, 100, 100), ('capsule',))])
+    frame = engine.update([[60, 10, 120, 30], [110, 10, 130, 30]], ['cup', 'capsule'], 0.0)
+    # 중심은 안, 교차 비율은 ratio 미만
+    assert frame.members('CUP').tolist() == [0] and frame.ratios[0, 0] == 1.0
+    assert frame.contains('SEAL', 1) and not frame.contains('SEAL', 0)
+    assert frame.present == {'CUP': True, 'SEAL': True}
+
+
+def test_ratios_match_scalar_version():
+    roi = (20, 30, 60, 40)
+    engine = ZoneEngine([Zone('Z', roi, ('capsule',))])
+    boxes = np.random.default_rng(1).integers(0, 120, (50, 4))
+    boxes[:, 2:] += boxes[:, :2] + 1
+    expected = [scalar_ratio(box, roi) for box in boxes.tolist()]
+    assert np.allclose(engine.ratios(boxes)[:, 0], expected)
+
+
+def test_reset_and_peek():
+    events = []
+    engine = make_engine(dwell=0)
+    engine.on_event = events.append
+    engine.update(INSIDE, ['capsule'], 0.0)
+    frame = engine.peek(INSIDE, ['capsule'])
+    assert isinstance(frame, ZoneFrame) and frame.events == [] and frame.present['A_ZONE']
+    engine.reset('A_ZONE')
+    assert not engine.state()['A_ZONE']['present']
+    assert kinds(engine.update(INSIDE, ['capsule'], 1.0)) == [(ENTERED, 'A_ZONE'), (STABLE, 'A_ZONE')]
+    assert [event['event'] for event in events] == [ENTERED, STABLE, ENTERED, STABLE]
+
+
+def test_invalid_zones():
+    with pytest.raises(ValueError):
+        Zone('A', (0, 0, 1, 1), ('capsule',), mode='edge')
+    with pytest.raises(ValueError):
+        ZoneEngine([Zone('A', (0, 0, 1, 1), ()), Zone('A', (0, 0, 1, 1), ())])
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import math
+import time
+
+
+def scurve_time(distance, speed, acc, jerk=0):
+    """
+    Rest-to-rest duration of a jerk limited (S-curve) profile, trapezoidal if jerk <= 0
+
+    :param distance: move distance (mm or rad)
+    :param speed: max speed (mm/s or rad/s)
+    :param acc: max acceleration (mm/s^2 or rad/s^2)
+    :param jerk: max jerk (mm/s^3 or rad/s^3)
+    :return: tuple((duration, ramp_time)), ramp_time is the time spent reaching the peak speed
+    """
+    distance = abs(distance)
+    if distance <= 0 or speed <= 0 or acc <= 0:
+        return 0.0, 0.0
+    if not jerk or jerk <= 0 or math.isinf(jerk):
+        t_acc = speed / acc
+        if speed * t_acc <= distance:
+            return 2 * t_acc + (distance - speed * t_acc) / speed, t_acc
+        t_acc = math.sqrt(distance / acc)
+        return 2 * t_acc, t_acc
+
+    def _ramp(v):
+        # time to reach v from rest, the acceleration is saturated only if v >= acc^2/jerk
+        if v * jerk >= acc * acc:
+            return v / acc + acc / jerk
+        return 2 * math.sqrt(v / jerk)
+
+    t_acc = _ramp(speed)
+    # accelerate + decelerate covers speed * t_acc (both ramps are symmetric)
+    if speed * t_acc <= distance:
+        return 2 * t_acc + (distance - speed * t_acc) / speed, t_acc
+    v_sat = acc * acc / jerk
+    if v_sat * _ramp(v_sat) <= distance:
+        # distance = v^2/acc + v*acc/jerk
+        k = acc / jerk
+        peak = acc * (math.sqrt(k * k + 4 * distance / acc) - k) / 2
+    else:
+        # distance = 2 * v^1.5 / sqrt(jerk)
+        peak = (distance * math.sqrt(jerk) / 2) ** (2.0 / 3)
+    t_acc = _ramp(peak)
+    return 2 * t_acc, t_acc
+
+
+def _rpy_to_matrix(roll, pitch, yaw):
+    cr, sr = math.cos(roll), math.sin(roll)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cy, sy = math.cos(yaw), math.sin(yaw)
+    return [
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ]
+
+
+def _matrix_to_rpy(m):
+    pitch = math.atan2(-m[2][0], math.sqrt(m[0][0] ** 2 + m[1][0] ** 2))
+    if abs(math.cos(pitch)) < 1e-9:
+        return math.atan2(m[0][1], m[1][1]) * (1 if pitch > 0 else -1), pitch, 0.0
+    return math.atan2(m[2][1], m[2][2]), pitch, math.atan2(m[1][0], m[0][0])
+
+
+def _matmul(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+
+
+def _rotation_angle(rpy1, rpy2):
+    m1 = _rpy_to_matrix(*rpy1)
+    m2 = _rpy_to_matrix(*rpy2)
+    # trace(m1^T * m2)
+    trace = sum(m1[k][i] * m2[k][i] for i in range(3) for k in range(3))
+    return math.acos(min(1.0, max(-1.0, (trace - 1) / 2)))
+
+
+class MotionEstimator(object):
+    """
+    Client side estimation of the duration of the motion commands, the controller is not involved
+
+    The profiles are modeled from the limits in the report (tcp_jerk/tcp_acc_limit/tcp_speed_limit and
+    joint_jerk/joint_acc_limit/joint_speed_limit), the start pose is the last used position/angles of the arm.
+    Ex:
+        estimator = MotionEstimator(arm)
+        secs = estimator.estimate_position(x=300, y=0, z=200, roll=180, pitch=0, yaw=0, speed=100, mvacc=1000)
+        secs = estimator.estimate_sequence([
+            ('servo_angle', {'angle': [179.2, -42.1, 7.4, 186.7, 41.5, -1.6], 'speed': 80, 'mvacc': 200}),
+            ('position', {'z': 100, 'relative': True, 'speed': 100, 'mvacc': 1000}),
+            ('sleep', 0.5),
+        ])
+    """
+    TCP = 'tcp'
+    JOINT = 'joint'
+
+    def __init__(self, arm=None, is_radian=None, **kwargs):
+        """
+        :param arm: instance of XArmAPI (or XArm), the limits and start pose are synchronized from it if given
+        :param is_radian: the angle unit of the parameters, default is arm.default_is_radian (False if no arm)
+        :param kwargs: default limits used if no arm is given
+            tcp_jerk: mm/s^3, default is 1000
+            tcp_max_acc: mm/s^2, default is 50000
+            tcp_max_speed: mm/s, default is 1000
+            rot_jerk: rad/s^3, default is 2.3
+            rot_max_acc: rad/s^2, default is 2.7
+            rot_max_speed: rad/s, default is math.pi
+            joint_jerk: rad/s^3, default is 20
+            joint_max_acc: rad/s^2, default is 20
+            joint_max_speed: rad/s, default is math.pi
+        """
+        self._arm = arm
+        if is_radian is None:
+            is_radian = arm.default_is_radian if arm is not None else False
+        self._is_radian = is_radian
+
+        self.tcp_jerk = kwargs.get('tcp_jerk', 1000)
+        self.tcp_min_acc, self.tcp_max_acc = 1.0, kwargs.get('tcp_max_acc', 50000)
+        self.tcp_min_speed, self.tcp_max_speed = 0.1, kwargs.get('tcp_max_speed', 1000)
+        self.rot_jerk = kwargs.get('rot_jerk', 2.3)
+        self.rot_max_acc = kwargs.get('rot_max_acc', 2.7)
+        self.rot_max_speed = kwargs.get('rot_max_speed', math.pi)
+        self.joint_jerk = kwargs.get('joint_jerk', 20.0)
+        self.joint_min_acc, self.joint_max_acc = 0.01, kwargs.get('joint_max_acc', 20.0)
+        self.joint_min_speed, self.joint_max_speed = 0.0001, kwargs.get('joint_max_speed', math.pi)
+
+        # mm / rad
+        self.position = [201.5, 0, 140.5, math.pi, 0, 0]
+        self.angles = [0.0] * 7
+        self.tcp_speed, self.tcp_acc = 100, 2000
+        self.joint_speed, self.joint_acc = math.radians(20), math.radians(500)
+
+        # duration = scale * estimated + offset, see fit()
+        self._calibration = {self.TCP: [1.0, 0.0], self.JOINT: [1.0, 0.0]}
+        self._samples = {self.TCP: [], self.JOINT: []}
+        self.sync()
+
+    def _to_rad(self, val, is_radian=None):
+        is_radian = self._is_radian if is_radian is None else is_radian
+        return float(val) if is_radian else math.radians(val)
+
+    def sync(self):
+        """
+        Synchronize the limits, the last used speed/acc and the start pose from the arm
+        """
+        if self._arm is None:
+            return
+        arm = self._arm
+        core = getattr(arm, 'arm', arm)
+        is_rad = arm.default_is_radian
+        to_rad = (lambda v: v) if is_rad else math.radians
+
+        self.tcp_jerk = arm.tcp_jerk
+        self.tcp_min_acc, self.tcp_max_acc = arm.tcp_acc_limit
+        self.tcp_min_speed, self.tcp_max_speed = arm.tcp_speed_limit
+        self.rot_jerk = getattr(core, '_rot_jerk', self.rot_jerk)
+        self.rot_max_acc = getattr(core, '_max_rot_acc', self.rot_max_acc)
+        self.joint_jerk = to_rad(arm.joint_jerk)
+        self.joint_min_acc, self.joint_max_acc = map(to_rad, arm.joint_acc_limit)
+        self.joint_min_speed, self.joint_max_speed = map(to_rad, arm.joint_speed_limit)
+
+        pos = arm.last_used_position
+        self.position = [pos[i] if i < 3 else to_rad(pos[i]) for i in range(6)]
+        self.angles = [to_rad(angle) for angle in arm.last_used_angles]
+        self.tcp_speed, self.tcp_acc = arm.last_used_tcp_speed, arm.last_used_tcp_acc
+        self.joint_speed, self.joint_acc = to_rad(arm.last_used_joint_speed), to_rad(arm.last_used_joint_acc)
+
+    def _tcp_params(self, speed=None, mvacc=None):
+        # same clamp as the XArm motion params
+        spd = self.tcp_speed if speed is None else min(max(float(speed), self.tcp_min_speed), self.tcp_max_speed)
+        acc = self.tcp_acc if mvacc is None else min(max(float(mvacc), self.tcp_min_acc), self.tcp_max_acc)
+        return spd, acc
+
+    def _joint_params(self, speed=None, mvacc=None, is_radian=None):
+        spd = self.joint_speed if speed is None else self._to_rad(speed, is_radian)
+        acc = self.joint_acc if mvacc is None else self._to_rad(mvacc, is_radian)
+        spd = min(max(spd, self.joint_min_speed), self.joint_max_speed)
+        acc = min(max(acc, self.joint_min_acc), self.joint_max_acc)
+        return spd, acc
+
+    def _tcp_time(self, start, end, speed, acc):
+        dist = math.sqrt(sum((end[i] - start[i]) ** 2 for i in range(3)))
+        rot = _rotation_angle(start[3:6], end[3:6])
+        t_lin, ramp_lin = scurve_time(dist, speed, acc, self.tcp_jerk)
+        # the orientation is interpolated along with the position, a pure rotation uses the rotation limits
+        # (the speed value is taken as deg/s for the orientation, converted to rad/s before the rad/s limit)
+        rot_speed = min(math.radians(speed), self.rot_max_speed)
+        t_rot, ramp_rot = scurve_time(rot, rot_speed, self.rot_max_acc, self.rot_jerk)
+        return (t_lin, ramp_lin) if t_lin >= t_rot else (t_rot, ramp_rot)
+
+    def _plan_position(self, start, x=None, y=None, z=None, roll=None, pitch=None, yaw=None,
+                       speed=None, mvacc=None, relative=False, is_radian=None, **kwargs):
+        rpy = [roll, pitch, yaw]
+        if relative:
+            end = [start[0] + (x or 0), start[1] + (y or 0), start[2] + (z or 0)]
+            end += [start[3 + i] + (0 if rpy[i] is None else self._to_rad(rpy[i], is_radian)) for i in range(3)]
+        else:
+            end = [start[i] if v is None else float(v) for i, v in enumerate([x, y, z])]
+            end += [start[3 + i] if rpy[i] is None else self._to_rad(rpy[i], is_radian) for i in range(3)]
+        spd, acc = self._tcp_params(speed, mvacc)
+        duration, ramp = self._tcp_time(start, end, spd, acc)
+        return duration, ramp, end
+
+    def _plan_tool_position(self, start, x=0, y=0, z=0, roll=0, pitch=0, yaw=0,
+                            speed=None, mvacc=None, is_radian=None, **kwargs):
+        m_start = _rpy_to_matrix(*start[3:6])
+        m_tool = _rpy_to_matrix(*[self._to_rad(v, is_radian) for v in [roll, pitch, yaw]])
+        offset = [x, y, z]
+        end = [start[i] + sum(m_start[i][k] * offset[k] for k in range(3)) for i in range(3)]
+        end += list(_matrix_to_rpy(_matmul(m_start, m_tool)))
+        spd, acc = self._tcp_params(speed, mvacc)
+        duration, ramp = self._tcp_time(start, end, spd, acc)
+        return duration, ramp, end
+
+    def _plan_servo_angle(self, start, servo_id=None, angle=None, speed=None, mvacc=None,
+                          relative=False, is_radian=None, **kwargs):
+        if servo_id is not None and servo_id != 8:
+            angles = [None] * 7
+            angles[servo_id - 1] = angle
+        else:
+            angles = list(angle) + [None] * (7 - len(angle))
+        end = list(start)
+        for i, val in enumerate(angles[:7]):
+            if val is None:
+                continue
+            val = self._to_rad(val, is_radian)
+            end[i] = start[i] + val if relative else val
+        spd, acc = self._joint_params(speed, mvacc, is_radian)
+        # all joints are synchronized to the joint with the largest displacement
+        delta = max(abs(end[i] - start[i]) for i in range(7))
+        duration, ramp = scurve_time(delta, spd, acc, self.joint_jerk)
+        return duration, ramp, end
+
+    def _apply_calibration(self, kind, duration):
+        if duration <= 0:
+            return 0.0
+        scale, offset = self._calibration[kind]
+        return max(0.0, scale * duration + offset)
+
+    def estimate_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None,
+                          speed=None, mvacc=None, relative=False, is_radian=None, start=None, **kwargs):
+        """
+        Estimate the duration of a set_position (linear motion)
+
+        :param start: start position [x, y, z, roll, pitch, yaw], default is the last used position
+        :return: duration (s)
+        """
+        if start is None:
+            start = self.position
+        else:
+            start = [start[i] if i < 3 else self._to_rad(start[i], is_radian) for i in range(6)]
+        duration, _, _ = self._plan_position(start, x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, speed=speed,
+                                             mvacc=mvacc, relative=relative, is_radian=is_radian)
+        return self._apply_calibration(self.TCP, duration)
+
+    def estimate_servo_angle(self, servo_id=None, angle=None, speed=None, mvacc=None,
+                             relative=False, is_radian=None, start=None, **kwargs):
+        """
+        Estimate the duration of a set_servo_angle (joint motion)
+
+        :param start: start angles, default is the last used angles
+        :return: duration (s)
+        """
+        if start is None:
+            start = self.angles
+        else:
+            start = [self._to_rad(v, is_radian) for v in start] + [0.0] * (7 - len(start))
+        duration, _, _ = self._plan_servo_angle(start, servo_id=servo_id, angle=angle, speed=speed, mvacc=mvacc,
+                                                relative=relative, is_radian=is_radian)
+        return self._apply_calibration(self.JOINT, duration)
+
+    def estimate_sequence(self, moves, update=False):
+        """
+        Estimate the duration of a sequence of motions
+
+        :param moves: [(kind, params), ...]
+            kind: 'position', 'tool_position', 'servo_angle', 'sleep'
+            params: the keyword arguments of the corresponding api, or the seconds if kind is 'sleep'
+            Note: a joint/linear motion with radius > 0 is blended into the next motion of the same kind,
+                the deceleration of the previous one overlaps the acceleration of the next one
+        :param update: the end pose of the sequence is used as the start pose of the next estimation or not
+        :return: tuple((total, durations)), durations is the duration of each move
+        """
+        position = list(self.position)
+        angles = list(self.angles)
+        durations = []
+        prev_kind, prev_ramp, prev_blend = None, 0.0, False
+        total = 0.0
+        for kind, params in moves:
+            if kind in ['sleep', 'pause']:
+                durations.append(float(params))
+                total += float(params)
+                prev_kind, prev_blend = None, False
+                continue
+            params = params or {}
+            if kind == 'position':
+                duration, ramp, position = self._plan_position(position, **params)
+                cal = self.TCP
+            elif kind == 'tool_position':
+                duration, ramp, position = self._plan_tool_position(position, **params)
+                cal = self.TCP
+            elif kind == 'servo_angle':
+                duration, ramp, angles = self._plan_servo_angle(angles, **params)
+                cal = self.JOINT
+            else:
+                raise ValueError('unknown motion kind: {}'.format(kind))
+            duration = self._apply_calibration(cal, duration)
+            if prev_blend and prev_kind == cal and duration > 0:
+                saving = min(prev_ramp, ramp)
+                duration = max(0.0, duration - saving)
+            radius = params.get('radius', None)
+            prev_kind, prev_ramp = cal, ramp
+            prev_blend = radius is not None and radius > 0 and not params.get('wait', False)
+            durations.append(duration)
+            total += duration
+        if update:
+            self.position, self.angles = position, angles
+        return total, durations
+
+    def add_sample(self, kind, estimated, measured):
+        """
+        Add a recorded timing for calibration
+
+        :param kind: 'tcp' or 'joint'
+        :param estimated: the estimated duration (s) without calibration
+        :param measured: the measured duration (s)
+        """
+        self._samples[kind].append((float(estimated), float(measured)))
+
+    def record(self, func, *args, **kwargs):
+        """
+        Run a blocking motion api and record the real timing for calibration
+        Ex:
+            estimator.record(arm.set_position, x=300, speed=100, mvacc=1000, wait=True)
+
+        :param func: arm.set_position/arm.set_tool_position/arm.set_servo_angle
+        :return: the return value of the func
+        """
+        self.sync()
+        name = getattr(func, '__name__', '')
+        kwargs['wait'] = True
+        if name == 'set_servo_angle':
+            kind = self.JOINT
+            estimated, _, _ = self._plan_servo_angle(self.angles, *args, **kwargs)
+        elif name == 'set_tool_position':
+            kind = self.TCP
+            estimated, _, _ = self._plan_tool_position(self.position, *args, **kwargs)
+        else:
+            kind = self.TCP
+            estimated, _, _ = self._plan_position(self.position, *args, **kwargs)
+        start = time.monotonic()
+        ret = func(*args, **kwargs)
+        measured = time.monotonic() - start
+        if ret == 0 and estimated > 0:
+            self.add_sample(kind, estimated, measured)
+        return ret
+
+    def fit(self):
+        """
+        Fit the calibration (duration = scale * estimated + offset) with the recorded samples by least squares
+
+        :return: calibration, {'tcp': [scale, offset], 'joint': [scale, offset]}
+        """
+        for kind, samples in self._samples.items():
+            n = len(samples)
+            if n == 0:
+                continue
+            sx = sum(s[0] for s in samples)
+            sy = sum(s[1] for s in samples)
+            if n == 1:
+                self._calibration[kind] = [sy / sx if sx > 0 else 1.0, 0.0]
+                continue
+            sxx = sum(s[0] * s[0] for s in samples)
+            sxy = sum(s[0] * s[1] for s in samples)
+            den = n * sxx - sx * sx
+            if abs(den) < 1e-12:
+                self._calibration[kind] = [sy / sx if sx > 0 else 1.0, 0.0]
+                continue
+            scale = (n * sxy - sx * sy) / den
+            self._calibration[kind] = [scale, (sy - scale * sx) / n]
+        return self.calibration
+
+    @property
+    def calibration(self):
+        return {kind: list(val) for kind, val in self._calibration.items()}
+
+    @calibration.setter
+    def calibration(self, calibration):
+        for kind, val in calibration.items():
+            if kind in self._calibration:
+                self._calibration[kind] = [float(val[0]), float(val[1])]
+
+    def clear_samples(self):
+        for samples in self._samples.values():
+            samples.clear()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import time
+import itertools
+import threading
+from collections import deque, OrderedDict
+from ..core.utils.log import logger
+from ..x3.code import APIState
+
+
+class MotionQueue(object):
+    """
+    Flow-controlled motion command queue
+
+    The commands are kept on the client side and pushed to the controller only while the controller buffer
+    (the cmdnum in the report) is under the target fill level, the producers are blocked if the client side
+    queue is full and woken up as soon as the dispatcher takes a command.
+    Ex:
+        mq = MotionQueue(arm, target_fill=16)
+        for path in paths:
+            mq.set_position(*path[:6], radius=path[6], speed=100, mvacc=1000)
+        mq.flush()
+        mq.close()
+    """
+    def __init__(self, arm, target_fill=16, max_pending=256, report_timeout=0.5, max_results=1024):
+        """
+        :param arm: instance of XArmAPI (or XArm)
+        :param target_fill: the number of commands kept in the controller buffer
+        :param max_pending: the max number of commands kept on the client side, enqueue blocks if exceeded
+        :param report_timeout: the cmdnum is polled if no report arrived within this time (s)
+        :param max_results: the max number of return codes kept for result(), the oldest are dropped first
+        """
+        self._arm = arm
+        self._core = getattr(arm, 'arm', arm)
+        self.target_fill = max(1, min(int(target_fill), self._core._max_cmd_num))
+        self.max_pending = max(1, int(max_pending))
+        self.report_timeout = report_timeout
+
+        self._ids = itertools.count(1)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._in_flight = None
+        self._sent_times = deque()
+        self._results = OrderedDict()
+        self.max_results = max(1, int(max_results))
+        self._error = 0
+        self._alive = True
+
+        self.sent_count = 0
+        self.producer_wait_count = 0
+        self.dispatcher_wait_count = 0
+
+        self._thread = threading.Thread(target=self._dispatch_thread, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def error(self):
+        """
+        The code of the first failed command, the queue is cleared and rejects new commands if not 0
+        """
+        return self._error
+
+    def _fill_estimate(self):
+        # the cmdnum in the report lags behind the commands sent after it
+        last_report_time = self._core._last_report_time
+        while self._sent_times and self._sent_times[0] <= last_report_time:
+            self._sent_times.popleft()
+        return self._core.cmd_num + len(self._sent_times)
+
+    def _wait_controller_space(self):
+        while self._alive and self._core.connected:
+            if self._fill_estimate() < self.target_fill:
+                return True
+            self.dispatcher_wait_count += 1
+            if time.monotonic() - self._core._last_report_time > self.report_timeout:
+                self._core.get_cmdnum()
+                self._sent_times.clear()
+                continue
+            self._core.wait_cmdnum_changed(self.report_timeout)
+        return False
+
+    def _dispatch_thread(self):
+        while self._alive:
+            with self._cond:
+                while self._alive and not self._pending:
+                    self._cond.wait()
+                if not self._alive:
+                    break
+            if not self._wait_controller_space():
+                if not self._core.connected:
+                    self._fail(-1)
+                continue
+            with self._cond:
+                if not self._pending:
+                    continue
+                item = self._pending.popleft()
+                self._in_flight = item[0]
+                # wake up the producers blocked by a full queue
+                self._cond.notify_all()
+            cid, func, args, kwargs = item
+            try:
+                code = func(*args, **kwargs)
+            except Exception as e:
+                logger.error('MotionQueue -> cmd {} exception: {}'.format(cid, e))
+                code = -3
+            self._sent_times.append(time.monotonic())
+            self.sent_count += 1
+            with self._cond:
+                self._store_result(cid, code)
+                self._in_flight = None
+                self._cond.notify_all()
+            if code != 0:
+                logger.error('MotionQueue -> cmd {} failed, code={}, clear the queue'.format(cid, code))
+                self._fail(code)
+
+    def _store_result(self, cid, code):
+        # called with the lock held, the results nobody asked for are dropped oldest first
+        self._results[cid] = code
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _fail(self, code):
+        with self._cond:
+            if self._error == 0:
+                self._error = code
+            for item in self._pending:
+                self._store_result(item[0], code)
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def enqueue(self, method, *args, **kwargs):
+        """
+        Enqueue a motion command, the command is always sent with wait=False
+
+        :param method: api name (such as 'set_position') or the callable
+        :param queue_timeout: the max time (s) to wait for space in the queue, default is None (wait forever)
+        :return: command id, -1 if the queue is closed or failed, 0 if timeout
+        """
+        timeout = kwargs.pop('queue_timeout', None)
+        func = getattr(self._arm, method) if isinstance(method, str) else method
+        kwargs['wait'] = False
+        expired = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._alive and self._error == 0 and len(self._pending) >= self.max_pending:
+                self.producer_wait_count += 1
+                remaining = None if expired is None else expired - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return 0
+                self._cond.wait(remaining)
+            if not self._alive or self._error != 0:
+                return -1
+            cid = next(self._ids)
+            self._pending.append((cid, func, args, kwargs))
+            self._cond.notify_all()
+            return cid
+
+    def set_position(self, *args, **kwargs):
+        return self.enqueue('set_position', *args, **kwargs)
+
+    def set_tool_position(self, *args, **kwargs):
+        return self.enqueue('set_tool_position', *args, **kwargs)
+
+    def set_servo_angle(self, *args, **kwargs):
+        return self.enqueue('set_servo_angle', *args, **kwargs)
+
+    def move_arc_lines(self, paths, is_radian=None, speed=None, mvacc=None, mvtime=None):
+        """
+        Enqueue the paths of move_arc_lines, [[x, y, z, roll, pitch, yaw, radius], ....]
+
+        :return: the command id of the last path
+        """
+        cid = -1
+        for path in paths:
+            radius = path[6] if len(path) > 6 and path[6] >= 0 else 0
+            cid = self.enqueue('set_position', *path[:6], radius=radius, is_radian=is_radian,
+                               speed=speed, mvacc=mvacc, mvtime=mvtime)
+            if cid <= 0:
+                break
+        return cid
+
+    def cancel(self, cid):
+        """
+        Cancel a command which has not been sent to the controller yet
+
+        :return: True if cancelled
+        """
+        with self._cond:
+            for item in self._pending:
+                if item[0] == cid:
+                    self._pending.remove(item)
+                    self._cond.notify_all()
+                    return True
+        return False
+
+    def clear(self):
+        """
+        Drop all the commands not sent yet, the commands in the controller buffer are not affected
+
+        :return: the number of the dropped commands
+        """
+        with self._cond:
+            count = len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+            return count
+
+    def result(self, cid):
+        """
+        Get the return code of a command, the code is removed once returned
+
+        :return: the return code of the command, None if not sent yet (or already returned / dropped)
+        """
+        with self._cond:
+            return self._results.pop(cid, None)
+
+    def flush(self, timeout=None, wait_motion=True):
+        """
+        Wait until all the commands are sent (and finished)
+
+        :param timeout: the max time (s) to wait, default is None (wait forever)
+        :param wait_motion: wait for the arm to finish the motion or not
+        :return: code, 0 if success
+        """
+        expired = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._alive and self._error == 0 and (self._pending or self._in_flight is not None):
+                remaining = None if expired is None else expired - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return APIState.WAIT_FINISH_TIMEOUT
+                self._cond.wait(remaining)
+            if self._error != 0:
+                return self._error
+        if wait_motion:
+            remaining = None if expired is None else max(expired - time.monotonic(), 0.001)
+            return self._core.wait_move(timeout=remaining)
+        return 0
+
+    def reset(self):
+        """
+        Clear the error (and the pending commands) so that the queue accepts new commands
+        """
+        with self._cond:
+            self._pending.clear()
+            self._results.clear()
+            self._error = 0
+            self._cond.notify_all()
+
+    def close(self, timeout=1):
+        with self._cond:
+            self._alive = False
+            self._pending.clear()
+            self._cond.notify_all()
+        self._core._notify_cmdnum_waiters()
+        self._thread.join(timeout)
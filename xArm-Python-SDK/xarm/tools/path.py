@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import math
+import numpy as np
+
+
+def _sliding_min(x, size):
+    """
+    Centered sliding window minimum (van Herk/Gil-Werman), O(n) for any window size
+    """
+    n = len(x)
+    if size <= 1 or n == 0:
+        return x.copy()
+    half = size // 2
+    size = half * 2 + 1
+    total = n + 2 * half
+    pad = (-total) % size
+    xp = np.concatenate([np.full(half, np.inf), x, np.full(half + pad, np.inf)])
+    blocks = xp.reshape(-1, size)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(suffix[:n], prefix[size - 1:size - 1 + n])
+
+
+def _moving_average_full(x, size):
+    """
+    Moving average with the ends held, the result is longer by (size - 1)
+    """
+    if size <= 1 or len(x) == 0:
+        return x.copy()
+    xp = np.concatenate([np.full(size - 1, x[0]), x, np.full(size - 1, x[-1])])
+    c = np.concatenate([[0.0], np.cumsum(xp)])
+    return (c[size:] - c[:-size]) / size
+
+
+def _limit_acc(v, s, acc, v_start=0.0, v_end=0.0):
+    """
+    Forward/backward acceleration passes on the squared speed, u(i+1) <= u(i) + 2 * acc * ds,
+    with w = u - 2 * acc * s the recursion becomes a running minimum
+    """
+    u = v * v
+    u[0] = min(u[0], v_start * v_start)
+    u = np.minimum.accumulate(u - 2 * acc * s) + 2 * acc * s
+    u[-1] = min(u[-1], v_end * v_end)
+    r = s[-1] - s
+    u = (np.minimum.accumulate((u - 2 * acc * r)[::-1]) + 2 * acc * r[::-1])[::-1]
+    return np.sqrt(np.maximum(u, 0))
+
+
+def _curvature(p):
+    """
+    Discrete curvature of the points (n, 3), 2 * |a x b| / (|a| * |b| * |a + b|)
+    """
+    k = np.zeros(len(p))
+    if len(p) < 3:
+        return k
+    a = p[1:-1] - p[:-2]
+    b = p[2:] - p[1:-1]
+    cross = np.linalg.norm(np.cross(a, b), axis=1)
+    den = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) * np.linalg.norm(a + b, axis=1)
+    valid = den > 1e-12
+    k[1:-1][valid] = 2 * cross[valid] / den[valid]
+    return k
+
+
+def path_length(points, orient_scale=100.0, is_radian=False):
+    """
+    The cumulative length of the points (n, 6), the rotation is weighted by orient_scale (mm per rad)
+    and the larger one of the translation and the weighted rotation is used for each step
+
+    :return: (s, ds)
+    """
+    dp = np.linalg.norm(np.diff(points[:, :3], axis=0), axis=1)
+    dr = np.abs(np.diff(points[:, 3:6], axis=0)).max(axis=1)
+    if not is_radian:
+        dr = np.radians(dr)
+    ds = np.maximum(dp, dr * orient_scale)
+    s = np.concatenate([[0.0], np.cumsum(ds)])
+    return s, ds
+
+
+def time_parameterize(points, speed, acc, jerk=0, dt=0.004, orient_scale=100.0, is_radian=False, out=None):
+    """
+    Time parameterization of the dense cartesian points under the tcp speed/acc/jerk limits
+
+    The speed is limited by the curvature (v <= sqrt(acc / k)) and bounded by the forward/backward acceleration
+    passes, the time of each interval is solved with the constant acceleration. If the jerk is limited, the
+    path position over time is smoothed by a moving average of 2 * acc / jerk seconds (this bounds the jerk and
+    adds the same time to the motion), the speed limit is eroded by the distance of the window in advance so the
+    smoothed motion keeps under the curvature limit.
+
+    :param points: (n, 6) array of [x, y, z, roll, pitch, yaw], with the unwrapped orientation
+    :param speed: max tcp speed (mm/s)
+    :param acc: max tcp acceleration (mm/s^2)
+    :param jerk: max tcp jerk (mm/s^3), 0 means no jerk limit
+    :param dt: the period of the setpoints (s)
+    :param orient_scale: the weight of the rotation (mm per rad)
+    :param is_radian: the unit of the orientation
+    :param out: preallocated (m, 6) array, the setpoints are written to out[:count] if it is large enough
+    :return: (m, 6) array of the setpoints (a view of out if given), the first is the start and the last is the end
+    """
+    points = np.asarray(points, dtype=float)
+    s, ds = path_length(points, orient_scale=orient_scale, is_radian=is_radian)
+    if len(points) < 2 or s[-1] <= 0:
+        setpoints = out[:1] if out is not None and len(out) >= 1 else np.empty((1, 6))
+        setpoints[0] = points[0]
+        return setpoints
+    k = _curvature(points[:, :3])
+    v = np.full(len(points), float(speed))
+    curved = k > 1e-9
+    v[curved] = np.minimum(v[curved], np.sqrt(acc / k[curved]))
+    window = int(round(2.0 * acc / jerk / dt)) if jerk and jerk > 0 else 1
+    if window > 1:
+        step = max(s[-1] / (len(s) - 1), 1e-9)
+        v = _sliding_min(v, 2 * int(math.ceil(speed * window * dt / step)) + 1)
+    v = _limit_acc(v, s, acc)
+
+    # constant acceleration in each interval
+    vs = v[1:] + v[:-1]
+    valid = vs > 1e-9
+    dts = np.zeros(len(ds))
+    dts[valid] = 2 * ds[valid] / vs[valid]
+    accs = np.zeros(len(ds))
+    accs[valid] = (v[1:][valid] - v[:-1][valid]) / dts[valid]
+    t = np.concatenate([[0.0], np.cumsum(dts)])
+    n = int(math.ceil(t[-1] / dt)) + 1
+    t_out = np.minimum(np.arange(n) * dt, t[-1])
+    idx = np.clip(np.searchsorted(t, t_out, side='right') - 1, 0, len(ds) - 1)
+    tau = t_out - t[idx]
+    s_out = np.minimum(s[idx] + v[idx] * tau + 0.5 * accs[idx] * tau * tau, s[-1])
+    if window > 1:
+        s_out = _moving_average_full(s_out, window)
+
+    count = len(s_out)
+    if out is not None and len(out) >= count:
+        setpoints = out[:count]
+    else:
+        setpoints = np.empty((count, 6))
+    for i in range(6):
+        setpoints[:, i] = np.interp(s_out, s, points[:, i])
+    return setpoints
+
+
+class CartesianPath(object):
+    """
+    Cartesian path builder (lines, arcs and Catmull-Rom splines), the path is densified and time parameterized
+    to the setpoints for servo cartesian streaming (set_servo_cartesian in mode 1)
+    Note:
+        1. The orientation (roll/pitch/yaw) is interpolated linearly on the unwrapped values, which is fine
+           for the small orientation changes, split the path if the orientation changes a lot
+    Ex:
+        path = CartesianPath(arm.position)
+        path.line_to([300, 0, 200, 180, 0, 0])
+        path.arc_to([350, 50, 200, 180, 0, 0], [300, 100, 200, 180, 0, 0])
+        path.spline([[250, 150, 250, 180, 0, 0], [200, 100, 300, 180, 0, 0]])
+        setpoints = path.generate(speed=100, acc=2000, jerk=10000, dt=0.004)
+        for pose in setpoints:
+            arm.set_servo_cartesian(pose)
+            time.sleep(0.004)
+    """
+    def __init__(self, start, is_radian=False, resolution=0.5, orient_scale=100.0):
+        """
+        :param start: the start pose [x, y, z, roll, pitch, yaw]
+        :param is_radian: the unit of the orientation
+        :param resolution: the distance (mm) between the densified points
+        :param orient_scale: the weight of the rotation (mm per rad)
+        """
+        self.is_radian = is_radian
+        self.resolution = resolution
+        self.orient_scale = orient_scale
+        self._start = np.asarray(start[:6], dtype=float)
+        self._segments = []
+        self._last = self._start.copy()
+        self._points = None
+
+    def __len__(self):
+        return len(self._segments)
+
+    @property
+    def end(self):
+        return self._last.copy()
+
+    def _unwrap(self, pose):
+        # keep the orientation continuous with the last pose
+        pose = np.asarray(pose[:6], dtype=float).copy()
+        period = 2 * math.pi if self.is_radian else 360.0
+        pose[3:] = self._last[3:] + (pose[3:] - self._last[3:] + period / 2) % period - period / 2
+        return pose
+
+    def _count(self, length):
+        return max(int(math.ceil(length / self.resolution)), 1)
+
+    def _append(self, points):
+        self._segments.append(points)
+        self._last = points[-1].copy()
+        self._points = None
+
+    def line_to(self, pose):
+        end = self._unwrap(pose)
+        rot = np.abs(end[3:] - self._last[3:]).max()
+        if not self.is_radian:
+            rot = math.radians(rot)
+        length = max(np.linalg.norm(end[:3] - self._last[:3]), rot * self.orient_scale)
+        u = np.linspace(0, 1, self._count(length) + 1)[1:, None]
+        self._append(self._last + (end - self._last) * u)
+        return self
+
+    def polyline(self, poses):
+        for pose in poses:
+            self.line_to(pose)
+        return self
+
+    def arc_to(self, via, end):
+        """
+        Circular arc from the current pose through the via pose to the end pose
+        """
+        via = self._unwrap(via)
+        end = self._unwrap(end)
+        p0, p1, p2 = self._last[:3], via[:3], end[:3]
+        a, b = p1 - p0, p2 - p0
+        axb = np.cross(a, b)
+        den = 2 * np.dot(axb, axb)
+        if den < 1e-9:
+            # collinear, degenerate to the lines
+            return self.line_to(via).line_to(end)
+        center = p0 + (np.dot(b, b) * np.cross(axb, a) + np.dot(a, a) * np.cross(b, axb)) / den
+        radius = np.linalg.norm(p0 - center)
+        normal = axb / np.linalg.norm(axb)
+        e1 = (p0 - center) / radius
+        e2 = np.cross(normal, e1)
+        v2 = p2 - center
+        angle = math.atan2(np.dot(v2, e2), np.dot(v2, e1)) % (2 * math.pi)
+        n = self._count(radius * angle)
+        theta = np.linspace(0, angle, n + 1)[1:]
+        points = np.empty((n, 6))
+        points[:, :3] = center + radius * (np.cos(theta)[:, None] * e1 + np.sin(theta)[:, None] * e2)
+        points[:, 3:] = self._last[3:] + (end[3:] - self._last[3:]) * (theta / angle)[:, None]
+        self._append(points)
+        return self
+
+    def spline(self, poses):
+        """
+        Catmull-Rom spline from the current pose through all the poses
+        """
+        if not poses:
+            return self
+        knots = [self._last]
+        for pose in poses:
+            self._last = self._unwrap(pose)
+            knots.append(self._last)
+        knots = np.array([knots[0]] + knots + [knots[-1]])
+        segments = []
+        for i in range(1, len(knots) - 2):
+            q0, q1, q2, q3 = knots[i - 1], knots[i], knots[i + 1], knots[i + 2]
+            # the chord underestimates the length, oversample a little
+            n = self._count(np.linalg.norm(q2[:3] - q1[:3]) * 1.2)
+            t = np.linspace(0, 1, n + 1)[1:, None]
+            t2, t3 = t * t, t * t * t
+            segments.append(0.5 * (2 * q1 + (q2 - q0) * t + (2 * q0 - 5 * q1 + 4 * q2 - q3) * t2
+                                   + (3 * q1 - q0 - 3 * q2 + q3) * t3))
+        self._append(np.concatenate(segments))
+        return self
+
+    def densify(self):
+        """
+        :return: (n, 6) array of the dense points, from the start to the end
+        """
+        if self._points is None:
+            self._points = np.concatenate([self._start[None, :]] + self._segments)
+        return self._points
+
+    def generate(self, speed, acc, jerk=0, dt=0.004, out=None):
+        """
+        :param speed: max tcp speed (mm/s)
+        :param acc: max tcp acceleration (mm/s^2)
+        :param jerk: max tcp jerk (mm/s^3), arm.tcp_jerk can be used
+        :param dt: the period of the setpoints (s)
+        :param out: preallocated (m, 6) array to reuse
+        :return: (m, 6) array of the setpoints
+        """
+        return time_parameterize(self.densify(), speed, acc, jerk=jerk, dt=dt, orient_scale=self.orient_scale,
+                                 is_radian=self.is_radian, out=out)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import os
+import json
+import time
+import functools
+import threading
+from collections import deque
+
+
+class _Span(object):
+    __slots__ = ('_profiler', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, profiler, name, cat, args):
+        self._profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = self._profiler.clock()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiler.add(self.name, self.start, self._profiler.clock(), self.cat, **self.args)
+        return False
+
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler(object):
+    """
+    Span based profiler, records (name, category, start, end, thread) of code sections
+    The spans can be exported as Chrome trace json (chrome://tracing or https://ui.perfetto.dev),
+    and the rolling duration statistics (p50/p95) of each span name are kept.
+
+    Example:
+        profiler = Profiler()
+        arm.set_profiler(profiler)  # spans of the blocking motion interfaces of the SDK
+        with profiler.span('pick', 'motion'):
+            arm.set_position(x=300, wait=True)
+        print(profiler.stats())
+        profiler.save_chrome_trace('trace.json')
+    """
+    def __init__(self, window=200, max_events=100000, clock=None, enabled=True):
+        """
+        :param window: number of the latest durations of each span name used by stats()
+        :param max_events: max number of spans kept for the trace export, the oldest ones are dropped
+        :param clock: function returns the current time in seconds, default is time.perf_counter
+        :param enabled: record spans or not
+        """
+        self.clock = clock or time.perf_counter
+        self.enabled = enabled
+        self._window = window
+        self._events = deque(maxlen=max_events)
+        self._durations = {}
+        self._count = 0
+        self._origin = self.clock()
+        self._pid = os.getpid()
+
+    def span(self, name, cat='', **args):
+        """
+        Context manager records the wall time of the code block
+
+        :param name: span name
+        :param cat: category, such as 'motion', 'sleep', 'vision', 'sdk'
+        :param args: extra info shown in the trace
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def add(self, name, start, end, cat='', **args):
+        """
+        Record a span with known start and end time (same time base as the clock)
+        """
+        if not self.enabled:
+            return
+        # deque.append is atomic, spans can be recorded from any thread without a lock
+        self._events.append((name, cat, start, end, threading.get_ident(), args))
+        durations = self._durations.get(name, None)
+        if durations is None:
+            durations = self._durations.setdefault(name, deque(maxlen=self._window))
+        durations.append(end - start)
+        self._count += 1
+
+    def wrap(self, func, name=None, cat=''):
+        """
+        Wrap a function so that every call is recorded as a span
+        """
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = self.clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, start, self.clock(), cat)
+        return wrapper
+
+    def mark(self):
+        """
+        :return: marker of the current position, used by events(since=marker)
+        """
+        return self._count
+
+    def events(self, since=None):
+        """
+        :param since: marker returned by mark(), only the spans recorded after it are returned
+        :return: list of (name, cat, start, end, thread_id, args)
+        """
+        events = list(self._events)
+        if since is not None:
+            events = events[max(0, len(events) - (self._count - since)):]
+        return events
+
+    def clear(self):
+        self._events.clear()
+        self._durations.clear()
+
+    @staticmethod
+    def _percentile(values, p):
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    def stats(self, name=None):
+        """
+        Rolling statistics of the span durations (seconds)
+
+        :param name: span name, None means all
+        :return: {name: {'count', 'avg', 'p50', 'p95', 'max'}}
+        """
+        names = [name] if name is not None else list(self._durations.keys())
+        result = {}
+        for key in names:
+            values = sorted(self._durations.get(key, ()))
+            if not values:
+                continue
+            result[key] = {
+                'count': len(values),
+                'avg': sum(values) / len(values),
+                'p50': self._percentile(values, 0.5),
+                'p95': self._percentile(values, 0.95),
+                'max': values[-1],
+            }
+        return result
+
+    def to_chrome_trace(self, events=None):
+        """
+        :param events: spans returned by events(), default is all the recorded spans
+        :return: dict of the Chrome trace event format
+        """
+        events = self.events() if events is None else events
+        trace = []
+        for name, cat, start, end, tid, args in events:
+            trace.append({
+                'name': name, 'cat': cat or 'default', 'ph': 'X', 'pid': self._pid, 'tid': tid,
+                'ts': round((start - self._origin) * 1e6, 3), 'dur': round((end - start) * 1e6, 3),
+                'args': args,
+            })
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path, events=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(events), f, ensure_ascii=False, default=str)
+        return path
+
+
+def profiled(name=None, cat=''):
+    """
+    Method decorator, records every call as a span of self.profiler (nothing is recorded if it is None)
+
+    Example:
+        class Robot(object):
+            profiler = None
+
+            @profiled(cat='motion')
+            def motion_home(self):
+                ...
+    """
+    def _profiled(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def decorator(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None or not profiler.enabled:
+                return func(self, *args, **kwargs)
+            start = profiler.clock()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                profiler.add(span_name, start, profiler.clock(), cat)
+        return decorator
+    return _profiled
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import time
+import threading
+from collections import deque
+from ..core.utils.log import logger
+
+
+class VelocityStream(object):
+    """
+    Rate-controlled velocity streaming (velocity control mode)
+
+    The targets can be set from any thread, the stream thread only sends the latest target at a fixed rate.
+    Every command is sent with a short duration, so the controller stops the arm by itself if the stream
+    thread dies, and the target is ramped to zero if the producer does not update it in time.
+    Ex:
+        arm.set_mode(5)
+        arm.set_state(0)
+        with VelocityStream(arm, mode=VelocityStream.CARTESIAN, rate=100) as vs:
+            while tracking:
+                vs.set_target([vx, vy, 0, 0, 0, 0])
+    """
+    JOINT = 'joint'
+    CARTESIAN = 'cartesian'
+
+    def __init__(self, arm, mode='cartesian', rate=100, watchdog=None, stall_timeout=0.1, ramp_time=0.2,
+                 is_radian=None, is_tool_coord=False, is_sync=True):
+        """
+        :param arm: instance of XArmAPI (or XArm)
+        :param mode: VelocityStream.CARTESIAN (mode 5) or VelocityStream.JOINT (mode 4)
+        :param rate: send rate (Hz)
+        :param watchdog: the duration (s) sent with every command, the arm stops if no command arrives within it,
+            default is 3 periods (at least 0.05s)
+        :param stall_timeout: the target is ramped to zero if not updated within this time (s)
+        :param ramp_time: the time (s) to ramp the stalled target to zero
+        :param is_radian: the unit of the rotation speeds, default is self.default_is_radian
+        :param is_tool_coord: only for cartesian mode
+        :param is_sync: only for joint mode
+        """
+        assert mode in (self.JOINT, self.CARTESIAN)
+        self._arm = arm
+        self.mode = mode
+        self.period = 1.0 / max(float(rate), 1.0)
+        self.watchdog = watchdog if watchdog is not None else max(self.period * 3, 0.05)
+        self.stall_timeout = stall_timeout
+        self.ramp_time = max(ramp_time, self.period)
+        self.is_radian = is_radian
+        self.is_tool_coord = is_tool_coord
+        self.is_sync = is_sync
+
+        self._lock = threading.Lock()
+        self._target = None
+        self._target_time = 0
+        self._target_seq = 0
+        self._sent_seq = 0
+        self._ramp_from = None
+        self._last_sent = None
+
+        self._send_times = deque(maxlen=max(int(rate), 10))
+        self.send_count = 0
+        self.error_count = 0
+        self.overrun_count = 0
+        self.stall_count = 0
+        self.last_code = 0
+        self._latency_sum = 0
+        self._latency_max = 0
+        self._latency_count = 0
+        self._call_sum = 0
+        self._call_max = 0
+
+        self._alive = False
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def alive(self):
+        return self._alive
+
+    @property
+    def stalled(self):
+        return self._ramp_from is not None
+
+    def start(self):
+        if self._alive:
+            return
+        self._alive = True
+        self._thread = threading.Thread(target=self._stream_thread, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1):
+        """
+        Stop the stream and send the zero velocity
+        """
+        if not self._alive:
+            return
+        self._alive = False
+        self._thread.join(timeout)
+        self._send([0] * self._dof())
+        with self._lock:
+            self._target = None
+
+    def set_target(self, speeds):
+        """
+        Set the velocity target, thread safe, only the latest target is sent
+
+        :param speeds: joint speeds (mode 4) or [spd_x, spd_y, spd_z, spd_rx, spd_ry, spd_rz] (mode 5)
+        """
+        speeds = list(speeds)
+        with self._lock:
+            self._target = speeds
+            self._target_time = time.monotonic()
+            self._target_seq += 1
+
+    def stats(self):
+        """
+        :return: dict of the counters
+            send_rate: the actual send rate (Hz) over the latest sends
+            latency_avg/latency_max: the time (s) from set_target to the target being sent
+            call_avg/call_max: the time (s) spent in the vc_set_* call
+        """
+        times = list(self._send_times)
+        rate = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0
+        return {
+            'send_rate': rate,
+            'send_count': self.send_count,
+            'error_count': self.error_count,
+            'overrun_count': self.overrun_count,
+            'stall_count': self.stall_count,
+            'stalled': self.stalled,
+            'last_code': self.last_code,
+            'latency_avg': self._latency_sum / self._latency_count if self._latency_count else 0,
+            'latency_max': self._latency_max,
+            'call_avg': self._call_sum / self.send_count if self.send_count else 0,
+            'call_max': self._call_max,
+        }
+
+    def reset_stats(self):
+        self._send_times.clear()
+        self.send_count = self.error_count = self.overrun_count = self.stall_count = 0
+        self._latency_sum = self._latency_max = self._latency_count = 0
+        self._call_sum = self._call_max = 0
+
+    def _dof(self):
+        if self.mode == self.CARTESIAN:
+            return 6
+        return getattr(self._arm, 'axis', 7)
+
+    def _send(self, speeds):
+        start = time.monotonic()
+        try:
+            if self.mode == self.CARTESIAN:
+                code = self._arm.vc_set_cartesian_velocity(speeds, is_radian=self.is_radian,
+                                                           is_tool_coord=self.is_tool_coord,
+                                                           duration=self.watchdog, ignore_log=True)
+            else:
+                code = self._arm.vc_set_joint_velocity(speeds, is_radian=self.is_radian, is_sync=self.is_sync,
+                                                       duration=self.watchdog, ignore_log=True)
+        except Exception as e:
+            logger.error('VelocityStream -> send exception: {}'.format(e))
+            code = -3
+        end = time.monotonic()
+        self._send_times.append(end)
+        self.send_count += 1
+        self._call_sum += end - start
+        self._call_max = max(self._call_max, end - start)
+        self.last_code = code
+        if code != 0:
+            self.error_count += 1
+        self._last_sent = speeds
+        return code, end
+
+    def _next_speeds(self, now):
+        with self._lock:
+            target, target_time, seq = self._target, self._target_time, self._target_seq
+        if target is None:
+            return None, 0, 0
+        age = now - target_time
+        if age <= self.stall_timeout:
+            self._ramp_from = None
+            return target, target_time, seq
+        # producer stalled, ramp the last sent velocity to zero
+        if self._ramp_from is None:
+            self._ramp_from = self._last_sent or target
+            self.stall_count += 1
+            logger.warning('VelocityStream -> target not updated for {:.3f}s, ramp to zero'.format(age))
+        scale = max(0.0, 1.0 - (age - self.stall_timeout) / self.ramp_time)
+        if scale == 0 and self._last_sent is not None and not any(self._last_sent):
+            # already stopped, the controller keeps zero velocity, no need to send more
+            return None, 0, 0
+        return [v * scale for v in self._ramp_from], 0, 0
+
+    def _stream_thread(self):
+        next_time = time.monotonic()
+        while self._alive:
+            next_time += self.period
+            now = time.monotonic()
+            if next_time > now:
+                time.sleep(next_time - now)
+            elif now - next_time > self.period:
+                # missed at least one period, restart the schedule instead of bursting
+                self.overrun_count += 1
+                next_time = now
+            if not self._alive:
+                break
+            speeds, target_time, seq = self._next_speeds(time.monotonic())
+            if speeds is None:
+                continue
+            code, sent_time = self._send(speeds)
+            if seq and seq != self._sent_seq:
+                self._sent_seq = seq
+                latency = sent_time - target_time
+                self._latency_sum += latency
+                self._latency_count += 1
+                self._latency_max = max(self._latency_max, latency)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+
+import os
+import json
+import math
+import time
+import threading
+from ..core.utils.log import logger
+
+
+class WaypointLibrary(object):
+    """
+    Named waypoint library with a persisted IK cache
+
+    The named poses are validated once (IK + joint limit check) and the joint solutions are stored in a json
+    file keyed by the controller sn, tcp offset and world offset, so the next startup only re-solves the poses
+    which have changed. All the values are in mm and degrees.
+    If the secondary control connection is open (connect_safety), the uncached waypoints are solved on both
+    connections at the same time, each connection serializes its own requests.
+    Ex:
+        wl = WaypointLibrary(arm, cache_path='waypoints.json')
+        wl.add('home', [179.2, -42.1, 7.4, 186.7, 41.5, -1.6], kind=WaypointLibrary.JOINT)
+        wl.add('cup_grab', [214.0, -100.2, 145.0, -25.6, -88.5, 95.8])
+        code, unreachable = wl.validate()
+        wl.move_to('cup_grab', speed=20, mvacc=500, wait=True)
+    """
+    LINEAR = 'linear'
+    JOINT = 'joint'
+
+    def __init__(self, arm, cache_path=None, precision=3):
+        """
+        :param arm: instance of XArmAPI (or XArm)
+        :param cache_path: the json file of the cache, default is None (no persistence)
+        :param precision: the decimals used to compare the poses and the offsets
+        """
+        self._arm = arm
+        self.cache_path = cache_path
+        self.precision = precision
+        self._waypoints = {}
+        self._solutions = {}
+        self.last_validate_time = None
+
+    def _round(self, values):
+        return [round(float(v), self.precision) for v in values]
+
+    def add(self, name, pose, kind='linear'):
+        """
+        Add (or replace) a named waypoint
+
+        :param name: the name of the waypoint
+        :param pose: [x, y, z, roll, pitch, yaw] if kind is linear, else the joint angles
+        :param kind: WaypointLibrary.LINEAR or WaypointLibrary.JOINT
+        """
+        assert kind in (self.LINEAR, self.JOINT)
+        self._waypoints[name] = {'kind': kind, 'pose': self._round(pose)}
+        self._solutions.pop(name, None)
+
+    def update(self, waypoints, kind='linear'):
+        """
+        :param waypoints: dict of {name: pose}
+        """
+        for name, pose in waypoints.items():
+            self.add(name, pose, kind=kind)
+
+    def remove(self, name):
+        self._waypoints.pop(name, None)
+        self._solutions.pop(name, None)
+
+    @property
+    def names(self):
+        return list(self._waypoints.keys())
+
+    @property
+    def unreachable(self):
+        return [name for name in self._waypoints if not self.is_reachable(name)]
+
+    def is_reachable(self, name):
+        solution = self._solutions.get(name, None)
+        return solution is not None and solution['reachable']
+
+    def get_angles(self, name):
+        """
+        :return: the cached joint solution (degrees), None if not validated or unreachable
+        """
+        solution = self._solutions.get(name, None)
+        if solution is None or not solution['reachable']:
+            return None
+        return list(solution['angles'])
+
+    def cache_key(self):
+        """
+        The cache is only valid for the same controller, tcp offset and world offset
+        """
+        tcp_offset = self._arm.position_offset if hasattr(self._arm, 'position_offset') else self._arm.tcp_offset
+        is_radian = getattr(self._arm, 'default_is_radian', False)
+        if is_radian:
+            tcp_offset = [math.degrees(v) if 2 < i < 6 else v for i, v in enumerate(tcp_offset)]
+            world_offset = [math.degrees(v) if 2 < i < 6 else v for i, v in enumerate(self._arm.world_offset)]
+        else:
+            world_offset = self._arm.world_offset
+        return '{}|{}|{}'.format(self._arm.sn, self._round(tcp_offset), self._round(world_offset))
+
+    def _load_cache(self, key):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get(key, {})
+        except Exception as e:
+            logger.warning('WaypointLibrary -> load cache failed, {}'.format(e))
+            return {}
+
+    def _save_cache(self, key):
+        if not self.cache_path:
+            return
+        try:
+            data = {}
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            data[key] = self._solutions
+            tmp_path = '{}.tmp'.format(self.cache_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning('WaypointLibrary -> save cache failed, {}'.format(e))
+
+    def _solve(self, waypoint):
+        if waypoint['kind'] == self.JOINT:
+            code, angles = 0, waypoint['pose']
+        else:
+            code, angles = self._arm.get_inverse_kinematics(waypoint['pose'], input_is_radian=False,
+                                                            return_is_radian=False)
+            if code != 0:
+                return code, {'pose': waypoint['pose'], 'kind': waypoint['kind'], 'angles': [], 'reachable': False}
+        code, limit = self._arm.is_joint_limit(angles, is_radian=False)
+        reachable = code == 0 and limit is False
+        return code, {'pose': waypoint['pose'], 'kind': waypoint['kind'], 'angles': self._round(angles),
+                      'reachable': reachable}
+
+    def _solve_with(self, arm_cmd, waypoint):
+        # same as _solve, but on the given control connection
+        core = getattr(self._arm, 'arm', self._arm)
+        if waypoint['kind'] == self.JOINT:
+            angles = waypoint['pose']
+        else:
+            ret = arm_cmd.get_ik([v if i < 3 else math.radians(v) for i, v in enumerate(waypoint['pose'][:6])])
+            code = core._check_code(ret[0])
+            if code != 0:
+                return code, {'pose': waypoint['pose'], 'kind': waypoint['kind'], 'angles': [], 'reachable': False}
+            angles = [math.degrees(v) for v in ret[1:8]]
+        joints = [math.radians(angles[i]) if i < len(angles) else core._last_angles[i] for i in range(7)]
+        ret = arm_cmd.is_joint_limit(joints)
+        code = core._check_code(ret[0])
+        reachable = code == 0 and not ret[1]
+        return code, {'pose': waypoint['pose'], 'kind': waypoint['kind'], 'angles': self._round(angles),
+                      'reachable': reachable}
+
+    def _solve_all(self, waypoints):
+        """
+        Solve the waypoints, split over the main and the secondary connection if both are connected
+
+        :param waypoints: list of (name, waypoint)
+        :return: list of (name, code, solution)
+        """
+        core = getattr(self._arm, 'arm', self._arm)
+        if len(waypoints) < 2 or not getattr(core, 'connected_safety', False):
+            return [(name, ) + self._solve(waypoint) for name, waypoint in waypoints]
+        connections = [core.arm_cmd, core.arm_cmd_safety]
+        results = [None] * len(waypoints)
+
+        def worker(index):
+            for i in range(index, len(waypoints), len(connections)):
+                name, waypoint = waypoints[i]
+                results[i] = (name, ) + self._solve_with(connections[index], waypoint)
+
+        threads = [threading.Thread(target=worker, args=(index, ), daemon=True) for index in range(len(connections))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def validate(self, force=False):
+        """
+        Validate all the waypoints, the cached solutions are reused if the pose and the cache key are unchanged
+
+        :param force: ignore the cache and re-solve all the waypoints
+        :return: tuple((code, unreachable)), only when code is 0, the unreachable is valid
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            unreachable: the names of the unreachable waypoints
+        """
+        start = time.monotonic()
+        key = self.cache_key()
+        cached = {} if force else self._load_cache(key)
+        pending = []
+        for name, waypoint in self._waypoints.items():
+            solution = cached.get(name, None)
+            if solution is not None and solution['pose'] == waypoint['pose'] and solution['kind'] == waypoint['kind']:
+                self._solutions[name] = solution
+            else:
+                pending.append((name, waypoint))
+        for name, code, solution in self._solve_all(pending):
+            if code != 0 and not self._arm.connected:
+                return code, []
+            self._solutions[name] = solution
+        if pending:
+            self._save_cache(key)
+        unreachable = self.unreachable
+        self.last_validate_time = time.monotonic() - start
+        logger.info('WaypointLibrary -> validate {} waypoints ({} solved) in {:.3f}s, unreachable={}'.format(
+            len(self._waypoints), len(pending), self.last_validate_time, unreachable))
+        return 0, unreachable
+
+    def move_to(self, name, speed=None, mvacc=None, mvtime=None, wait=False, timeout=None, **kwargs):
+        """
+        Joint move to the cached solution of the waypoint
+        Note:
+            1. The path is joint interpolated, use set_position if the linear path is required
+
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        angles = self.get_angles(name)
+        if angles is None:
+            logger.error('WaypointLibrary -> waypoint {} is not validated or unreachable'.format(name))
+            return -3
+        return self._arm.set_servo_angle(angle=angles, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=False,
+                                         wait=wait, timeout=timeout, **kwargs)
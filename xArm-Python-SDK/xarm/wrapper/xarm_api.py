@@ -1437,6 +1437,44 @@ class XArmAPI(object):
         """
         return self._arm.set_state(state=state)
 
+    def connect_safety(self):
+        """
+        Open a dedicated control connection for safety_set_state (socket connection only)
+        Note:
+            1. the commands of the main connection are serialized by a lock, a stop sent on the
+                main connection waits until the command in flight (such as a blocking query) returns,
+                the commands of the safety connection never wait for it
+            2. the connection is closed by disconnect()
+
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.connect_safety()
+
+    @property
+    def connected_safety(self):
+        """
+        Connection status of the safety connection
+        """
+        return self._arm.connected_safety
+
+    def safety_set_state(self, state):
+        """
+        Set the xArm state through the safety connection (the main connection if it is not connected)
+        Note:
+            1. unlike set_state, the current state is not queried before and after the command,
+                the state is updated by the report thread
+            2. only used for pause/resume/stop of the safety function, such as the human detection
+
+        :param state:
+            0: sport state
+            3: pause state
+            4: stop state
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.safety_set_state(state)
+
     def set_mode(self, mode=0, detection_param=0):
         """
         Set the xArm mode
@@ -2618,6 +2656,21 @@ class XArmAPI(object):
         """
         return self._arm.set_baud_checkset_enable(enable)
 
+    def set_profiler(self, profiler):
+        """
+        Set the profiler which records the spans of the blocking motion interfaces
+        (set_position/set_tool_position/set_servo_angle/wait_move)
+        Note:
+            1. the span of set_position(wait=True) includes the communication and the wait_move span,
+                the difference between them is the time spent on sending the command
+            2. see xarm.tools.profiler.Profiler for details
+
+        :param profiler: instance of xarm.tools.profiler.Profiler, None means disable
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.set_profiler(profiler)
+
     def set_checkset_default_baud(self, type_, baud):
         """
         Set the checkset baud value
@@ -3000,6 +3053,8 @@ class XArmAPI(object):
             duration > 0: seconds
             duration == 0: Always effective, will not stop automatically
             duration < 0: default value, only used to be compatible with the old protocol, equivalent to 0
+        :param kwargs: reserved parameters
+            ignore_log: do not log the successful call (for high rate streaming), default is False
         :return: code
             code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
         """
@@ -3019,6 +3074,8 @@ class XArmAPI(object):
             duration > 0: seconds, indicates the maximum number of seconds that this speed can be maintained
             duration == 0: Always effective, will not stop automatically
             duration < 0: default value, only used to be compatible with the old protocol, equivalent to 0
+        :param kwargs: reserved parameters
+            ignore_log: do not log the successful call (for high rate streaming), default is False
         :return: code
             code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
         """
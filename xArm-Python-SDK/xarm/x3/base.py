@@ -41,7 +41,7 @@ from ..core.utils.log import logger, pretty_print
 from ..core.utils import convert
 from ..core.config.x_code import ControllerWarn, ControllerError, ControllerErrorCodeMap, ControllerWarnCodeMap
 from .utils import compare_time, compare_version, filter_invaild_number
-from .decorator import xarm_is_connected, xarm_is_ready, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_wait_until_not_pause
+from .decorator import xarm_is_connected, xarm_is_ready, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_wait_until_not_pause, xarm_profile_span
 from .code import APIState
 from ..tools.threads import ThreadManage
 from ..version import __version__
@@ -114,6 +114,8 @@ class Base(BaseObject, Events):
             self.arm_cmd = None
             self._stream_503 = None # 透传使用
             self.arm_cmd_503 = None # 透传使用
+            self._stream_safety = None  # dedicated connection of safety_set_state
+            self.arm_cmd_safety = None
             self._stream_report = None
             self._report_thread = None
             self._only_report_err_warn_changed = True
@@ -166,6 +168,7 @@ class Base(BaseObject, Events):
             self._first_report_over = False
             self._default_is_radian = is_radian
             self._only_check_type = kwargs.get('only_check_type', 0)
+            self._profiler = None
 
             self._sleep_finish_time = time.monotonic()
             self._is_old_protocol = False
@@ -182,6 +185,7 @@ class Base(BaseObject, Events):
             self._pause_cond = threading.Condition()
             self._pause_lock = threading.Lock()
             self._pause_cnts = 0
+            self._cmdnum_cond = threading.Condition()
 
             self._realtime_tcp_speed = 0
             self._realtime_joint_speeds = [0, 0, 0, 0, 0, 0, 0]
@@ -484,6 +488,10 @@ class Base(BaseObject, Events):
     def connected_503(self):
         return self._stream_503 is not None and self._stream_503.connected
 
+    @property
+    def connected_safety(self):
+        return self._stream_safety is not None and self._stream_safety.connected
+
     @property
     def reported(self):
         return self._stream_report is not None and self._stream_report.connected
@@ -800,10 +808,27 @@ class Base(BaseObject, Events):
     def wait_until_cmdnum_lt_max(self):
         if not self._check_cmdnum_limit:
             return
-        while self.connected and self.cmd_num >= self._max_cmd_num:
+        self.wait_until_cmdnum_lt(self._max_cmd_num)
+
+    def wait_until_cmdnum_lt(self, num, timeout=None):
+        expired = time.monotonic() + timeout if timeout is not None and timeout > 0 else 0
+        while self.connected and self.cmd_num >= num:
+            remaining = expired - time.monotonic() if expired else 0.1
+            if remaining <= 0:
+                return False
             if time.monotonic() - self._last_report_time > 0.4:
                 self.get_cmdnum()
-            time.sleep(0.05)
+            # woken up by the report thread as soon as a new cmdnum arrives
+            self.wait_cmdnum_changed(min(remaining, 0.1))
+        return self.connected
+
+    def wait_cmdnum_changed(self, timeout=None):
+        with self._cmdnum_cond:
+            return self._cmdnum_cond.wait(timeout)
+
+    def _notify_cmdnum_waiters(self):
+        with self._cmdnum_cond:
+            self._cmdnum_cond.notify_all()
 
     @property
     def check_xarm_is_ready(self):
@@ -855,6 +880,32 @@ class Base(BaseObject, Events):
         self.arm_cmd_503.set_debug(self._debug)
         return 0
 
+    @xarm_is_connected(_type='set')
+    def connect_safety(self):
+        if self._stream_type != 'socket':
+            return APIState.API_EXCEPTION
+        if self.connected_safety:
+            return 0
+        # a second control connection, its commands never wait for the lock of the main connection
+        self._stream_safety = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT,
+            heartbeat=self._enable_heartbeat, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds)
+        if not self.connected_safety:
+            return APIState.NOT_CONNECTED
+        self.arm_cmd_safety = UxbusCmdTcp(self._stream_safety)
+        self.arm_cmd_safety.set_protocol_identifier(self.arm_cmd.get_protocol_identifier())
+        self.arm_cmd_safety.set_debug(self._debug)
+        return 0
+
+    @xarm_is_connected(_type='set')
+    def safety_set_state(self, state):
+        arm_cmd = self.arm_cmd_safety if self.connected_safety else self.arm_cmd
+        ret = arm_cmd.set_state(state)
+        ret[0] = self._check_code(ret[0])
+        # the state and the paused api calls are updated by the report thread
+        self.log_api_info('API -> safety_set_state({}) -> code={}, safety_channel={}'.format(
+            state, ret[0], arm_cmd is self.arm_cmd_safety), code=ret[0])
+        return ret[0]
+
     def connect(self, port=None, baudrate=None, timeout=None, axis=None, arm_type=None):
         if self.connected:
             return
@@ -1025,6 +1076,11 @@ class Base(BaseObject, Events):
                 self._stream_503.close()
             except:
                 pass
+        if self._stream_safety:
+            try:
+                self._stream_safety.close()
+            except:
+                pass
         if self._stream_report:
             try:
                 self._stream_report.close()
@@ -1055,6 +1111,10 @@ class Base(BaseObject, Events):
         self._baud_checkset = enable
         return 0
 
+    def set_profiler(self, profiler):
+        self._profiler = profiler
+        return 0
+
     def set_checkset_default_baud(self, type_, baud):
         if type_ == 1:
             self._default_gripper_baud = baud
@@ -1259,6 +1319,7 @@ class Base(BaseObject, Events):
         if self._pause_cnts > 0:
             with self._pause_cond:
                 self._pause_cond.notifyAll()
+        self._notify_cmdnum_waiters()
         self.disconnect()
 
     def _handle_report_data(self, data):
@@ -1377,6 +1438,7 @@ class Base(BaseObject, Events):
             update_time = time.monotonic()
             self._last_update_cmdnum_time = update_time
             self._last_update_state_time = update_time
+            self._notify_cmdnum_waiters()
             self._last_update_err_time = update_time
 
             for i in range(len(pose)):
@@ -1644,6 +1706,7 @@ class Base(BaseObject, Events):
             update_time = time.monotonic()
             self._last_update_cmdnum_time = update_time
             self._last_update_state_time = update_time
+            self._notify_cmdnum_waiters()
             self._last_update_err_time = update_time
 
             self._arm_motor_brake_states = mtbrake
@@ -2190,10 +2253,12 @@ class Base(BaseObject, Events):
         ret = self.arm_cmd.get_cmdnum()
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
-            if ret[1] != self._cmd_num:
-                self._report_cmdnum_changed_callback()
+            changed = ret[1] != self._cmd_num
             self._cmd_num = ret[1]
             self._last_update_cmdnum_time = time.monotonic()
+            if changed:
+                self._report_cmdnum_changed_callback()
+            self._notify_cmdnum_waiters()
         return ret[0], self._cmd_num
 
     @xarm_is_connected(_type='get')
@@ -2328,6 +2393,7 @@ class Base(BaseObject, Events):
             time.sleep(0.05)
         return APIState.WAIT_FINISH_TIMEOUT, -1
     
+    @xarm_profile_span
     def wait_move(self, timeout=None, trans_id=-1):
         if self._support_feedback and trans_id > 0:
             return self._wait_feedback(timeout, trans_id)[0]
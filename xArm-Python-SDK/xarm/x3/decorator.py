@@ -82,6 +82,20 @@ def xarm_wait_until_cmdnum_lt_max(func):
     return decorator
 
 
+def xarm_profile_span(func):
+    @functools.wraps(func)
+    def decorator(self, *args, **kwargs):
+        profiler = self._profiler
+        if profiler is None or not profiler.enabled:
+            return func(self, *args, **kwargs)
+        start = profiler.clock()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            profiler.add(func.__name__, start, profiler.clock(), 'sdk', wait=kwargs.get('wait', False))
+    return decorator
+
+
 def xarm_is_not_simulation_mode(ret=0):
     def _xarm_is_not_simulation_mode(func):
         @functools.wraps(func)
@@ -25,7 +25,7 @@ from .ft_sensor import FtSensor
 from .modbus_tcp import ModbusTcp
 from .parse import GcodeParser
 from .code import APIState
-from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max
+from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max, xarm_profile_span
 from .utils import to_radian
 try:
     # from ..tools.blockly_tool import BlocklyTool
@@ -226,6 +226,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
             return self._set_position_absolute(*tcp_pos, radius=radius, speed=speed, mvacc=mvacc, mvtime=mvtime,
                                                is_radian=True, wait=wait, timeout=timeout, **kwargs)
 
+    @xarm_profile_span
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
     @xarm_is_ready(_type='set')
@@ -249,6 +250,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
                                                speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
                                                wait=wait, timeout=timeout, **kwargs)
 
+    @xarm_profile_span
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
     @xarm_is_ready(_type='set')
@@ -449,6 +451,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
             return self._set_servo_angle_absolute(joints, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=True,
                                                   wait=wait, timeout=timeout, radius=radius, **kwargs)
 
+    @xarm_profile_span
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
     @xarm_is_ready(_type='set')
@@ -1662,7 +1665,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
         return ret[0], ret[1]
     
     @xarm_is_connected(_type='set')
-    def vc_set_joint_velocity(self, speeds, is_radian=None, is_sync=True, check_mode=True, duration=-1):
+    def vc_set_joint_velocity(self, speeds, is_radian=None, is_sync=True, check_mode=True, duration=-1, **kwargs):
         # if check_mode and not self._check_mode_is_correct(4):
         #     return APIState.MODE_IS_NOT_CORRECT
         is_radian = self._default_is_radian if is_radian is None else is_radian
@@ -1674,13 +1677,14 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
 
         ret = self.arm_cmd.vc_set_jointv(jnt_v, 1 if is_sync else 0, duration if self.version_is_ge(1, 8, 0) else -1)
         ret[0] = self._check_code(ret[0], is_move_cmd=True, mode=4)
-        self.log_api_info('API -> vc_set_joint_velocity -> code={}, speeds={}, is_sync={}'.format(
-            ret[0], jnt_v, is_sync
-        ), code=ret[0])
+        if not kwargs.get('ignore_log', False) or ret[0] != 0:
+            self.log_api_info('API -> vc_set_joint_velocity -> code={}, speeds={}, is_sync={}'.format(
+                ret[0], jnt_v, is_sync
+            ), code=ret[0])
         return ret[0]
 
     @xarm_is_connected(_type='set')
-    def vc_set_cartesian_velocity(self, speeds, is_radian=None, is_tool_coord=False, check_mode=True, duration=-1):
+    def vc_set_cartesian_velocity(self, speeds, is_radian=None, is_tool_coord=False, check_mode=True, duration=-1, **kwargs):
         # if check_mode and not self._check_mode_is_correct(5):
         #     return APIState.MODE_IS_NOT_CORRECT
         is_radian = self._default_is_radian if is_radian is None else is_radian
@@ -1691,9 +1695,10 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
             line_v[i] = spd if i <= 2 else to_radian(spd, is_radian)
         ret = self.arm_cmd.vc_set_linev(line_v, 1 if is_tool_coord else 0, duration if self.version_is_ge(1, 8, 0) else -1)
         ret[0] = self._check_code(ret[0], is_move_cmd=True, mode=5)
-        self.log_api_info('API -> vc_set_cartesian_velocity -> code={}, speeds={}, is_tool_coord={}'.format(
-            ret[0], line_v, is_tool_coord
-        ), code=ret[0])
+        if not kwargs.get('ignore_log', False) or ret[0] != 0:
+            self.log_api_info('API -> vc_set_cartesian_velocity -> code={}, speeds={}, is_tool_coord={}'.format(
+                ret[0], line_v, is_tool_coord
+            ), code=ret[0])
         return ret[0]
 
     @xarm_is_connected(_type='get')